@@ -2067,15 +2067,23 @@ app.get("/api/trader/status", (_req, res) => {
   });
 });
 
+/** Telemetry batches arrive as { events: [...] }; single posts as { event }. */
+function bodyEvents(body: any): any[] {
+  if (Array.isArray(body?.events)) return body.events.filter((e: any) => e && typeof e === "object");
+  return body?.event ? [body.event] : [];
+}
+
 app.post("/api/trader/event", (req, res) => {
-  const { event } = req.body || {};
-  if (!event) return res.status(400).json({ error: "No event" });
-  event.timestamp = Date.now();
-  traderLiveState.events.push(event);
+  const events = bodyEvents(req.body);
+  if (!events.length) return res.status(400).json({ error: "No event" });
+  for (const event of events) {
+    event.timestamp = Date.now();
+    traderLiveState.events.push(event);
+    io.emit("trader_event", event);
+  }
   traderLiveState.last_update = Date.now();
   if (traderLiveState.events.length > 200) traderLiveState.events = traderLiveState.events.slice(-200);
-  io.emit("trader_event", event);
-  res.json({ ok: true });
+  res.json({ ok: true, received: events.length });
 });
 
 app.get("/api/trader/live", (_req, res) => {
@@ -2890,14 +2898,16 @@ app.post("/api/frankenstein/swarm/start", (req, res) => {
 });
 
 app.post("/api/frankenstein/swarm/event", (req, res) => {
-  const { event } = req.body || {};
-  if (!event) return res.status(400).json({ error: "No event" });
-  fswarmState.events.push(event);
-  if (event.type === "swarm_session_done" && event.output) {
-    fswarmState.result = event.output;
+  const events = bodyEvents(req.body);
+  if (!events.length) return res.status(400).json({ error: "No event" });
+  for (const event of events) {
+    fswarmState.events.push(event);
+    if (event.type === "swarm_session_done" && event.output) {
+      fswarmState.result = event.output;
+    }
+    io.emit("fswarm_event", { session_id: fswarmState.session_id, event });
   }
-  io.emit("fswarm_event", { session_id: fswarmState.session_id, event });
-  res.json({ ok: true });
+  res.json({ ok: true, received: events.length });
 });
 
 app.get("/api/frankenstein/swarm/status", (_req, res) => {
@@ -2931,35 +2941,38 @@ const terminalLiveState: {
 } = { active: false, events: [], current_task: null, last_update: 0 };
 
 app.post("/api/frankenstein/terminal/event", (req, res) => {
-  const { event } = req.body || {};
-  if (!event) return res.status(400).json({ error: "No event" });
-  event.timestamp = Date.now();
-  terminalLiveState.events.push(event);
-  terminalLiveState.last_update = Date.now();
-
-  if (event.type === "terminal_batch_start") {
-    terminalLiveState.active = true;
-    terminalLiveState.current_task = null;
-  } else if (event.type === "terminal_task_start") {
-    terminalLiveState.current_task = { id: event.task_id, title: event.title, difficulty: event.difficulty, category: event.category, steps: [], started_at: Date.now() };
-  } else if (event.type === "terminal_step") {
-    if (terminalLiveState.current_task) {
-      terminalLiveState.current_task.steps.push({ command: event.command, output: event.output, error: event.error, step: event.step });
+  const events = bodyEvents(req.body);
+  if (!events.length) return res.status(400).json({ error: "No event" });
+  for (const event of events) {
+    event.timestamp = Date.now();
+    terminalLiveState.events.push(event);
+
+    if (event.type === "terminal_batch_start") {
+      terminalLiveState.active = true;
+      terminalLiveState.current_task = null;
+    } else if (event.type === "terminal_task_start") {
+      terminalLiveState.current_task = { id: event.task_id, title: event.title, difficulty: event.difficulty, category: event.category, steps: [], started_at: Date.now() };
+    } else if (event.type === "terminal_step") {
+      if (terminalLiveState.current_task) {
+        terminalLiveState.current_task.steps.push({ command: event.command, output: event.output, error: event.error, step: event.step });
+      }
+    } else if (event.type === "terminal_task_done") {
+      terminalLiveState.current_task = null;
+    } else if (event.type === "terminal_batch_done") {
+      terminalLiveState.active = false;
+      terminalLiveState.current_task = null;
     }
-  } else if (event.type === "terminal_task_done") {
-    terminalLiveState.current_task = null;
-  } else if (event.type === "terminal_batch_done") {
-    terminalLiveState.active = false;
-    terminalLiveState.current_task = null;
+
+    io.emit("terminal_live_event", event);
   }
+  terminalLiveState.last_update = Date.now();
 
   // Keep last 200 events
   if (terminalLiveState.events.length > 200) {
     terminalLiveState.events = terminalLiveState.events.slice(-200);
   }
 
-  io.emit("terminal_live_event", event);
-  res.json({ ok: true });
+  res.json({ ok: true, received: events.length });
 });
 
 app.get("/api/frankenstein/terminal/live", (_req, res) => {
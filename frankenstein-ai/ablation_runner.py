@@ -45,6 +45,7 @@ from task_generator import generate_task
 from task_generator_v2 import generate_v2_task
 from code_agent import FrankensteinCodeAgent, SolveMetadata
 from programming_env import evaluate_solution
+from task_bank import TaskBank
 
 console = Console()
 
@@ -53,6 +54,7 @@ DATA_DIR = Path(__file__).parent / "training_data"
 CONFIG_PATH = DATA_DIR / "config.json"
 RESULTS_PATH = DATA_DIR / "ablation_results.json"
 BACKUP_CONFIG_PATH = DATA_DIR / "config_backup.json"
+TASK_BANK_DIR = DATA_DIR / "task_bank"
 
 # Ablation configurations: which modules to disable
 ABLATION_CONFIGS = {
@@ -124,7 +126,23 @@ def _apply_ablation_config(config_name: str) -> dict[str, bool]:
     return states
 
 
-def generate_benchmark_tasks(num_tasks: int, seed: int = 42) -> list:
+def generate_benchmark_tasks(num_tasks: int, seed: int = 42, cache: bool = True) -> list:
+    """Load the fixed benchmark set from the task bank, building it on first use.
+
+    The cached file is written once per (num_tasks, seed), so every run and every
+    config evaluates byte-identical tasks (including ids).
+    """
+    if not cache:
+        return _build_benchmark_tasks(num_tasks, seed)
+    bank = TaskBank(TASK_BANK_DIR, background=False)
+    try:
+        return bank.benchmark_tasks(f"ablation_n{num_tasks}_s{seed}",
+                                    lambda: _build_benchmark_tasks(num_tasks, seed))
+    finally:
+        bank.close()
+
+
+def _build_benchmark_tasks(num_tasks: int, seed: int) -> list:
     """Generate a fixed set of benchmark tasks across all categories and difficulties."""
     rng = random.Random(seed)
     tasks = []
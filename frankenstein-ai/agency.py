@@ -16,6 +16,8 @@ Baserat på Karl Fristons Free Energy Principle (FEP).
 
 import numpy as np
 
+from bounded_history import RingBuffer, RunningStats, spill_path
+
 
 def _normalize(x: np.ndarray, axis: int = 0) -> np.ndarray:
     """Normalisera så kolumner summerar till 1."""
@@ -47,6 +49,10 @@ class ActiveInferenceAgent:
         num_actions: Antal möjliga handlingar
         preference_obs: Index för föredragna observationer (mål)
         exploration_weight: Hur mycket agenten värderar informationssökning (0-1)
+        policy_horizon: Antal steg framåt som policies utvärderas (1 = enstegs-EFE)
+        beam_width: Max antal policies som behålls per djup vid flerstegsplanering
+        history_limit: Max antal poster i action/observation/EFE-historiken (None = obegränsat)
+        spill_dir: Katalog där utträngd historik loggas som JSONL (None = ingen spill)
     """
 
     def __init__(
@@ -56,11 +62,20 @@ class ActiveInferenceAgent:
         num_actions: int = 4,
         preference_obs: list[int] | None = None,
         exploration_weight: float = 0.5,
+        policy_horizon: int = 1,
+        beam_width: int = 16,
+        history_limit: int | None = None,
+        spill_dir: str | None = None,
     ):
         self.num_obs = num_observations
         self.num_states = num_states
         self.num_actions = num_actions
         self.exploration_weight = exploration_weight
+        self.policy_horizon = max(1, int(policy_horizon))
+        self.beam_width = max(1, int(beam_width))
+
+        # Cache för H[P(o|s)] — invalideras när A byts ut
+        self._A_entropy: np.ndarray | None = None
 
         # --- Generativ Modell ---
         self.A = self._init_likelihood()
@@ -73,9 +88,12 @@ class ActiveInferenceAgent:
 
         # Statistik
         self.step_count = 0
-        self.action_history: list[int] = []
-        self.observation_history: list[int] = []
-        self.efe_history: list[float] = []
+        self.action_history = RingBuffer(history_limit, spill_path(spill_dir, "aif_actions"))
+        self.observation_history = RingBuffer(history_limit, spill_path(spill_dir, "aif_observations"))
+        self.efe_history = RingBuffer(history_limit, spill_path(spill_dir, "aif_efe"))
+        # Löpande aggregat — oberoende av hur mycket historik som behålls
+        self.efe_stats = RunningStats()
+        self.seen_observations: set[int] = set()
 
     def _init_likelihood(self) -> np.ndarray:
         """Initiera A-matris: P(obs | state).
@@ -121,68 +139,169 @@ class ActiveInferenceAgent:
         posterior = posterior / (posterior.sum() + 1e-16)
         return posterior
 
+    @property
+    def A(self) -> np.ndarray:
+        return self._A
+
+    @A.setter
+    def A(self, value: np.ndarray) -> None:
+        self._A = value
+        self._A_entropy = None
+
+    def invalidate_cache(self) -> None:
+        """Invalidera cachad entropi — anropa efter in-place-ändringar av A."""
+        self._A_entropy = None
+
+    def export_state(self) -> dict:
+        """Generativ modell, beliefs och aggregat (historiken spillas separat)."""
+        return {
+            "shape": [self.num_obs, self.num_states, self.num_actions],
+            "A": self.A, "B": self.B, "C": self.C, "D": self.D, "qs": self.qs,
+            "exploration_weight": self.exploration_weight,
+            "step_count": self.step_count,
+            "efe_stats": self.efe_stats.export_state(),
+            "seen_observations": sorted(self.seen_observations),
+        }
+
+    def import_state(self, state: dict) -> None:
+        """Återställ från export_state(). Antal obs/states/actions måste matcha."""
+        shape = [self.num_obs, self.num_states, self.num_actions]
+        if list(state["shape"]) != shape:
+            raise ValueError(f"AIF-form {state['shape']} matchar inte {shape}")
+        self.A = np.array(state["A"], dtype=float)
+        self.B = np.array(state["B"], dtype=float)
+        self.C = np.array(state["C"], dtype=float)
+        self.D = np.array(state["D"], dtype=float)
+        self.qs = np.array(state["qs"], dtype=float)
+        self.exploration_weight = float(state["exploration_weight"])
+        self.step_count = int(state["step_count"])
+        self.efe_stats.import_state(state["efe_stats"])
+        self.seen_observations = {int(o) for o in state["seen_observations"]}
+
+    def _state_entropy(self) -> np.ndarray:
+        """H[P(o|s)] per state, beräknas bara om när A ändrats."""
+        if self._A_entropy is None:
+            self._A_entropy = _entropy(self._A, axis=0)
+        return self._A_entropy
+
+    def _efe_of_predicted(self, qs_next: np.ndarray) -> np.ndarray:
+        """EFE för predikterade tillstånd med form (..., num_states).
+
+        Fungerar för godtyckliga batch-dimensioner: (actions, S),
+        (policies, actions, S) osv. Returnerar form (...).
+        """
+        # Prediktera framtida observationer: P(o' | s') * P(s')
+        qo_next = qs_next @ self._A.T
+        qo_next = qo_next / (qo_next.sum(axis=-1, keepdims=True) + 1e-16)
+
+        # --- Pragmatiskt värde (Exploitation) ---
+        # Negativ KL-divergens mot preferenser
+        log_qo = np.log(qo_next + 1e-16)
+        pragmatic = (qo_next * (self.C - log_qo)).sum(axis=-1)
+
+        # --- Epistemiskt värde (Exploration) ---
+        # H[P(o|s)] medelvärde över predikterade tillstånd
+        epistemic = -(qs_next @ self._state_entropy())
+
+        # Kombinera (lägre = bättre)
+        return -(1 - self.exploration_weight) * pragmatic + self.exploration_weight * epistemic
+
     def _compute_efe(self) -> np.ndarray:
         """Beräkna Expected Free Energy (EFE) för varje handling.
         
         G(π) = -E[log P(o|C)] + E[H[P(o|s)]]
              = Pragmatiskt värde + Epistemiskt värde
         
-        Lägre EFE = bättre handling.
+        Lägre EFE = bättre handling. Alla handlingar beräknas i en einsum.
         """
-        efe = np.zeros(self.num_actions)
-
-        for a in range(self.num_actions):
-            # Prediktera framtida tillstånd: P(s' | s, a) * P(s)
-            qs_next = self.B[:, :, a] @ self.qs  # (num_states,)
+        # Prediktera framtida tillstånd för alla handlingar: P(s' | s, a) * P(s)
+        qs_next = np.einsum("ija,j->ai", self.B, self.qs)  # (num_actions, num_states)
+        return self._efe_of_predicted(qs_next)
 
-            # Prediktera framtida observationer: P(o' | s') * P(s')
-            qo_next = self.A @ qs_next  # (num_obs,)
-            qo_next = qo_next / (qo_next.sum() + 1e-16)
+    def plan_policies(self, horizon: int | None = None, beam_width: int | None = None) -> tuple[np.ndarray, np.ndarray]:
+        """Utvärdera handlingssekvenser (policies) i batch med beam-pruning.
 
-            # --- Pragmatiskt värde (Exploitation) ---
-            # Negativ KL-divergens mot preferenser
-            # Agenten vill se observationer som matchar C
-            log_qo = np.log(qo_next + 1e-16)
-            pragmatic = np.dot(qo_next, self.C - log_qo)
+        Varje djup expanderar alla kvarvarande policies med alla handlingar
+        i en einsum, summerar EFE längs sekvensen och behåller de
+        `beam_width` bästa. Ändrar inte agentens beliefs.
 
-            # --- Epistemiskt värde (Exploration) ---
-            # Förväntad informationsvinst — minska osäkerhet om tillstånd
-            # H[P(o|s)] medelvärde över predikterade tillstånd
-            state_entropy = _entropy(self.A, axis=0)  # H per state
-            epistemic = -np.dot(qs_next, state_entropy)
+        Returns:
+            policies: (K, horizon) int-array med handlingssekvenser, bäst först
+            efe: (K,) total EFE per policy (lägre = bättre)
+        """
+        horizon = max(1, int(horizon or self.policy_horizon))
+        beam_width = max(1, int(beam_width or self.beam_width))
+
+        beliefs = self.qs[None, :]                       # (P, S)
+        policies = np.zeros((1, 0), dtype=np.int64)      # (P, t)
+        total = np.zeros(1)                              # (P,)
+
+        for _ in range(horizon):
+            qs_next = np.einsum("ija,pj->pai", self.B, beliefs)  # (P, A, S)
+            cand = (total[:, None] + self._efe_of_predicted(qs_next)).ravel()
+
+            # Pruning: behåll bara de bästa policies
+            k = min(beam_width, cand.size)
+            keep = np.argpartition(cand, k - 1)[:k] if k < cand.size else np.arange(cand.size)
+            keep = keep[np.argsort(cand[keep], kind="stable")]
+            p_idx, a_idx = np.divmod(keep, self.num_actions)
+
+            policies = np.concatenate([policies[p_idx], a_idx[:, None]], axis=1)
+            total = cand[keep]
+            nxt = qs_next[p_idx, a_idx]
+            beliefs = nxt / (nxt.sum(axis=1, keepdims=True) + 1e-16)
+
+        return policies, total
+
+    def _action_probs(self, horizon: int | None = None) -> tuple[np.ndarray, float]:
+        """Handlingssannolikheter + minsta EFE för nuvarande beliefs."""
+        horizon = self.policy_horizon if horizon is None else max(1, int(horizon))
+        if horizon <= 1:
+            efe = self._compute_efe()
+            # Negera: lägre EFE = högre prob
+            return _softmax(-efe), float(np.min(efe))
+        # Flerstegs: softmax över policies, marginalisera till första handlingen
+        policies, total = self.plan_policies(horizon)
+        policy_probs = _softmax(-total)
+        action_probs = np.bincount(policies[:, 0], weights=policy_probs, minlength=self.num_actions)
+        return action_probs / action_probs.sum(), float(total[0])
+
+    def _commit_action(self, action_idx: int, min_efe: float) -> None:
+        """Prediktera nästa tillstånd med vald handling och uppdatera historik."""
+        self.qs = self.B[:, :, action_idx] @ self.qs
+        self.qs = self.qs / (self.qs.sum() + 1e-16)
 
-            # Kombinera (lägre = bättre)
-            efe[a] = -(1 - self.exploration_weight) * pragmatic + self.exploration_weight * epistemic
+        self.action_history.append(action_idx)
+        self.efe_history.append(min_efe)
+        self.efe_stats.push(min_efe)
+        self.step_count += 1
 
-        return efe
+    def _record_observation(self, observation: int) -> None:
+        self.observation_history.append(observation)
+        self.seen_observations.add(observation)
 
-    def step(self, observation: int) -> int:
+    def step(self, observation: int, horizon: int | None = None) -> int:
         """Kör en cykel av Active Inference.
         
         1. Ta emot observation (från HDC-klassificering)
         2. Uppdatera beliefs (Bayesiansk inferens)
-        3. Välj handling (minimera EFE)
+        3. Välj handling (minimera EFE, över `horizon` steg — default policy_horizon)
+
+        horizon anges per anrop när antalet återstående beslut är känt,
+        t.ex. kodagentens kvarvarande retry-försök.
         """
-        observation = np.clip(observation, 0, self.num_obs - 1)
-        self.observation_history.append(observation)
+        observation = int(np.clip(observation, 0, self.num_obs - 1))
+        self._record_observation(observation)
 
         # 1. Posterior inference
         self.qs = self._infer_states(observation)
 
-        # 2. Beräkna EFE för varje handling
-        efe = self._compute_efe()
-
-        # 3. Välj handling via softmax (lägre EFE → högre sannolikhet)
-        action_probs = _softmax(-efe)  # Negera: lägre EFE = högre prob
+        # 2-3. Beräkna EFE och välj handling via softmax
+        action_probs, min_efe = self._action_probs(horizon)
         action_idx = int(np.random.choice(self.num_actions, p=action_probs))
 
         # 4. Uppdatera beliefs med vald handling (prediktera nästa tillstånd)
-        self.qs = self.B[:, :, action_idx] @ self.qs
-        self.qs = self.qs / (self.qs.sum() + 1e-16)
-
-        self.action_history.append(action_idx)
-        self.efe_history.append(float(np.min(efe)))
-        self.step_count += 1
+        self._commit_action(action_idx, min_efe)
 
         return action_idx
 
@@ -207,9 +326,10 @@ class ActiveInferenceAgent:
         """Returnera statistik om agentens beteende."""
         return {
             "steps": self.step_count,
-            "num_actions_taken": len(self.action_history),
-            "unique_observations": len(set(self.observation_history)),
-            "mean_efe": float(np.mean(self.efe_history)) if self.efe_history else 0.0,
+            "num_actions_taken": self.action_history.total,
+            "unique_observations": len(self.seen_observations),
+            "mean_efe": self.efe_stats.mean,
             "current_surprise": self.get_surprise(),
             "beliefs": self.get_beliefs().tolist(),
         }
+
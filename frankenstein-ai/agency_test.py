@@ -0,0 +1,98 @@
+"""
+Enhetstester för agency.py — vektoriserad EFE, flerstegsplanering och horisont per steg.
+
+Kör med: python -m pytest agency_test.py -v
+"""
+
+import os
+import sys
+import unittest
+from unittest import mock
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from agency import ActiveInferenceAgent, _entropy
+
+
+def _reference_efe(agent: ActiveInferenceAgent) -> np.ndarray:
+    """Ursprunglig loop-implementation av EFE — referens för vektoriseringen."""
+    efe = np.zeros(agent.num_actions)
+    for a in range(agent.num_actions):
+        qs_next = agent.B[:, :, a] @ agent.qs
+        qo_next = agent.A @ qs_next
+        qo_next = qo_next / (qo_next.sum() + 1e-16)
+        log_qo = np.log(qo_next + 1e-16)
+        pragmatic = np.dot(qo_next, agent.C - log_qo)
+        epistemic = -np.dot(qs_next, _entropy(agent.A, axis=0))
+        efe[a] = -(1 - agent.exploration_weight) * pragmatic + agent.exploration_weight * epistemic
+    return efe
+
+
+class TestVectorizedEFE(unittest.TestCase):
+    def test_matches_reference(self):
+        agent = ActiveInferenceAgent(num_observations=8, num_states=12, num_actions=4, preference_obs=[0, 1])
+        np.random.seed(0)
+        for obs in [0, 3, 6, 2, 7]:
+            agent.step(obs)
+            np.testing.assert_allclose(agent._compute_efe(), _reference_efe(agent), rtol=1e-10)
+
+    def test_entropy_cache_invalidated_on_new_A(self):
+        agent = ActiveInferenceAgent()
+        h1 = agent._state_entropy()
+        self.assertIs(h1, agent._state_entropy())
+        A = np.ones_like(agent.A) / agent.num_obs
+        agent.A = A
+        h2 = agent._state_entropy()
+        self.assertFalse(np.allclose(h1, h2))
+        np.testing.assert_allclose(agent._compute_efe(), _reference_efe(agent), rtol=1e-10)
+
+    def test_invalidate_cache_after_inplace_edit(self):
+        agent = ActiveInferenceAgent()
+        h1 = agent._state_entropy().copy()
+        agent.A[:, 0] = 1.0 / agent.num_obs
+        agent.invalidate_cache()
+        self.assertFalse(np.allclose(h1, agent._state_entropy()))
+
+
+class TestPolicyPlanning(unittest.TestCase):
+    def test_horizon_one_matches_efe(self):
+        agent = ActiveInferenceAgent(num_actions=4)
+        policies, total = agent.plan_policies(horizon=1, beam_width=4)
+        efe = agent._compute_efe()
+        self.assertEqual(policies.shape, (4, 1))
+        self.assertEqual(int(policies[0, 0]), int(np.argmin(efe)))
+        np.testing.assert_allclose(np.sort(efe), total)
+
+    def test_beam_pruning_limits_policies(self):
+        agent = ActiveInferenceAgent(num_actions=4)
+        policies, total = agent.plan_policies(horizon=4, beam_width=5)
+        self.assertEqual(policies.shape, (5, 4))
+        self.assertTrue(np.all(np.diff(total) >= 0))
+
+    def test_plan_does_not_change_beliefs(self):
+        agent = ActiveInferenceAgent()
+        qs = agent.get_beliefs()
+        agent.plan_policies(horizon=3)
+        np.testing.assert_array_equal(qs, agent.qs)
+
+    def test_multistep_step(self):
+        agent = ActiveInferenceAgent(policy_horizon=3)
+        action = agent.step(2)
+        self.assertTrue(0 <= action < agent.num_actions)
+        self.assertEqual(agent.step_count, 1)
+
+    def test_step_horizon_overrides_default(self):
+        np.random.seed(3)
+        agent = ActiveInferenceAgent()
+        with mock.patch.object(agent, "plan_policies", wraps=agent.plan_policies) as plan:
+            agent.step(2, horizon=3)
+            plan.assert_called_once_with(3)
+            agent.step(2, horizon=1)
+            plan.assert_called_once()
+        self.assertEqual(agent.policy_horizon, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
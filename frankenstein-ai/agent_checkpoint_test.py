@@ -0,0 +1,190 @@
+"""
+Enhetstester för agent_checkpoint.py — filformat och export/import per komponent.
+
+Kör med: python -m pytest agent_checkpoint_test.py -v
+"""
+
+import os
+import struct
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from types import SimpleNamespace
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from agency import ActiveInferenceAgent
+from agent_checkpoint import MAGIC, CheckpointError, read_checkpoint, write_checkpoint
+from code_agent import FrankensteinCodeAgent
+from cognition import NeuroSymbolicBridge
+from emotions import EkmanEmotionEngine
+from gut_feeling import GutFeelingEngine
+
+
+class _TmpDir(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "ckpt", "agent.bin")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+
+class TestFormat(_TmpDir):
+    def test_roundtrip_nested_arrays(self):
+        state = {
+            "a": np.arange(12, dtype=np.float32).reshape(3, 4),
+            "nested": {"b": np.array([1, 2, 3], dtype=np.int8), "xs": [np.ones(2), 5, "text"]},
+            "empty": np.zeros((0, 8), dtype=np.float16),
+        }
+        write_checkpoint(self.path, state)
+        loaded = read_checkpoint(self.path)
+        np.testing.assert_array_equal(loaded["a"], state["a"])
+        self.assertEqual(loaded["nested"]["b"].dtype, np.int8)
+        self.assertEqual(loaded["nested"]["xs"][1:], [5, "text"])
+        self.assertEqual(loaded["empty"].shape, (0, 8))
+        loaded["a"][0, 0] = 99.0  # Arrayerna ska gå att uppdatera in-place
+        self.assertEqual(os.listdir(os.path.dirname(self.path)), ["agent.bin"])
+
+    def test_rejects_foreign_and_future_files(self):
+        os.makedirs(os.path.dirname(self.path))
+        with open(self.path, "wb") as f:
+            f.write(b"not a checkpoint at all")
+        with self.assertRaises(CheckpointError):
+            read_checkpoint(self.path)
+        with open(self.path, "wb") as f:
+            f.write(struct.pack("<8sII", MAGIC, 999, 2) + b"{}")
+        with self.assertRaises(CheckpointError):
+            read_checkpoint(self.path)
+
+    def test_truncated_array_is_detected(self):
+        size = write_checkpoint(self.path, {"a": np.ones(1000)})
+        with open(self.path, "r+b") as f:
+            f.truncate(size - 4000)
+        with self.assertRaises(CheckpointError):
+            read_checkpoint(self.path)
+
+
+class TestComponents(_TmpDir):
+    def _roundtrip(self, state):
+        write_checkpoint(self.path, state)
+        return read_checkpoint(self.path)
+
+    def test_hdc_concepts_and_projection(self):
+        src = NeuroSymbolicBridge(lnn_output_dim=16, hdc_dim=256, prototype_dtype="int8")
+        for i in range(5):
+            hv = src.encode(torch.randn(16))
+            src.learn_concept(f"c{i % 3}", hv)
+        del src.concept_memory["c1"]
+        query = src.encode(torch.randn(16))
+
+        dst = NeuroSymbolicBridge(lnn_output_dim=16, hdc_dim=256, prototype_dtype="int8")
+        dst.import_state(self._roundtrip({"hdc": src.export_state()})["hdc"])
+        self.assertEqual(dst.get_concept_names(), src.get_concept_names())
+        self.assertEqual(dst.concept_sample_count, src.concept_sample_count)
+        self.assertEqual(dst.classify(query), src.classify(query))
+        dst.learn_concept("new", query)  # Matrisen kan växa efter återställning
+        self.assertEqual(dst.num_concepts, 3)
+
+        with self.assertRaises(ValueError):
+            NeuroSymbolicBridge(lnn_output_dim=16, hdc_dim=128).import_state(src.export_state())
+
+    def test_aif_model_and_beliefs(self):
+        src = ActiveInferenceAgent(num_observations=8, num_states=12, num_actions=4, exploration_weight=0.6)
+        for obs in [0, 3, 1, 7, 2]:
+            src.step(obs)
+        src.exploration_weight = 0.35
+        dst = ActiveInferenceAgent(num_observations=8, num_states=12, num_actions=4)
+        dst.import_state(self._roundtrip({"aif": src.export_state()})["aif"])
+        np.testing.assert_allclose(dst.A, src.A)
+        np.testing.assert_allclose(dst.qs, src.qs)
+        self.assertEqual(dst.exploration_weight, 0.35)
+        self.assertEqual(dst.step_count, src.step_count)
+        self.assertEqual(dst.efe_stats.to_dict(), src.efe_stats.to_dict())
+        self.assertEqual(dst.seen_observations, src.seen_observations)
+        np.testing.assert_allclose(dst._action_probs()[0], src._action_probs()[0])
+
+    def test_gut_and_emotions(self):
+        gut = GutFeelingEngine()
+        emotions = EkmanEmotionEngine()
+        for i in range(30):
+            score = 1.0 if i % 3 else 0.0
+            gut.record_outcome(score, "math", 1 + i % 4, gut_valence=0.2 if i % 2 else -0.1)
+            emotions.process_result(score, 3, attempts_used=1 + i % 3, max_attempts=3, is_new_pattern=i % 5 == 0)
+        loaded = self._roundtrip({"gut": gut.export_state(), "emotions": emotions.export_state()})
+
+        gut2, emotions2 = GutFeelingEngine(), EkmanEmotionEngine()
+        gut2.import_state(loaded["gut"])
+        emotions2.import_state(loaded["emotions"])
+        self.assertEqual(gut2.get_stats(), gut.get_stats())
+        self.assertEqual(emotions2.state.as_dict(), emotions.state.as_dict())
+        self.assertEqual(emotions2.total_updates, emotions.total_updates)
+
+    def test_load_is_fast(self):
+        hdc = NeuroSymbolicBridge(lnn_output_dim=64, hdc_dim=4096, prototype_dtype="float16")
+        for i in range(500):
+            hdc.learn_concept(f"c{i}", hdc.encode(torch.randn(64)))
+        write_checkpoint(self.path, {"hdc": hdc.export_state()})
+        t0 = time.perf_counter()
+        NeuroSymbolicBridge(64, 4096, "float16").import_state(read_checkpoint(self.path)["hdc"])
+        self.assertLess(time.perf_counter() - t0, 1.0)
+
+
+def _agent_like(prototype_dtype: str) -> SimpleNamespace:
+    """Minsta objekt som FrankensteinCodeAgent.checkpoint/restore arbetar mot."""
+    return SimpleNamespace(
+        hdc=NeuroSymbolicBridge(lnn_output_dim=8, hdc_dim=64, prototype_dtype=prototype_dtype),
+        aif=ActiveInferenceAgent(num_observations=8, num_states=12, num_actions=4),
+        gut=GutFeelingEngine(), emotions=EkmanEmotionEngine(),
+        total_tasks=0, total_solved=0, current_level=1, skills={}, solved={}, concept_code={},
+        error_counts=Counter(), strategy_stats={}, _attempt_prefix_counts=Counter(),
+        _llm_lock=threading.Lock(), llm_stats={}, _response_cache={},
+    )
+
+
+class TestAgentRestore(_TmpDir):
+    def setUp(self):
+        super().setUp()
+        self.src = _agent_like("float16")
+        for i in range(4):
+            self.src.hdc.learn_concept(f"c{i}", self.src.hdc.encode(torch.randn(8)))
+        self.src.total_tasks, self.src.concept_code = 7, {"c0": "print(1)"}
+        FrankensteinCodeAgent.checkpoint(self.src, self.path)
+
+    def test_other_prototype_precision_is_requantized(self):
+        dst = _agent_like("int8")
+        FrankensteinCodeAgent.restore(dst, self.path)
+        self.assertEqual(dst.hdc.get_concept_names(), ["c0", "c1", "c2", "c3"])
+        torch.testing.assert_close(dst.hdc.projection_matrix, self.src.hdc.projection_matrix)
+        query = self.src.hdc.encode(torch.randn(8))
+        self.assertEqual(dst.hdc.classify(query)[2], self.src.hdc.classify(query)[2])
+        self.assertAlmostEqual(dst.hdc.classify(query)[1], self.src.hdc.classify(query)[1], places=2)
+        self.assertEqual((dst.total_tasks, dst.concept_code), (7, {"c0": "print(1)"}))
+
+    def test_failed_restore_leaves_agent_untouched(self):
+        state = read_checkpoint(self.path)
+        del state["emotions"]["events"]  # Sista komponenten går sönder
+        write_checkpoint(self.path, state)
+        dst = _agent_like("int8")
+        projection = dst.hdc.projection_matrix.clone()
+        A = dst.aif.A.copy()
+        with self.assertRaises(CheckpointError):
+            FrankensteinCodeAgent.restore(dst, self.path)
+        torch.testing.assert_close(dst.hdc.projection_matrix, projection)
+        np.testing.assert_array_equal(dst.aif.A, A)
+        self.assertEqual((dst.hdc.num_concepts, dst.total_tasks), (0, 0))
+
+        state["agent"]["skills"] = {"loop": {"okänt_fält": 1}}
+        write_checkpoint(self.path, state)
+        with self.assertRaises(CheckpointError):
+            FrankensteinCodeAgent.restore(dst, self.path)
+
+
+if __name__ == "__main__":
+    unittest.main()
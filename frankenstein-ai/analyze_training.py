@@ -5,18 +5,19 @@ import os
 import sys
 from collections import defaultdict
 
+from progress_store import read_progress
+
 DATA_DIR = os.path.join(os.path.dirname(__file__), "training_data")
 PROGRESS_FILE = os.path.join(DATA_DIR, "progress.json")
 EBBINGHAUS_DIR = os.path.join(DATA_DIR, "ebbinghaus")
 
 def main():
-    if not os.path.exists(PROGRESS_FILE):
+    # Snapshot + händelselogg; läser bara kompletta rader medan träningen skriver
+    d = read_progress(DATA_DIR)
+    if d is None:
         print(f"ERROR: {PROGRESS_FILE} not found")
         sys.exit(1)
 
-    with open(PROGRESS_FILE, "r", encoding="utf-8") as f:
-        d = json.load(f)
-
     total = d.get("total_tasks_attempted", 0)
     solved = d.get("total_tasks_solved", 0)
     rate = round(solved / max(total, 1) * 100, 1)
@@ -0,0 +1,215 @@
+"""
+Batchschemaläggare för den kontinuerliga träningen.
+
+run_continuous valde batchtyp med fasta modulo-regler (terminal var 5:e,
+V2 var 7:e, chaos var 15:e, V4 var 4:e, spaced repetition var 4:e om
+något var förfallet) — oavsett hur lång tid en batchtyp faktiskt tar och
+hur många LLM-anrop den kostar. Här mäts båda per batchtyp och nästa
+batch väljs med en viktad budgetpolicy:
+
+1. Kostnad: max(väggtid, LLM-anrop × llm_call_cost_s) per batch (EWMA).
+   Under rate limiten kan en batch aldrig bli billigare än sina
+   LLM-anrop gånger tidsluckan per anrop
+2. Lärsignal: Lösta uppgifter + fail_signal × olösta, där lösningar från
+   deterministiska S0-vägar bara ger known_signal (inget nytt inlärt)
+3. Värde: weight × signal / kostnad (signal per sekund budget)
+4. Andelar: Varje typ får sin min_share av tiden; resten fördelas efter
+   värde^sharpness. Nästa batch = tillgänglig typ med störst underskott
+   (målandel × förbrukad tid − typens förbrukade tid), där förbrukad
+   tid avklingar så att andelarna gäller de senaste ~50 batcharna
+
+Konfigureras under "batch_scheduler" i training_data/config.json;
+policy "modulo" ger de gamla reglerna. Tillståndet (EWMA och förbrukad
+tid) sparas i progress["batch_scheduler"] och överlever omstarter.
+"""
+
+import json
+from dataclasses import asdict, dataclass
+from pathlib import Path
+
+CONFIG_PATH = Path(__file__).parent / "training_data" / "config.json"
+
+BATCH_TYPES = ("standard", "terminal", "v2", "chaos", "v4", "spaced_repetition")
+
+DEFAULT_CONFIG = {
+    "policy": "budget",          # "budget" | "modulo"
+    "llm_call_cost_s": 4.0,      # Tidslucka per LLM-anrop under rate limiten (jfr _call_llm)
+    "fail_signal": 0.3,          # Lärsignal för en olöst uppgift relativt en löst
+    "known_signal": 0.2,         # Lärsignal för en lösning via S0 (redan känd)
+    "sharpness": 2.0,            # >1 favoriserar batchtyper med högst värde hårdare
+    "ewma_alpha": 0.2,
+    "spent_decay": 0.98,         # Förbrukad tid glöms gradvis (~50 batchars fönster)
+    "weights": {t: 1.0 for t in BATCH_TYPES},
+    "min_share": {
+        "standard": 0.30, "terminal": 0.08, "v2": 0.06,
+        "chaos": 0.04, "v4": 0.08, "spaced_repetition": 0.06,
+    },
+    # Startantaganden innan en typ har mätts: (sekunder, LLM-anrop, signal) per batch
+    "priors": {
+        "standard": [60.0, 5.0, 6.0],
+        "terminal": [60.0, 5.0, 2.5],
+        "v2": [40.0, 5.0, 2.5],
+        "chaos": [30.0, 3.0, 2.5],
+        "v4": [60.0, 8.0, 4.0],
+        "spaced_repetition": [30.0, 3.0, 3.0],
+    },
+}
+
+
+def load_scheduler_config(path: str | Path = CONFIG_PATH) -> dict:
+    """Läs "batch_scheduler" ur config.json ovanpå standardvärdena."""
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    try:
+        user = json.loads(Path(path).read_text(encoding="utf-8")).get("batch_scheduler", {})
+    except (OSError, json.JSONDecodeError, AttributeError):
+        return config
+    for key, value in user.items():
+        if isinstance(value, dict) and isinstance(config.get(key), dict):
+            config[key].update(value)
+        else:
+            config[key] = value
+    return config
+
+
+def legacy_batch_type(batch_num: int, sr_due: bool) -> str:
+    """De gamla modulo-reglerna, i samma prioritetsordning som tidigare.
+
+    Obs: chaos (var 15:e) och spaced repetition (var 4:e) nåddes aldrig —
+    varje multipel av 15 tas av terminal och var 4:e batch av V4/V2.
+    """
+    if batch_num % 5 == 0:
+        return "terminal"
+    if batch_num % 7 == 0:
+        return "v2"
+    if batch_num % 4 == 0:
+        return "v4"
+    return "standard"
+
+
+def batch_signal(entries, config: dict) -> tuple[int, int, float]:
+    """(försök, lösta, lärsignal) för historikposterna från en batch."""
+    attempted = solved = 0
+    signal = 0.0
+    for entry in entries:
+        attempted += 1
+        if entry.get("score", 0) >= 1.0:
+            solved += 1
+            known = str(entry.get("strategy", "")).startswith("system0")
+            signal += config["known_signal"] if known else 1.0
+        else:
+            signal += config["fail_signal"]
+    return attempted, solved, signal
+
+
+@dataclass
+class BatchTypeStats:
+    batches: int = 0
+    wall_s: float = 0.0       # EWMA per batch
+    llm_calls: float = 0.0    # EWMA per batch
+    signal: float = 0.0       # EWMA per batch
+    spent_s: float = 0.0      # Förbrukad kostnad totalt
+    total_tasks: int = 0
+    total_solved: int = 0
+    total_llm_calls: int = 0
+
+    def cost(self, llm_call_cost_s: float) -> float:
+        return max(self.wall_s, self.llm_calls * llm_call_cost_s, 1e-3)
+
+
+class BatchScheduler:
+    """Väljer nästa batchtyp efter uppmätt kostnad och lärsignal."""
+
+    def __init__(self, config: dict | None = None):
+        self.config = config or load_scheduler_config()
+        self.types: dict[str, BatchTypeStats] = {}
+        for kind in BATCH_TYPES:
+            wall, calls, signal = self.config["priors"].get(kind, (60.0, 5.0, 1.0))
+            self.types[kind] = BatchTypeStats(wall_s=wall, llm_calls=calls, signal=signal)
+
+    @property
+    def policy(self) -> str:
+        return self.config.get("policy", "budget")
+
+    # --- Val ---
+
+    def value(self, kind: str) -> float:
+        """Viktad lärsignal per sekund budget."""
+        st = self.types[kind]
+        weight = self.config["weights"].get(kind, 1.0)
+        return weight * st.signal / st.cost(self.config["llm_call_cost_s"])
+
+    def target_shares(self, eligible=BATCH_TYPES) -> dict[str, float]:
+        """Målandel av tiden per tillgänglig batchtyp (summerar till 1)."""
+        kinds = [k for k in BATCH_TYPES if k in eligible and self.config["weights"].get(k, 1.0) > 0]
+        if not kinds:
+            return {}
+        mins = {k: self.config["min_share"].get(k, 0.0) for k in kinds}
+        floor = sum(mins.values())
+        if floor >= 1.0:
+            return {k: m / floor for k, m in mins.items()}
+        scores = {k: max(self.value(k), 0.0) ** self.config["sharpness"] for k in kinds}
+        total = sum(scores.values())
+        rest = 1.0 - floor
+        return {k: mins[k] + rest * (scores[k] / total if total > 0 else 1.0 / len(kinds)) for k in kinds}
+
+    def next_batch(self, batch_num: int, sr_due: bool = False) -> str:
+        """Batchtyp för nästa batch. spaced_repetition bara om något är förfallet."""
+        if self.policy == "modulo":
+            return legacy_batch_type(batch_num, sr_due)
+        eligible = [k for k in BATCH_TYPES if k != "spaced_repetition" or sr_due]
+        shares = self.target_shares(eligible)
+        if not shares:
+            return "standard"
+        spent = sum(self.types[k].spent_s for k in shares)
+        # Lägg till en kostnad för nästa batch så att en helt ny session också sprids
+        horizon = spent + min(self.types[k].cost(self.config["llm_call_cost_s"]) for k in shares)
+        return max(shares, key=lambda k: shares[k] * horizon - self.types[k].spent_s)
+
+    # --- Mätning ---
+
+    def record(self, kind: str, wall_s: float, llm_calls: int, entries=()) -> None:
+        """Registrera en avslutad batch (väggtid, LLM-anrop, nya historikposter)."""
+        st = self.types[kind]
+        attempted, solved, signal = batch_signal(entries, self.config)
+        a = self.config["ewma_alpha"] if st.batches else 1.0  # Första mätningen ersätter priorn
+        st.wall_s += a * (wall_s - st.wall_s)
+        st.llm_calls += a * (llm_calls - st.llm_calls)
+        st.signal += a * (signal - st.signal)
+        st.batches += 1
+        for other in self.types.values():
+            other.spent_s *= self.config["spent_decay"]
+        st.spent_s += max(wall_s, llm_calls * self.config["llm_call_cost_s"])
+        st.total_tasks += attempted
+        st.total_solved += solved
+        st.total_llm_calls += llm_calls
+
+    # --- Rapport & persistens ---
+
+    def report(self) -> dict:
+        """Per batchtyp: kostnad, signal, värde, mål- och faktisk andel."""
+        shares = self.target_shares()
+        spent = sum(st.spent_s for st in self.types.values()) or 1.0
+        out = {}
+        for kind, st in self.types.items():
+            out[kind] = {
+                "batches": st.batches,
+                "avg_wall_s": round(st.wall_s, 1),
+                "avg_llm_calls": round(st.llm_calls, 2),
+                "avg_signal": round(st.signal, 2),
+                "signal_per_hour": round(self.value(kind) * 3600, 1),
+                "target_share": round(shares.get(kind, 0.0), 3),
+                "actual_share": round(st.spent_s / spent, 3),
+                "tasks": st.total_tasks,
+                "solved": st.total_solved,
+                "llm_calls": st.total_llm_calls,
+            }
+        return {"policy": self.policy, "types": out}
+
+    def export_state(self) -> dict:
+        return {kind: asdict(st) for kind, st in self.types.items()}
+
+    def import_state(self, state: dict) -> None:
+        for kind, values in (state or {}).items():
+            if kind in self.types:
+                known = {k: v for k, v in values.items() if k in BatchTypeStats.__dataclass_fields__}
+                self.types[kind] = BatchTypeStats(**known)
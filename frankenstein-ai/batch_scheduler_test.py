@@ -0,0 +1,111 @@
+"""
+Enhetstester för batch_scheduler.py — kostnad, lärsignal, andelar och konfiguration.
+
+Kör med: python -m pytest batch_scheduler_test.py -v
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+from collections import Counter
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from batch_scheduler import (
+    BATCH_TYPES, DEFAULT_CONFIG, BatchScheduler, batch_signal, legacy_batch_type, load_scheduler_config,
+)
+
+SOLVED = {"score": 1.0, "strategy": "direct"}
+FAILED = {"score": 0.0, "strategy": "direct"}
+
+
+def _config(**overrides):
+    config = json.loads(json.dumps(DEFAULT_CONFIG))
+    config.update(overrides)
+    return config
+
+
+def _simulate(scheduler, batches, sim, sr_due=lambda b: False):
+    counts = Counter()
+    for b in range(1, batches + 1):
+        kind = scheduler.next_batch(b, sr_due=sr_due(b))
+        counts[kind] += 1
+        wall_s, llm_calls, entries = sim[kind]
+        scheduler.record(kind, wall_s, llm_calls, entries)
+    return counts
+
+
+class TestSignalAndCost(unittest.TestCase):
+    def test_known_solutions_give_less_signal(self):
+        config = _config()
+        s0 = {"score": 1.0, "strategy": "system0_deterministic"}
+        self.assertEqual(batch_signal([SOLVED, FAILED], config), (2, 1, 1.0 + config["fail_signal"]))
+        self.assertEqual(batch_signal([s0], config)[2], config["known_signal"])
+
+    def test_llm_calls_bound_cost_under_rate_limit(self):
+        sched = BatchScheduler(_config())
+        sched.record("v4", wall_s=10.0, llm_calls=8, entries=[SOLVED] * 4)
+        self.assertEqual(sched.types["v4"].cost(4.0), 32.0)
+        self.assertAlmostEqual(sched.value("v4"), 4.0 / 32.0)
+
+
+class TestAllocation(unittest.TestCase):
+    SIM = {
+        "standard": (60.0, 10, [SOLVED] * 5 + [FAILED] * 5),
+        "terminal": (30.0, 0, [SOLVED] * 4 + [FAILED]),
+        "v2": (50.0, 10, [FAILED] * 5),
+        "chaos": (20.0, 0, [SOLVED] * 5),
+        "v4": (80.0, 16, [SOLVED] * 4 + [FAILED] * 4),
+        "spaced_repetition": (25.0, 5, [SOLVED] * 5),
+    }
+
+    def test_every_type_gets_its_minimum_share(self):
+        sched = BatchScheduler(_config())
+        _simulate(sched, 300, self.SIM, sr_due=lambda b: True)
+        report = sched.report()["types"]
+        for kind in BATCH_TYPES:
+            self.assertGreater(report[kind]["batches"], 0, kind)
+            self.assertGreaterEqual(report[kind]["actual_share"] + 0.02, DEFAULT_CONFIG["min_share"][kind], kind)
+        # Mest signal per budgetsekund → störst andel utöver minimum
+        self.assertGreater(report["terminal"]["target_share"], report["v2"]["target_share"])
+
+    def test_spaced_repetition_only_when_due_and_weights_disable(self):
+        sched = BatchScheduler(_config(weights={**DEFAULT_CONFIG["weights"], "chaos": 0.0}))
+        counts = _simulate(sched, 100, self.SIM, sr_due=lambda b: False)
+        self.assertEqual(counts["spaced_repetition"], 0)
+        self.assertEqual(counts["chaos"], 0)
+
+    def test_modulo_policy_keeps_legacy_rules(self):
+        sched = BatchScheduler(_config(policy="modulo"))
+        picks = [sched.next_batch(b, sr_due=True) for b in range(1, 29)]
+        self.assertEqual(picks, [legacy_batch_type(b, True) for b in range(1, 29)])
+        self.assertEqual(picks[4], "terminal")
+        self.assertEqual(picks[6], "v2")
+        self.assertEqual(picks[7], "v4")
+
+    def test_state_roundtrip(self):
+        sched = BatchScheduler(_config())
+        _simulate(sched, 20, self.SIM)
+        other = BatchScheduler(_config())
+        other.import_state(json.loads(json.dumps(sched.export_state())))
+        self.assertEqual(other.report(), sched.report())
+        self.assertEqual(other.next_batch(21), sched.next_batch(21))
+
+
+class TestConfig(unittest.TestCase):
+    def test_config_json_overrides_merge_with_defaults(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "config.json")
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump({"modules": {}, "batch_scheduler": {"policy": "modulo", "min_share": {"v2": 0.2}}}, f)
+            config = load_scheduler_config(path)
+        self.assertEqual(config["policy"], "modulo")
+        self.assertEqual(config["min_share"]["v2"], 0.2)
+        self.assertEqual(config["min_share"]["standard"], DEFAULT_CONFIG["min_share"]["standard"])
+        self.assertEqual(load_scheduler_config("/nonexistent/config.json")["policy"], "budget")
+
+
+if __name__ == "__main__":
+    unittest.main()
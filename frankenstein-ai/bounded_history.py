@@ -0,0 +1,227 @@
+"""
+Begränsad historik för långlivade agenter.
+
+Agenter som körs dygnet runt får inte låta listor växa obegränsat.
+Den här modulen ger tre byggstenar:
+
+1. RingBuffer: Behåller de senaste N posterna (deque), räknar totalen
+2. BoundedDict: Insättningsordnad dict som slänger äldsta nyckeln vid fullt
+3. RunningStats: Welford-aggregat (count/mean/std/min/max) i O(1) minne
+
+Utträngda poster kan valfritt skrivas till en append-only JSONL-logg
+(spill), så att inget går förlorat även när RAM-historiken är begränsad.
+Spill skrivs i batchar; flush_spill_logs() (körs även vid atexit) tömmer
+alla öppna loggar.
+"""
+
+import atexit
+import json
+import math
+import os
+import weakref
+from collections import OrderedDict, deque
+from dataclasses import asdict, is_dataclass
+from itertools import islice
+from typing import Any, Callable, Iterator
+
+# Antal utträngda poster som samlas innan de skrivs till disk
+_SPILL_BATCH = 64
+
+
+# Alla levande spill-loggar, så att väntande poster kan skrivas vid avslut
+_OPEN_LOGS: "weakref.WeakSet[_SpillLog]" = weakref.WeakSet()
+
+
+def _default_serializer(record: Any) -> Any:
+    if is_dataclass(record) and not isinstance(record, type):
+        return asdict(record)
+    return record
+
+
+class _SpillLog:
+    """Append-only JSONL-logg för utträngda poster (skrivs i batchar)."""
+
+    def __init__(self, path: str, serializer: Callable[[Any], Any] | None = None):
+        self.path = path
+        self.serializer = serializer or _default_serializer
+        self._pending: list[str] = []
+        self.written = 0
+        _OPEN_LOGS.add(self)
+
+    def write(self, record: Any) -> None:
+        self._pending.append(json.dumps(self.serializer(record), ensure_ascii=False, default=str))
+        if len(self._pending) >= _SPILL_BATCH:
+            self.flush()
+
+    def flush(self) -> None:
+        if not self._pending:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write("\n".join(self._pending) + "\n")
+        self.written += len(self._pending)
+        self._pending.clear()
+
+
+@atexit.register
+def flush_spill_logs() -> None:
+    """Skriv väntande utträngda poster i alla spill-loggar till disk."""
+    for log in list(_OPEN_LOGS):
+        try:
+            log.flush()
+        except OSError as e:
+            print(f"[bounded_history] Kunde inte skriva {log.path}: {e}")
+
+
+def spill_path(spill_dir: str | None, name: str) -> str | None:
+    """Bygg sökväg till en spill-logg, eller None om spill är avstängt."""
+    if not spill_dir:
+        return None
+    return os.path.join(spill_dir, f"{name}.jsonl")
+
+
+class RingBuffer:
+    """Listliknande historik med valfri maxlängd.
+
+    maxlen=None ger obegränsat beteende (som en vanlig lista). Med maxlen
+    slängs de äldsta posterna; `total` räknar alla poster som någonsin
+    lagts till. Stöder append/extend, len, iteration, reversed och
+    indexering/slicing relativt de behållna posterna.
+    """
+
+    def __init__(
+        self,
+        maxlen: int | None = None,
+        spill_path: str | None = None,
+        serializer: Callable[[Any], Any] | None = None,
+    ):
+        self.maxlen = max(1, int(maxlen)) if maxlen is not None else None
+        self._buf: deque = deque(maxlen=self.maxlen)
+        self._spill = _SpillLog(spill_path, serializer) if spill_path else None
+        self.total = 0
+        self.evicted = 0
+
+    def append(self, item: Any) -> None:
+        if self.maxlen is not None and len(self._buf) == self.maxlen:
+            self.evicted += 1
+            if self._spill:
+                self._spill.write(self._buf[0])
+        self._buf.append(item)
+        self.total += 1
+
+    def extend(self, items) -> None:
+        for item in items:
+            self.append(item)
+
+    def clear(self) -> None:
+        self._buf.clear()
+
+    def flush(self) -> None:
+        """Skriv väntande utträngda poster till spill-loggen."""
+        if self._spill:
+            self._spill.flush()
+
+    def __len__(self) -> int:
+        return len(self._buf)
+
+    def __bool__(self) -> bool:
+        return bool(self._buf)
+
+    def __iter__(self) -> Iterator:
+        return iter(self._buf)
+
+    def __reversed__(self) -> Iterator:
+        return reversed(self._buf)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            n = len(self._buf)
+            start, stop, step = index.indices(n)
+            if step == 1 and start >= n // 2:
+                # Svansutsnitt (t.ex. [-10:]) — gå bakifrån i stället för att kopiera allt
+                tail = list(islice(reversed(self._buf), n - stop, n - start)) if stop > start else []
+                tail.reverse()
+                return tail
+            return list(self._buf)[index]
+        return self._buf[index]
+
+    def __repr__(self) -> str:
+        return f"RingBuffer(len={len(self._buf)}, maxlen={self.maxlen}, total={self.total})"
+
+
+class BoundedDict(OrderedDict):
+    """Dict med valfritt maxantal nycklar — äldsta insättningen slängs först."""
+
+    def __init__(
+        self,
+        maxlen: int | None = None,
+        spill_path: str | None = None,
+        serializer: Callable[[Any], Any] | None = None,
+    ):
+        super().__init__()
+        self.maxlen = max(1, int(maxlen)) if maxlen is not None else None
+        self._spill = _SpillLog(spill_path, serializer) if spill_path else None
+        self.evicted = 0
+
+    def __setitem__(self, key, value) -> None:
+        if key in self:
+            super().__setitem__(key, value)
+            return
+        super().__setitem__(key, value)
+        if self.maxlen is not None and len(self) > self.maxlen:
+            _, old = self.popitem(last=False)
+            self.evicted += 1
+            if self._spill:
+                self._spill.write(old)
+
+    def flush(self) -> None:
+        if self._spill:
+            self._spill.flush()
+
+
+class RunningStats:
+    """Welford-aggregat: count, mean, varians, min och max i O(1) minne."""
+
+    __slots__ = ("count", "mean", "_m2", "min", "max")
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self._m2 = 0.0
+        self.min = math.inf
+        self.max = -math.inf
+
+    def push(self, x: float) -> None:
+        x = float(x)
+        self.count += 1
+        delta = x - self.mean
+        self.mean += delta / self.count
+        self._m2 += delta * (x - self.mean)
+        if x < self.min:
+            self.min = x
+        if x > self.max:
+            self.max = x
+
+    @property
+    def variance(self) -> float:
+        return self._m2 / self.count if self.count > 0 else 0.0
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.variance)
+
+    def export_state(self) -> list[float]:
+        return [self.count, self.mean, self._m2, self.min, self.max]
+
+    def import_state(self, state) -> None:
+        count, self.mean, self._m2, self.min, self.max = (float(x) for x in state)
+        self.count = int(count)
+
+    def to_dict(self) -> dict:
+        return {
+            "count": self.count,
+            "mean": self.mean,
+            "std": self.std,
+            "min": self.min if self.count else 0.0,
+            "max": self.max if self.count else 0.0,
+        }
@@ -0,0 +1,105 @@
+"""
+Enhetstester för bounded_history.py — ringbuffertar, Welford-aggregat och spill.
+
+Kör med: python -m pytest bounded_history_test.py -v
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from bounded_history import RingBuffer, BoundedDict, RunningStats, flush_spill_logs, spill_path
+from agency import ActiveInferenceAgent
+
+
+class TestRingBuffer(unittest.TestCase):
+    def test_unbounded_behaves_like_list(self):
+        buf = RingBuffer()
+        buf.extend(range(100))
+        self.assertEqual(len(buf), 100)
+        self.assertEqual(buf.total, 100)
+        self.assertEqual(buf[-1], 99)
+        self.assertEqual(buf[-3:], [97, 98, 99])
+
+    def test_bounded_keeps_latest(self):
+        buf = RingBuffer(maxlen=5)
+        buf.extend(range(12))
+        self.assertEqual(list(buf), [7, 8, 9, 10, 11])
+        self.assertEqual(list(reversed(buf)), [11, 10, 9, 8, 7])
+        self.assertEqual(buf.total, 12)
+        self.assertEqual(buf.evicted, 7)
+
+    def test_spill_writes_evicted_records(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = spill_path(tmp, "test")
+            buf = RingBuffer(maxlen=3, spill_path=path)
+            buf.extend({"i": i} for i in range(10))
+            buf.flush()
+            with open(path, encoding="utf-8") as f:
+                spilled = [json.loads(line) for line in f]
+            self.assertEqual([r["i"] for r in spilled], list(range(7)))
+
+    def test_flush_spill_logs_writes_pending_batches(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = spill_path(tmp, "pending")
+            buf = RingBuffer(maxlen=2, spill_path=path)
+            buf.extend({"i": i} for i in range(5))
+            self.assertFalse(os.path.exists(path))  # Under batchgränsen: bara i RAM
+            flush_spill_logs()
+            with open(path, encoding="utf-8") as f:
+                self.assertEqual([json.loads(line)["i"] for line in f], [0, 1, 2])
+
+    def test_spill_disabled_without_dir(self):
+        self.assertIsNone(spill_path(None, "x"))
+
+
+class TestBoundedDict(unittest.TestCase):
+    def test_evicts_oldest_insert(self):
+        d = BoundedDict(maxlen=3)
+        for i in range(5):
+            d[i] = i * i
+        self.assertEqual(list(d.keys()), [2, 3, 4])
+        d[3] = -1  # Uppdatering ska inte tränga ut något
+        self.assertEqual(len(d), 3)
+        self.assertEqual(d.evicted, 2)
+
+
+class TestRunningStats(unittest.TestCase):
+    def test_matches_numpy(self):
+        data = np.random.RandomState(0).normal(3.0, 2.0, 1000)
+        rs = RunningStats()
+        for x in data:
+            rs.push(x)
+        self.assertEqual(rs.count, 1000)
+        self.assertAlmostEqual(rs.mean, float(np.mean(data)), places=9)
+        self.assertAlmostEqual(rs.std, float(np.std(data)), places=9)
+        self.assertAlmostEqual(rs.min, float(np.min(data)))
+        self.assertAlmostEqual(rs.max, float(np.max(data)))
+
+
+class TestBoundedAgentHistory(unittest.TestCase):
+    def test_aif_stats_cover_full_history(self):
+        bounded = ActiveInferenceAgent(history_limit=10)
+        full = ActiveInferenceAgent()
+        np.random.seed(3)
+        for i in range(200):
+            bounded.step(i % 8)
+        np.random.seed(3)
+        for i in range(200):
+            full.step(i % 8)
+
+        self.assertEqual(len(bounded.efe_history), 10)
+        b, f = bounded.get_stats(), full.get_stats()
+        self.assertEqual(b["num_actions_taken"], 200)
+        self.assertEqual(b["unique_observations"], f["unique_observations"])
+        self.assertAlmostEqual(b["mean_efe"], float(np.mean(list(full.efe_history))), places=9)
+
+
+if __name__ == "__main__":
+    unittest.main()
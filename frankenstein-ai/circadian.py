@@ -155,6 +155,8 @@ class SleepReport:
     math_dreams: list[MathDreamResult] = field(default_factory=list)
     collatz_anomalies: int = 0
     collatz_sequences: int = 0
+    memories_demoted: int = 0
+    memories_archived: int = 0
 
 
 class CircadianClock:
@@ -356,8 +358,12 @@ class SleepEngine:
     - NREM Collatz: Systematisk Collatz-utforskning under djupsömn
     """
 
-    def __init__(self, cycles_per_night: int = 3):
+    def __init__(self, cycles_per_night: int = 3, history_limit: int | None = None,
+                 spill_dir: str | None = None):
         self.cycles_per_night = cycles_per_night
+        # Begränsad historik för forskningsmotorerna (None = obegränsat)
+        self.history_limit = history_limit
+        self.spill_dir = spill_dir
         self.total_dreams = 0
         self.total_insights = 0
         self.total_consolidated = 0
@@ -380,6 +386,8 @@ class SleepEngine:
                     memory=episodic_memory,
                     bridge=hdc_bridge,
                     exploration_weight=0.7,  # Hög nyfikenhet under sömn
+                    history_limit=self.history_limit,
+                    spill_dir=self.spill_dir,
                 )
                 logger.info("MathResearchEngine loaded for dream research")
             except ImportError:
@@ -395,6 +403,8 @@ class SleepEngine:
                     memory=episodic_memory,
                     bridge=hdc_bridge,
                     exploration_weight=0.7,
+                    history_limit=self.history_limit,
+                    spill_dir=self.spill_dir,
                 )
                 logger.info("CollatzExplorer loaded for dream research")
             except ImportError:
@@ -433,6 +443,8 @@ class SleepEngine:
         rules = 0
         collatz_anomalies_total = 0
         collatz_sequences_total = 0
+        demoted = 0
+        archived = 0
 
         for cycle in range(self.cycles_per_night):
             # ── NREM Stage 3: Minneskonsolidering ──
@@ -440,6 +452,11 @@ class SleepEngine:
             consolidated += c
             decayed += d
 
+            # ── NREM: Flytta svaga minnen hot → warm → cold ──
+            dm, ar = self._nrem_tiering(episodic_memory)
+            demoted += dm
+            archived += ar
+
             # ── NREM: Collatz-utforskning (tidiga cykler = djupsömn) ──
             if enable_collatz_dreams and cycle < self.cycles_per_night // 2 + 1:
                 ca, cs = self._nrem_collatz(episodic_memory, hdc_bridge, cycle, collatz_batch_size)
@@ -479,6 +496,8 @@ class SleepEngine:
             math_dreams=math_dreams,
             collatz_anomalies=collatz_anomalies_total,
             collatz_sequences=collatz_sequences_total,
+            memories_demoted=demoted,
+            memories_archived=archived,
         )
 
         if math_dreams or collatz_anomalies_total > 0:
@@ -511,7 +530,7 @@ class SleepEngine:
 
             # Bestäm intervall baserat på vad som redan utforskats
             stats = explorer.get_stats()
-            start = stats.get("sequences_computed", 0) + 1
+            start = stats.get("max_explored", 0) + 1
             end = start + adjusted_batch
 
             anomalies = explorer.analyze_range(start, end)
@@ -601,6 +620,16 @@ class SleepEngine:
             logger.warning(f"Math dream error: {e}")
             return None
 
+    def _nrem_tiering(self, episodic_memory) -> tuple[int, int]:
+        """NREM: Nivåflytt efter konsolidering, så att vaken recall bara
+        behöver söka de heta minnena. Returnerar (demoted, archived).
+        """
+        try:
+            moved = episodic_memory.rebalance_tiers()
+            return moved["demoted"], moved["archived"]
+        except Exception:
+            return 0, 0
+
     def _nrem_consolidation(self, episodic_memory, cycle: int) -> tuple[int, int]:
         """NREM Stage 3: Förstärk viktiga minnen, försvaga oviktiga.
         
@@ -612,60 +641,32 @@ class SleepEngine:
         decayed = 0
 
         try:
-            if hasattr(episodic_memory, 'collection') and episodic_memory.collection:
-                all_data = episodic_memory.collection.get()
-                if all_data and all_data["ids"]:
-                    now = time.time()
-                    for i, mem_id in enumerate(all_data["ids"]):
-                        meta = all_data["metadatas"][i]
-                        strength = meta.get("strength", 1.0)
-                        score = meta.get("score", 0)
-                        access_count = meta.get("access_count", 0)
-
-                        # Viktiga minnen: hög score + ofta använda
-                        importance = (score * 0.6) + (min(access_count, 10) / 10 * 0.4)
-
-                        if importance > 0.5:
-                            # Konsolidera: förstärk
-                            boost = consolidation_strength * importance * 0.3
-                            new_strength = strength * (1.0 + boost)
-                            episodic_memory.collection.update(
-                                ids=[mem_id],
-                                metadatas=[{**meta, "strength": new_strength}],
-                            )
-                            consolidated += 1
-                        elif importance < 0.2 and strength < 2.0:
-                            # Accelerera decay för oviktiga
-                            new_strength = strength * 0.7
-                            if new_strength < 0.1:
-                                episodic_memory.collection.delete(ids=[mem_id])
-                                decayed += 1
-                            else:
-                                episodic_memory.collection.update(
-                                    ids=[mem_id],
-                                    metadatas=[{**meta, "strength": new_strength}],
-                                )
-            elif hasattr(episodic_memory, 'memories'):
-                # In-memory fallback
-                surviving = []
-                now = time.time()
-                for mem in episodic_memory.memories:
-                    meta = mem["metadata"]
+            # Alla update/delete under cykeln skrivs som bulk-anrop (flush vid slutet)
+            with episodic_memory.batched_writes():
+                to_delete: list[str] = []
+                for mem_id, meta in episodic_memory.iter_metadata():
                     strength = meta.get("strength", 1.0)
                     score = meta.get("score", 0)
                     access_count = meta.get("access_count", 0)
+
+                    # Viktiga minnen: hög score + ofta använda
                     importance = (score * 0.6) + (min(access_count, 10) / 10 * 0.4)
 
                     if importance > 0.5:
-                        meta["strength"] = strength * (1.0 + consolidation_strength * importance * 0.3)
+                        # Konsolidera: förstärk
+                        boost = consolidation_strength * importance * 0.3
+                        new_strength = strength * (1.0 + boost)
+                        episodic_memory.update_metadata(mem_id, {**meta, "strength": new_strength})
                         consolidated += 1
                     elif importance < 0.2 and strength < 2.0:
-                        meta["strength"] = strength * 0.7
-                        if meta["strength"] < 0.1:
+                        # Accelerera decay för oviktiga
+                        new_strength = strength * 0.7
+                        if new_strength < 0.1:
+                            to_delete.append(mem_id)
                             decayed += 1
-                            continue
-                    surviving.append(mem)
-                episodic_memory.memories = surviving
+                        else:
+                            episodic_memory.update_metadata(mem_id, {**meta, "strength": new_strength})
+                episodic_memory.delete(to_delete)
         except Exception:
             pass
 
@@ -693,12 +694,11 @@ class SleepEngine:
 
             # Beräkna novelty: hur olika är koncepten?
             try:
-                idx_a = list(hdc_bridge.concept_memory.keys()).index(concept_a) if concept_a in hdc_bridge.concept_memory else -1
-                idx_b = list(hdc_bridge.concept_memory.keys()).index(concept_b) if concept_b in hdc_bridge.concept_memory else -1
-
-                if idx_a >= 0 and idx_b >= 0:
-                    vec_a = list(hdc_bridge.concept_memory.values())[idx_a]
-                    vec_b = list(hdc_bridge.concept_memory.values())[idx_b]
+                memory = hdc_bridge.concept_memory
+                if concept_a in memory and concept_b in memory:
+                    # Uppslag per namn: avkvantiserar bara de två prototyperna
+                    vec_a = memory[concept_a]
+                    vec_b = memory[concept_b]
                     # Cosine similarity
                     sim = torch.nn.functional.cosine_similarity(
                         vec_a.unsqueeze(0), vec_b.unsqueeze(0)
@@ -6,6 +6,7 @@ Kör med: python -m pytest circadian_test.py -v
 
 import os
 import sys
+import tempfile
 import time
 import json
 import unittest
@@ -27,6 +28,26 @@ from circadian import (
 from memory import EbbinghausMemory
 from cognition import NeuroSymbolicBridge
 
+import collatz_explorer
+import math_research
+import memory
+
+
+def setUpModule():
+    """Drömmarnas upptäckter och minnesfiler hamnar i en temporär katalog, inte i training_data/."""
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    os.makedirs(os.path.join(tmp.name, "math_research"), exist_ok=True)
+    for module, name, value in (
+        (collatz_explorer, "DISCOVERY_LOG_DIR", os.path.join(tmp.name, "collatz")),
+        (math_research, "JOURNAL_DIR", os.path.join(tmp.name, "math_research")),
+        (memory, "_DEFAULT_FALLBACK_FILE", os.path.join(tmp.name, "ebbinghaus_memory.json")),
+        (memory, "_DEFAULT_PERSIST_DIR", os.path.join(tmp.name, "chromadb")),
+    ):
+        patcher = patch.object(module, name, value)
+        patcher.start()
+        unittest.addModuleCleanup(patcher.stop)
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # CircadianClock Tests
@@ -14,15 +14,18 @@ Frankenstein-stacken styr HUR agenten lär sig.
 LLM (Gemini) är bara "händerna" som skriver kod.
 """
 
+import copy
 import json
 import time
 import re
 import os
 import hashlib
+import threading
 import numpy as np
 import torch
 import requests
-from dataclasses import dataclass, field
+from collections import Counter
+from dataclasses import asdict, dataclass, field
 from pathlib import Path
 
 from programming_env import Task, EvalResult, evaluate_solution
@@ -30,7 +33,8 @@ from code_solver import solve_deterministic as solve_code_deterministic
 from curriculum import get_curriculum, get_tasks_by_level
 from cognition import NeuroSymbolicBridge, hdc_bind, hdc_permute
 from agency import ActiveInferenceAgent
-from memory import EbbinghausMemory, ShortTermBuffer
+from memory import DEFAULT_DEDUPE_THRESHOLD, ShortTermBuffer
+from memory_service import connect_memory
 from gut_feeling import GutFeelingEngine, GutFeelingResult
 from emotions import EkmanEmotionEngine
 from promotion_pipeline import PromotionPipeline
@@ -38,6 +42,10 @@ from symbolic_regression import SymbolicRegressionEngine
 from cross_domain_bridge import CrossDomainBridge
 from reflection_loop import ReflectionEngine
 from archon_client import ArchonClient
+from bounded_history import RingBuffer, spill_path
+from quantization import DEFAULT_EMBEDDING_DTYPE, check_dtype
+from agent_checkpoint import CheckpointError, read_checkpoint, write_checkpoint
+from spans import SPANS_ENABLED, SpanRecorder, SpanStats, activate, span, timed
 
 # Ladda API-nycklar från bridge/.env
 _env_path = Path(__file__).parent.parent / "bridge" / ".env"
@@ -54,17 +62,60 @@ XAI_API_KEY = _env_vars.get("XAI_API_KEY", os.environ.get("XAI_API_KEY", ""))
 # Runtime config (module toggles — läses från config.json varje solve_task)
 _CONFIG_PATH = Path(__file__).parent / "training_data" / "config.json"
 
-def _read_module_config() -> dict[str, bool]:
-    """Läs vilka moduler som är aktiverade. Returnerar {module_name: enabled}."""
+def _read_module_config(overrides: dict[str, bool] | None = None) -> dict[str, bool]:
+    """Läs vilka moduler som är aktiverade. Returnerar {module_name: enabled}.
+
+    config.json är den globala standarden; overrides (per agent eller per
+    anrop) läggs ovanpå i minnet så att parallella agenter inte delar fil.
+    """
     defaults = {"hdc": True, "aif": True, "ebbinghaus": True, "gut_feeling": True, "emotions": True, "stm": True, "symbolic_regression": True, "cross_domain_bridge": True, "reflection_loop": True}
+    config = defaults
     try:
         if _CONFIG_PATH.exists():
             data = json.loads(_CONFIG_PATH.read_text(encoding="utf-8"))
             modules = data.get("modules", {})
-            return {k: modules.get(k, {}).get("enabled", True) for k in defaults}
+            config = {k: modules.get(k, {}).get("enabled", True) for k in defaults}
     except Exception:
         pass
-    return defaults
+    if overrides:
+        config = {**config, **overrides}
+    return config
+
+
+# Minneslägen för 24/7-träningen: skrivkö, hot/warm/cold-nivåer och dedupe.
+# Övriga agenter (svärm, ablation, kluster) kör utan; "memory" i config.json överstyr.
+TRAINING_MEMORY_OPTIONS = {"write_behind": True, "tiering": True, "dedupe_threshold": DEFAULT_DEDUPE_THRESHOLD}
+
+
+def read_memory_options(defaults: dict | None = None) -> dict:
+    """Minneslägen ur "memory" i config.json ovanpå defaults (okända nycklar ignoreras)."""
+    options = dict(defaults or {})
+    try:
+        if _CONFIG_PATH.exists():
+            data = json.loads(_CONFIG_PATH.read_text(encoding="utf-8")).get("memory", {})
+            options.update((k, v) for k, v in data.items() if k in TRAINING_MEMORY_OPTIONS)
+    except Exception:
+        pass
+    return options
+
+
+class LLMThrottle:
+    """Reserverar tidsluckor för LLM-anrop.
+
+    Delas mellan agenter som använder samma API-nycklar (t.ex. svärmens
+    noder) så att parallella agenter tillsammans håller rate limiten.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.last_call = 0.0
+
+    def reserve(self, interval: float) -> float:
+        """Nästa lediga tidslucka (time.time()-tid) minst `interval` efter föregående."""
+        with self._lock:
+            slot = max(time.time(), self.last_call + interval)
+            self.last_call = slot
+            return slot
 
 # Dimensioner
 TASK_FEATURE_DIM = 64   # Feature-vektor för uppgiftsbeskrivningar
@@ -115,6 +166,46 @@ class SolveMetadata:
     gut_confidence: float = 0.0
     gut_recommendation: str = ""
     gut_signals: dict = field(default_factory=dict)
+    # Exklusiv tid per steg i ms (se spans.py); "other" = omätt tid
+    stage_ms: dict = field(default_factory=dict)
+
+
+@dataclass
+class PrefetchedSolution:
+    """Förberäknat arbete från träningspipelinen (training_pipeline.py).
+
+    Tillståndslösa steg — S0-solvern, ett första LLM-utkast och dess
+    evaluering — körs parallellt innan uppgiften når solve_task, som
+    då återanvänder resultaten i stället för att räkna om dem.
+    """
+    s0_checked: bool = False
+    s0_code: str | None = None
+    s0_result: EvalResult | None = None
+    draft_code: str | None = None
+    draft_result: EvalResult | None = None
+
+
+# Strategin som förhämtade LLM-utkast genereras med
+DRAFT_STRATEGY = "direct"
+
+# Minsta HDC-likhet för att S1 ska prova lagrad kod för ett koncept
+S1_MIN_CONFIDENCE = 0.5
+
+# deep_recall (varm/kall nivå) högst en gång per kategori och intervall —
+# kall nivå strömmas från disk, och befordrade träffar hittas sedan i hot
+DEEP_RECALL_INTERVAL = 600.0
+
+# Kategori för minnen som saknade en (matchar alla kategorier vid recall)
+UNKNOWN_CATEGORY = ""
+
+# Migreringsmarkör: minnen utan category har fått UNKNOWN_CATEGORY
+CATEGORY_BACKFILL = "category_backfill"
+
+# Likhet över vilken ett inkommande koncept räknas som samma som ett lokalt
+CONCEPT_MERGE_SIMILARITY = 0.9
+
+# Max antal LLM-svar som behålls i svarscachen efter en sammanslagning
+RESPONSE_CACHE_LIMIT = 500
 
 
 @dataclass
@@ -185,6 +276,83 @@ def _text_to_features(text: str, dim: int = TASK_FEATURE_DIM):
     return features
 
 
+def export_learned_from(holder, since: float = 0.0) -> dict:
+    """Inlärt tillstånd som kan slås ihop mellan processer.
+
+    holder: agent eller annat objekt med hdc, concept_code, skills,
+    _response_cache och promotion. since: bara cachesvar nyare än detta.
+    """
+    memory = holder.hdc.concept_memory
+    names = list(memory)
+    prototypes = (
+        np.stack([memory[name].numpy() for name in names]).astype(np.float32)
+        if names else np.zeros((0, holder.hdc.hdc_dim), dtype=np.float32)
+    )
+    return {
+        "concepts": names,
+        "prototypes": prototypes,
+        "sample_counts": [holder.hdc.concept_sample_count.get(name, 1) for name in names],
+        "concept_code": {name: holder.concept_code[name] for name in names if name in holder.concept_code},
+        "response_cache": {
+            h: entry for h, entry in getattr(holder, "_response_cache", {}).items() if entry[1] > since
+        },
+        "promoted_s1": dict(holder.promotion.promoted_s1),
+        "promoted_s0": dict(holder.promotion.promoted_s0),
+        "skills": {name: asdict(skill) for name, skill in holder.skills.items()},
+    }
+
+
+def merge_learned_into(holder, learned: dict) -> dict:
+    """Slå ihop export_learned_from()-data in i holder. Returnerar antal nyheter per del.
+
+    Koncept matchas på likhet (namnen är lokala per process): ett inkommande
+    koncept med likhet >= CONCEPT_MERGE_SIMILARITY mot ett lokalt ger bara
+    dess kod om den lokala saknar kod; annars läggs det till som nytt koncept.
+    """
+    hdc = holder.hdc
+    added = {"concepts": 0, "concept_code": 0, "response_cache": 0, "promoted": 0, "skills": 0}
+    for name, proto, count in zip(learned["concepts"], learned["prototypes"], learned["sample_counts"]):
+        hv = torch.from_numpy(np.asarray(proto, dtype=np.float32))
+        code = learned["concept_code"].get(name)
+        local = None
+        if hdc.num_concepts:
+            _, similarity, best = hdc.classify(hv)
+            if similarity >= CONCEPT_MERGE_SIMILARITY:
+                local = best
+        if local is None:
+            local = name
+            suffix = 1
+            while local in hdc.concept_memory:
+                local = f"{name}~{suffix}"
+                suffix += 1
+            hdc.concept_memory[local] = hv
+            hdc.concept_sample_count[local] = int(count)
+            added["concepts"] += 1
+        if code and local not in holder.concept_code:
+            holder.concept_code[local] = code
+            added["concept_code"] += 1
+
+    cache = getattr(holder, "_response_cache", None)
+    if cache is None:
+        cache = holder._response_cache = {}
+    for h, (text, ts) in learned["response_cache"].items():
+        if h not in cache or cache[h][1] < ts:
+            added["response_cache"] += h not in cache
+            cache[h] = (text, ts)
+    if len(cache) > RESPONSE_CACHE_LIMIT:
+        for h, _ in sorted(cache.items(), key=lambda kv: kv[1][1])[:len(cache) - RESPONSE_CACHE_LIMIT]:
+            del cache[h]
+
+    added["promoted"] = holder.promotion.merge_promoted(learned["promoted_s1"], learned["promoted_s0"])
+
+    for name, skill in learned["skills"].items():
+        current = holder.skills.get(name)
+        if current is None or skill["times_used"] > current.times_used:
+            added["skills"] += current is None
+            holder.skills[name] = SkillMemory(**skill)
+    return added
+
+
 class FrankensteinCodeAgent:
     """Full Frankenstein-stack kodagent.
     
@@ -205,8 +373,22 @@ class FrankensteinCodeAgent:
                                     └───────────┘
     """
 
-    def __init__(self, max_attempts: int = 3):
+    def __init__(self, max_attempts: int = 3, history_limit: int | None = None,
+                 spill_dir: str | None = None, module_config: dict[str, bool] | None = None,
+                 llm_throttle: LLMThrottle | None = None, memory_options: dict | None = None):
+        """
+        Args:
+            max_attempts: Max antal LLM-försök per uppgift
+            history_limit: Max antal försök/AIF-steg i RAM-historiken (None = obegränsat)
+            spill_dir: Katalog där utträngd historik loggas som JSONL (None = ingen spill)
+            module_config: Modulväxlar för just den här agenten, ovanpå config.json
+            llm_throttle: Delad tidsluckereservation för LLM-anrop (None = egen)
+            memory_options: Extra EbbinghausMemory-lägen (write_behind, tiering,
+                dedupe_threshold) — av som standard, run_continuous slår på dem
+        """
         self.max_attempts = max_attempts
+        self.module_config = dict(module_config or {})
+        self.llm_throttle = llm_throttle or LLMThrottle()
 
         # --- FRANKENSTEIN STACK ---
 
@@ -214,6 +396,7 @@ class FrankensteinCodeAgent:
         self.hdc = NeuroSymbolicBridge(
             lnn_output_dim=TASK_FEATURE_DIM,
             hdc_dim=HDC_DIM,
+            prototype_dtype=DEFAULT_EMBEDDING_DTYPE,
         )
 
         # Active Inference: Styr strategival via EFE-minimering
@@ -224,15 +407,23 @@ class FrankensteinCodeAgent:
             num_actions=NUM_STRATEGIES,
             preference_obs=[0, 1],  # Föredrar "solved" observationer
             exploration_weight=0.6,  # Börja nyfiket
+            history_limit=history_limit,
+            spill_dir=spill_dir,
         )
 
         # Ebbinghaus Episodiskt Minne: Lagrar lösningar med glömskekurva
         # decay_threshold=0.02 (sänkt från 0.05 — behåll minnen längre)
-        self.episodic_memory = EbbinghausMemory(
+        # Med FRANKENSTEIN_MEMORY_SERVICE satt delar alla agenter på värden en minnesdaemon
+        self.episodic_memory = connect_memory(
             decay_threshold=0.02,
             collection_name="code_solutions",
+            embedding_dtype=DEFAULT_EMBEDDING_DTYPE,
+            **(memory_options or {}),
         )
 
+        self._deep_recall_at: dict[str, float] = {}
+        self._backfill_memory_categories()
+
         # Korttidsminne: Senaste försöken för omedelbar kontext
         self.stm = ShortTermBuffer(capacity=50)
 
@@ -267,7 +458,9 @@ class FrankensteinCodeAgent:
         # --- AGENT STATE ---
         self.solved: dict[str, Attempt] = {}
         self.skills: dict[str, SkillMemory] = {}
-        self.all_attempts: list[Attempt] = []
+        self.all_attempts = RingBuffer(history_limit, spill_path(spill_dir, "code_attempts"))
+        # Antal försök per task_id-prefix ("gen-graph", "gen-graph-topo", ...)
+        self._attempt_prefix_counts: Counter = Counter()
         self.total_tasks = 0
         self.total_solved = 0
         self.current_level = 1
@@ -290,6 +483,11 @@ class FrankensteinCodeAgent:
             "rate_limits": 0, "timeouts": 0, "empty_responses": 0,
             "total_latency_ms": 0.0, "retries": 0,
         }
+        # Skyddar throttling och svarscache när pipelinen anropar LLM från flera trådar
+        self._llm_lock = threading.Lock()
+
+        # Stegtider per solve_task (p50/p95 i get_stats)
+        self.span_stats = SpanStats()
 
     # ===== PERCEPTION: Text → Features =====
 
@@ -302,6 +500,7 @@ class FrankensteinCodeAgent:
 
     # ===== KOGNITION (HDC): Mönsterigenkänning =====
 
+    @timed("hdc")
     def _recognize_pattern(self, task: Task) -> tuple[str, float, bool]:
         """Använd HDC för att matcha uppgift mot kända mönster.
         
@@ -342,8 +541,12 @@ class FrankensteinCodeAgent:
             return "runtime"
         return "logic"
 
-    def _choose_strategy(self, task: Task, attempt_num: int, is_new_pattern: bool, prev_feedback: str = "") -> str:
+    def _choose_strategy(self, task: Task, attempt_num: int, is_new_pattern: bool, prev_feedback: str = "",
+                         remaining: int = 1) -> str:
         """Active Inference väljer strategi baserat på överraskning och EFE.
+
+        remaining = återstående försök; AIF planerar hela retry-sekvensen
+        (plan_policies) i stället för att bara se ett steg framåt.
         
         Observation mappas till:
         - 0: solved_first_try
@@ -382,7 +585,7 @@ class FrankensteinCodeAgent:
                 observation = 7  # known_pattern
 
         # Active Inference: minimera EFE → välj handling
-        action_idx = self.aif.step(observation)
+        action_idx = self.aif.step(observation, horizon=remaining)
         strategy = STRATEGIES[action_idx % NUM_STRATEGIES]
 
         # Smart overrides baserat på kontext
@@ -419,7 +622,14 @@ class FrankensteinCodeAgent:
         hv = self.hdc.encode(features)
         hv_np = hv.squeeze(0).detach().numpy()
 
-        results = self.episodic_memory.recall(hv_np, n_results=3)
+        # Bara minnen från samma uppgiftskategori, eller utan känd kategori (förfiltreras via index/where)
+        where = {"category": {"$in": [task.category, UNKNOWN_CATEGORY]}}
+        results = self.episodic_memory.recall(hv_np, n_results=3, where=where)
+        now = time.time()
+        if not results and now - self._deep_recall_at.get(task.category, 0.0) >= DEEP_RECALL_INTERVAL:
+            # Inget hett minne — sök även varm/kall nivå (befordrar träffar)
+            self._deep_recall_at[task.category] = now
+            results = self.episodic_memory.deep_recall(hv_np, n_results=3, where=where)
 
         if results:
             # Returnera koden från det starkaste minnet
@@ -435,6 +645,26 @@ class FrankensteinCodeAgent:
                     return attempt.code
         return None
 
+    def _backfill_memory_categories(self) -> int:
+        """Ge minnen utan category UNKNOWN_CATEGORY, så att kategorifiltret inte tappar dem.
+
+        Engångsmigrering: markören i minnets header/collection gör att
+        senare starter (svärmnoder, ablation, klusterarbetare) hoppar över skanningen.
+        """
+        memory = self.episodic_memory
+        try:
+            if memory.is_migrated(CATEGORY_BACKFILL):
+                return 0
+            missing = [(m, meta) for m, meta in memory.iter_metadata() if "category" not in meta]
+            with memory.batched_writes():
+                for memory_id, meta in missing:
+                    memory.update_metadata(memory_id, {**meta, "category": UNKNOWN_CATEGORY})
+            memory.mark_migrated(CATEGORY_BACKFILL)
+        except Exception as e:
+            print(f"[memory] Warning: Could not backfill categories: {e}")
+            return 0
+        return len(missing)
+
     def _store_in_memory(self, task: Task, attempt: Attempt, concept_name: str) -> None:
         """Lagra lösning i Ebbinghaus-minnet.
         
@@ -459,7 +689,7 @@ class FrankensteinCodeAgent:
         # quality: hur bra lösningen var (logiskt värde)
         quality = max(0.3, attempt.score)  # 0.3 → 1.0
         # durability: sällsynta kategorier = viktigare att behålla
-        cat_count = sum(1 for a in self.all_attempts if getattr(a, 'task_id', '').startswith(f"gen-{task.category}"))
+        cat_count = self._attempt_prefix_counts[f"gen-{task.category}"]
         durability = 1.5 if cat_count < 20 else 1.0  # Sällsynta kategorier förstärks
 
         if attempt.score >= 1.0:
@@ -477,6 +707,15 @@ class FrankensteinCodeAgent:
             metadata=metadata,
         )
 
+    def _record_attempt(self, attempt: Attempt) -> None:
+        """Lägg till ett försök i historiken och uppdatera prefix-räknaren."""
+        self.all_attempts.append(attempt)
+        # Sista segmentet är unikt per uppgift — räknas inte (håller räknaren liten)
+        parts = attempt.task_id.split("-")
+        for i in range(1, len(parts)):
+            self._attempt_prefix_counts["-".join(parts[:i])] += 1
+
+    @timed("update")
     def _update_after_result(self, task: Task, attempt: Attempt, eval_result: EvalResult) -> None:
         """Uppdatera hela stacken efter ett resultat.
         
@@ -552,6 +791,7 @@ class FrankensteinCodeAgent:
 
     # ===== ARCHON: Kunskapsbas-sökning =====
 
+    @timed("archon")
     def _search_archon_kb(self, task: "Task") -> str:
         """Sök i Archon Knowledge Base efter relevant dokumentation.
         
@@ -600,65 +840,70 @@ class FrankensteinCodeAgent:
         if cached:
             cache_code, cache_ts = cached
             if time.time() - cache_ts < 86400:  # 24h TTL
-                self.llm_stats["successes"] += 1
+                self._count_llm(successes=1)
                 return cache_code
 
         for provider in providers:
             for attempt in range(max_retries + 1):
                 # Adaptive throttling: base 4s, increases after rate limits
-                rate_limit_penalty = min(self.llm_stats.get("rate_limits", 0) * 0.5, 10.0)
+                # Varje anrop reserverar nästa lediga tidslucka under låset, så
+                # parallella pipeline-trådar sprids jämnt i stället för att krocka
+                with self._llm_lock:
+                    rate_limit_penalty = min(self.llm_stats["rate_limits"] * 0.5, 10.0)
                 throttle = 4.0 + rate_limit_penalty
-                last_call = getattr(self, '_last_llm_call', 0.0)
-                elapsed_since_last = time.time() - last_call
-                if elapsed_since_last < throttle:
-                    time.sleep(throttle - elapsed_since_last)
-                self._last_llm_call = time.time()
+                slot = self.llm_throttle.reserve(throttle)
+                self._count_llm(calls=1)
+                wait = slot - time.time()
+                if wait > 0:
+                    with span("throttle"):
+                        time.sleep(wait)
 
-                self.llm_stats["calls"] += 1
                 t0 = time.time()
                 try:
-                    if provider == "gemini":
-                        resp = requests.post(
-                            f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
-                            json={
-                                "contents": [{"parts": [{"text": prompt}]}],
-                                "generationConfig": {"temperature": temperature},
-                            },
-                            timeout=30,
-                        )
-                    else:
-                        resp = requests.post(
-                            "https://api.x.ai/v1/chat/completions",
-                            headers={"Authorization": f"Bearer {XAI_API_KEY}"},
-                            json={
-                                "model": "grok-3-mini-fast",
-                                "messages": [{"role": "user", "content": prompt}],
-                                "max_tokens": 1500,
-                                "temperature": temperature,
-                            },
-                            timeout=30,
-                        )
-
-                    latency = (time.time() - t0) * 1000
-                    self.llm_stats["total_latency_ms"] += latency
+                    with span("llm_wait"):
+                        if provider == "gemini":
+                            resp = requests.post(
+                                f"https://generativelanguage.googleapis.com/v1beta/models/gemini-2.0-flash:generateContent?key={GEMINI_API_KEY}",
+                                json={
+                                    "contents": [{"parts": [{"text": prompt}]}],
+                                    "generationConfig": {"temperature": temperature},
+                                },
+                                timeout=30,
+                            )
+                        else:
+                            resp = requests.post(
+                                "https://api.x.ai/v1/chat/completions",
+                                headers={"Authorization": f"Bearer {XAI_API_KEY}"},
+                                json={
+                                    "model": "grok-3-mini-fast",
+                                    "messages": [{"role": "user", "content": prompt}],
+                                    "max_tokens": 1500,
+                                    "temperature": temperature,
+                                },
+                                timeout=30,
+                            )
+
+                    self._count_llm(total_latency_ms=(time.time() - t0) * 1000)
 
                     # Rate limit — backoff och retry
                     if resp.status_code == 429:
-                        self.llm_stats["rate_limits"] += 1
+                        self._count_llm(rate_limits=1)
                         wait = min(2 ** attempt * 2, 15)
-                        time.sleep(wait)
-                        self.llm_stats["retries"] += 1
+                        with span("throttle"):
+                            time.sleep(wait)
+                        self._count_llm(retries=1)
                         continue
 
                     # Server error — retry
                     if resp.status_code >= 500:
-                        self.llm_stats["failures"] += 1
-                        time.sleep(2)
-                        self.llm_stats["retries"] += 1
+                        self._count_llm(failures=1)
+                        with span("throttle"):
+                            time.sleep(2)
+                        self._count_llm(retries=1)
                         continue
 
                     if resp.status_code != 200:
-                        self.llm_stats["failures"] += 1
+                        self._count_llm(failures=1)
                         break  # Client error (400, 403) — byt provider
 
                     # Extrahera text
@@ -677,32 +922,38 @@ class FrankensteinCodeAgent:
                             text = choices[0].get("message", {}).get("content", "")
 
                     if text:
-                        self.llm_stats["successes"] += 1
                         # Cache response for future reuse
-                        if not hasattr(self, '_response_cache'):
-                            self._response_cache = {}
-                        self._response_cache[prompt_hash] = (text, time.time())
-                        # Limit cache size
-                        if len(self._response_cache) > 500:
-                            oldest = sorted(self._response_cache.items(), key=lambda x: x[1][1])[:100]
-                            for k, _ in oldest:
-                                del self._response_cache[k]
+                        with self._llm_lock:
+                            self.llm_stats["successes"] += 1
+                            if not hasattr(self, '_response_cache'):
+                                self._response_cache = {}
+                            self._response_cache[prompt_hash] = (text, time.time())
+                            # Limit cache size
+                            if len(self._response_cache) > 500:
+                                oldest = sorted(self._response_cache.items(), key=lambda x: x[1][1])[:100]
+                                for k, _ in oldest:
+                                    del self._response_cache[k]
                         return text
                     else:
-                        self.llm_stats["empty_responses"] += 1
+                        self._count_llm(empty_responses=1)
                         break  # Tomt svar — byt provider
 
                 except requests.exceptions.Timeout:
-                    self.llm_stats["timeouts"] += 1
-                    self.llm_stats["total_latency_ms"] += (time.time() - t0) * 1000
+                    self._count_llm(timeouts=1, total_latency_ms=(time.time() - t0) * 1000)
                     break  # Timeout — byt provider
                 except Exception:
-                    self.llm_stats["failures"] += 1
-                    self.llm_stats["total_latency_ms"] += (time.time() - t0) * 1000
+                    self._count_llm(failures=1, total_latency_ms=(time.time() - t0) * 1000)
                     break
 
         return None
 
+    def _count_llm(self, **deltas: float) -> None:
+        """Öka llm_stats-räknare under _llm_lock (pipeline- och svärmtrådar anropar LLM samtidigt)."""
+        with self._llm_lock:
+            for key, delta in deltas.items():
+                self.llm_stats[key] += delta
+
+    @timed("extract")
     def _extract_code(self, llm_response: str) -> str:
         """Extrahera Python-kod från LLM-svar — robust multi-format."""
         # 1. ```python ... ``` (vanligast)
@@ -748,9 +999,14 @@ class FrankensteinCodeAgent:
 
         return llm_response.strip()
 
+    @timed("prompt")
     def _build_prompt(self, task: Task, strategy: str, prev_attempts: list[Attempt] = None,
-                      gut_recommendation: str = "") -> str:
-        """Bygg prompt — berikas med HDC-minnen, AIF-kontext, felanalys och gut feeling."""
+                      gut_recommendation: str = "", asi_context: bool = True) -> str:
+        """Bygg prompt — berikas med HDC-minnen, AIF-kontext, felanalys och gut feeling.
+
+        asi_context=False utelämnar ASI-kontexten (sätts per uppgift i
+        solve_task) — krävs när prompten byggs utanför lösningsloopen.
+        """
         prompt = (
             "Du ar en expert Python-programmerare. Svara BARA med Python-kod i ett ```python``` block. "
             "Ingen forklaring. Koden maste lasa fran stdin med input() och skriva till stdout med print().\n\n"
@@ -803,11 +1059,11 @@ class FrankensteinCodeAgent:
             )
 
         # ASI: Symbolisk Regression — steg-för-steg bevisbyggare
-        if hasattr(self, '_asi_symbolic') and self._asi_symbolic:
+        if asi_context and getattr(self, '_asi_symbolic', ""):
             prompt += self._asi_symbolic + "\n"
 
         # ASI: Cross-Domain Bridge — regler från multipla domäner
-        if hasattr(self, '_asi_cross_domain') and self._asi_cross_domain:
+        if asi_context and getattr(self, '_asi_cross_domain', ""):
             prompt += self._asi_cross_domain + "\n"
 
         # Archon Knowledge Base: Injicera relevant dokumentation
@@ -885,9 +1141,42 @@ class FrankensteinCodeAgent:
         prompt += "Svara BARA med ```python``` kodblock:"
         return prompt
 
+    def has_cached_solution(self, task: Task) -> bool:
+        """Kan S0/S1 lösa uppgiften utan LLM? (bara läsning)
+
+        Sant om det finns en befordrad S0/S1-lösning, eller lagrad kod för
+        ett igenkänt HDC-koncept (S1-bypass). Träningspipelinen hoppar då
+        över LLM-utkastet.
+        """
+        if (self.promotion.get_s0_template(task.category, task.description) is not None
+                or self.promotion.get_s1_solution(task.category, task.description) is not None):
+            return True
+        try:
+            concept_name, confidence, is_new = self._recognize_pattern(task)
+        except (RuntimeError, IndexError):
+            return False  # solve_task lärde sig ett koncept samtidigt — utkasta hellre
+        return not is_new and confidence >= S1_MIN_CONFIDENCE and concept_name in self.concept_code
+
+    def draft_solution(self, task: Task) -> str | None:
+        """Generera ett första LLM-utkast utan att röra agentens lärtillstånd.
+
+        Används av träningspipelinens S2-steg som kör parallellt med
+        solve_task för andra uppgifter. Utkastet byggs med DRAFT_STRATEGY
+        och utan gut feeling/emotioner/ASI-kontext; finns det när solve_task
+        når försök 1 körs försöket med DRAFT_STRATEGY (AIF uppdateras ändå).
+        """
+        prompt = self._build_prompt(task, DRAFT_STRATEGY, asi_context=False)
+        response = self._call_llm(prompt, temperature=0.3)
+        if not response:
+            return None
+        return self._extract_code(response) or None
+
     # ===== HUVUDLOOP =====
 
-    def solve_task(self, task: Task, verbose: bool = True) -> EvalResult | None:
+    def solve_task(self, task: Task, verbose: bool = True,
+                   prefetched: PrefetchedSolution | None = None,
+                   modules: dict[str, bool] | None = None,
+                   cancel: threading.Event | None = None) -> EvalResult | None:
         """Lös en uppgift med full Frankenstein-stack.
         
         Flöde per försök:
@@ -897,16 +1186,36 @@ class FrankensteinCodeAgent:
         4. Eval: Kör tester
         5. Stack: Uppdaterar alla moduler
         
-        Returnerar EvalResult med .metadata (SolveMetadata) bifogad.
+        prefetched: Resultat från träningspipelinen — S0-utfallet och ett
+        evaluerat LLM-utkast återanvänds i stället för att beräknas här.
+        modules: Modulväxlar för just detta anrop (ovanpå agentens module_config).
+        cancel: Sätts den avbryts försöksloopen före nästa LLM-försök.
+
+        Returnerar EvalResult med .metadata (SolveMetadata) bifogad;
+        metadata.stage_ms anger tid per steg (se spans.py).
         """
+        recorder = SpanRecorder() if SPANS_ENABLED else None
+        t0 = time.perf_counter()
+        with activate(recorder):
+            result = self._solve_task(task, verbose, prefetched, modules, cancel)
+        if recorder is not None:
+            stage_ms = recorder.timings((time.perf_counter() - t0) * 1000)
+            self.span_stats.add(stage_ms)
+            meta = getattr(result, "metadata", None)
+            if meta is not None:
+                meta.stage_ms = stage_ms
+        return result
+
+    def _solve_task(self, task: Task, verbose: bool, prefetched: PrefetchedSolution | None,
+                    modules: dict[str, bool] | None, cancel: threading.Event | None) -> EvalResult | None:
         task_start = time.time()
         self.total_tasks += 1
         attempts: list[Attempt] = []
         best_result: EvalResult | None = None
         strategies_tried: list[str] = []
 
-        # Läs runtime-config (vilka moduler är aktiva?)
-        mcfg = _read_module_config()
+        # Läs runtime-config (vilka moduler är aktiva?) — fil + agentens + anropets växlar
+        mcfg = _read_module_config({**self.module_config, **(modules or {})})
 
         # HDC: Analysera uppgiften (kan bypassas)
         if mcfg["hdc"]:
@@ -922,31 +1231,29 @@ class FrankensteinCodeAgent:
 
         # Ebbinghaus: Hämta liknande minnen (kan bypassas)
         memory_results: list[dict] = []
-        if mcfg["hdc"]:
+        with span("hdc"):
             features = self._perceive_task(task)
             hv = self.hdc.encode(features)
             hv_np = hv.squeeze(0).detach().numpy()
-            if mcfg["ebbinghaus"]:
+        if mcfg["hdc"] and mcfg["ebbinghaus"]:
+            with span("memory_recall"):
                 memory_results = self.episodic_memory.recall(hv_np, n_results=3)
-        else:
-            features = self._perceive_task(task)
-            hv = self.hdc.encode(features)
-            hv_np = hv.squeeze(0).detach().numpy()
 
         # GUT FEELING: Snabb magkänsla INNAN LLM-anrop (kan bypassas)
         if mcfg["gut_feeling"]:
-            gut = self.gut.feel(
-                hdc_confidence=confidence,
-                is_new_pattern=is_new,
-                category=task.category,
-                difficulty=task.difficulty,
-                title=task.title,
-                description=task.description,
-                tags=task.tags,
-                memory_results=memory_results,
-                aif_surprise=surprise,
-                exploration_weight=self.aif.exploration_weight if mcfg["aif"] else 0.5,
-            )
+            with span("gut"):
+                gut = self.gut.feel(
+                    hdc_confidence=confidence,
+                    is_new_pattern=is_new,
+                    category=task.category,
+                    difficulty=task.difficulty,
+                    title=task.title,
+                    description=task.description,
+                    tags=task.tags,
+                    memory_results=memory_results,
+                    aif_surprise=surprise,
+                    exploration_weight=self.aif.exploration_weight if mcfg["aif"] else 0.5,
+                )
         else:
             gut = GutFeelingResult(valence=0.0, confidence=0.5, recommendation="neutral")
 
@@ -962,16 +1269,21 @@ class FrankensteinCodeAgent:
         emo_mods = {"temperature_mod": 0.0, "extra_attempts": 0, "strategy_preference": None,
                     "exploration_mod": 0.0, "persistence_mod": 1.0, "prompt_tone": ""}
         if mcfg["emotions"]:
-            emo_mods = self.emotions.get_behavioral_modifiers()
+            with span("emotions"):
+                emo_mods = self.emotions.get_behavioral_modifiers()
             effective_max += emo_mods["extra_attempts"]
 
         # === SYSTEM 0: DETERMINISTIC SOLVER ===
         # Instant, guaranteed-correct solutions for known task patterns
         # No LLM needed — fastest path to 100%
         system0_used = False
-        det_code = solve_code_deterministic(task)
-        if det_code:
-            s0_result = evaluate_solution(task, det_code)
+        if prefetched is not None and prefetched.s0_checked:
+            det_code, s0_result = prefetched.s0_code, prefetched.s0_result
+        else:
+            with span("s0"):
+                det_code = solve_code_deterministic(task)
+                s0_result = evaluate_solution(task, det_code) if det_code else None
+        if det_code and s0_result is not None:
             if s0_result.score >= 1.0:
                 system0_used = True
                 self.total_solved += 1
@@ -981,7 +1293,7 @@ class FrankensteinCodeAgent:
                     attempt_num=0, hdc_observation=0, surprise=surprise,
                 )
                 attempts.append(s0_attempt)
-                self.all_attempts.append(s0_attempt)
+                self._record_attempt(s0_attempt)
                 self.solved[task.id] = s0_attempt
                 self.strategy_stats.setdefault("system0_deterministic", {"attempts": 0, "successes": 0})
                 self.strategy_stats["system0_deterministic"]["attempts"] += 1
@@ -992,9 +1304,10 @@ class FrankensteinCodeAgent:
 
         # === PROMOTED S0: Patterns promoted from S1→S0 via pipeline ===
         if not system0_used:
-            promoted_code = self.promotion.get_s0_template(task.category, task.description)
+            with span("s0"):
+                promoted_code = self.promotion.get_s0_template(task.category, task.description)
+                p_result = evaluate_solution(task, promoted_code) if promoted_code else None
             if promoted_code:
-                p_result = evaluate_solution(task, promoted_code)
                 if p_result.score >= 1.0:
                     system0_used = True
                     self.total_solved += 1
@@ -1004,7 +1317,7 @@ class FrankensteinCodeAgent:
                         attempt_num=0, hdc_observation=0, surprise=surprise,
                     )
                     attempts.append(p_attempt)
-                    self.all_attempts.append(p_attempt)
+                    self._record_attempt(p_attempt)
                     self.solved[task.id] = p_attempt
                     self.strategy_stats.setdefault("system0_promoted", {"attempts": 0, "successes": 0})
                     self.strategy_stats["system0_promoted"]["attempts"] += 1
@@ -1015,9 +1328,10 @@ class FrankensteinCodeAgent:
 
         # === PROMOTED S1: Patterns promoted from S2→S1 via pipeline ===
         if not system0_used:
-            promoted_s1_code = self.promotion.get_s1_solution(task.category, task.description)
+            with span("s1"):
+                promoted_s1_code = self.promotion.get_s1_solution(task.category, task.description)
+                ps1_result = evaluate_solution(task, promoted_s1_code) if promoted_s1_code else None
             if promoted_s1_code:
-                ps1_result = evaluate_solution(task, promoted_s1_code)
                 if ps1_result.score >= 1.0:
                     system0_used = True  # treat as resolved
                     self.total_solved += 1
@@ -1027,7 +1341,7 @@ class FrankensteinCodeAgent:
                         attempt_num=0, hdc_observation=0, surprise=surprise,
                     )
                     attempts.append(ps1_attempt)
-                    self.all_attempts.append(ps1_attempt)
+                    self._record_attempt(ps1_attempt)
                     self.solved[task.id] = ps1_attempt
                     self.strategy_stats.setdefault("system1_promoted", {"attempts": 0, "successes": 0})
                     self.strategy_stats["system1_promoted"]["attempts"] += 1
@@ -1045,10 +1359,11 @@ class FrankensteinCodeAgent:
                 and mcfg["gut_feeling"] and mcfg["hdc"] and mcfg["ebbinghaus"]
                 and gut.recommendation == "confident"
                 and not is_new
-                and confidence >= 0.5
+                and confidence >= S1_MIN_CONFIDENCE
                 and concept_name in self.concept_code):
             cached_code = self.concept_code[concept_name]
-            s1_result = evaluate_solution(task, cached_code)
+            with span("s1"):
+                s1_result = evaluate_solution(task, cached_code)
             if s1_result.score >= 1.0:
                 # System 1 lyckades! Registrera som from_memory
                 system1_used = True
@@ -1059,7 +1374,7 @@ class FrankensteinCodeAgent:
                     attempt_num=0, hdc_observation=0, surprise=surprise,
                 )
                 attempts.append(s1_attempt)
-                self.all_attempts.append(s1_attempt)
+                self._record_attempt(s1_attempt)
                 self.solved[task.id] = s1_attempt
                 self.strategy_stats.setdefault("system1_memory", {"attempts": 0, "successes": 0})
                 self.strategy_stats["system1_memory"]["attempts"] += 1
@@ -1094,9 +1409,14 @@ class FrankensteinCodeAgent:
 
         prev_feedback = ""
         for attempt_num in range(effective_max if not (system0_used or system1_used) else 0):
+            if cancel is not None and cancel.is_set():
+                break
+            # Pipeline: förhämtat utkast blir försök 1 (strategin är given)
+            draft_code = prefetched.draft_code if prefetched is not None and attempt_num == 0 else None
             # AIF: Välj strategi via Expected Free Energy (kan bypassas)
             if mcfg["aif"]:
-                strategy = self._choose_strategy(task, attempt_num, is_new, prev_feedback)
+                strategy = self._choose_strategy(task, attempt_num, is_new, prev_feedback,
+                                                 remaining=effective_max - attempt_num)
             else:
                 strategy = "direct" if attempt_num == 0 else "with_hints"
 
@@ -1110,6 +1430,11 @@ class FrankensteinCodeAgent:
                 strategy = emo_mods["strategy_preference"]
                 if strategy in self.strategy_stats:
                     self.strategy_stats[strategy]["attempts"] += 1
+
+            # Förhämtat utkast: försök 1 binds till DRAFT_STRATEGY — LLM-anropet är redan gjort
+            if draft_code and strategy != DRAFT_STRATEGY:
+                strategy = DRAFT_STRATEGY
+                self.strategy_stats[strategy]["attempts"] += 1
             strategies_tried.append(strategy)
 
             if verbose:
@@ -1123,36 +1448,42 @@ class FrankensteinCodeAgent:
                     end=" ", flush=True,
                 )
 
-            # LLM: Generera kod (gut feeling + emotioner påverkar prompt + temperature)
-            emo_tone = emo_mods["prompt_tone"] if mcfg["emotions"] else ""
-            combined_gut = gut.recommendation if mcfg["gut_feeling"] else ""
-            if emo_tone and combined_gut:
-                combined_gut = f"{combined_gut}|{emo_tone}"
-            elif emo_tone:
-                combined_gut = emo_tone
-            prompt = self._build_prompt(task, strategy, attempts, gut_recommendation=combined_gut)
-            # Dynamisk temperature: gut + emotion modifier
-            base_temp = 0.3
-            if mcfg["gut_feeling"]:
-                base_temp = 0.2 if gut.recommendation == "confident" else 0.5 if gut.recommendation == "cautious" else 0.3
-            if mcfg["emotions"]:
-                base_temp += emo_mods["temperature_mod"]
-            temp = min(max(0.1, base_temp + attempt_num * 0.15), 0.9)
-            llm_response = self._call_llm(prompt, temperature=temp)
-
-            if not llm_response:
-                if verbose:
-                    print("X LLM timeout")
-                continue
+            if draft_code:
+                code = draft_code
+                with span("eval"):
+                    eval_result = prefetched.draft_result or evaluate_solution(task, code)
+            else:
+                # LLM: Generera kod (gut feeling + emotioner påverkar prompt + temperature)
+                emo_tone = emo_mods["prompt_tone"] if mcfg["emotions"] else ""
+                combined_gut = gut.recommendation if mcfg["gut_feeling"] else ""
+                if emo_tone and combined_gut:
+                    combined_gut = f"{combined_gut}|{emo_tone}"
+                elif emo_tone:
+                    combined_gut = emo_tone
+                prompt = self._build_prompt(task, strategy, attempts, gut_recommendation=combined_gut)
+                # Dynamisk temperature: gut + emotion modifier
+                base_temp = 0.3
+                if mcfg["gut_feeling"]:
+                    base_temp = 0.2 if gut.recommendation == "confident" else 0.5 if gut.recommendation == "cautious" else 0.3
+                if mcfg["emotions"]:
+                    base_temp += emo_mods["temperature_mod"]
+                temp = min(max(0.1, base_temp + attempt_num * 0.15), 0.9)
+                llm_response = self._call_llm(prompt, temperature=temp)
+
+                if not llm_response:
+                    if verbose:
+                        print("X LLM timeout")
+                    continue
 
-            code = self._extract_code(llm_response)
-            if not code:
-                if verbose:
-                    print("X Ingen kod")
-                continue
+                code = self._extract_code(llm_response)
+                if not code:
+                    if verbose:
+                        print("X Ingen kod")
+                    continue
 
-            # Eval: Kör tester
-            eval_result = evaluate_solution(task, code)
+                # Eval: Kör tester
+                with span("eval"):
+                    eval_result = evaluate_solution(task, code)
 
             attempt = Attempt(
                 task_id=task.id,
@@ -1165,7 +1496,7 @@ class FrankensteinCodeAgent:
                 surprise=surprise,
             )
             attempts.append(attempt)
-            self.all_attempts.append(attempt)
+            self._record_attempt(attempt)
             prev_feedback = eval_result.feedback
 
             # Stack: Uppdatera alla moduler
@@ -1208,13 +1539,14 @@ class FrankensteinCodeAgent:
                             f"In:{tc.input_data.strip()[:80]}→Out:{tc.expected_output[:60]}"
                             for tc in task.test_cases[:2]
                         )
-                    reflection = self.reflection.reflect(
-                        code=code,
-                        task_description=task.description[:500],
-                        test_cases_info=tc_info,
-                        feedback=eval_result.feedback,
-                        elapsed_ms=attempt_elapsed,
-                    )
+                    with span("reflection"):
+                        reflection = self.reflection.reflect(
+                            code=code,
+                            task_description=task.description[:500],
+                            test_cases_info=tc_info,
+                            feedback=eval_result.feedback,
+                            elapsed_ms=attempt_elapsed,
+                        )
                     if reflection.issues and reflection.critique_prompt:
                         if verbose:
                             crit = sum(1 for i in reflection.issues if i.severity == "critical")
@@ -1222,11 +1554,13 @@ class FrankensteinCodeAgent:
                             print(f"  [Reflect] Självkritik: {crit} kritiska, {warn} varningar → fixar...")
 
                         # Extra LLM-anrop med critique-prompt
-                        fix_response = self._call_llm(reflection.critique_prompt, temperature=0.2)
+                        cancelled = cancel is not None and cancel.is_set()
+                        fix_response = None if cancelled else self._call_llm(reflection.critique_prompt, temperature=0.2)
                         if fix_response:
                             fix_code = self._extract_code(fix_response)
                             if fix_code and fix_code != code:
-                                fix_result = evaluate_solution(task, fix_code)
+                                with span("eval"):
+                                    fix_result = evaluate_solution(task, fix_code)
                                 if fix_result.score > eval_result.score:
                                     self.reflection.record_fix_outcome(True)
                                     # Registrera som nytt försök
@@ -1240,7 +1574,7 @@ class FrankensteinCodeAgent:
                                         surprise=surprise,
                                     )
                                     attempts.append(fix_attempt)
-                                    self.all_attempts.append(fix_attempt)
+                                    self._record_attempt(fix_attempt)
                                     prev_feedback = fix_result.feedback
                                     self._update_after_result(task, fix_attempt, fix_result)
 
@@ -1272,25 +1606,28 @@ class FrankensteinCodeAgent:
 
         # Periodisk garbage collection (glöm dåliga minnen)
         if mcfg["ebbinghaus"] and self.total_tasks % 20 == 0:
-            removed = self.episodic_memory.garbage_collect()
+            with span("maintenance"):
+                removed = self.episodic_memory.garbage_collect()
             if removed > 0 and verbose:
                 print(f"  [Ebbinghaus] Glomde {removed} svaga minnen")
 
         # Periodisk HDC concept splitting (var 50:e uppgift)
         if mcfg["hdc"] and self.total_tasks % 50 == 0:
-            split = self.hdc.maybe_split_concepts(max_samples=80)
+            with span("maintenance"):
+                split = self.hdc.maybe_split_concepts(max_samples=80)
             if split > 0 and verbose:
                 print(f"  [HDC] Splittade {split} breda koncept ({self.hdc.num_concepts} kvar)")
 
         # Gut Feeling: Registrera utfall för kalibrering
         final_score = best_result.score if best_result else 0.0
         if mcfg["gut_feeling"]:
-            self.gut.record_outcome(
-                score=final_score,
-                category=task.category,
-                difficulty=task.difficulty,
-                gut_valence=gut.valence,
-            )
+            with span("gut"):
+                self.gut.record_outcome(
+                    score=final_score,
+                    category=task.category,
+                    difficulty=task.difficulty,
+                    gut_valence=gut.valence,
+                )
 
         # EKMAN EMOTIONER: Uppdatera baserat på resultat
         # Bestäm feltyp
@@ -1326,17 +1663,18 @@ class FrankensteinCodeAgent:
                     break
 
         if mcfg["emotions"]:
-            self.emotions.process_result(
-                score=final_score,
-                difficulty=task.difficulty,
-                attempts_used=len(attempts),
-                max_attempts=effective_max,
-                is_new_pattern=is_new,
-                error_type=error_type,
-                was_timeout=was_timeout,
-                previous_score=prev_score,
-                streak=current_streak,
-            )
+            with span("emotions"):
+                self.emotions.process_result(
+                    score=final_score,
+                    difficulty=task.difficulty,
+                    attempts_used=len(attempts),
+                    max_attempts=effective_max,
+                    is_new_pattern=is_new,
+                    error_type=error_type,
+                    was_timeout=was_timeout,
+                    previous_score=prev_score,
+                    streak=current_streak,
+                )
 
             if verbose and self.emotions.state.dominant()[1] > 0.2:
                 mood = self.emotions.get_mood_summary()
@@ -1366,10 +1704,108 @@ class FrankensteinCodeAgent:
             best_result.metadata = meta  # type: ignore[attr-defined]
         return best_result
 
+    # ===== CHECKPOINT: Spara & Återställ hela stacken =====
+
+    def checkpoint(self, path: str | Path) -> int:
+        """Skriv hela den kognitiva stacken till en binär checkpoint (atomiskt).
+
+        Episodiskt minne och promotion-tillstånd persisteras redan separat.
+        Returnerar filstorlek i bytes.
+        """
+        with self._llm_lock:
+            llm = {
+                "stats": dict(self.llm_stats),
+                "response_cache": [[h, text, ts] for h, (text, ts) in getattr(self, "_response_cache", {}).items()],
+            }
+        state = {
+            "agent": {
+                "total_tasks": self.total_tasks,
+                "total_solved": self.total_solved,
+                "current_level": self.current_level,
+                "skills": {name: asdict(skill) for name, skill in self.skills.items()},
+                "solved": {task_id: asdict(a) for task_id, a in self.solved.items()},
+                "concept_code": dict(self.concept_code),
+                "error_counts": dict(self.error_counts),
+                "strategy_stats": {s: dict(st) for s, st in self.strategy_stats.items()},
+                "attempt_prefix_counts": dict(self._attempt_prefix_counts),
+                "llm": llm,
+            },
+            "hdc": self.hdc.export_state(),
+            "aif": self.aif.export_state(),
+            "gut": self.gut.export_state(),
+            "emotions": self.emotions.export_state(),
+        }
+        return write_checkpoint(path, state)
+
+    def restore(self, path: str | Path) -> None:
+        """Återställ stacken från checkpoint(). Kastar CheckpointError om den inte passar.
+
+        Allt valideras och byggs innan något skrivs över; misslyckas en
+        komponent rullas de redan importerade tillbaka, så agenten är
+        antingen helt återställd eller orörd.
+        """
+        state = read_checkpoint(path)
+        try:
+            hdc_dims = (state["hdc"]["lnn_output_dim"], state["hdc"]["hdc_dim"])
+            if hdc_dims != (self.hdc.lnn_output_dim, self.hdc.hdc_dim):
+                raise CheckpointError(f"{path}: HDC-dimensioner {hdc_dims} passar inte agenten")
+            aif_shape = [self.aif.num_obs, self.aif.num_states, self.aif.num_actions]
+            if list(state["aif"]["shape"]) != aif_shape:
+                raise CheckpointError(f"{path}: AIF-form {state['aif']['shape']} passar inte agenten")
+            check_dtype(state["hdc"]["concepts"]["matrix"]["dtype"])  # Annan precision kvantiseras om
+
+            agent = state["agent"]
+            counters = (int(agent["total_tasks"]), int(agent["total_solved"]), int(agent["current_level"]))
+            skills = {name: SkillMemory(**skill) for name, skill in agent["skills"].items()}
+            solved = {task_id: Attempt(**a) for task_id, a in agent["solved"].items()}
+            concept_code = dict(agent["concept_code"])
+            error_counts = dict(agent["error_counts"])
+            strategy_stats = {s: dict(st) for s, st in agent["strategy_stats"].items()}
+            prefix_counts = Counter(agent["attempt_prefix_counts"])
+            llm_stats = dict(agent["llm"]["stats"])
+            response_cache = {h: (text, ts) for h, text, ts in agent["llm"]["response_cache"]}
+        except (KeyError, TypeError, ValueError) as e:
+            raise CheckpointError(f"{path}: ogiltig checkpoint ({e})") from e
+
+        components = {"hdc": self.hdc, "aif": self.aif, "gut": self.gut, "emotions": self.emotions}
+        backup = copy.deepcopy({name: comp.export_state() for name, comp in components.items()})
+        done = []
+        try:
+            for name, comp in components.items():
+                done.append(name)
+                comp.import_state(state[name])
+        except (KeyError, TypeError, ValueError) as e:
+            for name in done:
+                components[name].import_state(backup[name])
+            raise CheckpointError(f"{path}: {done[-1]} kunde inte återställas ({e})") from e
+
+        self.total_tasks, self.total_solved, self.current_level = counters
+        self.skills = skills
+        self.solved = solved
+        self.concept_code = concept_code
+        self.error_counts.update(error_counts)
+        self.strategy_stats.update(strategy_stats)
+        self._attempt_prefix_counts = prefix_counts
+        with self._llm_lock:
+            self.llm_stats.update(llm_stats)
+            self._response_cache = response_cache
+
+    def export_learned(self, since: float = 0.0) -> dict:
+        """Inlärt tillstånd för sammanslagning mellan träningsprocesser."""
+        with self._llm_lock:
+            return export_learned_from(self, since)
+
+    def merge_learned(self, learned: dict) -> dict:
+        """Ta in koncept, svarscache, promotion-tiers och skills från andra processer."""
+        with self._llm_lock:
+            return merge_learned_into(self, learned)
+
     def get_stats(self) -> dict:
         """Returnera full stack-statistik."""
         mem_stats = self.episodic_memory.get_stats()
         aif_stats = self.aif.get_stats()
+        with self._llm_lock:
+            llm_stats = dict(self.llm_stats)
         # Beräkna strategi-framgångsgrader
         strat_rates = {}
         for s, st in self.strategy_stats.items():
@@ -1381,7 +1817,7 @@ class FrankensteinCodeAgent:
             "solve_rate": self.total_solved / max(self.total_tasks, 1),
             "skills_learned": len(self.skills),
             "skill_names": list(self.skills.keys()),
-            "total_attempts": len(self.all_attempts),
+            "total_attempts": self.all_attempts.total,
             "current_level": self.current_level,
             # HDC
             "hdc_concepts": self.hdc.num_concepts,
@@ -1404,13 +1840,9 @@ class FrankensteinCodeAgent:
             "gut_feeling": self.gut.get_stats(),
             # LLM
             "llm_stats": {
-                **self.llm_stats,
-                "avg_latency_ms": round(
-                    self.llm_stats["total_latency_ms"] / max(self.llm_stats["calls"], 1), 1
-                ),
-                "success_rate": round(
-                    self.llm_stats["successes"] / max(self.llm_stats["calls"], 1), 3
-                ),
+                **llm_stats,
+                "avg_latency_ms": round(llm_stats["total_latency_ms"] / max(llm_stats["calls"], 1), 1),
+                "success_rate": round(llm_stats["successes"] / max(llm_stats["calls"], 1), 3),
             },
             # Ekman Emotioner
             "emotions": self.emotions.get_stats(),
@@ -1420,6 +1852,8 @@ class FrankensteinCodeAgent:
             "symbolic_regression": self.symbolic.get_stats(),
             "cross_domain_bridge": self.cross_domain.get_stats(),
             "reflection_loop": self.reflection.get_stats(),
+            # Stegtider i solve_task (ms, exklusiv tid)
+            "stages": self.span_stats.summary(),
         }
 
 
@@ -12,10 +12,15 @@ nästan garanterat ortogonala — information kan lagras "holografiskt" över he
 vektorn, vilket gör systemet extremt tolerant mot brus.
 """
 
+from collections.abc import MutableMapping
+
+import numpy as np
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
 
+from quantization import QuantizedMatrix
+
 
 # --- Ren PyTorch HDC-operationer (ersätter torchhd) ---
 
@@ -71,6 +76,74 @@ def hdc_cosine_similarity(a: torch.Tensor, b: torch.Tensor) -> torch.Tensor:
     return F.cosine_similarity(a, b, dim=-1).unsqueeze(0) if a.shape[0] == 1 and b.shape[0] > 1 else F.cosine_similarity(a.expand_as(b), b, dim=-1).unsqueeze(0)
 
 
+class PrototypeMemory(MutableMapping):
+    """Koncept-prototyper lagrade i en kvantiserad matris (float32/float16/int8).
+
+    Beter sig som dict[str, torch.Tensor]: läsning avkvantiserar en
+    prototyp till en float32-tensor, skrivning kvantiserar. Nycklarna
+    behåller insättningsordning; similarities() räknar mot alla
+    prototyper direkt på den kvantiserade matrisen.
+    """
+
+    def __init__(self, dtype: str = "float32"):
+        self._matrix = QuantizedMatrix(dtype=dtype)
+        self._rows: dict[str, int] = {}
+
+    @property
+    def dtype(self) -> str:
+        return self._matrix.dtype
+
+    @property
+    def nbytes(self) -> int:
+        return self._matrix.nbytes
+
+    def __len__(self) -> int:
+        return len(self._rows)
+
+    def __iter__(self):
+        return iter(self._rows)
+
+    def __contains__(self, name) -> bool:
+        return name in self._rows
+
+    def __getitem__(self, name: str) -> torch.Tensor:
+        return torch.from_numpy(np.array(self._matrix.row(self._rows[name])))
+
+    def __setitem__(self, name: str, hv: torch.Tensor) -> None:
+        vec = hv.detach().cpu().reshape(-1).float().numpy()
+        row = self._rows.get(name)
+        if row is None:
+            self._rows[name] = self._matrix.append(vec)
+        else:
+            self._matrix.set_row(row, vec)
+
+    def __delitem__(self, name: str) -> None:
+        row = self._rows.pop(name)
+        moved = self._matrix.delete_row(row)
+        if moved is not None:
+            for other, r in self._rows.items():
+                if r == moved:
+                    self._rows[other] = row
+                    break
+
+    def similarities(self, hv: torch.Tensor) -> torch.Tensor:
+        """Cosine similarity mot alla prototyper, i nyckelordning. Form (N,)."""
+        sims = self._matrix.similarities(hv.detach().cpu().reshape(-1).float().numpy())
+        order = np.fromiter(self._rows.values(), dtype=np.int64, count=len(self._rows))
+        return torch.from_numpy(sims[order])
+
+    def export_state(self) -> dict:
+        return {
+            "matrix": self._matrix.export_state(),
+            "names": list(self._rows),
+            "rows": list(self._rows.values()),
+        }
+
+    def import_state(self, state: dict) -> None:
+        self._matrix.import_state(state["matrix"])
+        self._rows = dict(zip(state["names"], (int(r) for r in state["rows"])))
+
+
 class NeuroSymbolicBridge(nn.Module):
     """Brygga mellan kontinuerlig LNN-output och diskret HDC-rymd.
     
@@ -82,9 +155,12 @@ class NeuroSymbolicBridge(nn.Module):
     Parametrar:
         lnn_output_dim: Dimensionalitet från LNN (default 32)
         hdc_dim: Dimensionalitet i HDC-rymden (default 10000)
+        prototype_dtype: Lagringsprecision för prototyperna
+            ("float32", "float16" eller "int8" — se quantization.py)
     """
 
-    def __init__(self, lnn_output_dim: int = 32, hdc_dim: int = 10000):
+    def __init__(self, lnn_output_dim: int = 32, hdc_dim: int = 10000,
+                 prototype_dtype: str = "float32"):
         super().__init__()
         self.hdc_dim = hdc_dim
         self.lnn_output_dim = lnn_output_dim
@@ -97,8 +173,8 @@ class NeuroSymbolicBridge(nn.Module):
             hdc_random_projection(lnn_output_dim, hdc_dim),
         )
 
-        # Associativt minne: concept_name → prototyp-hypervektor
-        self.concept_memory: dict[str, torch.Tensor] = {}
+        # Associativt minne: concept_name → prototyp-hypervektor (kvantiserad)
+        self.concept_memory = PrototypeMemory(dtype=prototype_dtype)
         # Antal samples per koncept (för splitting)
         self.concept_sample_count: dict[str, int] = {}
 
@@ -140,12 +216,11 @@ class NeuroSymbolicBridge(nn.Module):
             hv = hv.squeeze(0)
 
         names = list(self.concept_memory.keys())
-        prototypes = torch.stack(list(self.concept_memory.values()))
 
-        # Cosine similarity mot alla prototyper
-        similarities = hdc_cosine_similarity(hv, prototypes)
+        # Cosine similarity mot alla prototyper (direkt på kvantiserad matris)
+        similarities = self.concept_memory.similarities(hv)
         best_idx = torch.argmax(similarities).item()
-        confidence = similarities.view(-1)[best_idx].item()
+        confidence = similarities[best_idx].item()
 
         return best_idx, confidence, names[best_idx]
 
@@ -195,6 +270,26 @@ class NeuroSymbolicBridge(nn.Module):
         else:
             return best_idx
 
+    def export_state(self) -> dict:
+        """Projektionsmatris, prototyper och sample-räknare (för checkpoints)."""
+        return {
+            "lnn_output_dim": self.lnn_output_dim,
+            "hdc_dim": self.hdc_dim,
+            "projection_matrix": self.projection_matrix.detach().cpu().numpy(),
+            "concepts": self.concept_memory.export_state(),
+            "concept_sample_count": dict(self.concept_sample_count),
+        }
+
+    def import_state(self, state: dict) -> None:
+        """Återställ från export_state(). Dimensionerna måste matcha."""
+        dims = (state["lnn_output_dim"], state["hdc_dim"])
+        if dims != (self.lnn_output_dim, self.hdc_dim):
+            raise ValueError(f"HDC-dimensioner {dims} matchar inte ({self.lnn_output_dim}, {self.hdc_dim})")
+        # Prototyperna är bara meningsfulla med samma (slumpade) projektion
+        self.projection_matrix.copy_(torch.from_numpy(np.asarray(state["projection_matrix"])))
+        self.concept_memory.import_state(state["concepts"])
+        self.concept_sample_count = {k: int(v) for k, v in state["concept_sample_count"].items()}
+
     @property
     def num_concepts(self) -> int:
         """Antal lagrade koncept."""
@@ -45,6 +45,12 @@ from agency import ActiveInferenceAgent
 # Ebbinghaus-minne från memory.py
 from memory import EbbinghausMemory
 
+# Begränsad historik för långa körningar
+from bounded_history import RingBuffer, BoundedDict, spill_path
+
+# Kvantiserad lagring av HDC-embeddings
+from quantization import DEFAULT_EMBEDDING_DTYPE, QuantizedVector, quantized_attribute, quantized_value
+
 # ── Logging ──
 
 logger = logging.getLogger("collatz_explorer")
@@ -114,6 +120,10 @@ class CollatzDiscovery:
     surprise_score: float = 0.0
 
 
+# HDC-embeddingen (10 000 dims) lagras kvantiserad men läses som lista
+CollatzDiscovery.hdc_embedding = quantized_attribute("hdc_embedding")
+
+
 # ── Basis-vektorer för HDC-encoding ──
 
 class CollatzHDCEncoder:
@@ -267,6 +277,17 @@ class CollatzHDCEncoder:
         return float(sim.squeeze())
 
 
+def _sequence_summary(seq: CollatzSequence) -> dict:
+    """Kompakt spill-post för en sekvens (hela steglistan kan vara miljontals tal)."""
+    return {
+        "n": seq.n,
+        "length": seq.length,
+        "peak": seq.peak,
+        "odd_steps": seq.odd_steps,
+        "even_steps": seq.even_steps,
+    }
+
+
 # ── Collatz Explorer ──
 
 class CollatzExplorer:
@@ -281,6 +302,7 @@ class CollatzExplorer:
         aif_agent: Active Inference-agent för exploration-beslut
         memory: Ebbinghaus-minne för persistent lagring
         bridge: NeuroSymbolicBridge för koncept-lärande
+        embedding_dtype: Lagringsprecision för HDC-embeddings (se quantization.py)
     """
 
     def __init__(
@@ -288,7 +310,13 @@ class CollatzExplorer:
         memory: Optional[EbbinghausMemory] = None,
         bridge: Optional[NeuroSymbolicBridge] = None,
         exploration_weight: float = 0.7,  # Hög nyfikenhet
+        history_limit: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        embedding_dtype: str = DEFAULT_EMBEDDING_DTYPE,
     ):
+        # Precision för upptäckternas HDC-embeddings, minnet och prototyperna
+        self.embedding_dtype = embedding_dtype
+
         # HDC encoder
         self.hdc_encoder = CollatzHDCEncoder(dim=HDC_DIM)
 
@@ -301,20 +329,30 @@ class CollatzExplorer:
             num_actions=4,
             preference_obs=[0, 1, 2],  # Föredrar anomali-observationer
             exploration_weight=exploration_weight,
+            history_limit=history_limit,
+            spill_dir=spill_dir,
         )
 
         # Ebbinghaus memory
         self.memory = memory or EbbinghausMemory(
             collection_name="collatz_discoveries",
             decay_threshold=0.05,
+            embedding_dtype=embedding_dtype,
         )
 
         # NeuroSymbolicBridge för koncept-lärande
-        self.bridge = bridge or NeuroSymbolicBridge(lnn_output_dim=32, hdc_dim=HDC_DIM)
+        self.bridge = bridge or NeuroSymbolicBridge(
+            lnn_output_dim=32, hdc_dim=HDC_DIM, prototype_dtype=embedding_dtype,
+        )
 
         # Intern statistik
-        self._sequences_computed: dict[int, CollatzSequence] = {}
-        self._anomalies: list[CollatzAnomaly] = []
+        # history_limit begränsar sekvens-cachen och anomalilistan (None = obegränsat)
+        self._sequences_computed = BoundedDict(
+            history_limit, spill_path(spill_dir, "collatz_sequences"), serializer=_sequence_summary,
+        )
+        self._anomalies = RingBuffer(history_limit, spill_path(spill_dir, "collatz_anomalies"))
+        self._anomaly_type_counts: Counter = Counter()
+        self._max_explored = 0
         self._discoveries: list[CollatzDiscovery] = []
         self._stats = defaultdict(float)
         self._running = False
@@ -375,6 +413,7 @@ class CollatzExplorer:
             even_steps=sum(1 for s in steps[:-1] if s % 2 == 0),
         )
         self._sequences_computed[n] = seq
+        self._max_explored = max(self._max_explored, n)
 
         # Uppdatera running statistics
         self._count += 1
@@ -475,6 +514,7 @@ class CollatzExplorer:
                 anomalies.append(anomaly)
 
         self._anomalies.extend(anomalies)
+        self._anomaly_type_counts.update(a.anomaly_type for a in anomalies)
         self._stats["ranges_analyzed"] += 1
         self._stats["total_anomalies"] += len(anomalies)
 
@@ -535,14 +575,17 @@ class CollatzExplorer:
                 norm = combined.norm()
                 if norm > 0:
                     combined = combined / norm
-                discovery.hdc_embedding = combined.numpy().tolist()
+                discovery.hdc_embedding = QuantizedVector.from_array(combined.numpy(), self.embedding_dtype)
             else:
                 # Slumpmässig embedding som fallback
-                discovery.hdc_embedding = torch.randn(HDC_DIM).numpy().tolist()
+                discovery.hdc_embedding = QuantizedVector.from_array(
+                    torch.randn(HDC_DIM).numpy(), self.embedding_dtype,
+                )
+        embedding = quantized_value(discovery, "hdc_embedding").to_array()
 
         # Lagra i Ebbinghaus-minnet
         memory_id = self.memory.store(
-            embedding=discovery.hdc_embedding,
+            embedding=embedding,
             concept=f"collatz_{discovery.category}",
             metadata={
                 "discovery_id": discovery.discovery_id,
@@ -557,7 +600,7 @@ class CollatzExplorer:
         discovery.memory_id = memory_id
 
         # Lär konceptet i NeuroSymbolicBridge
-        hv_tensor = torch.tensor(discovery.hdc_embedding, dtype=torch.float32)
+        hv_tensor = torch.from_numpy(embedding)
         self.bridge.learn_concept(f"collatz_{discovery.category}", hv_tensor)
 
         # Spara till disk
@@ -622,7 +665,7 @@ class CollatzExplorer:
         self._stats["last_surprise"] = surprise
 
         # Exekvera strategi
-        max_explored = max(self._sequences_computed.keys()) if self._sequences_computed else 0
+        max_explored = self._max_explored
 
         if action == 0:
             # Sekventiell: nästa oexplorade
@@ -817,7 +860,9 @@ class CollatzExplorer:
 
         summary = {
             "iterations_completed": min(i + 1, iterations) if i is not None else 0,
-            "sequences_computed": len(self._sequences_computed),
+            "sequences_computed": self._count,
+            "sequences_cached": len(self._sequences_computed),
+            "max_explored": self._max_explored,
             "anomalies_detected": total_anomalies,
             "discoveries_made": total_discoveries,
             "aif_surprise": self.aif_agent.get_surprise(),
@@ -834,35 +879,44 @@ class CollatzExplorer:
 
     # ── Recall & Query ──
 
-    def recall_similar_discoveries(self, pattern: CollatzSequence | int, n_results: int = 5) -> list[dict]:
+    def recall_similar_discoveries(
+        self,
+        pattern: CollatzSequence | int,
+        n_results: int = 5,
+        category: Optional[str] = None,
+    ) -> list[dict]:
         """Hämta liknande upptäckter från Ebbinghaus-minnet.
         
         Args:
             pattern: Mönster att söka efter (sekvens eller tal)
             n_results: Max antal resultat
+            category: Begränsa till en upptäcktskategori ("pattern", "anomaly", ...)
             
         Returns:
             results: Lista med matchande minnen
         """
         hv = self.encode_to_hdc(pattern)
-        embedding = hv.numpy().tolist()
-        return self.memory.recall(embedding, n_results=n_results)
+        # Bara explorerns egna upptäckter (minnet kan delas med andra moduler)
+        where = {"source": "collatz_explorer"}
+        if category is not None:
+            where["category"] = category
+        return self.memory.recall(hv.numpy(), n_results=n_results, where=where)
 
     # ── Stats & Export ──
 
     def get_stats(self) -> dict:
         """Returnera fullständig statistik."""
         return {
-            "sequences_computed": len(self._sequences_computed),
-            "anomalies_detected": len(self._anomalies),
+            "sequences_computed": self._count,
+            "sequences_cached": len(self._sequences_computed),
+            "max_explored": self._max_explored,
+            "anomalies_detected": self._anomalies.total,
             "discoveries_made": len(self._discoveries),
             "aif_surprise": self.aif_agent.get_surprise(),
             "aif_steps": int(self._stats.get("aif_steps", 0)),
             "memory_stats": self.memory.get_stats(),
             "running": self._running,
-            "anomaly_types": dict(
-                Counter(a.anomaly_type for a in self._anomalies)
-            ) if self._anomalies else {},
+            "anomaly_types": dict(self._anomaly_type_counts),
         }
 
     def get_discoveries(self) -> list[dict]:
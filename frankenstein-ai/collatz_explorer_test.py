@@ -9,8 +9,10 @@ import asyncio
 import math
 import os
 import sys
+import tempfile
 import time
 import unittest
+from unittest import mock
 
 import numpy as np
 import torch
@@ -31,6 +33,23 @@ from cognition import NeuroSymbolicBridge, hdc_cosine_similarity
 from agency import ActiveInferenceAgent
 from memory import EbbinghausMemory
 
+import collatz_explorer
+import memory
+
+
+def setUpModule():
+    """Upptäckter och minnesfiler hamnar i en temporär katalog, inte i training_data/."""
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    for module, name, value in (
+        (collatz_explorer, "DISCOVERY_LOG_DIR", os.path.join(tmp.name, "collatz")),
+        (memory, "_DEFAULT_FALLBACK_FILE", os.path.join(tmp.name, "ebbinghaus_memory.json")),
+        (memory, "_DEFAULT_PERSIST_DIR", os.path.join(tmp.name, "chromadb")),
+    ):
+        patcher = mock.patch.object(module, name, value)
+        patcher.start()
+        unittest.addModuleCleanup(patcher.stop)
+
 
 class TestRunSequence(unittest.TestCase):
     """Tester för run_sequence()."""
@@ -497,6 +516,13 @@ class TestRecallSimilarDiscoveries(unittest.TestCase):
         # Med in-memory fallback borde vi hitta minst 1
         self.assertGreater(len(results), 0, "Should recall at least one stored discovery")
 
+    def test_recall_filters_by_category(self):
+        """category begränsar recall till den kategorins upptäckter."""
+        results = self.explorer.recall_similar_discoveries(27, n_results=10, category="pattern")
+        self.assertGreater(len(results), 0)
+        self.assertTrue(all(r["concept"] == "collatz_pattern" for r in results))
+        self.assertEqual(self.explorer.recall_similar_discoveries(27, category="no_such_category"), [])
+
 
 class TestGetStats(unittest.TestCase):
     """Tester för get_stats()."""
@@ -517,6 +543,14 @@ class TestGetStats(unittest.TestCase):
         self.assertGreater(stats["sequences_computed"], 0)
         self.assertIn("memory_stats", stats)
 
+    def test_counters_keep_growing_past_history_limit(self):
+        explorer = CollatzExplorer(history_limit=10)
+        explorer.analyze_range(1, 50)
+        stats = explorer.get_stats()
+        self.assertEqual(stats["sequences_cached"], 10)
+        self.assertEqual(stats["sequences_computed"], 50)
+        self.assertEqual(stats["max_explored"], 50)
+
 
 class TestExploreCollatzConvenience(unittest.TestCase):
     """Tester för explore_collatz() convenience-funktion."""
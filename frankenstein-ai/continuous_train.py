@@ -3,7 +3,7 @@
 
 Kör oändligt:
 1. Genererar nya uppgifter dynamiskt
-2. Löser dem med LLM + minnesbaserad strategi
+2. Löser dem med LLM + minnesbaserad strategi (stegvis pipeline, se training_pipeline.py)
 3. Sparar all progression till disk (JSON)
 4. Adaptiv svårighetsgrad — ökar när agenten klarar sig bra
 5. Periodisk sammanfattning och statistik
@@ -13,7 +13,6 @@ Starta: python continuous_train.py
 Stoppa: Ctrl+C (sparar automatiskt)
 """
 
-import json
 import time
 import signal
 import sys
@@ -40,20 +39,25 @@ from rich.panel import Panel
 from rich import box
 
 from curriculum import get_curriculum
-from task_generator import generate_task
-from task_generator_v2 import generate_v2_task
-from task_generator_v4 import generate_v4_task, V4_GENERATORS
+from task_generator_v4 import V4_GENERATORS
 from chaos_monkey import create_chaos_task, generate_refactor_task
 from meta_learning import MetaLearningEngine
 from multi_llm_router import MultiLLMRouter
-from code_agent import CodeLearningAgent, SolveMetadata
+from code_agent import TRAINING_MEMORY_OPTIONS, CodeLearningAgent, SolveMetadata, read_memory_options
 from code_solver import solve_deterministic as solve_code_deterministic
 from programming_env import evaluate_solution
 from circadian import CircadianClock, SleepEngine
-from terminal_tasks import generate_terminal_task
 from terminal_agent import TerminalAgent
 from spaced_repetition import SpacedRepetitionScheduler
-import urllib.request
+from training_pipeline import build_code_pipeline
+from progress_store import ProgressStore
+from task_bank import TaskBank
+from rolling_stats import TrendTracker, check_consistency
+from telemetry import bridge_events, flush_all, log_writer
+from bounded_history import flush_spill_logs
+from agent_checkpoint import CHECKPOINT_INTERVAL, CHECKPOINT_NAME, CheckpointError
+from batch_scheduler import BatchScheduler, load_scheduler_config
+from memory import adopt_legacy_fallback
 
 # Detect if output is redirected — disable Rich formatting if so
 _is_redirected = not sys.stdout.isatty() if sys.stdout else True
@@ -61,13 +65,18 @@ console = Console(force_terminal=not _is_redirected, no_color=_is_redirected)
 
 # Persistens
 DATA_DIR = Path(__file__).parent / "training_data"
-PROGRESS_FILE = DATA_DIR / "progress.json"
+PROGRESS_FILE = DATA_DIR / "progress.json"  # Snapshot — per-uppgift-poster i progress_events.jsonl
 LOG_FILE = DATA_DIR / "training.log"
+CHECKPOINT_FILE = DATA_DIR / CHECKPOINT_NAME  # Hela agentens kognitiva stack (binär)
 SOLUTIONS_DIR = DATA_DIR / "solutions"
 
 
 BRIDGE_URL = os.environ.get("BRIDGE_URL", "http://localhost:3031")
 
+# Begränsad RAM-historik för 24/7-körning — utträngda poster spillas till disk
+HISTORY_LIMIT = int(os.environ.get("FRANKENSTEIN_HISTORY_LIMIT", "5000"))
+HISTORY_SPILL_DIR = DATA_DIR / "history_spill"
+
 
 def _load_env_file(path: Path) -> None:
     """Minimal .env loader (no dependencies).
@@ -107,18 +116,11 @@ if not os.environ.get("GEMINI_API_KEY"):
 
 
 def _send_terminal_event(event: dict):
-    """Send a live terminal event to bridge for real-time UI updates. Fire-and-forget."""
-    try:
-        data = json.dumps({"event": event}).encode("utf-8")
-        req = urllib.request.Request(
-            f"{BRIDGE_URL}/api/frankenstein/terminal/event",
-            data=data,
-            headers={"Content-Type": "application/json"},
-            method="POST",
-        )
-        urllib.request.urlopen(req, timeout=2)
-    except Exception:
-        pass
+    """Send a live terminal event to bridge for real-time UI updates.
+
+    Queued and batched by telemetry.py — never blocks the training loop.
+    """
+    bridge_events(f"{BRIDGE_URL}/api/frankenstein/terminal/event").send(event)
 
 
 def ensure_dirs():
@@ -126,14 +128,21 @@ def ensure_dirs():
     SOLUTIONS_DIR.mkdir(exist_ok=True)
 
 
-def load_progress() -> dict:
-    """Ladda sparad progression från disk."""
-    if PROGRESS_FILE.exists():
-        try:
-            return json.loads(PROGRESS_FILE.read_text(encoding="utf-8"))
-        except Exception:
-            pass
-    return {
+def open_stores() -> tuple[ProgressStore, TaskBank]:
+    """Öppna progressionslagret och uppgiftsbanken för en träningssession.
+
+    ProgressStore: händelselogg + snapshot (se progress_store.py);
+    progress["history"] loggar varje append. TaskBank: förgenererade
+    uppgifter (se task_bank.py); faller tillbaka på generatorerna om
+    banken är tom. Anroparen stänger båda när sessionen slutar.
+    """
+    ensure_dirs()
+    return ProgressStore(DATA_DIR), TaskBank(DATA_DIR / "task_bank")
+
+
+def load_progress(store: ProgressStore) -> dict:
+    """Ladda sparad progression (snapshot + händelselogg) från disk."""
+    return store.load(default={
         "total_tasks_attempted": 0,
         "total_tasks_solved": 0,
         "total_attempts": 0,
@@ -152,78 +161,52 @@ def load_progress() -> dict:
         "retry_solves": 0,
         "total_solve_time_ms": 0.0,
         "trends": {},  # Beräknade rullande medelvärden
-    }
+    })
 
 
-def save_progress(progress: dict):
-    """Spara progression till disk."""
+def save_progress(store: ProgressStore, progress: dict, force: bool = False):
+    """Spara en snapshot av progressionen (högst var SNAPSHOT_INTERVAL s om inte force).
+
+    Historikposter skrivs redan till händelseloggen när de läggs till.
+    """
     ensure_dirs()
     progress["last_saved"] = datetime.now().isoformat()
-    PROGRESS_FILE.write_text(json.dumps(progress, indent=2, ensure_ascii=False), encoding="utf-8")
+    store.save(progress, force=force)
+
+
+def save_checkpoint(agent) -> None:
+    """Skriv agentens checkpoint (atomiskt). Fel loggas men stoppar aldrig träningen."""
+    try:
+        t0 = time.perf_counter()
+        size = agent.checkpoint(CHECKPOINT_FILE)
+        log_event(f"CHECKPOINT: {size / 1024:.0f} KB på {(time.perf_counter() - t0) * 1000:.0f} ms")
+    except Exception as e:
+        log_event(f"CHECKPOINT ERROR: {e}")
+
+
+def restore_checkpoint(agent) -> bool:
+    """Återställ agenten från senaste checkpoint. Returnerar True om den lästes."""
+    if not CHECKPOINT_FILE.exists():
+        return False
+    try:
+        t0 = time.perf_counter()
+        agent.restore(CHECKPOINT_FILE)
+    except (CheckpointError, OSError) as e:
+        console.print(f"[yellow]⚠ Checkpoint kunde inte läsas ({e}) — startar från progress.json[/]")
+        log_event(f"CHECKPOINT RESTORE FAILED: {e}")
+        return False
+    console.print(
+        f"[dim]🧠 Checkpoint återställd på {(time.perf_counter() - t0) * 1000:.0f} ms: "
+        f"{agent.hdc.num_concepts} HDC-koncept, {len(agent.skills)} skills, "
+        f"{agent.llm_stats.get('calls', 0)} LLM-anrop[/]"
+    )
+    return True
 
 
 def log_event(msg: str):
-    """Logga till fil."""
-    ensure_dirs()
+    """Logga till fil (buffrat — skrivs i block av telemetry.BufferedLogWriter)."""
     timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-    with open(LOG_FILE, "a", encoding="utf-8") as f:
-        f.write(f"[{timestamp}] {msg}\n")
-
-
-def compute_trends(progress: dict) -> dict:
-    """Beräkna rullande trender från historik."""
-    history = progress.get("history", [])
-    trends = {}
-    for window_name, window_size in [("last_10", 10), ("last_50", 50), ("last_100", 100)]:
-        recent = history[-window_size:] if len(history) >= window_size else history
-        if not recent:
-            trends[window_name] = {"solve_rate": 0, "first_try_rate": 0, "avg_time_ms": 0, "count": 0}
-            continue
-        solved = sum(1 for h in recent if h.get("score", 0) >= 1.0)
-        first_try = sum(1 for h in recent if h.get("first_try", False))
-        times = [h.get("time_ms", 0) for h in recent if h.get("time_ms", 0) > 0]
-        trends[window_name] = {
-            "solve_rate": round(solved / len(recent), 3),
-            "first_try_rate": round(first_try / len(recent), 3),
-            "avg_time_ms": round(sum(times) / max(len(times), 1), 1),
-            "count": len(recent),
-        }
-
-    # Trender per nivå (senaste 50)
-    level_trends = {}
-    recent_all = history[-200:]
-    for lvl in range(1, 11):
-        level_hist = [h for h in recent_all if h.get("difficulty") == lvl]
-        if level_hist:
-            s = sum(1 for h in level_hist if h.get("score", 0) >= 1.0)
-            ft = sum(1 for h in level_hist if h.get("first_try", False))
-            times = [h.get("time_ms", 0) for h in level_hist if h.get("time_ms", 0) > 0]
-            level_trends[str(lvl)] = {
-                "solve_rate": round(s / len(level_hist), 3),
-                "first_try_rate": round(ft / len(level_hist), 3),
-                "avg_time_ms": round(sum(times) / max(len(times), 1), 1),
-                "count": len(level_hist),
-            }
-    trends["per_level"] = level_trends
-
-    # Trender per kategori (senaste 200)
-    cat_trends = {}
-    for h in recent_all:
-        cat = h.get("category", "unknown")
-        if cat not in cat_trends:
-            cat_trends[cat] = {"attempted": 0, "solved": 0, "first_try": 0, "total_time_ms": 0.0}
-        cat_trends[cat]["attempted"] += 1
-        if h.get("score", 0) >= 1.0:
-            cat_trends[cat]["solved"] += 1
-        if h.get("first_try", False):
-            cat_trends[cat]["first_try"] += 1
-        cat_trends[cat]["total_time_ms"] += h.get("time_ms", 0)
-    for cat, ct in cat_trends.items():
-        ct["solve_rate"] = round(ct["solved"] / max(ct["attempted"], 1), 3)
-        ct["avg_time_ms"] = round(ct["total_time_ms"] / max(ct["attempted"], 1), 1)
-    trends["per_category"] = cat_trends
-
-    return trends
+    log_writer(LOG_FILE).write(f"[{timestamp}] {msg}")
 
 
 def save_solution(task_id: str, code: str, score: float):
@@ -235,7 +218,7 @@ def save_solution(task_id: str, code: str, score: float):
     path.write_text(header + code, encoding="utf-8")
 
 
-def adaptive_difficulty(progress: dict) -> int:
+def adaptive_difficulty(progress: dict, stats: TrendTracker | None = None) -> int:
     """Beräkna adaptiv svårighetsgrad baserat på senaste prestanda + gut feeling.
     
     Nivåer 1-10:
@@ -249,7 +232,8 @@ def adaptive_difficulty(progress: dict) -> int:
     - Om magkänslan var "confident" OCH korrekt → snabbare uppgradering
     - Om magkänslan var "cautious" OCH korrekt (misslyckades) → långsammare
     """
-    history = progress.get("history", [])
+    # Bara de senaste 30 posterna används — hämtas ur trackerns fönster om det finns
+    history = stats.recent() if stats is not None else progress.get("history", [])
     if len(history) < 5:
         return max(1, progress.get("current_difficulty", 1))
 
@@ -341,6 +325,16 @@ def print_session_stats(progress: dict, session_start: float, session_solved: in
             if t.get("count", 0) > 0:
                 table.add_row(label, f"{t['solve_rate']:.0%} löst", f"FT:{t['first_try_rate']:.0%} {t['avg_time_ms']:.0f}ms")
 
+    # Batchschema: faktisk/mål-andel av tiden och lärsignal per timme
+    sched = progress.get("batch_scheduler", {})
+    if sched.get("types"):
+        table.add_row("", "", "")
+        table.add_row(f"[bold]-- BATCHSCHEMA ({sched.get('policy', '?')}) --[/]", "", "")
+        for kind, t in sched["types"].items():
+            if t["batches"]:
+                table.add_row(kind, f"{t['actual_share']:.0%}/{t['target_share']:.0%} tid",
+                              f"{t['signal_per_hour']:.0f} sig/h {t['avg_wall_s']:.0f}s {t['avg_llm_calls']:.1f} LLM")
+
     # Frankenstein-stack stats
     if agent:
         stats = agent.get_stats()
@@ -366,17 +360,43 @@ def print_session_stats(progress: dict, session_start: float, session_solved: in
         console.print(f"  Nivå {lvl}: [{bar}] [{color}]{s}/{a} ({rate:.0%})[/]")
 
 
+def _llm_calls(*agents) -> int:
+    """Summerade LLM-anrop för agenterna (för batchkostnad)."""
+    return sum(int(a.llm_stats.get("calls", 0)) for a in agents)
+
+
+def _close_batch(scheduler: BatchScheduler, batch: tuple, progress: dict, *agents) -> None:
+    """Mät en avslutad batch och spara schemaläggarens tillstånd i progress."""
+    kind, started, calls0, total0 = batch
+    history = progress["history"]
+    new = history.total - total0
+    entries = history[-new:] if new > 0 else []
+    scheduler.record(kind, time.time() - started, _llm_calls(*agents) - calls0, entries)
+    progress["batch_scheduler"] = {**scheduler.report(), "state": scheduler.export_state()}
+
+
 def run_continuous():
     """Huvudloop — kör tills Ctrl+C."""
-    ensure_dirs()
-    progress = load_progress()
+    progress_store, task_bank = open_stores()
+    if adopt_legacy_fallback():
+        console.print("[dim]🧠 Minne: ebbinghaus_memory.* flyttat till kodagentens collection[/]")
+    progress = load_progress(progress_store)
     progress["session_count"] = progress.get("session_count", 0) + 1
 
-    agent = CodeLearningAgent(max_attempts=3)
+    # Inkrementella trender: matas med varje ny historikpost (O(1) per uppgift)
+    trend_tracker = TrendTracker(progress["history"])
+    progress["history"].listeners.append(trend_tracker.push)
+
+    agent = CodeLearningAgent(
+        max_attempts=3,
+        history_limit=HISTORY_LIMIT,
+        spill_dir=str(HISTORY_SPILL_DIR),
+        memory_options=read_memory_options(TRAINING_MEMORY_OPTIONS),
+    )
 
     # Spaced Repetition Scheduler — bootstrap from history
     sr_scheduler = SpacedRepetitionScheduler()
-    sr_imported = sr_scheduler.import_from_progress(progress)
+    sr_imported = sr_scheduler.import_from_progress(progress, stats=trend_tracker)
     if sr_imported:
         console.print(f"[dim]📅 Spaced Repetition: importerade {sr_imported} kategorier[/]")
 
@@ -390,12 +410,15 @@ def run_continuous():
     if os.environ.get("XAI_API_KEY"):
         available_providers.append("grok")
     llm_router = MultiLLMRouter(available_providers=available_providers or ["gemini"])
-    llm_imported = llm_router.import_from_history(progress.get("history", []))
+    llm_imported = llm_router.import_from_history(progress.get("history", []), stats=trend_tracker)
     if llm_imported:
         console.print(f"[dim]🔀 Multi-LLM Router: importerade {llm_imported} historiska resultat[/]")
 
-    # Återställ agent-state från sparad progression
+    # Återställ agent-state: hela stacken från checkpoint, annars skills från progression
+    restored = restore_checkpoint(agent)
     for skill_name, skill_data in progress.get("skills", {}).items():
+        if restored and skill_name in agent.skills:
+            continue
         from code_agent import SkillMemory
         agent.skills[skill_name] = SkillMemory(
             pattern=skill_data.get("pattern", skill_name),
@@ -404,6 +427,7 @@ def run_continuous():
             success_rate=skill_data.get("success_rate", 0.5),
             times_used=skill_data.get("times_used", 0),
         )
+    last_checkpoint = time.time()
 
     session_start = time.time()
     session_solved = 0
@@ -482,12 +506,12 @@ def run_continuous():
                     "first_try": bool(result and result.score >= 1.0),
                     "strategy": "",
                     "feedback": (result.feedback if result else "") or "",
+                    "stages": meta.stage_ms if meta else {},
                 })
-                progress["history"] = progress["history"][-1000:]
 
                 tasks_since_report += 1
                 if tasks_since_report >= 10:
-                    save_progress(progress)
+                    save_progress(progress_store, progress)
                     tasks_since_report = 0
 
         # Fas 2: Oändlig genererad träning
@@ -499,14 +523,33 @@ def run_continuous():
             batches_per_day=30,   # 1 "dag" = 30 batchar ≈ 30 min
             sleep_batches=3,      # 3 batchar sömn per dag
         )
-        sleep_engine = SleepEngine(cycles_per_night=3)
+        sleep_engine = SleepEngine(
+            cycles_per_night=3,
+            history_limit=HISTORY_LIMIT,
+            spill_dir=str(HISTORY_SPILL_DIR),
+        )
 
         # Terminal agent: löser bash-uppgifter (Terminal-Bench-inspirerat)
         terminal_agent = TerminalAgent()
 
+        # Batchtyp väljs efter uppmätt tid, LLM-kostnad och lärsignal (se batch_scheduler.py)
+        scheduler = BatchScheduler(load_scheduler_config())
+        scheduler.import_state(progress.get("batch_scheduler", {}).get("state"))
+        open_batch = None  # (typ, start, LLM-anrop, historik-total) för pågående batch
+
         batch_num = 0
         while running:
             batch_num += 1
+            if open_batch is not None:
+                _close_batch(scheduler, open_batch, progress, agent, terminal_agent)
+                open_batch = None
+
+            # Kontrollera trackern mot full omräkning då och då
+            if batch_num % 50 == 0:
+                mismatches = check_consistency(trend_tracker, progress["history"])
+                if mismatches:
+                    log_event(f"TREND_MISMATCH {len(mismatches)}: {'; '.join(mismatches[:3])}")
+                    trend_tracker.rebuild(progress["history"])
 
             # === CIRCADIAN: Hämta aktuell fas ===
             circ_state = circadian.get_state()
@@ -531,13 +574,15 @@ def run_continuous():
                 progress["sleep_stats"]["total_insights"] += len(sleep_report.insights)
                 circadian.advance_batch(events_this_batch=0)
                 circadian.save_state()
-                save_progress(progress)
+                save_progress(progress_store, progress)
                 continue
 
             # === VAKEN: Normal träning med circadian-påverkan ===
+            batch_type = scheduler.next_batch(batch_num, sr_due=bool(sr_scheduler.get_due_categories()))
+            open_batch = (batch_type, time.time(), _llm_calls(agent, terminal_agent), progress["history"].total)
 
-            # === TERMINAL BATCH: var 5:e batch kör terminal-uppgifter ===
-            if batch_num % 5 == 0:
+            # === TERMINAL BATCH: bash-uppgifter ===
+            if batch_type == "terminal":
                 # Terminal tasks: cap at 5 initially, scale up as terminal_stats improve
                 term_solve_rate = progress.get("terminal_stats", {}).get("solve_rate", 0)
                 term_max = 5 if term_solve_rate < 0.7 else 7 if term_solve_rate < 0.9 else 9
@@ -549,7 +594,7 @@ def run_continuous():
                     if not running:
                         break
                     try:
-                        ttask = generate_terminal_task(term_diff)
+                        ttask = task_bank.sample("terminal", term_diff)
                         console.print(f"  [green]🖥️ {ttask.id}[/] {ttask.title}", end=" ")
                         _send_terminal_event({"type": "terminal_task_start", "task_id": ttask.id, "title": ttask.title, "difficulty": ttask.difficulty, "category": ttask.category, "task_num": ti + 1, "total_tasks": 5})
 
@@ -606,7 +651,6 @@ def run_continuous():
                             "fatigue": round(circ_state.fatigue, 3),
                             "terminal": True,
                         })
-                        progress["history"] = progress["history"][-1000:]
                     except Exception as terr:
                         console.print(f"[red]⚠ Terminal error: {terr}[/]")
                         log_event(f"TERMINAL_ERROR {terr}")
@@ -630,14 +674,14 @@ def run_continuous():
                 })
                 circadian.advance_batch(events_this_batch=5)
                 circadian.save_state()
-                save_progress(progress)
+                save_progress(progress_store, progress)
                 console.print()
                 print_session_stats(progress, session_start, session_solved, session_attempted, agent=agent)
                 console.print()
                 continue
 
-            # === FRANKENSTEIN 2.0: Nya okända uppgifter (var 7:e batch) ===
-            if batch_num % 7 == 0 and batch_num % 5 != 0:
+            # === FRANKENSTEIN 2.0: Nya okända uppgifter ===
+            if batch_type == "v2":
                 v2_diff = max(3, min(8, progress.get("current_difficulty", 5)))
                 console.print(f"[bold white on red] Batch {batch_num} {circ_state.emoji} — 🧟 FRANKENSTEIN 2.0 (bugfix/api/optimization) [/]")
                 v2_solved = 0
@@ -645,7 +689,7 @@ def run_continuous():
                     if not running:
                         break
                     try:
-                        v2task = generate_v2_task(v2_diff)
+                        v2task = task_bank.sample("v2", v2_diff)
                         console.print(f"  [red]🧟 {v2task.id}[/] {v2task.title}", end=" ")
                         try:
                             v2result = agent.solve_task(v2task, verbose=False)
@@ -677,13 +721,13 @@ def run_continuous():
                             "category": v2task.category,
                             "timestamp": time.time(),
                             "time_ms": round(v2_time_ms, 1),
+                            "stages": v2meta.stage_ms if v2meta else {},
                             "attempts": 1,
                             "first_try": bool(v2result and v2result.score >= 1.0),
                             "strategy": v2meta.winning_strategy if v2meta else "",
                             "feedback": (v2result.feedback if v2result else "")[:300],
                             "v2": True,
                         })
-                        progress["history"] = progress["history"][-1000:]
                     except Exception as v2gen_err:
                         console.print(f"[red]⚠ V2 gen error: {v2gen_err}[/]")
 
@@ -693,14 +737,14 @@ def run_continuous():
                 progress["v2_stats"]["solved"] += v2_solved
                 circadian.advance_batch(events_this_batch=5)
                 circadian.save_state()
-                save_progress(progress)
+                save_progress(progress_store, progress)
                 console.print()
                 print_session_stats(progress, session_start, session_solved, session_attempted, agent=agent)
                 console.print()
                 continue
 
-            # === CHAOS MONKEY: Muterade lösningar (var 15:e batch) ===
-            if batch_num % 15 == 0 and batch_num % 5 != 0:
+            # === CHAOS MONKEY: Muterade lösningar ===
+            if batch_type == "chaos":
                 console.print(f"[bold white on dark_red] Batch {batch_num} {circ_state.emoji} — 🐒 CHAOS MONKEY (bugg-injektion) [/]")
                 chaos_solved = 0
                 for ci in range(5):
@@ -708,7 +752,7 @@ def run_continuous():
                         break
                     try:
                         # Generate a normal task, solve it deterministically, then mutate
-                        base_task = generate_task(random.randint(3, 7))
+                        base_task = task_bank.sample("v1", random.randint(3, 7))
                         det_code = solve_code_deterministic(base_task)
                         if not det_code:
                             continue
@@ -732,6 +776,19 @@ def run_continuous():
                                     console.print(f"[green]✅[/]")
                                 else:
                                     console.print(f"[red]❌ {rresult.score if rresult else 0:.0%}[/]")
+                                rmeta = getattr(rresult, "metadata", None)
+                                progress["history"].append({
+                                    "id": refactor.id, "task_id": base_task.id,
+                                    "score": rresult.score if rresult else 0,
+                                    "difficulty": refactor.difficulty,
+                                    "category": refactor.category,
+                                    "timestamp": time.time(),
+                                    "time_ms": 0, "attempts": 1,
+                                    "first_try": bool(rresult and rresult.score >= 1.0),
+                                    "strategy": "refactor",
+                                    "feedback": (rresult.feedback if rresult else "")[:300],
+                                    "stages": rmeta.stage_ms if rmeta else {},
+                                })
                             continue
 
                         # Solve the chaos task (broken code → agent must fix)
@@ -761,6 +818,7 @@ def run_continuous():
                         else:
                             console.print(f"[red]❌ {cresult.score if cresult else 0:.0%}[/]")
 
+                        cmeta = getattr(cresult, "metadata", None)
                         progress["history"].append({
                             "id": f"chaos-{chaos.mutation_type}", "task_id": chaos.original_task.id,
                             "score": cresult.score if cresult else 0,
@@ -771,9 +829,9 @@ def run_continuous():
                             "first_try": bool(cresult and cresult.score >= 1.0),
                             "strategy": "chaos_monkey",
                             "feedback": (cresult.feedback if cresult else "")[:300],
+                            "stages": cmeta.stage_ms if cmeta else {},
                             "chaos": True,
                         })
-                        progress["history"] = progress["history"][-1000:]
                     except Exception as cerr:
                         console.print(f"[red]⚠ Chaos error: {cerr}[/]")
 
@@ -783,14 +841,14 @@ def run_continuous():
                 progress["chaos_stats"]["solved"] += chaos_solved
                 circadian.advance_batch(events_this_batch=5)
                 circadian.save_state()
-                save_progress(progress)
+                save_progress(progress_store, progress)
                 console.print()
                 print_session_stats(progress, session_start, session_solved, session_attempted, agent=agent)
                 console.print()
                 continue
 
-            # === FRANKENSTEIN 4.0: Nya domäner — regex, JSON, FSM, bitar, text, system design (var 4:e batch) ===
-            if batch_num % 4 == 0 and batch_num % 5 != 0 and batch_num % 7 != 0 and batch_num % 15 != 0:
+            # === FRANKENSTEIN 4.0: Nya domäner — regex, JSON, FSM, bitar, text, system design ===
+            if batch_type == "v4":
                 v4_diff = max(3, min(8, progress.get("current_difficulty", 5)))
                 v4_cats = set(d for d, _ in V4_GENERATORS)
                 console.print(f"[bold white on dark_orange] Batch {batch_num} {circ_state.emoji} — 🧬 FRANKENSTEIN 4.0 (regex/json/fsm/bits/text/system) Nivå {v4_diff} [/]")
@@ -800,7 +858,7 @@ def run_continuous():
                     if not running:
                         break
                     try:
-                        v4task = generate_v4_task(v4_diff)
+                        v4task = task_bank.sample("v4", v4_diff)
                         console.print(f"  [dark_orange]🧬 {v4task.id}[/] {v4task.title}", end=" ")
                         try:
                             v4result = agent.solve_task(v4task, verbose=False)
@@ -860,6 +918,7 @@ def run_continuous():
                             "category": v4task.category,
                             "timestamp": time.time(),
                             "time_ms": round(v4_time_ms, 1),
+                            "stages": v4meta.stage_ms if v4meta else {},
                             "attempts": v4meta.attempts_used if v4meta else 1,
                             "first_try": v4_first,
                             "strategy": v4_strat,
@@ -868,7 +927,6 @@ def run_continuous():
                             "circadian_phase": circ_state.phase,
                             "circadian_day": circ_state.day_number,
                         })
-                        progress["history"] = progress["history"][-1000:]
                     except Exception as v4gen_err:
                         console.print(f"[red]⚠ V4 gen error: {v4gen_err}[/]")
 
@@ -878,7 +936,7 @@ def run_continuous():
                 progress["v4_stats"]["solved"] += v4_solved
                 circadian.advance_batch(events_this_batch=8)
                 circadian.save_state()
-                save_progress(progress)
+                save_progress(progress_store, progress)
                 console.print()
                 print_session_stats(progress, session_start, session_solved, session_attempted, agent=agent)
                 console.print()
@@ -887,7 +945,7 @@ def run_continuous():
             # === META-LEARNING: Analysera inlärningskurva (var 10:e batch) ===
             if batch_num % 10 == 0 and meta_engine.should_analyze(progress.get("total_tasks_attempted", 0)):
                 try:
-                    meta_analysis = meta_engine.analyze(progress)
+                    meta_analysis = meta_engine.analyze(progress, stats=trend_tracker)
                     if meta_analysis.get("status") == "analyzed":
                         phase = meta_analysis["learning_phase"]
                         schedule = meta_analysis["schedule_recommendation"]
@@ -913,8 +971,8 @@ def run_continuous():
                 except Exception as meta_err:
                     log_event(f"META_LEARNING_ERROR: {meta_err}")
 
-            # === SPACED REPETITION: Återbesök svaga kategorier (var 4:e batch) ===
-            if sr_scheduler.should_inject_review(batch_num):
+            # === SPACED REPETITION: Återbesök svaga kategorier (när något är förfallet) ===
+            if batch_type == "spaced_repetition":
                 sr_stats = sr_scheduler.get_stats()
                 console.print(f"[bold white on dark_green] Batch {batch_num} {circ_state.emoji} — 📅 SPACED REPETITION ({sr_stats['due_for_review']} due, {sr_stats['weak_categories']} weak) [/]")
                 sr_solved = 0
@@ -925,7 +983,7 @@ def run_continuous():
                     if not review:
                         break
                     try:
-                        sr_task = generate_task(review["difficulty"])
+                        sr_task = task_bank.sample("v1", review["difficulty"])
                         console.print(f"  [dark_green]📅 {sr_task.id}[/] {sr_task.title} [dim]({review['reason']})[/]", end=" ")
                         try:
                             sr_result = agent.solve_task(sr_task, verbose=False)
@@ -978,6 +1036,7 @@ def run_continuous():
                             "category": sr_task.category,
                             "timestamp": time.time(),
                             "time_ms": round(sr_time_ms, 1),
+                            "stages": sr_meta.stage_ms if sr_meta else {},
                             "attempts": sr_meta.attempts_used if sr_meta else 1,
                             "first_try": sr_first,
                             "strategy": sr_strat,
@@ -987,7 +1046,6 @@ def run_continuous():
                             "circadian_phase": circ_state.phase,
                             "circadian_day": circ_state.day_number,
                         })
-                        progress["history"] = progress["history"][-1000:]
                     except Exception as sr_gen_err:
                         console.print(f"[red]⚠ SR error: {sr_gen_err}[/]")
 
@@ -999,7 +1057,7 @@ def run_continuous():
                 progress["sr_stats"].update(sr_scheduler.get_stats())
                 circadian.advance_batch(events_this_batch=5)
                 circadian.save_state()
-                save_progress(progress)
+                save_progress(progress_store, progress)
                 console.print()
                 print_session_stats(progress, session_start, session_solved, session_attempted, agent=agent)
                 console.print()
@@ -1027,7 +1085,7 @@ def run_continuous():
                 difficulty = random.choices(range(1, 11), weights=weights, k=1)[0]
                 console.print(f"[bold white on cyan] Batch {batch_num} {circ_state.emoji} — CYKLISK Nivå {difficulty} [/]")
             else:
-                difficulty = adaptive_difficulty(progress)
+                difficulty = adaptive_difficulty(progress, stats=trend_tracker)
                 # Circadian difficulty modifier: morning_peak → svårare, afternoon_dip → lättare
                 difficulty = max(1, min(10, difficulty + circ_state.difficulty_preference))
 
@@ -1036,15 +1094,24 @@ def run_continuous():
             if batch_num % 5 != 0 and batch_num % 3 != 0:
                 console.print(f"[bold white on blue] Batch {batch_num} {circ_state.emoji} Dag {circ_state.day_number} — Svårighet {difficulty} ({circ_state.phase}) [/]")
 
-            for i in range(10):  # 10 uppgifter per batch
+            # Pipeline: generering, S0, LLM-utkast och evaluering körs parallellt;
+            # lärsteget (solve_task + progress) sker här, en uppgift i taget
+            pipeline = build_code_pipeline(agent, lambda d=difficulty: task_bank.sample("v1", d))
+            for item in pipeline.run(10, should_stop=lambda: not running):  # 10 uppgifter per batch
                 if not running:
                     break
 
-                task = generate_task(difficulty)
+                task = item.task
+                if task is None:
+                    console.print(f"  [red]⚠ {item.error}[/]")
+                    log_event(f"PIPELINE_ERROR: {item.error}")
+                    continue
+                if item.error:
+                    log_event(f"PIPELINE_ERROR {task.id}: {item.error}")
                 console.print(f"  [cyan]{task.id}[/] {task.title}", end=" ")
 
                 try:
-                    result = agent.solve_task(task, verbose=False)
+                    result = agent.solve_task(task, verbose=False, prefetched=item.prefetched)
                 except Exception as task_err:
                     console.print(f"[red]⚠ {task_err}[/]")
                     log_event(f"TASK_ERROR {task.id}: {task_err}")
@@ -1119,6 +1186,7 @@ def run_continuous():
                     "category": category,
                     "timestamp": time.time(),
                     "time_ms": round(time_ms, 1),
+                    "stages": meta.stage_ms if meta else {},
                     "attempts": attempts_used,
                     "first_try": first_try,
                     "strategy": winning_strat,
@@ -1131,7 +1199,6 @@ def run_continuous():
                     "circadian_day": circ_state.day_number,
                     "fatigue": round(circ_state.fatigue, 3),
                 })
-                progress["history"] = progress["history"][-1000:]
 
                 # Uppdatera skills
                 if result and result.score >= 1.0:
@@ -1183,7 +1250,7 @@ def run_continuous():
                 "phase_stats": circadian.phase_stats,
                 "sleep_engine": sleep_engine.get_stats(),
             }
-            progress["trends"] = compute_trends(progress)
+            progress["trends"] = trend_tracker.trends()
             # Multi-LLM Router stats
             progress["llm_router"] = llm_router.get_stats()
             # V4 category coverage
@@ -1196,7 +1263,12 @@ def run_continuous():
                 progress["v4_stats"]["solve_rate"] = round(v4_solved_count / max(len(v4_history), 1), 3)
             # Spaced Repetition stats
             progress["sr_stats"] = sr_scheduler.get_stats()
-            save_progress(progress)
+            # Pipeline: genomströmning och beläggning per steg (senaste batchen)
+            progress["pipeline"] = pipeline.stats
+            save_progress(progress_store, progress)
+            if time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                save_checkpoint(agent)
+                last_checkpoint = time.time()
             console.print()
             print_session_stats(progress, session_start, session_solved, session_attempted, agent=agent)
             console.print()
@@ -1207,10 +1279,16 @@ def run_continuous():
         console.print(f"\n[red]⚠ Fel: {e}[/]")
         log_event(f"ERROR: {e}")
     finally:
-        # Spara alltid vid avslut
+        # Spara alltid vid avslut (inkl. minnen i skrivkön)
+        agent.episodic_memory.close()
         elapsed = time.time() - session_start
         progress["total_training_seconds"] = progress.get("total_training_seconds", 0) + elapsed
-        save_progress(progress)
+        save_progress(progress_store, progress, force=True)
+        save_checkpoint(agent)
+        progress_store.close()
+        task_bank.close()
+        flush_spill_logs()
+        flush_all()
 
         console.print(f"\n[bold]💾 Progression sparad till {PROGRESS_FILE}[/]")
         print_session_stats(progress, session_start, session_solved, session_attempted, agent=agent)
@@ -30,7 +30,7 @@ Inspirerat av:
 
 import math
 import time
-from dataclasses import dataclass, field
+from dataclasses import asdict, dataclass, field
 from collections import deque
 from typing import Optional
 
@@ -403,6 +403,27 @@ class EkmanEmotionEngine:
             "arousal": round(s.arousal, 3),
         }
 
+    # === Checkpoint ===
+
+    def export_state(self) -> dict:
+        """Emotionellt tillstånd, händelser och statistik (för checkpoints)."""
+        return {
+            "state": {e: getattr(self.state, e) for e in EMOTIONS},
+            "events": [asdict(ev) for ev in self._events],
+            "modifier_outcomes": [list(o) for o in self._modifier_outcomes],
+            "total_updates": self.total_updates,
+            "emotion_totals": dict(self._emotion_totals),
+        }
+
+    def import_state(self, state: dict) -> None:
+        self.state = EmotionState(**{e: float(state["state"].get(e, 0.0)) for e in EMOTIONS})
+        self._events.clear()
+        self._events.extend(EmotionEvent(**ev) for ev in state["events"])
+        self._modifier_outcomes.clear()
+        self._modifier_outcomes.extend((str(m), bool(ok)) for m, ok in state["modifier_outcomes"])
+        self.total_updates = int(state["total_updates"])
+        self._emotion_totals.update(state["emotion_totals"])
+
     # === Stats ===
 
     def get_stats(self) -> dict:
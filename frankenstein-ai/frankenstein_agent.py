@@ -19,6 +19,8 @@ Flödet per steg:
 """
 
 import time
+from collections import Counter
+
 import numpy as np
 import torch
 from rich.console import Console
@@ -30,7 +32,10 @@ from rich import box
 from perception import LiquidPerceptionUnit
 from cognition import NeuroSymbolicBridge
 from agency import ActiveInferenceAgent
-from memory import EbbinghausMemory, ShortTermBuffer
+from memory import ShortTermBuffer
+from memory_service import connect_memory
+from bounded_history import RingBuffer, spill_path
+from quantization import DEFAULT_EMBEDDING_DTYPE
 
 console = Console()
 
@@ -63,6 +68,10 @@ class FrankensteinAgent:
         num_actions: Antal möjliga handlingar
         confidence_threshold: Tröskel för "känt" koncept
         preference_obs: Föredragna observationer (mål)
+        history_limit: Max antal steg i RAM-historiken (None = obegränsat)
+        spill_dir: Katalog där utträngd historik loggas som JSONL (None = ingen spill)
+        memory_options: Extra EbbinghausMemory-lägen (write_behind, tiering,
+            dedupe_threshold) — av som standard
     """
 
     def __init__(
@@ -76,6 +85,9 @@ class FrankensteinAgent:
         num_actions: int = 4,
         confidence_threshold: float = 0.4,
         preference_obs: list[int] | None = None,
+        history_limit: int | None = None,
+        spill_dir: str | None = None,
+        memory_options: dict | None = None,
     ):
         self.sensor_dim = sensor_dim
         self.confidence_threshold = confidence_threshold
@@ -97,6 +109,7 @@ class FrankensteinAgent:
         self.cognition = NeuroSymbolicBridge(
             lnn_output_dim=self.lnn_output_dim,
             hdc_dim=hdc_dim,
+            prototype_dtype=DEFAULT_EMBEDDING_DTYPE,
         )
 
         # 3. AGENTSKAP (Active Inference)
@@ -106,12 +119,16 @@ class FrankensteinAgent:
             num_actions=num_actions,
             preference_obs=preference_obs or [0, 1],
             exploration_weight=0.5,
+            history_limit=history_limit,
+            spill_dir=spill_dir,
         )
 
-        # 4. MINNE
-        self.episodic_memory = EbbinghausMemory(
+        # 4. MINNE (delad minnesdaemon om FRANKENSTEIN_MEMORY_SERVICE är satt)
+        self.episodic_memory = connect_memory(
             decay_threshold=0.1,
             collection_name="frankenstein_episodic",
+            embedding_dtype=DEFAULT_EMBEDDING_DTYPE,
+            **(memory_options or {}),
         )
         self.short_term = ShortTermBuffer(capacity=20)
 
@@ -119,7 +136,8 @@ class FrankensteinAgent:
         self.step_count = 0
         self.total_surprise = 0.0
         self.new_concepts_learned = 0
-        self.actions_taken: list[int] = []
+        self.actions_taken = RingBuffer(history_limit, spill_path(spill_dir, "agent_actions"))
+        self.action_counts: Counter = Counter()
 
     @torch.no_grad()
     def step(self, sensor_input: np.ndarray) -> dict:
@@ -190,6 +208,7 @@ class FrankensteinAgent:
 
         self.step_count += 1
         self.actions_taken.append(action_idx)
+        self.action_counts[action_idx] += 1
         t_elapsed = time.time() - t_start
 
         return {
@@ -386,11 +405,11 @@ def run_demo(num_steps: int = 100, sensor_dim: int = 32) -> None:
     # Handlingsfördelning
     console.print("\n[bold]Handlingsfördelning:[/]")
     action_counts = {}
-    for a in agent.actions_taken:
+    for a, count in agent.action_counts.items():
         name = ACTION_NAMES.get(a, f"ACTION_{a}")
-        action_counts[name] = action_counts.get(name, 0) + 1
+        action_counts[name] = action_counts.get(name, 0) + count
     for name, count in sorted(action_counts.items(), key=lambda x: -x[1]):
-        pct = count / len(agent.actions_taken) * 100
+        pct = count / agent.actions_taken.total * 100
         bar = "█" * int(pct / 2)
         console.print(f"  {name:12s}: {bar} {count} ({pct:.0f}%)")
 
@@ -20,8 +20,9 @@ import sys
 import os
 import io
 import copy
-import hashlib
-import requests
+import ast
+import threading
+from concurrent.futures import Executor, ThreadPoolExecutor, as_completed
 import numpy as np
 import torch
 from dataclasses import dataclass, field
@@ -36,8 +37,11 @@ if hasattr(sys.stderr, "buffer") and not isinstance(sys.stderr, io.TextIOWrapper
 
 from programming_env import Task, EvalResult, evaluate_solution
 from task_generator import generate_task
-from code_agent import FrankensteinCodeAgent, _read_module_config
+from code_agent import FrankensteinCodeAgent, LLMThrottle
 from cognition import NeuroSymbolicBridge
+from hdc_store import SharedConceptStore
+from insight_store import InsightStore
+from telemetry import bridge_events
 
 
 # ---------------------------------------------------------------------------
@@ -106,6 +110,8 @@ class SwarmAttempt:
     feedback: str
     time_ms: float
     confidence: float  # Baserat på gut feeling + HDC confidence
+    cancelled: bool = False  # Avbruten av first-solve innan den hann lösa
+    eval_result: EvalResult | None = None  # Nodens evaluering av `code` (återanvänds i konsensus)
 
 
 @dataclass
@@ -136,37 +142,44 @@ class PythonMycelium:
     Delar HDC-koncept och lösningsstrategier mellan noder.
     Cross-domain bonus: om en nod löser en uppgift som en annan misslyckades med,
     propageras insikten med 1.5x vikt.
+
+    Koncepten ligger i ett SharedConceptStore (hdc_store.py): noder i andra
+    processer som öppnar samma concept_store_path ser varandras koncept
+    utan kopiering. Insikterna ligger i ett InsightStore (insight_store.py),
+    indexerat per uppgift och koncept med tak och åldersvräkning.
     """
 
-    def __init__(self):
-        self.shared_concepts: dict[str, torch.Tensor] = {}
-        self.solution_insights: list[dict] = []
+    def __init__(self, concept_store_path: str | None = None):
+        self.shared_concepts = SharedConceptStore(concept_store_path)
+        self.solution_insights = InsightStore()
 
     def share_concept(self, source_id: str, concept_name: str, hypervector: torch.Tensor):
-        key = f"{source_id}:{concept_name}"
-        self.shared_concepts[key] = hypervector.clone()
+        self.shared_concepts.put(source_id, concept_name, hypervector)
 
     def get_shared_concepts(self, exclude_source: str) -> list[tuple[str, torch.Tensor]]:
-        return [
-            (k, v) for k, v in self.shared_concepts.items()
-            if not k.startswith(f"{exclude_source}:")
-        ]
+        return self.shared_concepts.items(exclude_source=exclude_source)
+
+    def close(self):
+        self.shared_concepts.close()
 
-    def share_insight(self, source_id: str, task_id: str, code: str, score: float, strategy: str):
-        self.solution_insights.append({
+    def share_insight(self, source_id: str, task_id: str, code: str, score: float, strategy: str,
+                      concept: str = "", hypervector: torch.Tensor | None = None):
+        self.solution_insights.add({
             "source": source_id,
             "task_id": task_id,
             "code": code,
             "score": score,
             "strategy": strategy,
             "timestamp": time.time(),
-        })
+            "concept": concept,
+        }, hypervector)
 
     def get_insights_for_task(self, task_id: str, exclude_source: str) -> list[dict]:
-        return [
-            i for i in self.solution_insights
-            if i["task_id"] == task_id and i["source"] != exclude_source
-        ]
+        return self.solution_insights.for_task(task_id, exclude_source)
+
+    def get_related_insights(self, hypervector: torch.Tensor, exclude_task: str, k: int = 3) -> list[dict]:
+        """Lösta insikter från uppgifter vars HDC-koncept liknar hypervektorn."""
+        return self.solution_insights.related(hypervector, exclude_task=exclude_task, k=k)
 
 
 # ---------------------------------------------------------------------------
@@ -179,31 +192,63 @@ def consensus_best(attempts: list[SwarmAttempt]) -> tuple[str, float, str]:
     return best.code, best.score, "best"
 
 
-def consensus_vote(attempts: list[SwarmAttempt], task: Task) -> tuple[str, float, str]:
-    """Viktad röstning: kör alla lösningar, vikta med confidence × influence."""
+def normalize_code(code: str) -> str:
+    """Nyckel för dedupe: kod som bara skiljer sig i formatering/kommentarer ger samma nyckel."""
+    try:
+        return ast.unparse(ast.parse(code))
+    except (SyntaxError, ValueError):
+        lines = (line.rstrip() for line in code.strip().splitlines())
+        return "\n".join(line for line in lines if line)
+
+
+def _known_evals(attempts: list[SwarmAttempt]) -> dict[str, EvalResult]:
+    """Evalueringar som noderna redan gjort, per normaliserad kod."""
+    return {
+        normalize_code(a.code): a.eval_result
+        for a in attempts if a.code and a.eval_result is not None
+    }
+
+
+def consensus_vote(attempts: list[SwarmAttempt], task: Task,
+                   evals: dict[str, EvalResult] | None = None) -> tuple[str, float, str]:
+    """Viktad röstning: gruppera likvärdig kod, vikta med score × confidence × influence.
+
+    Vinnarens score tas från nodernas egna evalueringar; bara kod som ingen
+    nod evaluerat körs igen.
+    """
     if not attempts:
         return "", 0.0, "vote"
+    if evals is None:
+        evals = _known_evals(attempts)
 
-    # Samla unika lösningar
-    unique_codes: dict[str, float] = {}
+    # Samla unika lösningar (normaliserad kod → vikt, första kodvarianten)
+    weights: dict[str, float] = {}
+    codes: dict[str, str] = {}
     for a in attempts:
-        code_hash = hashlib.md5(a.code.encode()).hexdigest()
-        if code_hash not in unique_codes:
-            unique_codes[code_hash] = 0.0
+        if not a.code:
+            continue
+        key = normalize_code(a.code)
+        codes.setdefault(key, a.code)
         # Vikta med score × confidence
         profile = PROFILES.get(a.profile_id)
         influence = profile.influence if profile else 1.0
-        unique_codes[code_hash] += a.score * a.confidence * influence
+        weights[key] = weights.get(key, 0.0) + a.score * a.confidence * influence
+    if not weights:
+        return consensus_best(attempts)
 
     # Välj koden med högst viktad poäng
-    best_hash = max(unique_codes, key=unique_codes.get)
-    best_code = next(a.code for a in attempts if hashlib.md5(a.code.encode()).hexdigest() == best_hash)
-    result = evaluate_solution(task, best_code)
-    return best_code, result.score, "vote"
+    best_key = max(weights, key=weights.get)
+    result = evals.get(best_key) or evaluate_solution(task, codes[best_key])
+    return codes[best_key], result.score, "vote"
+
 
+def consensus_merge(attempts: list[SwarmAttempt], task: Task, llm_fn,
+                    executor: Executor | None = None) -> tuple[str, float, str]:
+    """Merge: LLM syntetiserar bästa delarna från alla lösningar.
 
-def consensus_merge(attempts: list[SwarmAttempt], task: Task, llm_fn) -> tuple[str, float, str]:
-    """Merge: LLM syntetiserar bästa delarna från alla lösningar."""
+    Ny sammanslagen kod evalueras i executor medan röstningen räknas fram
+    som reserv; kod som en nod redan evaluerat körs inte igen.
+    """
     # Filtrera till lösningar med score > 0
     good_attempts = [a for a in attempts if a.score > 0]
     if not good_attempts:
@@ -223,6 +268,7 @@ def consensus_merge(attempts: list[SwarmAttempt], task: Task, llm_fn) -> tuple[s
         "Koden måste läsa från stdin med input() och skriva till stdout med print()."
     )
 
+    evals = _known_evals(attempts)
     try:
         response = llm_fn(prompt)
         if response:
@@ -231,9 +277,23 @@ def consensus_merge(attempts: list[SwarmAttempt], task: Task, llm_fn) -> tuple[s
             matches = re.findall(pattern, response, re.DOTALL)
             if matches:
                 merged_code = matches[0].strip()
-                result = evaluate_solution(task, merged_code)
-                if result.score >= max(a.score for a in attempts):
-                    return merged_code, result.score, "merge"
+                known = evals.get(normalize_code(merged_code))
+                if known is not None:
+                    # Samma kod som en nod redan evaluerat — inget nytt att köra
+                    merged_score, fallback = known.score, consensus_vote(attempts, task, evals)
+                else:
+                    own_pool = executor is None
+                    pool = ThreadPoolExecutor(max_workers=1) if own_pool else executor
+                    try:
+                        pending = pool.submit(evaluate_solution, task, merged_code)
+                        fallback = consensus_vote(attempts, task, evals)
+                        merged_score = pending.result().score
+                    finally:
+                        if own_pool:
+                            pool.shutdown(wait=False)
+                if merged_score >= max(a.score for a in attempts):
+                    return merged_code, merged_score, "merge"
+                return fallback
     except Exception:
         pass
 
@@ -246,18 +306,35 @@ def consensus_merge(attempts: list[SwarmAttempt], task: Task, llm_fn) -> tuple[s
 # ---------------------------------------------------------------------------
 
 class FrankensteinSwarm:
-    """Svärm av Frankenstein-agenter med kollektiv kognition."""
+    """Svärm av Frankenstein-agenter med kollektiv kognition.
+
+    Varje nod får sina modulväxlar i minnet (module_config), så noderna kan
+    köra samtidigt i en trådpool utan att skriva om config.json. Noderna
+    delar en LLMThrottle eftersom de använder samma API-nycklar.
+    """
 
     def __init__(
         self,
         profiles: list[str] | None = None,
         max_attempts_per_node: int = 2,
         bridge_url: str | None = None,
+        parallel: bool = True,
+        consensus: str = "auto",
+        concept_store_path: str | None = None,
     ):
+        """
+        Args:
+            parallel: Kör noderna samtidigt (fas 1 och förfining)
+            consensus: "auto" = best/vote/merge efter utfall; "best" = första
+                lösningen vinner och övriga noder avbryts
+            concept_store_path: Bas för delat konceptlager (None = temporärt)
+        """
         self.bridge_url = bridge_url
         self.max_attempts = max_attempts_per_node
-        self.mycelium = PythonMycelium()
+        self.consensus = consensus
+        self.mycelium = PythonMycelium(concept_store_path)
         self.results: list[SwarmTaskResult] = []
+        self.llm_throttle = LLMThrottle()
 
         # Skapa agenter med olika kognitiva profiler
         profile_ids = profiles or ["analytiker", "kreativist", "kritiker"]
@@ -270,72 +347,123 @@ class FrankensteinSwarm:
                 print(f"  ⚠ Okänd profil: {pid}, hoppar över")
                 continue
 
-            # Skriv profil-specifik config
-            self._write_profile_config(profile)
-            agent = FrankensteinCodeAgent(max_attempts=max_attempts_per_node)
+            agent = FrankensteinCodeAgent(
+                max_attempts=max_attempts_per_node,
+                module_config=profile.modules,
+                llm_throttle=self.llm_throttle,
+            )
             self.agents[pid] = agent
             self.profiles[pid] = profile
             print(f"  {profile.emoji} {profile.label} initierad ({sum(v for v in profile.modules.values())}/6 moduler)")
 
-        # Återställ config till default
-        self._reset_config()
+        # Samma projektion i alla noder — annars går deras delade koncept inte att jämföra.
+        # Kopia per nod: import_state skriver in i tensorn (copy_) och får inte nå grannarna.
+        nodes = list(self.agents.values())
+        for agent in nodes[1:]:
+            agent.hdc.projection_matrix = nodes[0].hdc.projection_matrix.clone()
+
+        self._pool = (
+            ThreadPoolExecutor(max_workers=len(self.agents), thread_name_prefix="swarm-node")
+            if parallel and len(self.agents) > 1 else None
+        )
 
         self.total_tasks = 0
         self.total_solved = 0
         self.collective_wins = 0  # Gånger konsensus > bästa individuella
+        self.cancelled_nodes = 0  # Nodkörningar avbrutna av first-solve
 
-    def _write_profile_config(self, profile: CognitiveProfile):
-        """Skriv modulconfig för en specifik profil."""
-        config_path = Path(__file__).parent / "training_data" / "config.json"
-        try:
-            if config_path.exists():
-                cfg = json.loads(config_path.read_text(encoding="utf-8"))
-            else:
-                cfg = {"modules": {}}
-            for key, enabled in profile.modules.items():
-                if key in cfg.get("modules", {}):
-                    cfg["modules"][key]["enabled"] = enabled
-                else:
-                    cfg.setdefault("modules", {})[key] = {"enabled": enabled, "label": key, "description": ""}
-            config_path.write_text(json.dumps(cfg, indent=2, ensure_ascii=False), encoding="utf-8")
-        except Exception:
-            pass
-
-    def _reset_config(self):
-        """Återställ config till alla moduler PÅ."""
-        config_path = Path(__file__).parent / "training_data" / "config.json"
-        try:
-            if config_path.exists():
-                cfg = json.loads(config_path.read_text(encoding="utf-8"))
-                for key in cfg.get("modules", {}):
-                    cfg["modules"][key]["enabled"] = True
-                config_path.write_text(json.dumps(cfg, indent=2, ensure_ascii=False), encoding="utf-8")
-        except Exception:
-            pass
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=True)
+            self._pool = None
+        self.mycelium.close()
 
     def _send_event(self, event: dict):
+        """Köa en händelse till bridge (batchas i bakgrunden av telemetry.py)."""
         if not self.bridge_url:
             return
+        bridge_events(f"{self.bridge_url}/api/frankenstein/swarm/event").send(event)
+
+    def _run_node(self, pid: str, task: Task, cancel: threading.Event) -> tuple[SwarmAttempt, EvalResult | None]:
+        """Låt en nod lösa uppgiften (körs i nodens egen tråd)."""
+        agent = self.agents[pid]
+        t0 = time.time()
         try:
-            requests.post(
-                f"{self.bridge_url}/api/frankenstein/swarm/event",
-                json={"event": event},
-                timeout=3,
-            )
-        except Exception:
-            pass
+            result = agent.solve_task(task, verbose=False, cancel=cancel)
+        except Exception as e:
+            return SwarmAttempt(profile_id=pid, code="", score=0.0, feedback=str(e),
+                                time_ms=(time.time() - t0) * 1000, confidence=0.0), None
+        elapsed = (time.time() - t0) * 1000
+        score = result.score if result else 0.0
+        code = ""
+        feedback = ""
+        if result:
+            # Koden som score gäller; äldre resultat utan kod → senaste attempt
+            code = result.code
+            if not code:
+                task_attempts = [a for a in agent.all_attempts if a.task_id == task.id]
+                if task_attempts:
+                    code = task_attempts[-1].code if hasattr(task_attempts[-1], 'code') else ""
+            feedback = result.feedback
+
+        # Beräkna confidence baserat på agentens stats
+        stats = agent.get_stats()
+        hdc_conf = min(stats.get("hdc_concepts", 0) / 50, 1.0)
+        confidence = 0.5 + 0.3 * score + 0.2 * hdc_conf
+        attempt = SwarmAttempt(
+            profile_id=pid, code=code, score=score, feedback=feedback,
+            time_ms=elapsed, confidence=confidence,
+            cancelled=cancel.is_set() and score < 1.0,
+            eval_result=result if result and result.code == code else None,
+        )
+        return attempt, result
+
+    def _node_concept(self, pid: str, result: EvalResult | None) -> tuple[str, torch.Tensor | None]:
+        """HDC-konceptet som noden kopplade till uppgiften, och dess prototyp."""
+        meta = getattr(result, "metadata", None)
+        name = getattr(meta, "hdc_concept", "")
+        memory = self.agents[pid].hdc.concept_memory
+        if name and name in memory:
+            return name, memory[name]
+        return "", None
+
+    def _task_hypervector(self, task: Task) -> torch.Tensor:
+        """Uppgiften i HDC-rymden (noderna delar projektion, så första noden räcker)."""
+        agent = next(iter(self.agents.values()))
+        return agent.hdc.encode(agent._perceive_task(task)).squeeze(0)
+
+    def _run_nodes(self, jobs: dict[str, Task], stop_on_solve: bool):
+        """Kör {pid: uppgift} — parallellt om poolen finns — och ge (pid, attempt, result)
+        i den ordning noderna blir klara. stop_on_solve: avbryt övriga vid första lösning."""
+        cancel = threading.Event()
+        if self._pool is None:
+            for pid, task in jobs.items():
+                if cancel.is_set():
+                    break
+                attempt, result = self._run_node(pid, task, cancel)
+                if stop_on_solve and attempt.score >= 1.0:
+                    cancel.set()
+                yield pid, attempt, result
+            return
+        futures = {self._pool.submit(self._run_node, pid, task, cancel): pid for pid, task in jobs.items()}
+        for future in as_completed(futures):
+            attempt, result = future.result()
+            if stop_on_solve and attempt.score >= 1.0:
+                cancel.set()  # Övriga noder slutar före nästa LLM-försök
+            yield futures[future], attempt, result
 
     def solve_task(self, task: Task, verbose: bool = True) -> SwarmTaskResult:
         """Kör en uppgift genom svärmen.
         
         Faser:
-        1. Individuell analys — varje nod löser uppgiften oberoende
+        1. Individuell analys — varje nod löser uppgiften oberoende (parallellt)
         2. Insight-propagation — dela lösningar via Mycelium
-        3. Förfining — noder som misslyckades får se andras lösningar
+        3. Förfining — noder som misslyckades får se andras lösningar (parallellt)
         4. Konsensus — välj/syntetisera bästa lösningen
         """
         task_start = time.time()
         self.total_tasks += 1
+        first_solve = self.consensus == "best"
 
         if verbose:
             print(f"\n{'='*60}")
@@ -355,102 +483,71 @@ class FrankensteinSwarm:
         if verbose:
             print(f"\n  🔬 Fas 1: Individuell analys")
 
-        attempts: list[SwarmAttempt] = []
-        for pid, agent in self.agents.items():
+        by_node: dict[str, SwarmAttempt] = {}
+        for pid, attempt, result in self._run_nodes({pid: task for pid in self.agents}, stop_on_solve=first_solve):
             profile = self.profiles[pid]
-            self._write_profile_config(profile)
+            by_node[pid] = attempt
+            self.cancelled_nodes += attempt.cancelled
+
+            # Dela insight (och konceptet för lösta uppgifter) via Mycelium
+            concept, hv = self._node_concept(pid, result)
+            if attempt.code and attempt.score > 0:
+                # Konceptnamn är nodlokala — nyckla per nod
+                self.mycelium.share_insight(pid, task.id, attempt.code, attempt.score, profile.preferred_strategy,
+                                            concept=f"{pid}:{concept}" if concept else "", hypervector=hv)
+            if attempt.score >= 1.0 and concept:
+                try:
+                    self.mycelium.share_concept(pid, concept, hv)
+                except ValueError as e:
+                    print(f"  ⚠ Kunde inte dela koncept {concept}: {e}")
 
             if verbose:
-                print(f"    {profile.emoji} {profile.label}... ", end="", flush=True)
-
-            t0 = time.time()
-            try:
-                result = agent.solve_task(task, verbose=False)
-                elapsed = (time.time() - t0) * 1000
-                score = result.score if result else 0.0
-                code = ""
-                feedback = ""
-                if result:
-                    # Hämta koden från senaste attempt
-                    task_attempts = [a for a in agent.all_attempts if a.task_id == task.id]
-                    if task_attempts:
-                        code = task_attempts[-1].code if hasattr(task_attempts[-1], 'code') else ""
-                        feedback = result.feedback
-
-                # Beräkna confidence baserat på agentens stats
-                stats = agent.get_stats()
-                hdc_conf = min(stats.get("hdc_concepts", 0) / 50, 1.0)
-                confidence = 0.5 + 0.3 * score + 0.2 * hdc_conf
-
-                attempt = SwarmAttempt(
-                    profile_id=pid,
-                    code=code,
-                    score=score,
-                    feedback=feedback,
-                    time_ms=elapsed,
-                    confidence=confidence,
-                )
-                attempts.append(attempt)
-
-                # Dela insight via Mycelium
-                if code and score > 0:
-                    self.mycelium.share_insight(pid, task.id, code, score, profile.preferred_strategy)
-
-                if verbose:
-                    status = "✅" if score >= 1.0 else f"❌ {score:.0%}"
-                    print(f"{status} ({elapsed:.0f}ms, conf={confidence:.2f})")
-
-                self._send_event({
-                    "type": "swarm_node_done",
-                    "phase": 1,
-                    "profile_id": pid,
-                    "label": profile.label,
-                    "emoji": profile.emoji,
-                    "score": score,
-                    "time_ms": round(elapsed, 1),
-                    "confidence": round(confidence, 2),
-                })
-
-            except Exception as e:
-                elapsed = (time.time() - t0) * 1000
-                if verbose:
-                    print(f"⚠ {e}")
-                attempts.append(SwarmAttempt(
-                    profile_id=pid, code="", score=0.0,
-                    feedback=str(e), time_ms=elapsed, confidence=0.0,
-                ))
-
-            time.sleep(0.5)  # Rate limit
+                if attempt.cancelled:
+                    status = "⏹ avbruten"
+                elif attempt.confidence == 0.0 and attempt.feedback:
+                    status = f"⚠ {attempt.feedback}"
+                else:
+                    status = "✅" if attempt.score >= 1.0 else f"❌ {attempt.score:.0%}"
+                print(f"    {profile.emoji} {profile.label}... {status} ({attempt.time_ms:.0f}ms, conf={attempt.confidence:.2f})")
+
+            self._send_event({
+                "type": "swarm_node_done",
+                "phase": 1,
+                "profile_id": pid,
+                "label": profile.label,
+                "emoji": profile.emoji,
+                "score": attempt.score,
+                "time_ms": round(attempt.time_ms, 1),
+                "confidence": round(attempt.confidence, 2),
+            })
+        attempts = [by_node[pid] for pid in self.agents if pid in by_node]
 
         # --- Fas 2: Insight-propagation + Förfining ---
         failed_nodes = [a for a in attempts if a.score < 1.0]
         succeeded_nodes = [a for a in attempts if a.score >= 1.0]
 
-        if failed_nodes and succeeded_nodes:
-            if verbose:
-                print(f"\n  🍄 Fas 2: Mycelium — {len(failed_nodes)} noder förfinar med insikter")
+        if failed_nodes and not first_solve:
+            # Ingen nod löste? Lösta insikter från liknande uppgifter (via HDC) kan ändå hjälpa
+            related = [] if succeeded_nodes else self.mycelium.get_related_insights(
+                self._task_hypervector(task), exclude_task=task.id)
 
+            jobs: dict[str, Task] = {}
             for failed in failed_nodes:
                 pid = failed.profile_id
-                profile = self.profiles[pid]
-                agent = self.agents[pid]
-                self._write_profile_config(profile)
-
                 # Hämta insikter från andra noder
-                insights = self.mycelium.get_insights_for_task(task.id, pid)
-                if not insights:
+                insights = self.mycelium.get_insights_for_task(task.id, pid) if succeeded_nodes else []
+                if insights:
+                    hint = "HINT: En annan agent löste detta med följande approach:\n" + insights[0]["code"][:200]
+                elif related:
+                    hint = "HINT: En liknande uppgift löstes med följande approach:\n" + related[0]["code"][:200]
+                else:
                     continue
-
-                if verbose:
-                    print(f"    {profile.emoji} {profile.label} förfinar med {len(insights)} insikter... ", end="", flush=True)
-
                 # Ge agenten en ny chans med insikter som kontext
                 # Vi modifierar uppgiftens hints med andras lösningar
-                enhanced_task = Task(
+                jobs[pid] = Task(
                     id=task.id,
                     title=task.title,
-                    description=task.description + "\n\nHINT: En annan agent löste detta med följande approach:\n" +
-                        insights[0]["code"][:200] + "...",
+                    description=task.description + "\n\n" + hint + "...",
                     difficulty=task.difficulty,
                     category=task.category,
                     test_cases=task.test_cases,
@@ -458,43 +555,36 @@ class FrankensteinSwarm:
                     tags=task.tags,
                 )
 
-                t0 = time.time()
-                try:
-                    result = agent.solve_task(enhanced_task, verbose=False)
-                    elapsed = (time.time() - t0) * 1000
-                    score = result.score if result else 0.0
-
-                    if score > failed.score:
-                        code = ""
-                        task_attempts = [a for a in agent.all_attempts if a.task_id == task.id]
-                        if task_attempts:
-                            code = task_attempts[-1].code if hasattr(task_attempts[-1], 'code') else ""
-
-                        # Uppdatera attempt
-                        failed.code = code
-                        failed.score = score
-                        failed.feedback = result.feedback if result else ""
-                        failed.time_ms += elapsed
-
-                        if verbose:
-                            status = "✅ FÖRBÄTTRAD" if score >= 1.0 else f"↑ {score:.0%}"
-                            print(f"{status} ({elapsed:.0f}ms)")
-
-                        self._send_event({
-                            "type": "swarm_node_refined",
-                            "profile_id": pid,
-                            "label": profile.label,
-                            "new_score": score,
-                            "improvement": score - failed.score,
-                        })
-                    else:
-                        if verbose:
-                            print(f"→ ingen förbättring")
-                except Exception as e:
-                    if verbose:
-                        print(f"⚠ {e}")
+            if verbose and jobs:
+                source = "insikter" if succeeded_nodes else "insikter från liknande uppgifter"
+                print(f"\n  🍄 Fas 2: Mycelium — {len(jobs)} noder förfinar med {source}")
+
+            for pid, refined, result in self._run_nodes(jobs, stop_on_solve=False):
+                profile = self.profiles[pid]
+                failed = by_node[pid]
+                if refined.score > failed.score:
+                    improvement = refined.score - failed.score
+                    # Uppdatera attempt
+                    failed.code = refined.code
+                    failed.score = refined.score
+                    failed.feedback = result.feedback if result else ""
+                    failed.eval_result = refined.eval_result
+                    failed.time_ms += refined.time_ms
 
-                time.sleep(0.5)
+                    if verbose:
+                        status = "✅ FÖRBÄTTRAD" if refined.score >= 1.0 else f"↑ {refined.score:.0%}"
+                        print(f"    {profile.emoji} {profile.label} förfinar... {status} ({refined.time_ms:.0f}ms)")
+
+                    self._send_event({
+                        "type": "swarm_node_refined",
+                        "profile_id": pid,
+                        "label": profile.label,
+                        "new_score": refined.score,
+                        "improvement": improvement,
+                    })
+                elif verbose:
+                    msg = f"⚠ {refined.feedback}" if refined.confidence == 0.0 and refined.feedback else "→ ingen förbättring"
+                    print(f"    {profile.emoji} {profile.label} förfinar... {msg}")
 
         # --- Fas 3: Konsensus ---
         if verbose:
@@ -504,7 +594,12 @@ class FrankensteinSwarm:
         all_solved = all(a.score >= 1.0 for a in attempts)
         any_solved = any(a.score >= 1.0 for a in attempts)
 
-        if all_solved:
+        if first_solve and any_solved:
+            # First-solve: första lösningen vinner (övriga noder avbröts)
+            consensus_code, consensus_score, method = consensus_best(attempts)
+            if verbose:
+                print(f"    First-solve → {method}")
+        elif all_solved:
             # Alla löste — välj bästa (snabbaste med högst confidence)
             consensus_code, consensus_score, method = consensus_best(attempts)
             if verbose:
@@ -520,7 +615,7 @@ class FrankensteinSwarm:
                 # Använd första agentens LLM
                 first_agent = list(self.agents.values())[0]
                 return first_agent._call_llm(prompt)
-            consensus_code, consensus_score, method = consensus_merge(attempts, task, llm_fn)
+            consensus_code, consensus_score, method = consensus_merge(attempts, task, llm_fn, self._pool)
             if verbose:
                 print(f"    Ingen löste — merge-syntes → score={consensus_score:.0%}")
 
@@ -548,9 +643,6 @@ class FrankensteinSwarm:
         )
         self.results.append(result)
 
-        # Återställ config
-        self._reset_config()
-
         if verbose:
             winner = "🧟‍♂️🐝 SVÄRMEN" if consensus_score >= 1.0 else "❌ MISSLYCKADES"
             improvement = f" (kollektiv +{collective_improvement:.0%})" if collective_improvement > 0 else ""
@@ -585,6 +677,10 @@ class FrankensteinSwarm:
             "collective_win_rate": self.collective_wins / max(self.total_tasks, 1),
             "shared_concepts": len(self.mycelium.shared_concepts),
             "shared_insights": len(self.mycelium.solution_insights),
+            "insight_store": self.mycelium.solution_insights.stats(),
+            "parallel": self._pool is not None,
+            "consensus_mode": self.consensus,
+            "cancelled_nodes": self.cancelled_nodes,
             "per_node": {
                 pid: {
                     "label": self.profiles[pid].label,
@@ -606,6 +702,8 @@ def run_swarm_session(
     num_tasks: int = 20,
     difficulties: list[int] | None = None,
     bridge_url: str | None = None,
+    parallel: bool = True,
+    consensus: str = "auto",
 ):
     if difficulties is None:
         difficulties = [3, 4, 5, 6, 7, 8]
@@ -618,7 +716,7 @@ def run_swarm_session(
     print(f"  Svårigheter: {difficulties}")
     print("=" * 70)
 
-    swarm = FrankensteinSwarm(bridge_url=bridge_url)
+    swarm = FrankensteinSwarm(bridge_url=bridge_url, parallel=parallel, consensus=consensus)
 
     if bridge_url:
         swarm._send_event({
@@ -636,9 +734,12 @@ def run_swarm_session(
             tasks.append(generate_task(diff))
     tasks = tasks[:num_tasks]
 
-    for i, task in enumerate(tasks):
-        print(f"\n[{i+1}/{len(tasks)}]", end="")
-        swarm.solve_task(task, verbose=True)
+    try:
+        for i, task in enumerate(tasks):
+            print(f"\n[{i+1}/{len(tasks)}]", end="")
+            swarm.solve_task(task, verbose=True)
+    finally:
+        swarm.close()
 
     # Slutrapport
     stats = swarm.get_stats()
@@ -704,9 +805,14 @@ if __name__ == "__main__":
     parser = argparse.ArgumentParser(description="FrankensteinSwarm — Biologisk Kognition × Kollektiv Intelligens")
     parser.add_argument("num_tasks", nargs="?", type=int, default=20, help="Antal uppgifter")
     parser.add_argument("--bridge-url", type=str, default=None, help="Bridge URL för realtids-events")
+    parser.add_argument("--consensus", choices=["auto", "best"], default="auto",
+                        help="best = första lösningen vinner, övriga noder avbryts")
+    parser.add_argument("--sequential", action="store_true", help="Kör noderna en i taget")
     args = parser.parse_args()
 
     run_swarm_session(
         num_tasks=args.num_tasks,
         bridge_url=args.bridge_url,
+        parallel=not args.sequential,
+        consensus=args.consensus,
     )
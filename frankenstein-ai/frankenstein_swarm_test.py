@@ -0,0 +1,225 @@
+"""
+Enhetstester för frankenstein_swarm.py — parallella noder, modulväxlar i minnet
+och first-solve-avbrott.
+
+Kör med: python -m pytest frankenstein_swarm_test.py -v
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import torch
+
+import code_agent
+import frankenstein_swarm
+from cognition import NeuroSymbolicBridge
+from frankenstein_swarm import FrankensteinSwarm, SwarmAttempt, consensus_merge, consensus_vote, normalize_code
+from programming_env import EvalResult, Task
+
+
+def _task(task_id="t1"):
+    return Task(id=task_id, title="Summa", description="Skriv ut summan", difficulty=1,
+                category="math", test_cases=[{"input": "1 2", "expected": "3"}])
+
+
+class FakeAgent:
+    """Ersätter FrankensteinCodeAgent: löser efter en fördröjning per profil."""
+
+    plans: dict[str, tuple[float, float]] = {}  # {frozenset-nyckel: (sekunder, score)}
+
+    def __init__(self, max_attempts=2, module_config=None, llm_throttle=None):
+        self.module_config = module_config
+        self.llm_throttle = llm_throttle
+        self.all_attempts = []
+        self.cancelled = False
+        self.total_tasks = self.total_solved = 0
+        self.hdc = NeuroSymbolicBridge(lnn_output_dim=4, hdc_dim=16)
+        self.descriptions = []
+        self.delay, self.score = FakeAgent.plans.get(frozenset(k for k, v in module_config.items() if not v), (0.0, 0.0))
+
+    def _perceive_task(self, task):
+        return torch.ones(4)
+
+    def solve_task(self, task, verbose=True, cancel=None):
+        self.total_tasks += 1
+        self.descriptions.append(task.description)
+        end = time.time() + self.delay
+        while time.time() < end:
+            if cancel is not None and cancel.is_set():
+                self.cancelled = True
+                return EvalResult(task.id, 0.0, 0, 1, [], "", 0.0, "avbruten")
+            time.sleep(0.005)
+        self.total_solved += self.score >= 1.0
+        code = f"print({self.score})"
+        self.all_attempts.append(SimpleNamespace(task_id=task.id, code=code))
+        concept = f"{task.category}_0"
+        self.hdc.learn_concept(concept, self.hdc.encode(torch.ones(4)))
+        result = EvalResult(task.id, self.score, int(self.score), 1, [], code, 1.0, "ok")
+        result.metadata = SimpleNamespace(hdc_concept=concept)
+        return result
+
+    def get_stats(self):
+        return {"hdc_concepts": 0}
+
+    def _call_llm(self, prompt):
+        return None
+
+
+# Profilerna skiljer sig i vilka moduler som är avstängda
+ANALYTIKER = frozenset()
+KREATIVIST = frozenset({"aif", "stm"})
+KRITIKER = frozenset({"emotions"})
+
+
+class SwarmTestCase(unittest.TestCase):
+    def make_swarm(self, plans, **kwargs):
+        FakeAgent.plans = plans
+        with mock.patch.object(frankenstein_swarm, "FrankensteinCodeAgent", FakeAgent), \
+                mock.patch("builtins.print"):
+            swarm = FrankensteinSwarm(**kwargs)
+        self.addCleanup(swarm.close)
+        return swarm
+
+    def solve(self, swarm):
+        with mock.patch("builtins.print"):
+            return swarm.solve_task(_task(), verbose=True)
+
+
+class TestModuleConfig(SwarmTestCase):
+    def test_agents_get_profile_modules_and_shared_throttle(self):
+        swarm = self.make_swarm({})
+        for pid, agent in swarm.agents.items():
+            self.assertEqual(agent.module_config, swarm.profiles[pid].modules)
+            self.assertIs(agent.llm_throttle, swarm.llm_throttle)
+
+    def test_overrides_layer_on_top_of_config_file(self):
+        with mock.patch.object(code_agent, "_CONFIG_PATH", code_agent.Path("/nonexistent/config.json")):
+            self.assertTrue(code_agent._read_module_config()["aif"])
+            cfg = code_agent._read_module_config({"aif": False})
+        self.assertFalse(cfg["aif"])
+        self.assertTrue(cfg["hdc"])
+
+    def test_shared_throttle_spaces_slots(self):
+        throttle = code_agent.LLMThrottle()
+        slots = []
+        threads = [threading.Thread(target=lambda: slots.append(throttle.reserve(2.0))) for _ in range(4)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        slots.sort()
+        for a, b in zip(slots, slots[1:]):
+            self.assertAlmostEqual(b - a, 2.0, places=6)
+
+
+class TestParallelPhases(SwarmTestCase):
+    PLANS = {ANALYTIKER: (0.2, 1.0), KREATIVIST: (0.2, 1.0), KRITIKER: (0.2, 1.0)}
+
+    def test_phase_one_runs_nodes_concurrently(self):
+        swarm = self.make_swarm(self.PLANS)
+        t0 = time.time()
+        result = self.solve(swarm)
+        parallel_s = time.time() - t0
+        self.assertEqual(result.consensus_score, 1.0)
+        self.assertEqual([a.profile_id for a in result.attempts], list(swarm.agents))
+        self.assertLess(parallel_s, 0.45)  # Sekventiellt ≥ 0.6 s
+        self.assertTrue(swarm.get_stats()["parallel"])
+
+    def test_solved_concepts_are_shared_between_nodes(self):
+        swarm = self.make_swarm(self.PLANS)
+        nodes = list(swarm.agents.values())
+        torch.testing.assert_close(nodes[1].hdc.projection_matrix, nodes[0].hdc.projection_matrix)
+        self.assertIsNot(nodes[1].hdc.projection_matrix, nodes[0].hdc.projection_matrix)
+        self.solve(swarm)
+        seen = dict(swarm.mycelium.get_shared_concepts("analytiker"))
+        self.assertEqual(sorted(seen), ["kreativist:math_0", "kritiker:math_0"])
+        torch.testing.assert_close(seen["kritiker:math_0"], nodes[0].hdc.concept_memory["math_0"])
+        self.assertEqual(swarm.get_stats()["shared_concepts"], 3)
+
+    def test_import_state_touches_only_its_own_node(self):
+        swarm = self.make_swarm(self.PLANS)
+        nodes = list(swarm.agents.values())
+        before = nodes[0].hdc.projection_matrix.clone()
+        state = nodes[1].hdc.export_state()
+        state["projection_matrix"] = state["projection_matrix"] * 0
+        nodes[1].hdc.import_state(state)
+        self.assertEqual(float(nodes[1].hdc.projection_matrix.abs().sum()), 0.0)
+        torch.testing.assert_close(nodes[0].hdc.projection_matrix, before)
+        torch.testing.assert_close(nodes[2].hdc.projection_matrix, before)
+
+    def test_failed_task_refines_with_insights_from_similar_task(self):
+        swarm = self.make_swarm({ANALYTIKER: (0.0, 1.0), KREATIVIST: (0.0, 1.0), KRITIKER: (0.0, 1.0)})
+        self.solve(swarm)
+        for agent in swarm.agents.values():
+            agent.score = 0.0
+        with mock.patch("builtins.print"):
+            swarm.solve_task(_task("t2"), verbose=True)
+        for agent in swarm.agents.values():
+            self.assertEqual(len(agent.descriptions), 3)  # t1, t2, förfining av t2
+            self.assertIn("En liknande uppgift löstes", agent.descriptions[-1])
+        self.assertEqual(swarm.get_stats()["insight_store"]["tasks"], 1)  # Bara lösningar med score > 0
+
+    def test_sequential_mode_still_works(self):
+        swarm = self.make_swarm(self.PLANS, parallel=False)
+        t0 = time.time()
+        result = self.solve(swarm)
+        self.assertGreaterEqual(time.time() - t0, 0.6)
+        self.assertEqual(result.consensus_method, "best")
+
+    def test_first_solve_cancels_remaining_nodes(self):
+        plans = {ANALYTIKER: (0.05, 1.0), KREATIVIST: (2.0, 1.0), KRITIKER: (2.0, 0.0)}
+        swarm = self.make_swarm(plans, consensus="best")
+        t0 = time.time()
+        result = self.solve(swarm)
+        self.assertLess(time.time() - t0, 1.0)
+        self.assertEqual(result.consensus_score, 1.0)
+        self.assertEqual(result.consensus_method, "best")
+        self.assertTrue(swarm.agents["kreativist"].cancelled)
+        self.assertTrue(swarm.agents["kritiker"].cancelled)
+        self.assertEqual(swarm.get_stats()["cancelled_nodes"], 2)
+
+
+def _attempt(pid, code, score, evaluated=True):
+    result = EvalResult("t1", score, int(score), 1, [], code, 1.0, "ok") if evaluated else None
+    return SwarmAttempt(profile_id=pid, code=code, score=score, feedback="", time_ms=1.0,
+                        confidence=0.8, eval_result=result)
+
+
+class TestConsensusReuse(unittest.TestCase):
+    SUM = "a, b = map(int, input().split())\nprint(a + b)"
+    SUM_REFORMATTED = "# summa\na,b = map(int,input().split())\n\nprint( a+b )  \n"
+
+    def test_formatting_only_differences_collapse(self):
+        self.assertEqual(normalize_code(self.SUM), normalize_code(self.SUM_REFORMATTED))
+        self.assertNotEqual(normalize_code(self.SUM), normalize_code("print(3)"))
+        self.assertEqual(normalize_code("def f(:\n  pass  \n\n"), "def f(:\n  pass")
+
+    def test_vote_reuses_node_evaluations(self):
+        attempts = [_attempt("analytiker", self.SUM, 1.0), _attempt("kreativist", self.SUM_REFORMATTED, 1.0),
+                    _attempt("kritiker", "print(3)", 0.5)]
+        with mock.patch.object(frankenstein_swarm, "evaluate_solution") as evaluate:
+            code, score, method = consensus_vote(attempts, _task())
+        evaluate.assert_not_called()
+        self.assertEqual((code, score, method), (self.SUM, 1.0, "vote"))
+
+    def test_merge_evaluates_only_new_code(self):
+        attempts = [_attempt("analytiker", "print(1)", 0.5), _attempt("kritiker", self.SUM, 0.5)]
+        fresh = EvalResult("t1", 1.0, 1, 1, [], "x", 1.0, "ok")
+        with mock.patch.object(frankenstein_swarm, "evaluate_solution", return_value=fresh) as evaluate:
+            same = consensus_merge(attempts, _task(), lambda p: f"```python\n{self.SUM_REFORMATTED}\n```")
+            evaluate.assert_not_called()
+            merged = consensus_merge(attempts, _task(), lambda p: "```python\nprint(sum(map(int, input().split())))\n```")
+        self.assertEqual(same[1:], (0.5, "merge"))
+        self.assertEqual(evaluate.call_count, 1)
+        self.assertEqual(merged[1:], (1.0, "merge"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -466,6 +466,31 @@ class GutFeelingEngine:
             for k in self._weights:
                 self._weights[k] /= total
 
+    # === Checkpoint ===
+
+    def export_state(self) -> dict:
+        """Historik, track records, kalibrering och vikter (för checkpoints)."""
+        return {
+            "results": list(self._results),
+            "category_record": self._category_record,
+            "difficulty_record": [[d, rec] for d, rec in self._difficulty_record.items()],
+            "calibration_data": [list(pair) for pair in self._calibration_data],
+            "weights": dict(self._weights),
+            "total_predictions": self.total_predictions,
+            "correct_predictions": self.correct_predictions,
+        }
+
+    def import_state(self, state: dict) -> None:
+        self._results.clear()
+        self._results.extend(state["results"])
+        self._category_record = {k: dict(v) for k, v in state["category_record"].items()}
+        self._difficulty_record = {int(d): dict(rec) for d, rec in state["difficulty_record"]}
+        self._calibration_data.clear()
+        self._calibration_data.extend((float(g), float(s)) for g, s in state["calibration_data"])
+        self._weights.update(state["weights"])
+        self.total_predictions = int(state["total_predictions"])
+        self.correct_predictions = int(state["correct_predictions"])
+
     # === Stats ===
 
     def get_stats(self) -> dict:
@@ -0,0 +1,211 @@
+"""
+Delat HDC-konceptlager för svärmens noder.
+
+PythonMycelium klonade varje delad hypervektor in i en dict med nyckeln
+"källa:koncept", och get_shared_concepts skannade alla nycklar med
+startswith vid varje anrop. Här ligger alla delade koncept i EN
+memory-mappad matris som flera processer kan öppna samtidigt:
+
+1. Radallokering: Append-only under ett fillås — en ny delning av samma
+   (källa, koncept) får en ny rad och den senaste raden gäller
+2. Publicering: Vektor och nyckel skrivs först, radräknaren i huvudet
+   sist — en läsare ser aldrig en halvskriven rad
+3. Index: Varje instans indexerar bara rader den inte sett än,
+   {källa: {koncept: rad}}, så uppslag blir dict-uppslag i stället för
+   skanningar
+4. Läsning: Vektorerna returneras som tensorer ovanpå mappningen (ingen
+   kopia) — de ska behandlas som skrivskyddade
+
+Filer bredvid `base`:
+- <base>.hdr: int64[4] = (version, dim, rader, kapacitet)
+- <base>.hv: float32-matris (kapacitet × dim)
+- <base>.keys: (källa, koncept) per rad, utf-8 med fast bredd
+- <base>.lock: fillås för allokering och tillväxt
+
+Utan base skapas lagret i en temporär katalog som tas bort vid close().
+"""
+
+import os
+import shutil
+import tempfile
+import threading
+
+import numpy as np
+import torch
+
+from progress_store import file_lock
+
+STORE_VERSION = 1
+DEFAULT_CAPACITY = 256
+
+_KEY_DTYPE = np.dtype([("source", "S32"), ("name", "S96")])
+_HDR_VERSION, _HDR_DIM, _HDR_ROWS, _HDR_CAPACITY = range(4)
+
+
+def _encode(value: str, field: str) -> bytes:
+    raw = value.encode("utf-8")
+    limit = _KEY_DTYPE[field].itemsize
+    if len(raw) > limit:
+        raise ValueError(f"{field} '{value}' är längre än {limit} byte")
+    return raw
+
+
+class SharedConceptStore:
+    """Append-only matris av hypervektorer, delad via en memory-mappad fil."""
+
+    def __init__(self, base_path: str | None = None, dim: int | None = None,
+                 capacity: int = DEFAULT_CAPACITY):
+        self._owned_dir = None
+        if base_path is None:
+            self._owned_dir = tempfile.mkdtemp(prefix="hdc_store_")
+            base_path = os.path.join(self._owned_dir, "concepts")
+        self.base = base_path
+        self.hdr_path = f"{base_path}.hdr"
+        self.hv_path = f"{base_path}.hv"
+        self.keys_path = f"{base_path}.keys"
+        self.lock_path = f"{base_path}.lock"
+        self.initial_capacity = max(int(capacity), 1)
+        self.dim = dim
+        self._hdr: np.memmap | None = None
+        self._hv: np.memmap | None = None
+        self._keys: np.memmap | None = None
+        self._mapped_capacity = 0
+        self._seen = 0
+        self._index: dict[str, dict[str, int]] = {}
+        self._lock = threading.Lock()
+        os.makedirs(os.path.dirname(self.base) or ".", exist_ok=True)
+        self._open_header()
+
+    # --- Mappning ---
+
+    def _open_header(self) -> bool:
+        if self._hdr is not None:
+            return True
+        if not os.path.exists(self.hdr_path) or os.path.getsize(self.hdr_path) < 32:
+            return False
+        hdr = np.memmap(self.hdr_path, dtype=np.int64, mode="r+", shape=(4,))
+        if hdr[_HDR_VERSION] != STORE_VERSION:
+            raise ValueError(f"Okänd version {int(hdr[_HDR_VERSION])} i {self.hdr_path}")
+        if self.dim is not None and hdr[_HDR_DIM] != self.dim:
+            raise ValueError(f"HDC-dimension {self.dim} matchar inte lagret ({int(hdr[_HDR_DIM])})")
+        self.dim = int(hdr[_HDR_DIM])
+        self._hdr = hdr
+        return True
+
+    def _create(self, dim: int) -> None:
+        """Skapa filerna (anropas under fillåset)."""
+        self.dim = dim
+        cap = self.initial_capacity
+        for path, nbytes in ((self.hv_path, cap * dim * 4), (self.keys_path, cap * _KEY_DTYPE.itemsize)):
+            with open(path, "wb") as f:
+                f.truncate(nbytes)
+        tmp = self.hdr_path + ".tmp"
+        np.array([STORE_VERSION, dim, 0, cap], dtype=np.int64).tofile(tmp)
+        os.replace(tmp, self.hdr_path)  # Huvudet sist: då finns datafilerna
+        self._open_header()
+
+    def _map(self, capacity: int) -> None:
+        self._hv = np.memmap(self.hv_path, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+        self._keys = np.memmap(self.keys_path, dtype=_KEY_DTYPE, mode="r+", shape=(capacity,))
+        self._mapped_capacity = capacity
+
+    def _grow(self, needed: int) -> None:
+        """Fördubbla kapaciteten (anropas under fillåset)."""
+        cap = int(self._hdr[_HDR_CAPACITY])
+        if needed <= cap:
+            return
+        while cap < needed:
+            cap *= 2
+        os.truncate(self.hv_path, cap * self.dim * 4)
+        os.truncate(self.keys_path, cap * _KEY_DTYPE.itemsize)
+        self._hdr[_HDR_CAPACITY] = cap
+
+    def _refresh(self) -> None:
+        """Indexera rader som andra instanser/processer publicerat."""
+        if not self._open_header():
+            return
+        rows = int(self._hdr[_HDR_ROWS])
+        if rows <= self._seen:
+            return
+        if rows > self._mapped_capacity:
+            self._map(int(self._hdr[_HDR_CAPACITY]))
+        for row in range(self._seen, rows):
+            key = self._keys[row]
+            source = key["source"].decode("utf-8")
+            self._index.setdefault(source, {})[key["name"].decode("utf-8")] = row
+        self._seen = rows
+
+    # --- Skriv ---
+
+    def put(self, source: str, name: str, hv: torch.Tensor) -> int:
+        """Dela en hypervektor; returnerar raden den fick."""
+        key = (_encode(source, "source"), _encode(name, "name"))
+        vec = hv.detach().cpu().reshape(-1).float().numpy()
+        with self._lock, file_lock(self.lock_path):
+            if not self._open_header():
+                self._create(len(vec))
+            if len(vec) != self.dim:
+                raise ValueError(f"Hypervektor med dimension {len(vec)} matchar inte lagret ({self.dim})")
+            row = int(self._hdr[_HDR_ROWS])
+            self._grow(row + 1)
+            if row >= self._mapped_capacity:
+                self._map(int(self._hdr[_HDR_CAPACITY]))
+            self._hv[row] = vec
+            self._keys[row] = key
+            self._hdr[_HDR_ROWS] = row + 1  # Publicera
+            self._refresh()
+        return row
+
+    # --- Läs ---
+
+    def get(self, source: str, name: str) -> torch.Tensor | None:
+        with self._lock:
+            self._refresh()
+            row = self._index.get(source, {}).get(name)
+            return None if row is None else torch.from_numpy(self._hv[row])
+
+    def by_source(self, source: str) -> dict[str, torch.Tensor]:
+        """Alla koncept från en källa (senaste versionen av varje)."""
+        with self._lock:
+            self._refresh()
+            return {name: torch.from_numpy(self._hv[row]) for name, row in self._index.get(source, {}).items()}
+
+    def items(self, exclude_source: str | None = None) -> list[tuple[str, torch.Tensor]]:
+        """[("källa:koncept", hypervektor)] för alla källor utom exclude_source."""
+        with self._lock:
+            self._refresh()
+            return [
+                (f"{source}:{name}", torch.from_numpy(self._hv[row]))
+                for source, names in self._index.items() if source != exclude_source
+                for name, row in names.items()
+            ]
+
+    def sources(self) -> list[str]:
+        with self._lock:
+            self._refresh()
+            return list(self._index)
+
+    def __len__(self) -> int:
+        with self._lock:
+            self._refresh()
+            return sum(len(names) for names in self._index.values())
+
+    @property
+    def rows(self) -> int:
+        """Allokerade rader (inklusive ersatta versioner)."""
+        with self._lock:
+            self._refresh()
+            return self._seen
+
+    @property
+    def nbytes(self) -> int:
+        return self.rows * (self.dim or 0) * 4
+
+    def close(self) -> None:
+        with self._lock:
+            self._hdr = self._hv = self._keys = None
+            self._mapped_capacity = self._seen = 0
+            self._index = {}
+        if self._owned_dir is not None:
+            shutil.rmtree(self._owned_dir, ignore_errors=True)
+            self._owned_dir = None
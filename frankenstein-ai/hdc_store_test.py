@@ -0,0 +1,99 @@
+"""
+Enhetstester för hdc_store.py — delad konceptmatris, index per källa och
+synlighet mellan processer.
+
+Kör med: python -m pytest hdc_store_test.py -v
+"""
+
+import multiprocessing
+import os
+import sys
+import tempfile
+import unittest
+
+import torch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from hdc_store import SharedConceptStore
+
+
+def _write_from_child(base: str, source: str, count: int) -> None:
+    store = SharedConceptStore(base)
+    for i in range(count):
+        store.put(source, f"c{i}", torch.full((8,), float(i)))
+    store.close()
+
+
+class TestSharedConceptStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self.tmp.name, "concepts")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_index_per_source_and_latest_row_wins(self):
+        store = SharedConceptStore(self.base, capacity=2)
+        store.put("a", "loop", torch.ones(8))
+        store.put("b", "loop", torch.zeros(8))
+        store.put("b", "sort", torch.full((8,), 2.0))
+        store.put("a", "loop", torch.full((8,), 3.0))  # Ny version → ny rad, växer förbi kapaciteten
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.rows, 4)
+        self.assertEqual(store.get("a", "loop")[0].item(), 3.0)
+        self.assertIsNone(store.get("a", "sort"))
+        self.assertEqual(sorted(store.by_source("b")), ["loop", "sort"])
+        self.assertEqual(sorted(k for k, _ in store.items(exclude_source="a")), ["b:loop", "b:sort"])
+        store.close()
+
+    def test_second_instance_sees_rows_without_copy(self):
+        writer = SharedConceptStore(self.base)
+        reader = SharedConceptStore(self.base)
+        self.assertEqual(len(reader), 0)
+        writer.put("a", "x", torch.ones(8))
+        hv = reader.get("a", "x")
+        self.assertIsNotNone(hv)
+        self.assertIsNotNone(hv.numpy().base)  # Vy över mappningen, ingen kopia
+        for i in range(300):  # Tvingar tillväxt och ommappning i läsaren
+            writer.put("a", f"y{i}", torch.full((8,), float(i)))
+        self.assertEqual(reader.get("a", "y299")[0].item(), 299.0)
+        writer.close()
+        reader.close()
+
+    def test_dimension_mismatch_and_long_keys_raise(self):
+        store = SharedConceptStore(self.base)
+        store.put("a", "x", torch.ones(8))
+        with self.assertRaises(ValueError):
+            store.put("a", "y", torch.ones(9))
+        with self.assertRaises(ValueError):
+            store.put("a" * 40, "y", torch.ones(8))
+        with self.assertRaises(ValueError):
+            SharedConceptStore(self.base, dim=16)
+        store.close()
+
+    def test_processes_share_concepts(self):
+        ctx = multiprocessing.get_context("spawn")
+        procs = [ctx.Process(target=_write_from_child, args=(self.base, src, 20)) for src in ("p1", "p2")]
+        for p in procs:
+            p.start()
+        for p in procs:
+            p.join(timeout=120)
+            self.assertEqual(p.exitcode, 0)
+        store = SharedConceptStore(self.base)
+        self.assertEqual(store.rows, 40)
+        self.assertEqual(sorted(store.sources()), ["p1", "p2"])
+        self.assertEqual(store.get("p2", "c7")[3].item(), 7.0)
+        store.close()
+
+    def test_temporary_store_removed_on_close(self):
+        store = SharedConceptStore()
+        store.put("a", "x", torch.ones(4))
+        path = os.path.dirname(store.base)
+        self.assertTrue(os.path.isdir(path))
+        store.close()
+        self.assertFalse(os.path.exists(path))
+
+
+if __name__ == "__main__":
+    unittest.main()
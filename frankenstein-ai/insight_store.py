@@ -0,0 +1,152 @@
+"""
+Indexerat och begränsat lager för Myceliums lösningsinsikter.
+
+PythonMycelium.solution_insights var en obegränsad lista som
+get_insights_for_task skannade linjärt för varje nod och uppgift — i en
+lång run_swarm_session blev varje uppslag långsammare.
+
+1. Index: Insikter per task_id och per HDC-koncept (deque per nyckel),
+   så uppslag kostar O(tak) oavsett sessionens längd
+2. Tak: Högst per_task/per_concept insikter per nyckel (äldsta faller
+   bort) och högst max_total totalt
+3. Ålder: Insikter äldre än max_age_s vräks — vräkningen går i
+   insättningsordning och kostar amorterat O(1)
+4. Likhet: Varje koncept med insikter har en hypervektor; related()
+   hittar insikter från närliggande uppgifter via cosine similarity
+   mot konceptmatrisen, inte bara exakt samma task_id
+
+Insikterna är dicts ({"source", "task_id", "code", "score", "strategy",
+"timestamp", "concept"}) som tidigare.
+"""
+
+import time
+from collections import deque
+
+import numpy as np
+
+DEFAULT_PER_TASK = 8
+DEFAULT_PER_CONCEPT = 32
+DEFAULT_MAX_AGE_S = 6 * 3600
+DEFAULT_MAX_TOTAL = 5000
+
+
+def _as_vector(hv) -> np.ndarray:
+    """Tensor eller array → platt float32-vektor."""
+    if hasattr(hv, "detach"):
+        hv = hv.detach().cpu().float().numpy()
+    return np.asarray(hv, dtype=np.float32).reshape(-1)
+
+
+class InsightStore:
+    """Lösningsinsikter indexerade per uppgift och per HDC-koncept."""
+
+    def __init__(self, per_task: int = DEFAULT_PER_TASK, per_concept: int = DEFAULT_PER_CONCEPT,
+                 max_age_s: float = DEFAULT_MAX_AGE_S, max_total: int = DEFAULT_MAX_TOTAL):
+        self.per_task = per_task
+        self.per_concept = per_concept
+        self.max_age_s = max_age_s
+        self.max_total = max_total
+        self._order: deque[dict] = deque()  # Insättningsordning (= tidsordning)
+        self._by_task: dict[str, deque[dict]] = {}
+        self._by_concept: dict[str, deque[dict]] = {}
+        self._concept_hv: dict[str, np.ndarray] = {}
+        self._matrix: np.ndarray | None = None  # Normaliserade hypervektorer, byggs vid behov
+        self._matrix_names: list[str] = []
+        self.evicted = 0
+
+    # --- Skriv ---
+
+    def add(self, insight: dict, hv=None) -> None:
+        """Lägg till en insikt; hv = konceptets hypervektor (för related())."""
+        insight.setdefault("timestamp", time.time())
+        insight.setdefault("concept", "")
+        self._evict(insight["timestamp"])
+        self._order.append(insight)
+        self._push(self._by_task, insight["task_id"], insight, self.per_task)
+        concept = insight["concept"]
+        if concept:
+            self._push(self._by_concept, concept, insight, self.per_concept)
+            if hv is not None:
+                vec = _as_vector(hv)
+                norm = float(np.linalg.norm(vec))
+                if norm > 0:
+                    self._concept_hv[concept] = vec / norm
+                    self._matrix = None
+        while len(self._order) > self.max_total:
+            self._drop_oldest()
+
+    def _push(self, index: dict[str, deque], key: str, insight: dict, cap: int) -> None:
+        bucket = index.get(key)
+        if bucket is None:
+            bucket = index[key] = deque()
+        bucket.append(insight)
+        if len(bucket) > cap:
+            bucket.popleft()
+
+    def _drop_oldest(self) -> None:
+        old = self._order.popleft()
+        self.evicted += 1
+        for index, key in ((self._by_task, old["task_id"]), (self._by_concept, old["concept"])):
+            bucket = index.get(key)
+            if bucket and bucket[0] is old:
+                bucket.popleft()
+            if bucket is not None and not bucket:
+                del index[key]
+                if index is self._by_concept and self._concept_hv.pop(key, None) is not None:
+                    self._matrix = None
+
+    def _evict(self, now: float) -> None:
+        cutoff = now - self.max_age_s
+        while self._order and self._order[0]["timestamp"] < cutoff:
+            self._drop_oldest()
+
+    # --- Läs ---
+
+    def for_task(self, task_id: str, exclude_source: str | None = None) -> list[dict]:
+        """Insikter för exakt den här uppgiften, nyaste sist."""
+        self._evict(time.time())
+        return [i for i in self._by_task.get(task_id, ()) if i["source"] != exclude_source]
+
+    def for_concept(self, concept: str, exclude_source: str | None = None) -> list[dict]:
+        self._evict(time.time())
+        return [i for i in self._by_concept.get(concept, ()) if i["source"] != exclude_source]
+
+    def related(self, hv, exclude_source: str | None = None, exclude_task: str | None = None,
+                k: int = 3, min_similarity: float = 0.5, min_score: float = 1.0) -> list[dict]:
+        """Insikter från de k koncept som liknar hv mest (bästa först).
+
+        Varje träff får "similarity" satt; insikter med score < min_score
+        eller från exclude_task/exclude_source hoppas över.
+        """
+        self._evict(time.time())
+        if not self._concept_hv:
+            return []
+        if self._matrix is None:
+            self._matrix_names = list(self._concept_hv)
+            self._matrix = np.stack([self._concept_hv[c] for c in self._matrix_names])
+        query = _as_vector(hv)
+        if query.shape[0] != self._matrix.shape[1]:
+            return []
+        sims = self._matrix @ (query / max(float(np.linalg.norm(query)), 1e-10))
+        out = []
+        for idx in np.argsort(-sims, kind="stable")[:k]:
+            if sims[idx] < min_similarity:
+                break
+            hits = [
+                i for i in self._by_concept.get(self._matrix_names[idx], ())
+                if i["source"] != exclude_source and i["task_id"] != exclude_task and i["score"] >= min_score
+            ]
+            hits.sort(key=lambda i: -i["score"])
+            out.extend({**i, "similarity": float(sims[idx])} for i in hits)
+        return out
+
+    def __len__(self) -> int:
+        return len(self._order)
+
+    def stats(self) -> dict:
+        return {
+            "insights": len(self._order),
+            "tasks": len(self._by_task),
+            "concepts": len(self._by_concept),
+            "evicted": self.evicted,
+        }
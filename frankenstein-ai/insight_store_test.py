@@ -0,0 +1,83 @@
+"""
+Enhetstester för insight_store.py — index per uppgift/koncept, tak,
+åldersvräkning och likhetsfrågor.
+
+Kör med: python -m pytest insight_store_test.py -v
+"""
+
+import os
+import sys
+import time
+import unittest
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from insight_store import InsightStore
+
+
+def _insight(task_id, source="a", score=1.0, concept="", ts=None, code="print(1)"):
+    insight = {"source": source, "task_id": task_id, "code": code, "score": score, "strategy": "direct",
+               "concept": concept}
+    if ts is not None:
+        insight["timestamp"] = ts
+    return insight
+
+
+class TestIndexAndCaps(unittest.TestCase):
+    def test_task_lookup_excludes_source_and_respects_cap(self):
+        store = InsightStore(per_task=3)
+        for i in range(5):
+            store.add(_insight("t1", source="a" if i % 2 else "b", code=f"print({i})"))
+        store.add(_insight("t2"))
+        self.assertEqual([i["code"] for i in store.for_task("t1")], ["print(2)", "print(3)", "print(4)"])
+        self.assertEqual([i["code"] for i in store.for_task("t1", exclude_source="a")], ["print(2)", "print(4)"])
+        self.assertEqual(len(store.for_task("t2")), 1)
+        self.assertEqual(store.for_task("saknas"), [])
+
+    def test_age_and_total_eviction_keep_indexes_consistent(self):
+        store = InsightStore(max_age_s=60, max_total=4)
+        now = time.time()
+        store.add(_insight("old", concept="c", ts=now - 120), hv=np.ones(4))
+        store.add(_insight("new", concept="c", ts=now))
+        self.assertEqual(store.for_task("old"), [])
+        self.assertEqual([i["task_id"] for i in store.for_concept("c")], ["new"])
+        for i in range(6):
+            store.add(_insight(f"t{i}", ts=now))
+        self.assertEqual(len(store), 4)
+        self.assertEqual(store.for_concept("c"), [])
+        stats = store.stats()
+        self.assertEqual((stats["tasks"], stats["concepts"], stats["evicted"]), (4, 0, 4))
+        self.assertEqual(store.related(np.ones(4)), [])  # Konceptets vektor vräktes med sista insikten
+
+
+class TestRelated(unittest.TestCase):
+    def test_similar_concepts_return_solved_insights_from_other_tasks(self):
+        rng = np.random.RandomState(0)
+        loops, strings = rng.randn(64), rng.randn(64)
+        store = InsightStore()
+        store.add(_insight("sum_1", concept="a:loops", code="for"), hv=torch.from_numpy(loops))
+        store.add(_insight("sum_2", concept="a:loops", score=0.5), hv=loops)
+        store.add(_insight("rev_1", concept="b:strings", code="[::-1]"), hv=strings)
+
+        query = loops + 0.1 * rng.randn(64)
+        hits = store.related(query, exclude_task="sum_9")
+        self.assertEqual([h["code"] for h in hits], ["for"])  # Ofullständig lösning filtreras bort
+        self.assertGreater(hits[0]["similarity"], 0.9)
+        self.assertEqual(store.related(query, exclude_task="sum_1"), [])
+        self.assertEqual(store.related(np.ones(8)), [])  # Fel dimension
+
+    def test_lookups_stay_bounded_over_long_sessions(self):
+        store = InsightStore(per_task=4, per_concept=8, max_total=500)
+        hv = np.ones(16)
+        for i in range(5000):
+            store.add(_insight(f"t{i % 50}", concept=f"c{i % 10}"), hv=hv)
+        self.assertEqual(len(store), 500)
+        self.assertEqual(len(store.for_task("t7")), 4)
+        self.assertEqual(len(store.related(hv, k=2)), 16)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -51,6 +51,8 @@ from cognition import (
 )
 from agency import ActiveInferenceAgent
 from memory import EbbinghausMemory
+from bounded_history import RingBuffer, spill_path
+from quantization import DEFAULT_EMBEDDING_DTYPE, QuantizedVector, quantized_attribute, quantized_value
 
 # ── Logging ──
 
@@ -117,6 +119,10 @@ class ResearchFinding:
     timestamp: float = field(default_factory=time.time)
 
 
+# HDC-embeddingen (10 000 dims) lagras kvantiserad men läses som lista
+ResearchFinding.hdc_embedding = quantized_attribute("hdc_embedding")
+
+
 @dataclass
 class ExperimentResult:
     """Resultat av ett experiment/test."""
@@ -1078,6 +1084,13 @@ class SyracuseProblem(ResearchProblem):
 # Math Research Engine — Orchestrator
 # ══════════════════════════════════════════════════════════════════════════════
 
+def _finding_summary(finding: ResearchFinding) -> dict:
+    """Spill-post för ett fynd — utan HDC-embedding (10 000 floats)."""
+    d = asdict(finding)
+    d.pop("hdc_embedding", None)
+    return d
+
+
 class MathResearchEngine:
     """Orkestrerar autonom matematisk forskning.
     
@@ -1091,13 +1104,22 @@ class MathResearchEngine:
         memory: Optional[EbbinghausMemory] = None,
         bridge: Optional[NeuroSymbolicBridge] = None,
         exploration_weight: float = 0.6,
+        history_limit: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+        embedding_dtype: str = DEFAULT_EMBEDDING_DTYPE,
     ):
+        # Precision för fyndens HDC-embeddings, minnet och prototyperna
+        self.embedding_dtype = embedding_dtype
+
         # Kognitiva moduler
         self.memory = memory or EbbinghausMemory(
             collection_name="math_research",
             decay_threshold=0.05,
+            embedding_dtype=embedding_dtype,
+        )
+        self.bridge = bridge or NeuroSymbolicBridge(
+            lnn_output_dim=32, hdc_dim=HDC_DIM, prototype_dtype=embedding_dtype,
         )
-        self.bridge = bridge or NeuroSymbolicBridge(lnn_output_dim=32, hdc_dim=HDC_DIM)
         self.encoder = MathHDCEncoder(dim=HDC_DIM)
 
         # AIF: 5 problem-observationer + 3 meta-observationer
@@ -1107,6 +1129,8 @@ class MathResearchEngine:
             num_actions=5,  # Välj bland 5 problem
             preference_obs=[0, 1, 2, 3, 4],  # Föredrar alla anomali-typer
             exploration_weight=exploration_weight,
+            history_limit=history_limit,
+            spill_dir=spill_dir,
         )
 
         # Forskningsproblem
@@ -1119,7 +1143,12 @@ class MathResearchEngine:
         }
 
         # State
-        self._findings: list[ResearchFinding] = []
+        # history_limit begränsar fyndlistan (None = obegränsat); räknare täcker alla fynd
+        self._findings = RingBuffer(
+            history_limit, spill_path(spill_dir, "math_findings"), serializer=_finding_summary,
+        )
+        self._findings_by_problem: Counter = Counter()
+        self._findings_by_category: Counter = Counter()
         self._hypotheses: list[Hypothesis] = []
         self._experiments: list[ExperimentResult] = []
         self._cross_domain: list[dict] = []
@@ -1160,11 +1189,11 @@ class MathResearchEngine:
         for f in findings:
             # Encodera som HDC
             hv = problem.encode_finding(f, self.encoder)
-            f.hdc_embedding = hv.numpy().tolist()
+            f.hdc_embedding = QuantizedVector.from_array(hv.numpy(), self.embedding_dtype)
 
             # Lagra i Ebbinghaus
             f.memory_id = self.memory.store(
-                embedding=f.hdc_embedding,
+                embedding=hv.numpy(),
                 concept=f"math_{f.problem}_{f.category}",
                 metadata={
                     "finding_id": f.finding_id,
@@ -1180,6 +1209,8 @@ class MathResearchEngine:
             self.bridge.learn_concept(f"math_{f.problem}", hv)
 
         self._findings.extend(findings)
+        self._findings_by_problem.update(f.problem for f in findings)
+        self._findings_by_category.update(f.category for f in findings)
         self._stats[f"findings_{problem_name}"] += len(findings)
         self._exploration_counter[problem_name] += 1
 
@@ -1239,18 +1270,25 @@ class MathResearchEngine:
         # Gruppera fynd per problem
         by_problem: dict[str, list[ResearchFinding]] = defaultdict(list)
         for f in self._findings:
-            if f.hdc_embedding:
+            q = quantized_value(f, "hdc_embedding")
+            if q is not None and len(q):
                 by_problem[f.problem].append(f)
 
+        # Senaste 10 per problem som normerade float32-matriser: en matmul per problempar
+        recent = {p: fs[-10:] for p, fs in by_problem.items()}
+        unit = {}
+        for p, fs in recent.items():
+            mat = np.stack([quantized_value(f, "hdc_embedding").to_array() for f in fs])
+            unit[p] = mat / np.maximum(np.linalg.norm(mat, axis=1, keepdims=True), 1e-8)
+
         problems = list(by_problem.keys())
         for i in range(len(problems)):
             for j in range(i + 1, len(problems)):
                 p1, p2 = problems[i], problems[j]
-                for f1 in by_problem[p1][-10:]:  # Senaste 10 per problem
-                    for f2 in by_problem[p2][-10:]:
-                        hv1 = torch.tensor(f1.hdc_embedding, dtype=torch.float32)
-                        hv2 = torch.tensor(f2.hdc_embedding, dtype=torch.float32)
-                        sim = self.encoder.similarity(hv1, hv2)
+                sims = unit[p1] @ unit[p2].T
+                for a, f1 in enumerate(recent[p1]):
+                    for b, f2 in enumerate(recent[p2]):
+                        sim = float(sims[a, b])
 
                         if sim > threshold:
                             discovery = {
@@ -1273,6 +1311,30 @@ class MathResearchEngine:
 
         return discoveries
 
+    def recall_similar_findings(
+        self,
+        finding: ResearchFinding,
+        n_results: int = 5,
+        problem: Optional[str] = None,
+        category: Optional[str] = None,
+    ) -> list[dict]:
+        """Hämta lagrade fynd som liknar `finding`, valfritt per problem/kategori.
+
+        Filtret skickas som where till minnet, så top-n gäller inom
+        problemet/kategorin i stället för att filtreras i efterhand.
+        """
+        q = quantized_value(finding, "hdc_embedding")
+        if q is not None:
+            embedding = q.to_array()
+        else:
+            embedding = self.problems[finding.problem].encode_finding(finding, self.encoder).numpy()
+        where = {"source": "math_research"}
+        if problem is not None:
+            where["problem"] = problem
+        if category is not None:
+            where["category"] = category
+        return self.memory.recall(embedding, n_results=n_results, where=where)
+
     # ── Full Research Cycle ──
 
     async def run_research_cycle(
@@ -1373,7 +1435,7 @@ class MathResearchEngine:
 
     def get_stats(self) -> dict:
         return {
-            "total_findings": len(self._findings),
+            "total_findings": self._findings.total,
             "total_hypotheses": len(self._hypotheses),
             "active_hypotheses": sum(1 for h in self._hypotheses if h.status == "active"),
             "supported_hypotheses": sum(1 for h in self._hypotheses if h.status == "supported"),
@@ -1384,8 +1446,8 @@ class MathResearchEngine:
             "aif_surprise": self.aif.get_surprise(),
             "memory_stats": self.memory.get_stats(),
             "running": self._running,
-            "findings_by_problem": dict(Counter(f.problem for f in self._findings)),
-            "findings_by_category": dict(Counter(f.category for f in self._findings)),
+            "findings_by_problem": dict(self._findings_by_problem),
+            "findings_by_category": dict(self._findings_by_category),
         }
 
     def get_hypotheses(self) -> list[dict]:
@@ -1424,7 +1486,7 @@ class MathResearchEngine:
             f"Genererad: {time.strftime('%Y-%m-%d %H:%M:%S')}",
             "",
             "## Sammanfattning",
-            f"- **Totalt fynd:** {len(self._findings)}",
+            f"- **Totalt fynd:** {self._findings.total}",
             f"- **Hypoteser:** {len(self._hypotheses)} (aktiva: {sum(1 for h in self._hypotheses if h.status == 'active')})",
             f"- **Experiment:** {len(self._experiments)}",
             f"- **Cross-domain mönster:** {len(self._cross_domain)}",
@@ -1432,10 +1494,9 @@ class MathResearchEngine:
         ]
 
         for pname, problem in self.problems.items():
-            p_findings = [f for f in self._findings if f.problem == pname]
             p_hyps = [h for h in self._hypotheses if h.problem == pname]
             lines.append(f"## {problem.name}: {problem.description}")
-            lines.append(f"Fynd: {len(p_findings)}, Hypoteser: {len(p_hyps)}")
+            lines.append(f"Fynd: {self._findings_by_problem[pname]}, Hypoteser: {len(p_hyps)}")
             lines.append("")
 
             for h in p_hyps:
@@ -8,8 +8,10 @@ import asyncio
 import math
 import os
 import sys
+import tempfile
 import time
 import unittest
+from unittest import mock
 
 import numpy as np
 import torch
@@ -35,6 +37,24 @@ from math_research import (
 )
 from cognition import hdc_cosine_similarity
 
+import math_research
+import memory
+
+
+def setUpModule():
+    """Journaler och minnesfiler hamnar i en temporär katalog, inte i training_data/."""
+    tmp = tempfile.TemporaryDirectory()
+    unittest.addModuleCleanup(tmp.cleanup)
+    os.makedirs(os.path.join(tmp.name, "math_research"), exist_ok=True)
+    for module, name, value in (
+        (math_research, "JOURNAL_DIR", os.path.join(tmp.name, "math_research")),
+        (memory, "_DEFAULT_FALLBACK_FILE", os.path.join(tmp.name, "ebbinghaus_memory.json")),
+        (memory, "_DEFAULT_PERSIST_DIR", os.path.join(tmp.name, "chromadb")),
+    ):
+        patcher = mock.patch.object(module, name, value)
+        patcher.start()
+        unittest.addModuleCleanup(patcher.stop)
+
 
 # ══════════════════════════════════════════════════════════════════════════════
 # Utility Tests
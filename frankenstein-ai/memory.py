@@ -20,8 +20,18 @@ import time
 import math
 import json
 import os
+import atexit
+import functools
+import heapq
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
 import numpy as np
 
+from memory_tiers import ColdArchive, WarmTierStore
+from progress_store import file_lock
+from quantization import block_dot, check_dtype, dequantize, quantize, quantize_rows
+
 # ChromaDB är optional — fallback till in-memory med JSON-persistens
 try:
     import chromadb
@@ -37,6 +47,1020 @@ _DEFAULT_PERSIST_DIR = os.path.join(
 _DEFAULT_FALLBACK_FILE = os.path.join(
     os.path.dirname(__file__), "training_data", "ebbinghaus_memory.json"
 )
+# Alla collections delade tidigare _DEFAULT_FALLBACK_FILE; kodagentens
+# collection (den som skrev mest) tar över de gamla filerna
+_LEGACY_FALLBACK_COLLECTION = "code_solutions"
+
+
+def default_fallback_file(collection_name: str) -> str:
+    """Fallback-filen för en collection (egen bas per collection)."""
+    return os.path.join(os.path.dirname(_DEFAULT_FALLBACK_FILE), f"ebbinghaus_{collection_name}.json")
+
+
+def adopt_legacy_fallback(collection_name: str = _LEGACY_FALLBACK_COLLECTION) -> bool:
+    """Byt namn på ebbinghaus_memory.* till collectionens bas (en gång).
+
+    Migrering som run_continuous kör innan agenten skapas — att konstruera
+    en EbbinghausMemory rör aldrig andra filer än sina egna.
+    Returnerar True om filer flyttades.
+    """
+    legacy_base = os.path.splitext(_DEFAULT_FALLBACK_FILE)[0]
+    path = default_fallback_file(collection_name)
+    new_base = os.path.splitext(path)[0]
+    directory = os.path.dirname(legacy_base)
+    prefix = os.path.basename(legacy_base) + "."
+    if not os.path.isdir(directory) or os.path.exists(path) or os.path.exists(f"{new_base}.header.json"):
+        return False
+    legacy = [name for name in os.listdir(directory) if name.startswith(prefix) and not name.endswith(".lock")]
+    if not legacy:
+        return False
+    with file_lock(f"{new_base}.lock"):
+        if os.path.exists(path) or os.path.exists(f"{new_base}.header.json"):
+            return False
+        for name in legacy:
+            if os.path.exists(os.path.join(directory, name)):
+                os.replace(os.path.join(directory, name), new_base + name[len(prefix) - 1:])
+    return True
+
+
+# Max dimensionalitet för lagrade embeddings (längre vektorer subsamplas jämnt)
+MAX_EMBEDDING_DIM = 1024
+
+# 1 strength-enhet = 1 timme
+STRENGTH_SCALE = 3600
+
+# Cosine-likhet över vilken store() slår ihop ett nytt minne med ett befintligt
+DEFAULT_DEDUPE_THRESHOLD = 0.97
+
+# Antal köade metadata-skrivningar innan en batch tvångsflushas
+DEFAULT_WRITE_BATCH = 256
+
+# Write-behind: köns maxlängd och antal minnen per collection.add
+DEFAULT_WRITE_QUEUE_SIZE = 1024
+DEFAULT_WRITE_BEHIND_BATCH = 64
+
+# Metadata-nycklar med sekundärindex i fallback-backenden (för recall(where=...))
+DEFAULT_INDEX_KEYS = ("concept", "category", "source", "problem", "strategy")
+
+# Operatorer i where-filter (delmängd av ChromaDB:s syntax)
+_WHERE_OPS = {
+    "$eq": lambda v, x: v == x,
+    "$ne": lambda v, x: v != x,
+    "$in": lambda v, x: v in x,
+    "$nin": lambda v, x: v not in x,
+    "$gt": lambda v, x: v is not None and v > x,
+    "$gte": lambda v, x: v is not None and v >= x,
+    "$lt": lambda v, x: v is not None and v < x,
+    "$lte": lambda v, x: v is not None and v <= x,
+}
+
+
+@functools.lru_cache(maxsize=32)
+def _subsample_indices(length: int) -> np.ndarray:
+    """Jämnt fördelade index för subsampling — cachas per inlängd."""
+    return np.linspace(0, length - 1, MAX_EMBEDDING_DIM, dtype=int)
+
+
+def _prepare_embedding(embedding: np.ndarray | list[float]) -> np.ndarray:
+    """Konvertera till 1D-array och subsampla till MAX_EMBEDDING_DIM."""
+    vec = np.asarray(embedding)
+    if vec.ndim != 1:
+        vec = vec.reshape(-1)
+    if len(vec) > MAX_EMBEDDING_DIM:
+        vec = vec[_subsample_indices(len(vec))]
+    return vec
+
+
+def expiry_time(metadata: dict, threshold: float) -> float:
+    """Tidpunkt då retention faller under threshold (sluten form).
+
+    R = exp(-t / (S * SCALE)) < threshold  ⇔  t > S * SCALE * ln(1/threshold)
+    Saknad last_access räknas som "just nu" och går därför aldrig ut.
+    """
+    last = metadata.get("last_access")
+    if last is None or threshold <= 0:
+        return math.inf
+    strength = metadata.get("strength", 1.0)
+    if strength <= 0:
+        return -math.inf
+    if threshold >= 1:
+        return float(last)
+    return float(last) + max(strength * STRENGTH_SCALE, 0.01) * math.log(1.0 / threshold)
+
+
+def matches_where(metadata: dict, where: dict) -> bool:
+    """Utvärdera ett ChromaDB-likt where-filter mot en metadata-dict.
+
+    {"key": värde} är likhet, {"key": {"$in": [...]}} osv. använder
+    _WHERE_OPS; flera nycklar, "$and" och "$or" kombinerar villkor.
+    """
+    for key, cond in where.items():
+        if key == "$and":
+            if not all(matches_where(metadata, c) for c in cond):
+                return False
+        elif key == "$or":
+            if not any(matches_where(metadata, c) for c in cond):
+                return False
+        elif isinstance(cond, dict):
+            value = metadata.get(key)
+            for op, operand in cond.items():
+                if op not in _WHERE_OPS:
+                    raise ValueError(f"Okänd where-operator: {op}")
+                if not _WHERE_OPS[op](value, operand):
+                    return False
+        elif metadata.get(key) != cond:
+            return False
+    return True
+
+
+def _chroma_where(where: dict) -> dict:
+    """ChromaDB kräver exakt en toppnyckel — flera villkor blir $and."""
+    clauses = []
+    for key, cond in where.items():
+        if key in ("$and", "$or"):
+            clauses.append({key: [_chroma_where(c) for c in cond]})
+        else:
+            clauses.append({key: cond})
+    return clauses[0] if len(clauses) == 1 else {"$and": clauses}
+
+
+class ExpiryIndex:
+    """Min-heap över minnenas utgångstider med lat invalidering.
+
+    Varje set() pushar en ny post; gamla poster för samma id ligger kvar
+    i heapen men ignoreras vid pop eftersom de inte matchar den aktuella
+    utgångstiden. pop_expired() kostar O(k log n) för k utgångna minnen,
+    oberoende av hur många minnen som lever.
+    """
+
+    def __init__(self):
+        self._heap: list[tuple[float, str]] = []
+        self._expires: dict[str, float] = {}
+
+    def __len__(self) -> int:
+        return len(self._expires)
+
+    def set(self, memory_id: str, expires_at: float) -> None:
+        self._expires[memory_id] = expires_at
+        if expires_at != math.inf:
+            heapq.heappush(self._heap, (expires_at, memory_id))
+            if len(self._heap) > 2 * len(self._expires) + 64:
+                self._rebuild()
+
+    def discard(self, memory_id: str) -> None:
+        self._expires.pop(memory_id, None)
+
+    def is_expired(self, memory_id: str, now: float) -> bool:
+        expires_at = self._expires.get(memory_id)
+        return expires_at is not None and expires_at < now
+
+    def pop_expired(self, now: float) -> list[str]:
+        """Ta ut alla minnen vars utgångstid passerat."""
+        expired = []
+        heap = self._heap
+        while heap and heap[0][0] < now:
+            expires_at, memory_id = heapq.heappop(heap)
+            if self._expires.get(memory_id) == expires_at:
+                del self._expires[memory_id]
+                expired.append(memory_id)
+        return expired
+
+    def next_expiry(self) -> float:
+        while self._heap and self._expires.get(self._heap[0][1]) != self._heap[0][0]:
+            heapq.heappop(self._heap)
+        return self._heap[0][0] if self._heap else math.inf
+
+    def _rebuild(self) -> None:
+        """Släng inaktuella heap-poster."""
+        self._heap = [(t, m) for m, t in self._expires.items() if t != math.inf]
+        heapq.heapify(self._heap)
+
+
+class MatrixMemoryStore:
+    """Kolumnärt in-memory-index för fallback-backenden (utan ChromaDB).
+
+    Embeddings ligger i en växande matris (float32, float16 eller int8
+    med en skalfaktor per rad) med förberäknade normer. strength och last_access speglas i egna
+    kolumner så att retention kan beräknas vektoriserat; full metadata
+    ligger i en parallell lista. Borttagning markerar rader som döda
+    och matrisen kompakteras när hälften av raderna är döda.
+
+    Om `journal` sätts (t.ex. en BinaryMemoryLog) anmäls varje
+    add/set_metadata/remove dit, så att persistensen kan vara inkrementell.
+
+    Metadata-nycklarna i `index_keys` har sekundärindex (värde → rader),
+    så att filter_rows() kan plocka ut en kategori utan att skanna allt.
+    """
+
+    def __init__(self, dtype: str | np.dtype = np.float32, capacity: int = 256,
+                 index_keys: tuple[str, ...] = DEFAULT_INDEX_KEYS):
+        self.dtype = np.dtype(check_dtype(dtype))
+        self.dim: int | None = None
+        self._capacity = max(1, capacity)
+        self._emb: np.ndarray | None = None
+        self._scales = np.ones(self._capacity, dtype=np.float32)
+        self._norms = np.zeros(self._capacity)
+        self._strength = np.zeros(self._capacity)
+        self._last_access = np.zeros(self._capacity)
+        self._alive = np.zeros(self._capacity, dtype=bool)
+        self._ids: list[str | None] = []
+        self._meta: list[dict | None] = []
+        self._row_of: dict[str, int] = {}
+        self._n = 0  # Använda rader (inkl. döda)
+        self._index: dict[str, dict[object, set[int]]] = {key: {} for key in index_keys}
+        self.journal = None
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._row_of
+
+    def _grow(self, needed: int) -> None:
+        if needed <= self._capacity and self._emb is not None:
+            return
+        new_cap = max(self._capacity, 1)
+        while new_cap < needed:
+            new_cap *= 2
+        emb = np.zeros((new_cap, self.dim), dtype=self.dtype)
+        if self._emb is not None:
+            emb[:self._n] = self._emb[:self._n]
+        self._emb = emb
+        for name in ("_scales", "_norms", "_strength", "_last_access", "_alive"):
+            old = getattr(self, name)
+            col = np.zeros(new_cap, dtype=old.dtype)
+            col[:self._n] = old[:self._n]
+            setattr(self, name, col)
+        self._capacity = new_cap
+
+    def _index_add(self, row: int, meta: dict) -> None:
+        for key, postings in self._index.items():
+            value = meta.get(key)
+            if value is not None and not isinstance(value, (list, dict)):
+                postings.setdefault(value, set()).add(row)
+
+    def _index_remove(self, row: int, meta: dict) -> None:
+        for key, postings in self._index.items():
+            value = meta.get(key)
+            rows = postings.get(value) if value is not None and not isinstance(value, (list, dict)) else None
+            if rows is not None:
+                rows.discard(row)
+                if not rows:
+                    del postings[value]
+
+    def _sync_columns(self, row: int, meta: dict) -> None:
+        self._strength[row] = meta.get("strength", 1.0)
+        # Saknad last_access behandlas som "just nu" (som i original-formeln)
+        self._last_access[row] = meta.get("last_access", np.nan)
+
+    def add(self, memory_id: str, embedding: np.ndarray, metadata: dict) -> int:
+        vec = np.asarray(embedding, dtype=np.float64)
+        if self.dim is None:
+            self.dim = len(vec)
+        elif len(vec) != self.dim:
+            raise ValueError(f"Embedding-dimension {len(vec)} matchar inte lagrets {self.dim}")
+        self._grow(self._n + 1)
+        row = self._n
+        codes, scale = quantize(vec, self.dtype.name)
+        self._emb[row] = codes
+        self._scales[row] = scale
+        self._norms[row] = np.linalg.norm(dequantize(codes, scale).astype(np.float64))
+        self._alive[row] = True
+        self._ids.append(memory_id)
+        self._meta.append(metadata)
+        self._sync_columns(row, metadata)
+        self._index_add(row, metadata)
+        self._row_of[memory_id] = row
+        self._n += 1
+        if self.journal is not None:
+            self.journal.record_add(memory_id)
+        return row
+
+    def add_many(self, memory_ids: list[str], embeddings: np.ndarray, metadatas: list[dict]) -> None:
+        """Lägg till många rader på en gång (används vid laddning)."""
+        embeddings = np.asarray(embeddings)
+        if len(memory_ids) == 0:
+            return
+        if self.dim is None:
+            self.dim = embeddings.shape[1]
+        elif embeddings.shape[1] != self.dim:
+            raise ValueError(f"Embedding-dimension {embeddings.shape[1]} matchar inte lagrets {self.dim}")
+        k = len(memory_ids)
+        self._grow(self._n + k)
+        rows = slice(self._n, self._n + k)
+        codes, scales = quantize_rows(embeddings, self.dtype.name)
+        self._emb[rows] = codes
+        self._scales[rows] = scales
+        self._norms[rows] = np.linalg.norm(dequantize(codes, scales).astype(np.float64), axis=1)
+        self._alive[rows] = True
+        for i, (memory_id, meta) in enumerate(zip(memory_ids, metadatas)):
+            row = self._n + i
+            self._ids.append(memory_id)
+            self._meta.append(meta)
+            self._sync_columns(row, meta)
+            self._index_add(row, meta)
+            self._row_of[memory_id] = row
+        self._n += k
+        if self.journal is not None:
+            for memory_id in memory_ids:
+                self.journal.record_add(memory_id)
+
+    def get_embedding(self, memory_id: str) -> np.ndarray | None:
+        row = self._row_of.get(memory_id)
+        return self._vector(row) if row is not None else None
+
+    def _vector(self, row: int) -> np.ndarray:
+        """Avkvantiserad embedding för en rad (float32, eller float16 som lagrat)."""
+        if self.dtype == np.int8:
+            return dequantize(self._emb[row], self._scales[row])
+        return self._emb[row]
+
+    def get_metadata(self, memory_id: str) -> dict | None:
+        row = self._row_of.get(memory_id)
+        return self._meta[row] if row is not None else None
+
+    def set_metadata(self, memory_id: str, metadata: dict) -> None:
+        row = self._row_of[memory_id]
+        self._index_remove(row, self._meta[row])
+        self._meta[row] = metadata
+        self._sync_columns(row, metadata)
+        self._index_add(row, metadata)
+        if self.journal is not None:
+            self.journal.record_update(memory_id)
+
+    def remove(self, memory_ids) -> int:
+        removed = 0
+        for memory_id in memory_ids:
+            row = self._row_of.pop(memory_id, None)
+            if row is None:
+                continue
+            self._alive[row] = False
+            self._index_remove(row, self._meta[row])
+            self._ids[row] = None
+            self._meta[row] = None
+            removed += 1
+            if self.journal is not None:
+                self.journal.record_delete(memory_id)
+        if removed and self._n - len(self._row_of) > self._n // 2:
+            self._compact()
+        return removed
+
+    def _compact(self) -> None:
+        """Flytta ihop levande rader (ordningen bevaras)."""
+        rows = np.flatnonzero(self._alive[:self._n])
+        k = len(rows)
+        if self._emb is not None:
+            self._emb[:k] = self._emb[rows]
+        for name in ("_scales", "_norms", "_strength", "_last_access"):
+            col = getattr(self, name)
+            col[:k] = col[rows]
+        self._alive[:k] = True
+        self._alive[k:self._n] = False
+        self._ids = [self._ids[r] for r in rows]
+        self._meta = [self._meta[r] for r in rows]
+        self._row_of = {mid: i for i, mid in enumerate(self._ids)}
+        self._n = k
+        for postings in self._index.values():
+            postings.clear()
+        for row, meta in enumerate(self._meta):
+            self._index_add(row, meta)
+
+    def live_rows(self) -> np.ndarray:
+        return np.flatnonzero(self._alive[:self._n])
+
+    def _indexed_rows(self, where: dict) -> set[int] | None:
+        """Rader som uppfyller where:s indexerade likhets-/$in-villkor (None = inga sådana)."""
+        result = None
+        for key, cond in where.items():
+            if key == "$and":
+                parts = [self._indexed_rows(c) for c in cond]
+            elif key in self._index:
+                if isinstance(cond, dict):
+                    values = [cond["$eq"]] if "$eq" in cond else cond.get("$in")
+                else:
+                    values = [cond]
+                if values is None:
+                    continue
+                parts = [set().union(*(self._index[key].get(v, ()) for v in values))]
+            else:
+                continue
+            for rows in parts:
+                if rows is not None:
+                    result = set(rows) if result is None else result & rows
+        return result
+
+    def filter_rows(self, where: dict) -> np.ndarray:
+        """Levande rader vars metadata matchar where, i radordning.
+
+        Sekundärindexen smalnar av kandidaterna; övriga villkor prövas
+        bara på dem (utan indexerade villkor prövas alla levande rader).
+        """
+        indexed = self._indexed_rows(where)
+        rows = self.live_rows() if indexed is None else np.array(sorted(indexed), dtype=np.int64)
+        return np.array([r for r in rows if matches_where(self._meta[r], where)], dtype=np.int64)
+
+    def items(self) -> list[tuple[str, np.ndarray, dict]]:
+        """(id, embedding, metadata) för alla levande minnen, i insättningsordning."""
+        return [(self._ids[r], self._vector(r), self._meta[r]) for r in self.live_rows()]
+
+    def retention(self, now: float, rows: np.ndarray | None = None) -> np.ndarray:
+        """Vektoriserad Ebbinghaus-retention R = exp(-t / (S * SCALE))."""
+        if rows is None:
+            rows = np.arange(self._n)
+        strength = self._strength[rows]
+        last = self._last_access[rows]
+        elapsed = now - np.where(np.isnan(last), now, last)
+        with np.errstate(over="ignore", invalid="ignore"):
+            ret = np.exp(-elapsed / np.maximum(strength * STRENGTH_SCALE, 0.01))
+        return np.where(strength <= 0, 0.0, ret)
+
+    def similarities(self, query: np.ndarray, rows: np.ndarray | None = None) -> np.ndarray:
+        """Cosine similarity mot alla (eller valda) rader.
+
+        Räknas direkt på de lagrade koderna (float16/int8 avkvantiseras
+        blockvis i block_dot), så hela matrisen blir aldrig float32.
+        """
+        if self._emb is None or self._n == 0:
+            return np.zeros(0)
+        q = np.asarray(query, dtype=np.float64)
+        if rows is None:
+            rows = slice(0, self._n)
+        dots = block_dot(self._emb[rows], q, self._scales[rows])
+        norms = self._norms[rows]
+        return dots.astype(np.float64) / np.maximum(norms * np.linalg.norm(q), 1e-10)
+
+    def search(self, query: np.ndarray, n_results: int, now: float,
+               threshold: float, rows: np.ndarray | None = None) -> list[tuple[int, float, float]]:
+        """Top-n levande minnen med retention >= threshold.
+
+        Med `rows` (t.ex. från filter_rows) poängsätts bara de raderna.
+        Returnerar [(row, similarity, retention)] sorterat på similarity
+        (fallande, lika värden i insättningsordning).
+        """
+        if not self._row_of or n_results <= 0:
+            return []
+        if rows is None:
+            rows = np.arange(self._n)
+        ret = self.retention(now, rows)
+        keep = self._alive[rows] & (ret >= threshold)
+        cand, ret = rows[keep], ret[keep]
+        if len(cand) == 0:
+            return []
+        sims = self.similarities(query, cand)
+        if n_results < len(cand):
+            part = np.argpartition(-sims, n_results - 1)[:n_results]
+        else:
+            part = np.arange(len(cand))
+        order = part[np.lexsort((part, -sims[part]))]
+        return [(int(cand[i]), float(sims[i]), float(ret[i])) for i in order]
+
+    def row_id(self, row: int) -> str:
+        return self._ids[row]
+
+    def row_metadata(self, row: int) -> dict:
+        return self._meta[row]
+
+
+class MetadataWriteBatch:
+    """Samlar metadata-uppdateringar och borttagningar till bulk-anrop.
+
+    I ChromaDB-läge blir N enskilda update/delete-rundturer två anrop:
+    update(ids=[...], metadatas=[...]) och delete(ids=[...]). Flushas
+    explicit, när batchen stängs eller när max_pending nås.
+    """
+
+    def __init__(self, memory: "EbbinghausMemory", max_pending: int = DEFAULT_WRITE_BATCH):
+        self.memory = memory
+        self.max_pending = max(1, max_pending)
+        self._updates: dict[str, dict] = {}
+        self._deletes: dict[str, None] = {}  # Insättningsordnad mängd
+        self.flushes = 0
+
+    def __len__(self) -> int:
+        return len(self._updates) + len(self._deletes)
+
+    def update(self, memory_id: str, metadata: dict) -> None:
+        if memory_id in self._deletes:
+            return
+        self._updates[memory_id] = metadata
+        if len(self) >= self.max_pending:
+            self.flush()
+
+    def pending(self, memory_id: str) -> dict | None:
+        """Väntande metadata för ett minne, om det uppdaterats i batchen."""
+        return self._updates.get(memory_id)
+
+    def delete(self, memory_ids) -> None:
+        for memory_id in memory_ids:
+            self._updates.pop(memory_id, None)
+            self._deletes[memory_id] = None
+        if len(self) >= self.max_pending:
+            self.flush()
+
+    def flush(self) -> None:
+        if not len(self):
+            return
+        updates, deletes = self._updates, list(self._deletes)
+        self._updates, self._deletes = {}, {}
+        if updates:
+            self.memory._apply_updates(list(updates), list(updates.values()))
+        if deletes:
+            self.memory._apply_deletes(deletes)
+        self.flushes += 1
+
+
+class BinaryMemoryLog:
+    """Kompakt binär persistens för fallback-backenden.
+
+    Tre filer bredvid `base`:
+    - <base>.<gen>.f16: append-only segment med råa embeddings i disk_dtype
+      (en rad per tillagt minne, läses via np.memmap; suffixet är historiskt)
+    - <base>.<gen>.meta.jsonl: metadata-logg med add/upd/del-poster
+    - <base>.header.json: dim, aktuell generation, giltiga längder,
+      räknare och körda migreringar — skrivs atomiskt sist, så en
+      avbruten save ignoreras
+
+    save() skriver bara ändringar sedan förra save. När loggen eller
+    segmentet domineras av döda/inaktuella poster skrivs en ny generation
+    med bara levande minnen (kompaktering) och headern pekas om.
+
+    Flera instanser (trådar eller processer) kan dela samma bas: load,
+    save och compact håller ett exklusivt fillås (<base>.lock), läser om
+    headern och spelar först upp andras poster i lagret (sync), så att
+    append sker vid offseten på disk och en kompaktering aldrig skriver
+    över andras minnen.
+    """
+
+    VERSION = 1
+
+    def __init__(self, base_path: str, disk_dtype: str = "float32"):
+        self.base = base_path
+        self.header_path = f"{base_path}.header.json"
+        self.lock_path = f"{base_path}.lock"
+        self.disk_dtype = np.dtype(disk_dtype)
+        self.generation = 0
+        self.dim: int | None = None
+        self.segment_rows = 0
+        self.log_size = 0
+        self.log_records = 0
+        self.dead_rows = 0
+        self._persisted: set[str] = set()
+        self._pending_add: dict[str, None] = {}
+        self._pending_update: dict[str, None] = {}
+        self._pending_delete: dict[str, None] = {}
+        self._force_compact = False
+        # Engångsmigreringar som körts mot basen (se EbbinghausMemory.mark_migrated)
+        self.migrations: set[str] = set()
+
+    def _paths(self, generation: int) -> tuple[str, str]:
+        return f"{self.base}.{generation}.f16", f"{self.base}.{generation}.meta.jsonl"
+
+    def exists(self) -> bool:
+        return os.path.exists(self.header_path)
+
+    @property
+    def dirty(self) -> bool:
+        return bool(self._pending_add or self._pending_update or self._pending_delete)
+
+    def request_compaction(self) -> None:
+        """Nästa save skriver en ny generation (t.ex. efter misslyckad load)."""
+        self._force_compact = True
+
+    # ── Journal (anropas av MatrixMemoryStore) ──
+
+    def record_add(self, memory_id: str) -> None:
+        self._pending_delete.pop(memory_id, None)
+        self._pending_add[memory_id] = None
+
+    def record_update(self, memory_id: str) -> None:
+        if memory_id not in self._pending_add:
+            self._pending_update[memory_id] = None
+
+    def record_delete(self, memory_id: str) -> None:
+        self._pending_add.pop(memory_id, None)
+        self._pending_update.pop(memory_id, None)
+        if memory_id in self._persisted:
+            self._pending_delete[memory_id] = None
+
+    # ── Läs ──
+
+    def _read_header(self) -> dict | None:
+        if not os.path.exists(self.header_path):
+            return None
+        with open(self.header_path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _read_records(self, generation: int, start: int, end: int) -> list[dict]:
+        """Loggposter mellan två byte-offsets i en generation."""
+        if end <= start:
+            return []
+        with open(self._paths(generation)[1], "rb") as f:
+            f.seek(start)
+            data = f.read(end - start)
+        return [json.loads(line) for line in data.decode("utf-8").splitlines() if line.strip()]
+
+    def load(self) -> tuple[list[str], np.ndarray, list[dict], dict]:
+        """Läs (ids, embeddings, metadatas, counters) i insättningsordning.
+
+        Embeddings läses från ett memory-mappat segment.
+        """
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with file_lock(self.lock_path):
+            return self._load()
+
+    def _load(self) -> tuple[list[str], np.ndarray, list[dict], dict]:
+        header = self._read_header()
+        self.generation = header["generation"]
+        self.dim = header["dim"]
+        self.disk_dtype = np.dtype(header.get("dtype", "float16"))
+        self.segment_rows = header["segment_rows"]
+        self.log_size = header["log_size"]
+        self.dead_rows = header.get("dead_rows", 0)
+        self.migrations.update(header.get("migrations", []))
+        seg_path, log_path = self._paths(self.generation)
+
+        # Kapa bort svansar från en avbruten save
+        row_bytes = (self.dim or 0) * self.disk_dtype.itemsize
+        for path, size in ((seg_path, self.segment_rows * row_bytes), (log_path, self.log_size)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+
+        entries: dict[str, list] = {}
+        self.log_records = 0
+        if self.log_size:
+            with open(log_path, "r", encoding="utf-8") as f:
+                for line in f:
+                    rec = json.loads(line)
+                    self.log_records += 1
+                    op = rec["op"]
+                    if op == "add":
+                        entries[rec["id"]] = [rec["row"], rec["meta"]]
+                    elif op == "upd" and rec["id"] in entries:
+                        entries[rec["id"]][1] = rec["meta"]
+                    elif op == "del":
+                        for memory_id in rec["ids"]:
+                            entries.pop(memory_id, None)
+
+        ids = list(entries)
+        self._persisted = set(ids)
+        metas = [entries[m][1] for m in ids]
+        embeddings = self._read_rows(self.generation, self.segment_rows, [entries[m][0] for m in ids])
+        return ids, embeddings, metas, header.get("counters", {})
+
+    def _read_rows(self, generation: int, segment_rows: int, rows: list[int]) -> np.ndarray:
+        if not rows or not self.dim:
+            return np.zeros((0, self.dim or 0), dtype=self.disk_dtype)
+        seg = np.memmap(self._paths(generation)[0], dtype=self.disk_dtype, mode="r",
+                        shape=(segment_rows, self.dim))
+        return np.array(seg[rows])
+
+    def sync(self, store: "MatrixMemoryStore") -> tuple[list[str], list[str]]:
+        """Spela upp poster som andra instanser skrivit sedan vi senast läste/skrev.
+
+        Anropas under fillåset. Egna väntande ändringar vinner över andras.
+        Returnerar (tillagda/uppdaterade id:n, borttagna id:n).
+        """
+        header = self._read_header()
+        if header is not None:
+            self.migrations.update(header.get("migrations", []))
+        if header is None or (header["generation"], header["log_size"]) == (self.generation, self.log_size):
+            return [], []
+        if self.dim is None:
+            self.dim = header["dim"]
+        if header["generation"] == self.generation:
+            records = self._read_records(self.generation, self.log_size, header["log_size"])
+            self.log_records += len(records)
+        else:
+            # Någon annan har kompakterat: nya generationen är hela sanningen
+            records = self._read_records(header["generation"], 0, header["log_size"])
+            self.log_records = len(records)
+            on_disk = {r["id"] for r in records if r["op"] == "add"}
+            records.append({"op": "del", "ids": list(self._persisted - on_disk)})
+        changed, removed = [], []
+        journal, store.journal = store.journal, None
+        try:
+            adds = [r for r in records if r["op"] == "add" and r["id"] not in self._pending_delete]
+            rows = self._read_rows(header["generation"], header["segment_rows"], [r["row"] for r in adds])
+            add_at = {r["id"]: i for i, r in enumerate(adds)}
+            for rec in records:
+                op = rec["op"]
+                if op == "add" and rec["id"] in add_at:
+                    memory_id = rec["id"]
+                    self._persisted.add(memory_id)
+                    if memory_id in store:
+                        if memory_id not in self._pending_update and memory_id not in self._pending_add:
+                            store.set_metadata(memory_id, rec["meta"])
+                    else:
+                        store.add(memory_id, rows[add_at[memory_id]], rec["meta"])
+                    changed.append(memory_id)
+                elif op == "upd" and rec["id"] in store and rec["id"] not in self._pending_update:
+                    store.set_metadata(rec["id"], rec["meta"])
+                    changed.append(rec["id"])
+                elif op == "del":
+                    gone = []
+                    for memory_id in rec["ids"]:
+                        self._persisted.discard(memory_id)
+                        if memory_id in self._pending_update:
+                            # Vi ändrade minnet efter att någon annan raderade det: skriv det på nytt
+                            del self._pending_update[memory_id]
+                            self._pending_add[memory_id] = None
+                        elif memory_id not in self._pending_add:
+                            gone.append(memory_id)
+                    removed.extend(m for m in gone if m in store)
+                    store.remove(gone)
+        finally:
+            store.journal = journal
+        self.generation = header["generation"]
+        self.segment_rows = header["segment_rows"]
+        self.log_size = header["log_size"]
+        self.dead_rows = header.get("dead_rows", 0)
+        return changed, removed
+
+    def refresh(self, store: "MatrixMemoryStore") -> tuple[list[str], list[str]]:
+        """sync() under fillåset, utan att skriva något."""
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with file_lock(self.lock_path):
+            return self.sync(store)
+
+    # ── Skriv ──
+
+    def save(self, store: "MatrixMemoryStore", counters: dict) -> tuple[list[str], list[str]]:
+        """Skriv ändringar sedan förra save (eller kompaktera).
+
+        Returnerar andra instansers ändringar som spelades upp (se sync).
+        """
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with file_lock(self.lock_path):
+            synced = self.sync(store)
+            self._save(store, counters)
+        return synced
+
+    def _save(self, store: "MatrixMemoryStore", counters: dict) -> None:
+        live = len(store)
+        if (self._force_compact or self.log_records > 4 * live + 1024
+                or self.dead_rows > max(live, 256)):
+            self._compact(store, counters)
+            return
+        if self.dim is None:
+            self.dim = store.dim
+        seg_path, log_path = self._paths(self.generation)
+        os.makedirs(os.path.dirname(seg_path) or ".", exist_ok=True)
+
+        added = [m for m in self._pending_add if m in store]
+        lines = []
+        if added:
+            emb = np.stack([store.get_embedding(m) for m in added]).astype(self.disk_dtype)
+            with open(seg_path, "ab") as f:
+                f.write(emb.tobytes())
+            for i, memory_id in enumerate(added):
+                lines.append({"op": "add", "id": memory_id, "row": self.segment_rows + i,
+                              "meta": store.get_metadata(memory_id)})
+            self.segment_rows += len(added)
+        for memory_id in self._pending_update:
+            if memory_id in store:
+                lines.append({"op": "upd", "id": memory_id, "meta": store.get_metadata(memory_id)})
+        if self._pending_delete:
+            lines.append({"op": "del", "ids": list(self._pending_delete)})
+            self.dead_rows += len(self._pending_delete)
+        if lines:
+            data = "".join(json.dumps(rec, ensure_ascii=False) + "\n" for rec in lines).encode("utf-8")
+            with open(log_path, "ab") as f:
+                f.write(data)
+            self.log_size += len(data)
+            self.log_records += len(lines)
+
+        self._persisted.update(added)
+        self._persisted.difference_update(self._pending_delete)
+        self._clear_pending()
+        self._write_header(counters)
+
+    def compact(self, store: "MatrixMemoryStore", counters: dict) -> tuple[list[str], list[str]]:
+        """Skriv en ny generation med bara levande minnen (även andra instansers)."""
+        os.makedirs(os.path.dirname(self.lock_path) or ".", exist_ok=True)
+        with file_lock(self.lock_path):
+            synced = self.sync(store)
+            self._compact(store, counters)
+        return synced
+
+    def _compact(self, store: "MatrixMemoryStore", counters: dict) -> None:
+        old_paths = self._paths(self.generation)
+        self.generation += 1
+        seg_path, log_path = self._paths(self.generation)
+        os.makedirs(os.path.dirname(seg_path) or ".", exist_ok=True)
+        items = store.items()
+        self.dim = store.dim
+        with open(seg_path, "wb") as f:
+            if items:
+                f.write(np.stack([emb for _, emb, _ in items]).astype(self.disk_dtype).tobytes())
+        lines = "".join(
+            json.dumps({"op": "add", "id": mem_id, "row": i, "meta": meta}, ensure_ascii=False) + "\n"
+            for i, (mem_id, _, meta) in enumerate(items)
+        ).encode("utf-8")
+        with open(log_path, "wb") as f:
+            f.write(lines)
+        self.segment_rows = len(items)
+        self.log_size = len(lines)
+        self.log_records = len(items)
+        self.dead_rows = 0
+        self._force_compact = False
+        self._persisted = {mem_id for mem_id, _, _ in items}
+        self._clear_pending()
+        self._write_header(counters)
+        for path in old_paths:
+            if os.path.exists(path):
+                os.remove(path)
+
+    def _clear_pending(self) -> None:
+        self._pending_add.clear()
+        self._pending_update.clear()
+        self._pending_delete.clear()
+
+    def _write_header(self, counters: dict) -> None:
+        tmp = f"{self.header_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "version": self.VERSION,
+                "generation": self.generation,
+                "dim": self.dim,
+                "dtype": self.disk_dtype.name,
+                "segment_rows": self.segment_rows,
+                "log_size": self.log_size,
+                "dead_rows": self.dead_rows,
+                "counters": counters,
+                "migrations": sorted(self.migrations),
+                "saved_at": time.time(),
+            }, f)
+        os.replace(tmp, self.header_path)
+
+
+class WriteBehindQueue:
+    """Begränsad skrivkö som en bakgrundstråd tömmer i batchar.
+
+    Minnen ligger kvar som "väntande" (kö eller under skrivning) tills
+    backenden bekräftat skrivningen, så att recall kan söka dem
+    (read-your-writes). Ändringar på minnen som redan skrivs sparas och
+    appliceras direkt efter skrivningen.
+
+    Backpressure när kön är full:
+    - "block": store() väntar tills bakgrundstråden gjort plats
+    - "drop_oldest": äldsta köade minnet släpps (räknas i `dropped`)
+    """
+
+    POLICIES = ("block", "drop_oldest")
+
+    def __init__(
+        self,
+        memory: "EbbinghausMemory",
+        maxsize: int = DEFAULT_WRITE_QUEUE_SIZE,
+        batch_size: int = DEFAULT_WRITE_BEHIND_BATCH,
+        backpressure: str = "block",
+    ):
+        if backpressure not in self.POLICIES:
+            raise ValueError(f"Okänd backpressure-policy: {backpressure} (välj {self.POLICIES})")
+        self.memory = memory
+        self.maxsize = max(1, maxsize)
+        self.batch_size = max(1, batch_size)
+        self.backpressure = backpressure
+        self._cond = threading.Condition()
+        self._queued: OrderedDict[str, tuple[np.ndarray, dict]] = OrderedDict()
+        self._inflight: dict[str, tuple[np.ndarray, dict]] = {}
+        self._late_updates: dict[str, dict] = {}
+        self._late_deletes: set[str] = set()
+        self._closed = False
+        self.written = 0
+        self.batches = 0
+        self.dropped = 0
+        self.errors = 0
+        self._thread = threading.Thread(target=self._run, name="memory-write-behind", daemon=True)
+        self._thread.start()
+
+    def __len__(self) -> int:
+        with self._cond:
+            return len(self._queued) + len(self._inflight)
+
+    def put(self, memory_id: str, embedding: np.ndarray, metadata: dict) -> str | None:
+        """Köa ett minne. Returnerar id för ett släppt minne (drop_oldest) eller None."""
+        dropped = None
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("Skrivkön är stängd")
+            while len(self._queued) >= self.maxsize:
+                if self.backpressure == "drop_oldest":
+                    dropped, _ = self._queued.popitem(last=False)
+                    self.dropped += 1
+                    break
+                self._cond.wait()
+            self._queued[memory_id] = (embedding, metadata)
+            self._cond.notify_all()
+        return dropped
+
+    def snapshot(self) -> list[tuple[str, np.ndarray, dict]]:
+        """Alla väntande minnen (köade och under skrivning)."""
+        with self._cond:
+            pending = list(self._inflight.items()) + list(self._queued.items())
+        return [(memory_id, emb, meta) for memory_id, (emb, meta) in pending]
+
+    def amend(self, memory_id: str, metadata: dict) -> bool:
+        """Ersätt metadata för ett väntande minne. False om det redan skrivits."""
+        with self._cond:
+            if memory_id in self._queued:
+                self._queued[memory_id] = (self._queued[memory_id][0], metadata)
+                return True
+            if memory_id in self._inflight:
+                self._inflight[memory_id] = (self._inflight[memory_id][0], metadata)
+                self._late_updates[memory_id] = metadata
+                return True
+            return False
+
+    def cancel(self, memory_ids) -> set[str]:
+        """Stryk väntande minnen. Returnerar de id:n som fanns i kön."""
+        cancelled = set()
+        with self._cond:
+            for memory_id in memory_ids:
+                if self._queued.pop(memory_id, None) is not None:
+                    cancelled.add(memory_id)
+                elif memory_id in self._inflight:
+                    self._late_updates.pop(memory_id, None)
+                    self._late_deletes.add(memory_id)
+                    cancelled.add(memory_id)
+            self._cond.notify_all()
+        return cancelled
+
+    def flush(self, timeout: float | None = None) -> bool:
+        """Vänta tills kön är tom. False vid timeout."""
+        with self._cond:
+            return self._cond.wait_for(lambda: not self._queued and not self._inflight, timeout)
+
+    def close(self, timeout: float | None = None) -> None:
+        """Töm kön och stoppa bakgrundstråden."""
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join(timeout)
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                self._cond.wait_for(lambda: self._queued or self._closed)
+                if not self._queued:
+                    return
+                while self._queued and len(self._inflight) < self.batch_size:
+                    memory_id, item = self._queued.popitem(last=False)
+                    self._inflight[memory_id] = item
+                batch = [(memory_id, emb, meta) for memory_id, (emb, meta) in self._inflight.items()]
+                self._cond.notify_all()
+
+            self._write(batch)
+
+            with self._cond:
+                late_updates = {m: self._late_updates.pop(m) for m, _, _ in batch if m in self._late_updates}
+                late_deletes = [m for m, _, _ in batch if m in self._late_deletes]
+                self._late_deletes.difference_update(late_deletes)
+                self._inflight.clear()
+                self.written += len(batch)
+                self.batches += 1
+                self._cond.notify_all()
+
+            try:
+                if late_updates:
+                    self.memory._apply_updates(list(late_updates), list(late_updates.values()))
+                if late_deletes:
+                    self.memory._apply_deletes(late_deletes)
+            except Exception as e:
+                self.errors += 1
+                print(f"[memory] Warning: write-behind follow-up failed: {e}")
+
+    def _write(self, batch: list[tuple[str, np.ndarray, dict]]) -> None:
+        try:
+            self.memory._write_batch(batch)
+            return
+        except Exception:
+            if len(batch) == 1:
+                self.errors += 1
+                print(f"[memory] Warning: write-behind dropped {batch[0][0]}")
+                return
+        # Batchen misslyckades — skriv en i taget så att bara trasiga minnen tappas
+        for item in batch:
+            self._write([item])
+
+    def stats(self) -> dict:
+        return {
+            "pending": len(self),
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+            "errors": self.errors,
+            "backpressure": self.backpressure,
+        }
+
+
+def _synchronized(method):
+    """Kör metoden under minnets lås (skyddar mot write-behind-tråden)."""
+    @functools.wraps(method)
+    def wrapper(self, *args, **kwargs):
+        with self._lock:
+            return method(self, *args, **kwargs)
+    return wrapper
 
 
 class EbbinghausMemory:
@@ -49,7 +1073,31 @@ class EbbinghausMemory:
     
     Persistens:
     - ChromaDB: PersistentClient sparar till disk automatiskt
-    - Fallback: JSON-fil sparas periodiskt och vid garbage_collect
+    - Fallback: binärt (BinaryMemoryLog: embedding-segment + metadata-logg,
+      inkrementella saves) eller JSON (persist_format="json"). En befintlig
+      JSON-fil migreras automatiskt till binärt format vid start.
+
+    Fallback-backenden lagrar embeddings i en MatrixMemoryStore
+    (embedding_dtype: "float32", "float16" eller "int8" — se quantization.py).
+
+    Utgångstider (när retention korsar decay_threshold) hålls i ett
+    ExpiryIndex som uppdateras vid store/recall/update_metadata, så att
+    garbage_collect bara rör de minnen som faktiskt gått ut.
+
+    Med write_behind=True skrivs nya minnen via en WriteBehindQueue i
+    bakgrunden; close() (körs även vid processavslut) tömmer kön.
+
+    Med tiering=True delas minnena i nivåer efter retention:
+    - hot (R >= hot_threshold): backenden, det enda vanlig recall söker
+    - warm (decay_threshold <= R < hot_threshold): WarmTierStore (int8, mmap)
+    - cold (R < decay_threshold): ColdArchive i stället för att raderas
+    rebalance_tiers() (körs under sömnen) flyttar minnen nedåt;
+    deep_recall() söker alla nivåer och befordrar träffar till hot.
+
+    Med dedupe_threshold satt slår store() ihop nästan identiska minnen:
+    om närmaste heta minne har cosine-likhet >= tröskeln förstärks det
+    (som vid recall) och får den nya metadatan, i stället för att ett
+    nytt minne läggs till. merge_count räknar sammanslagningarna.
     """
 
     def __init__(
@@ -58,11 +1106,28 @@ class EbbinghausMemory:
         collection_name: str = "episodic_log",
         persist_dir: str | None = None,
         fallback_file: str | None = None,
+        embedding_dtype: str = "float32",
+        persist_format: str = "binary",
+        write_behind: bool = False,
+        write_queue_size: int = DEFAULT_WRITE_QUEUE_SIZE,
+        write_batch_size: int = DEFAULT_WRITE_BEHIND_BATCH,
+        backpressure: str = "block",
+        tiering: bool = False,
+        hot_threshold: float = 0.25,
+        dedupe_threshold: float | None = None,
     ):
         self.decay_threshold = decay_threshold
+        self.dedupe_threshold = dedupe_threshold
         self.collection_name = collection_name
-        self._fallback_file = fallback_file or _DEFAULT_FALLBACK_FILE
+        self._fallback_file = fallback_file or default_fallback_file(collection_name)
         self._persist_counter = 0
+        self._binlog: BinaryMemoryLog | None = None
+        self._lock = threading.RLock()
+        self._queue: WriteBehindQueue | None = None
+        self.hot_threshold = hot_threshold
+        self._warm: WarmTierStore | None = None
+        self._cold: ColdArchive | None = None
+        self._demote: ExpiryIndex | None = None
 
         if HAS_CHROMADB:
             chroma_dir = persist_dir or _DEFAULT_PERSIST_DIR
@@ -75,42 +1140,242 @@ class EbbinghausMemory:
             existing = self.collection.count()
             if existing > 0:
                 print(f"[memory] Loaded {existing} persistent memories from {chroma_dir}")
+            tier_base = os.path.join(chroma_dir, collection_name)
         else:
-            # In-memory fallback with JSON persistence
-            self.memories: list[dict] = []
-            self._load_fallback()
+            # In-memory fallback (kolumnärt matrisindex) med binär/JSON-persistens
+            self._store = MatrixMemoryStore(dtype=embedding_dtype)
+            if persist_format == "binary":
+                # Disk i lagrets precision: omladdning ger identiska resultat
+                # (int8 avkvantiseras exakt till float32)
+                disk_dtype = "float16" if self._store.dtype == np.float16 else "float32"
+                self._binlog = BinaryMemoryLog(os.path.splitext(self._fallback_file)[0], disk_dtype)
+            tier_base = os.path.splitext(self._fallback_file)[0]
+
+        if tiering:
+            self._warm = WarmTierStore(tier_base)
+            self._cold = ColdArchive(tier_base)
+            self._demote = ExpiryIndex()
 
         self.total_stored = 0
         self.total_recalled = 0
         self.total_decayed = 0
+        self.total_demoted = 0
+        self.total_archived = 0
+        self.total_promoted = 0
+        self.total_merged = 0
+
+        # Körda engångsmigreringar (delas med binärloggen när den finns)
+        self.migrations: set[str] = self._binlog.migrations if self._binlog is not None else set()
+        if HAS_CHROMADB:
+            marker = (self.collection.metadata or {}).get("migrations", "")
+            self.migrations.update(m for m in marker.split(",") if m)
+        else:
+            self._load_fallback()
+
+        self._expiry = ExpiryIndex()
+        self._rebuild_expiry()
+        self._batch: MetadataWriteBatch | None = None
+
+        if write_behind:
+            self._queue = WriteBehindQueue(self, write_queue_size, write_batch_size, backpressure)
+            atexit.register(self.close)
+
+    def _counters(self) -> dict:
+        return {
+            "total_stored": self.total_stored,
+            "total_recalled": self.total_recalled,
+            "total_decayed": self.total_decayed,
+            "total_demoted": self.total_demoted,
+            "total_archived": self.total_archived,
+            "total_promoted": self.total_promoted,
+            "total_merged": self.total_merged,
+        }
 
     def _load_fallback(self) -> None:
+        """Load memories from binary log, or JSON file (migrated to binary)."""
+        if self._binlog is not None and self._binlog.exists():
+            self._load_binary()
+        else:
+            self._load_json()
+            if self._binlog is not None and len(self._store):
+                self._migrate_json()
+        if self._binlog is not None:
+            self._store.journal = self._binlog
+
+    def _load_binary(self) -> None:
+        try:
+            ids, embeddings, metadatas, counters = self._binlog.load()
+            self._store.add_many(ids, embeddings, metadatas)
+            self.total_stored = counters.get("total_stored", len(ids))
+            self.total_recalled = counters.get("total_recalled", 0)
+            self.total_decayed = counters.get("total_decayed", 0)
+            self.total_demoted = counters.get("total_demoted", 0)
+            self.total_archived = counters.get("total_archived", 0)
+            self.total_promoted = counters.get("total_promoted", 0)
+            self.total_merged = counters.get("total_merged", 0)
+            print(f"[memory] Loaded {len(self._store)} memories from {self._binlog.header_path}")
+        except Exception as e:
+            print(f"[memory] Warning: Could not load {self._binlog.header_path}: {e}")
+            self._store = MatrixMemoryStore(dtype=self._store.dtype)
+            self._binlog.request_compaction()
+
+    def _migrate_json(self) -> None:
+        """Skriv JSON-minnen som binär generation och byt namn på JSON-filen."""
+        try:
+            self._binlog.compact(self._store, self._counters())
+            os.replace(self._fallback_file, self._fallback_file + ".migrated")
+            print(f"[memory] Migrated {len(self._store)} memories to {self._binlog.header_path}")
+        except Exception as e:
+            print(f"[memory] Warning: Could not migrate {self._fallback_file}: {e}")
+
+    def _load_json(self) -> None:
         """Load memories from JSON fallback file."""
         if os.path.exists(self._fallback_file):
             try:
                 with open(self._fallback_file, "r", encoding="utf-8") as f:
                     data = json.load(f)
-                self.memories = data.get("memories", [])
-                self.total_stored = data.get("total_stored", len(self.memories))
+                memories = data.get("memories", [])
+                skipped = 0
+                for mem in memories:
+                    try:
+                        self._store.add(mem["id"], _prepare_embedding(mem["embedding"]), mem["metadata"])
+                    except ValueError:
+                        skipped += 1
+                self.total_stored = data.get("total_stored", len(memories))
                 self.total_recalled = data.get("total_recalled", 0)
                 self.total_decayed = data.get("total_decayed", 0)
-                print(f"[memory] Loaded {len(self.memories)} memories from {self._fallback_file}")
+                self.migrations.update(data.get("migrations", []))
+                print(f"[memory] Loaded {len(self._store)} memories from {self._fallback_file}")
+                if skipped:
+                    print(f"[memory] Warning: skipped {skipped} memories with mismatched embedding dimension")
             except Exception as e:
                 print(f"[memory] Warning: Could not load {self._fallback_file}: {e}")
-                self.memories = []
+                self._store = MatrixMemoryStore(dtype=self._store.dtype)
+
+    def _rebuild_expiry(self) -> None:
+        """Bygg utgångsindexet från lagrade minnen (en gång vid start)."""
+        try:
+            for mem_id, meta in self.iter_metadata():
+                self._track(mem_id, meta)
+        except Exception as e:
+            print(f"[memory] Warning: Could not build expiry index: {e}")
+
+    def _track(self, memory_id: str, metadata: dict) -> None:
+        self._expiry.set(memory_id, expiry_time(metadata, self.decay_threshold))
+        if self._demote is not None:
+            self._demote.set(memory_id, expiry_time(metadata, self.hot_threshold))
 
+    def _untrack(self, memory_id: str) -> None:
+        self._expiry.discard(memory_id)
+        if self._demote is not None:
+            self._demote.discard(memory_id)
+
+    def _evict_expired(self, now: float) -> int:
+        """Ta bort minnen vars utgångstid passerat — O(k log n)."""
+        expired = self._still_expired(self._expiry.pop_expired(now), now)
+        if not expired:
+            return 0
+        cancelled = self._queue.cancel(expired) if self._queue is not None else set()
+        if cancelled:
+            expired = [m for m in expired if m not in cancelled]
+        if self._cold is not None and expired:
+            # Nivåindelning: utgångna minnen arkiveras i stället för att raderas
+            archived = self._fetch_hot(expired)
+            self._cold.append(archived)
+            self.total_archived += len(archived)
+        if HAS_CHROMADB:
+            try:
+                if expired:
+                    self.collection.delete(ids=expired)
+            except Exception:
+                return 0
+            removed = len(expired) + len(cancelled)
+        else:
+            removed = self._store.remove(expired) + len(cancelled)
+        self.total_decayed += removed
+        return removed
+
+    def _still_expired(self, candidates: list[str], now: float) -> list[str]:
+        """Räkna om retention från aktuell metadata innan något raderas.
+
+        Utgångsindexet bygger på metadata vi själva sett — en annan instans
+        (eller process mot samma Chroma-katalog) kan ha förstärkt minnet
+        sedan dess. Överlevare läggs tillbaka med sin nya utgångstid.
+        """
+        if not candidates:
+            return []
+        try:
+            current = self._current_metadata(candidates)
+        except Exception:
+            return candidates  # Backenden svarar inte: lita på indexet
+        expired = []
+        for memory_id in candidates:
+            meta = current.get(memory_id)
+            if meta is None:
+                self._untrack(memory_id)  # Redan borttaget av någon annan
+            elif expiry_time(meta, self.decay_threshold) < now:
+                self._untrack(memory_id)
+                expired.append(memory_id)
+            else:
+                self._track(memory_id, meta)
+        return expired
+
+    def _current_metadata(self, memory_ids: list[str]) -> dict[str, dict]:
+        """Senaste metadata per id: skrivkö och öppen batch före backenden."""
+        current = {}
+        if self._queue is not None:
+            wanted = set(memory_ids)
+            current.update((m, meta) for m, _, meta in self._queue.snapshot() if m in wanted)
+        rest = [m for m in memory_ids if m not in current]
+        if rest and HAS_CHROMADB:
+            data = self.collection.get(ids=rest, include=["metadatas"])
+            current.update(zip(data["ids"], data["metadatas"]))
+        elif rest:
+            if self._binlog is not None:
+                self._apply_sync(*self._binlog.refresh(self._store))
+            for memory_id in rest:
+                meta = self._store.get_metadata(memory_id)
+                if meta is not None:
+                    current[memory_id] = meta
+        if self._batch is not None:
+            for memory_id in list(current):
+                pending = self._batch.pending(memory_id)
+                if pending is not None:
+                    current[memory_id] = pending
+        return current
+
+    def _apply_sync(self, changed: list[str], removed: list[str]) -> None:
+        """Minnen som andra instanser skrivit/ändrat/raderat ska också åldras här."""
+        for memory_id in changed:
+            meta = self._store.get_metadata(memory_id)
+            if meta is not None:
+                self._track(memory_id, meta)
+        for memory_id in removed:
+            self._untrack(memory_id)
+
+    @_synchronized
     def _save_fallback(self) -> None:
-        """Save memories to JSON fallback file."""
+        """Save memories (incremental binary append, or full JSON rewrite)."""
         if HAS_CHROMADB:
             return  # ChromaDB handles its own persistence
+        if self._binlog is not None:
+            try:
+                synced = self._binlog.save(self._store, self._counters())
+            except Exception as e:
+                print(f"[memory] Warning: Could not save {self._binlog.header_path}: {e}")
+                return
+            self._apply_sync(*synced)
+            return
         try:
             os.makedirs(os.path.dirname(self._fallback_file), exist_ok=True)
             with open(self._fallback_file, "w", encoding="utf-8") as f:
                 json.dump({
-                    "memories": self.memories,
-                    "total_stored": self.total_stored,
-                    "total_recalled": self.total_recalled,
-                    "total_decayed": self.total_decayed,
+                    "memories": [
+                        {"id": mem_id, "embedding": emb.tolist(), "metadata": meta}
+                        for mem_id, emb, meta in self._store.items()
+                    ],
+                    **self._counters(),
+                    "migrations": sorted(self.migrations),
                     "saved_at": time.time(),
                 }, f, ensure_ascii=False)
         except Exception as e:
@@ -131,7 +1396,6 @@ class EbbinghausMemory:
         Returns:
             retention: Värde mellan 0 och 1
         """
-        STRENGTH_SCALE = 3600  # 1 strength-enhet = 1 timme
         if strength <= 0:
             return 0.0
         return math.exp(-time_elapsed / max(strength * STRENGTH_SCALE, 0.01))
@@ -143,6 +1407,11 @@ class EbbinghausMemory:
         metadata: dict | None = None,
     ) -> str:
         """Spara ett nytt episodiskt minne.
+
+        I write-behind-läge läggs minnet i skrivkön och skrivs av en
+        bakgrundstråd; recall ser det ändå direkt (read-your-writes).
+        Med dedupe_threshold kan minnet i stället slås ihop med ett
+        befintligt nästan identiskt minne (se _merge_duplicate).
         
         Args:
             embedding: Vektorrepresentation (t.ex. hypervektor)
@@ -150,16 +1419,11 @@ class EbbinghausMemory:
             metadata: Extra metadata
             
         Returns:
-            memory_id: Unikt ID för minnet
+            memory_id: Unikt ID för minnet (det befintliga vid sammanslagning)
         """
-        if isinstance(embedding, np.ndarray):
-            embedding = embedding.tolist()
-
         # Begränsa dimensionalitet för ChromaDB (max ~2000 dims effektivt)
-        if len(embedding) > 1024:
-            # Subsampla jämnt fördelat
-            indices = np.linspace(0, len(embedding) - 1, 1024, dtype=int)
-            embedding = [embedding[i] for i in indices]
+        # Subsampla jämnt fördelat
+        embedding = _prepare_embedding(embedding)
 
         now = time.time()
         memory_id = f"mem_{now}_{self.total_stored}"
@@ -174,61 +1438,285 @@ class EbbinghausMemory:
         if metadata:
             mem_metadata.update(metadata)
 
-        if HAS_CHROMADB:
-            self.collection.add(
-                embeddings=[embedding],
-                metadatas=[mem_metadata],
-                ids=[memory_id],
-            )
+        if self.dedupe_threshold is not None:
+            merged_id = self._merge_duplicate(embedding, mem_metadata, now)
+            if merged_id is not None:
+                return merged_id
+
+        if self._queue is not None:
+            with self._lock:
+                self._track(memory_id, mem_metadata)
+            dropped = self._queue.put(memory_id, embedding, mem_metadata)
+            if dropped is not None:
+                with self._lock:
+                    self._expiry.discard(dropped)
         else:
-            self.memories.append({
-                "id": memory_id,
-                "embedding": embedding,
-                "metadata": mem_metadata,
-            })
+            self._write_batch([(memory_id, embedding, mem_metadata)])
+            with self._lock:
+                self._track(memory_id, mem_metadata)
 
         self.total_stored += 1
+        return memory_id
 
-        # Periodic persistence (every 50 stores)
-        self._persist_counter += 1
-        if self._persist_counter % 50 == 0:
-            self._save_fallback()
+    def store_many(self, items) -> list[str]:
+        """Spara flera minnen: items är (embedding, concept, metadata)-tupler.
 
-        return memory_id
+        Ger MemoryClient en batchad store (en rundresa till minnestjänsten).
+        """
+        return [self.store(embedding, concept, metadata) for embedding, concept, metadata in items]
+
+    @_synchronized
+    def _merge_duplicate(self, embedding: np.ndarray, metadata: dict, now: float) -> str | None:
+        """Slå ihop ett nytt minne med närmaste heta minne om de är nästan lika.
+
+        Sammanslagningen följer spacing effect som recall (strength * 1.5,
+        last_access = nu, access_count + 1) men behåller den nya metadatan
+        och originalets timestamp. Returnerar id för det förstärkta minnet,
+        eller None om inget minne ligger över dedupe_threshold.
+        """
+        candidates = self._backend_candidates(embedding, 1, now)
+        if self._queue is not None:
+            candidates = self._merge_pending(candidates, embedding, 1, now)
+        if not candidates:
+            return None
+        distance, mem_id, old, _ = candidates[0]
+        if 1 - distance < self.dedupe_threshold:
+            return None
 
+        merged = {
+            **old,
+            **metadata,
+            "timestamp": old.get("timestamp", metadata["timestamp"]),
+            "strength": max(old.get("strength", 1.0) * 1.5, metadata["strength"]),
+            "access_count": old.get("access_count", 0) + 1,
+            "merge_count": old.get("merge_count", 0) + 1,
+        }
+        self.update_metadata(mem_id, merged)
+        self.total_merged += 1
+        return mem_id
+
+    def _write_batch(self, items: list[tuple[str, np.ndarray, dict]]) -> None:
+        """Skriv nya minnen till backenden (synkront eller från skrivkön)."""
+        ids = [memory_id for memory_id, _, _ in items]
+        metadatas = [meta for _, _, meta in items]
+        if HAS_CHROMADB:
+            self.collection.add(
+                embeddings=[emb.tolist() for _, emb, _ in items],
+                metadatas=metadatas,
+                ids=ids,
+            )
+        with self._lock:
+            if not HAS_CHROMADB:
+                if len(items) == 1:
+                    self._store.add(ids[0], items[0][1], metadatas[0])
+                else:
+                    self._store.add_many(ids, np.stack([emb for _, emb, _ in items]), metadatas)
+
+            # Periodic persistence (every 50 stores)
+            before = self._persist_counter
+            self._persist_counter += len(items)
+            if before // 50 != self._persist_counter // 50:
+                self._save_fallback()
+
+    @_synchronized
     def recall(
-        self, query_embedding: np.ndarray | list[float], n_results: int = 5
+        self,
+        query_embedding: np.ndarray | list[float],
+        n_results: int = 5,
+        where: dict | None = None,
     ) -> list[dict]:
         """Hämta relevanta minnen via vektorsökning.
         
         Vid recall förstärks minnet (spacing effect):
         S_{new} = S_{old} + 1
+
+        Recall ändrar inget utöver förstärkningen: minnen under
+        decay_threshold filtreras bort men ligger kvar tills
+        garbage_collect/NREM poppar utgångsindexet. Minnen som ännu
+        ligger i skrivkön söks också (read-your-writes).
+
+        Med where (ChromaDB-syntax, t.ex. {"category": "sorting"}) filtreras
+        kandidaterna före likhetsberäkningen: ChromaDB får filtret direkt,
+        fallback-backenden använder sina sekundärindex.
         
         Args:
             query_embedding: Sökvektor
             n_results: Max antal resultat
+            where: Metadata-filter (valfritt)
             
         Returns:
             results: Lista med {id, concept, strength, retention, distance}
         """
-        if isinstance(query_embedding, np.ndarray):
-            query_embedding = query_embedding.tolist()
-
-        if len(query_embedding) > 1024:
-            indices = np.linspace(0, len(query_embedding) - 1, 1024, dtype=int)
-            query_embedding = [query_embedding[i] for i in indices]
+        query_embedding = _prepare_embedding(query_embedding)
 
         now = time.time()
+        candidates = self._backend_candidates(query_embedding, n_results, now, where)
+        if self._queue is not None:
+            candidates = self._merge_pending(candidates, query_embedding, n_results, now, where)
+
+        results = self._strengthen([(*c, "hot", None) for c in candidates], now)
+        self.total_recalled += len(results)
+        return results
+
+    def _strengthen(self, hits: list[tuple], now: float) -> list[dict]:
+        """Förstärk träffar (spacing effect) och bygg resultatlistan.
+
+        hits: (distance, id, metadata, retention, tier, embedding). Träffar
+        från warm/cold befordras till hot med sin embedding.
+        """
         results = []
+        promoted = []
+        # En bulk-update för alla träffar i stället för en per minne
+        with self.batched_writes():
+            for distance, mem_id, meta, ret, tier, emb in hits:
+                # Förstärk minnet (spacing effect — multiplikativ)
+                new_strength = meta.get("strength", 1.0) * 1.5
+                new_meta = {
+                    **meta,
+                    "strength": new_strength,
+                    "last_access": now,
+                    "access_count": meta.get("access_count", 0) + 1,
+                }
+                if tier == "hot":
+                    self.update_metadata(mem_id, new_meta)
+                else:
+                    promoted.append((mem_id, emb, new_meta))
+
+                result = {
+                    "id": mem_id,
+                    "concept": meta.get("concept", "unknown"),
+                    "strength": new_strength,
+                    "retention": ret,
+                    "distance": distance,
+                }
+                if self._warm is not None:
+                    result["tier"] = tier
+                results.append(result)
+
+        if promoted:
+            self._write_batch(promoted)
+            for mem_id, _, new_meta in promoted:
+                self._track(mem_id, new_meta)
+            self.total_promoted += len(promoted)
+        return results
+
+    @_synchronized
+    def deep_recall(
+        self,
+        query_embedding: np.ndarray | list[float],
+        n_results: int = 5,
+        where: dict | None = None,
+    ) -> list[dict]:
+        """Recall över alla nivåer (hot, warm, cold).
+
+        Dyrare än recall: varm nivå avkvantiseras och kall nivå strömmas
+        från disk. Träffar i warm/cold befordras tillbaka till hot.
+        Utan tiering är det samma sak som recall. where filtrerar alla nivåer.
+        """
+        if self._warm is None:
+            return self.recall(query_embedding, n_results, where)
+        query_embedding = _prepare_embedding(query_embedding)
+        now = time.time()
+        hits = [(*c, "hot", None) for c in self._backend_candidates(query_embedding, n_results, now, where)]
+        if self._queue is not None:
+            hits = [(*c, "hot", None) for c in self._merge_pending(
+                [h[:4] for h in hits], query_embedding, n_results, now, where)]
+        predicate = (lambda meta: matches_where(meta, where)) if where else None
+        for mem_id, sim, meta in self._warm.search(query_embedding, n_results, predicate):
+            ret = self.retention(now - meta.get("last_access", now), meta.get("strength", 1.0))
+            hits.append((1 - sim, mem_id, meta, ret, "warm", None))
+        for mem_id, sim, meta, emb in self._cold.search(query_embedding, n_results, predicate):
+            ret = self.retention(now - meta.get("last_access", now), meta.get("strength", 1.0))
+            hits.append((1 - sim, mem_id, meta, ret, "cold", emb))
+        hits.sort(key=lambda h: h[0])
+        hits = hits[:n_results]
+
+        # Plocka ut embeddings för befordran
+        resolved = []
+        cold_ids = []
+        for distance, mem_id, meta, ret, tier, emb in hits:
+            if tier == "warm":
+                emb = self._warm.pop(mem_id)[0]
+            elif tier == "cold":
+                cold_ids.append(mem_id)
+            resolved.append((distance, mem_id, meta, ret, tier, emb))
+        if cold_ids:
+            self._cold.remove(cold_ids)
+
+        results = self._strengthen(resolved, now)
+        self.total_recalled += len(results)
+        self._warm.save()
+        return results
+
+    def _fetch_hot(self, memory_ids: list[str]) -> list[tuple[str, np.ndarray, dict]]:
+        """(id, embedding, metadata) för minnen i hot-backenden."""
+        if not memory_ids:
+            return []
+        if HAS_CHROMADB:
+            data = self.collection.get(ids=list(memory_ids), include=["embeddings", "metadatas"])
+            return [
+                (mem_id, np.asarray(emb, dtype=np.float32), meta)
+                for mem_id, emb, meta in zip(data["ids"], data["embeddings"], data["metadatas"])
+            ]
+        return [
+            (mem_id, np.array(self._store.get_embedding(mem_id)), self._store.get_metadata(mem_id))
+            for mem_id in memory_ids if mem_id in self._store
+        ]
+
+    def rebalance_tiers(self, now: float | None = None) -> dict:
+        """Flytta minnen nedåt: hot → warm → cold (körs under sömnen).
+
+        hot → warm: retention under hot_threshold (poppas ur ett eget
+        utgångsindex). warm → cold: retention under decay_threshold.
+        Utgångna hot-minnen arkiveras direkt i cold.
+        """
+        if self._warm is None:
+            return {"demoted": 0, "archived": 0}
+        # Väntande skrivningar måste ligga i backenden innan de kan flyttas
+        self.flush()
+        with self._lock:
+            now = time.time() if now is None else now
+            archived_before = self.total_archived
+            self._evict_expired(now)
 
+            demote_ids = [m for m in self._demote.pop_expired(now) if m not in self._pending_ids()]
+            moved = self._fetch_hot(demote_ids)
+            for mem_id, emb, meta in moved:
+                self._warm.add(mem_id, emb, meta)
+                self._expiry.discard(mem_id)
+            if moved:
+                self._apply_deletes([mem_id for mem_id, _, _ in moved])
+            self.total_demoted += len(moved)
+
+            to_cold = self._warm.expired(now, self.decay_threshold, STRENGTH_SCALE)
+            items = []
+            for mem_id in to_cold:
+                emb, meta = self._warm.pop(mem_id)
+                items.append((mem_id, emb, meta))
+            self._cold.append(items)
+            self.total_archived += len(items)
+
+            self._warm.save()
+            self._save_fallback()
+            return {"demoted": len(moved), "archived": self.total_archived - archived_before}
+
+    def _pending_ids(self) -> set[str]:
+        return {m for m, _, _ in self._queue.snapshot()} if self._queue is not None else set()
+
+    def _backend_candidates(
+        self, query_embedding: np.ndarray, n_results: int, now: float, where: dict | None = None
+    ) -> list[tuple[float, str, dict, float]]:
+        """Top-n ej utgångna träffar i backenden som (distance, id, metadata, retention)."""
+        candidates = []
         if HAS_CHROMADB:
             try:
                 count = self.collection.count()
                 if count == 0:
                     return []
                 query_results = self.collection.query(
-                    query_embeddings=[query_embedding],
+                    query_embeddings=[query_embedding.tolist()],
                     n_results=min(n_results, count),
+                    **({"where": _chroma_where(where)} if where else {}),
                 )
             except Exception:
                 return []
@@ -240,118 +1728,181 @@ class EbbinghausMemory:
 
                     # Beräkna retention
                     time_elapsed = now - meta.get("last_access", now)
-                    strength = meta.get("strength", 1.0)
-                    ret = self.retention(time_elapsed, strength)
-
+                    ret = self.retention(time_elapsed, meta.get("strength", 1.0))
                     if ret >= self.decay_threshold:
-                        # Förstärk minnet (spacing effect — multiplikativ)
-                        new_strength = strength * 1.5
-                        self.collection.update(
-                            ids=[mem_id],
-                            metadatas=[{
-                                **meta,
-                                "strength": new_strength,
-                                "last_access": now,
-                                "access_count": meta.get("access_count", 0) + 1,
-                            }],
-                        )
-
-                        results.append({
-                            "id": mem_id,
-                            "concept": meta.get("concept", "unknown"),
-                            "strength": new_strength,
-                            "retention": ret,
-                            "distance": distance,
-                        })
-
+                        candidates.append((distance, mem_id, meta, ret))
         else:
-            # In-memory fallback med enkel cosine similarity
-            if not self.memories:
-                return []
+            # In-memory fallback: (indexfilter +) en matmul + retention-mask + argpartition
+            rows = self._store.filter_rows(where) if where else None
+            for row, sim, ret in self._store.search(
+                query_embedding, n_results, now, self.decay_threshold, rows
+            ):
+                candidates.append((1 - sim, self._store.row_id(row), self._store.row_metadata(row), ret))
+        return candidates
 
-            query_vec = np.array(query_embedding)
-            scored = []
-            for mem in self.memories:
-                mem_vec = np.array(mem["embedding"])
-                # Cosine similarity
-                dot = np.dot(query_vec, mem_vec)
-                norm = np.linalg.norm(query_vec) * np.linalg.norm(mem_vec)
-                sim = dot / max(norm, 1e-10)
-
-                meta = mem["metadata"]
-                time_elapsed = now - meta.get("last_access", now)
-                strength = meta.get("strength", 1.0)
-                ret = self.retention(time_elapsed, strength)
-
-                if ret >= self.decay_threshold:
-                    scored.append((sim, mem, ret))
-
-            scored.sort(key=lambda x: x[0], reverse=True)
-            for sim, mem, ret in scored[:n_results]:
-                meta = mem["metadata"]
-                meta["strength"] = meta["strength"] * 1.5
-                meta["last_access"] = now
-                meta["access_count"] = meta.get("access_count", 0) + 1
-
-                results.append({
-                    "id": mem["id"],
-                    "concept": meta.get("concept", "unknown"),
-                    "strength": meta["strength"],
-                    "retention": ret,
-                    "distance": 1 - sim,
-                })
+    def _merge_pending(
+        self,
+        candidates: list[tuple[float, str, dict, float]],
+        query_embedding: np.ndarray,
+        n_results: int,
+        now: float,
+        where: dict | None = None,
+    ) -> list[tuple[float, str, dict, float]]:
+        """Slå ihop backend-träffar med minnen som ännu ligger i skrivkön."""
+        pending = [
+            (mem_id, emb, meta) for mem_id, emb, meta in self._queue.snapshot()
+            if len(emb) == len(query_embedding) and (not where or matches_where(meta, where))
+        ]
+        if not pending:
+            return candidates
+        q = np.asarray(query_embedding, dtype=np.float64)
+        emb = np.stack([e for _, e, _ in pending]).astype(np.float64)
+        sims = emb @ q / np.maximum(np.linalg.norm(emb, axis=1) * np.linalg.norm(q), 1e-10)
+        for (mem_id, _, meta), sim in zip(pending, sims):
+            ret = self.retention(now - meta.get("last_access", now), meta.get("strength", 1.0))
+            if ret >= self.decay_threshold:
+                candidates.append((1 - float(sim), mem_id, meta, ret))
 
-        self.total_recalled += len(results)
-        return results
+        # Stabil sortering; ett minne kan synas både i kön och i backenden
+        merged, seen = [], set()
+        for cand in sorted(candidates, key=lambda c: c[0]):
+            if cand[1] not in seen:
+                seen.add(cand[1])
+                merged.append(cand)
+        return merged[:n_results]
 
+    @_synchronized
     def garbage_collect(self) -> int:
         """Rensa minnen med låg retention (Ebbinghaus decay).
-        
+
+        Poppar bara utgångna minnen ur utgångsindexet (O(k log n)) i
+        stället för att räkna om retention för hela samlingen.
+
         Returns:
             removed: Antal borttagna minnen
         """
-        now = time.time()
-        removed = 0
+        removed = self._evict_expired(time.time())
+        if removed > 0:
+            self._save_fallback()
+        return removed
+
+    @_synchronized
+    def iter_metadata(self) -> list[tuple[str, dict]]:
+        """Alla minnen som (id, metadata) — för konsolidering under sömn.
 
+        Inkluderar minnen som ännu ligger i skrivkön.
+        """
         if HAS_CHROMADB:
+            all_data = self.collection.get(include=["metadatas"])
+            items = list(zip(all_data["ids"], all_data["metadatas"])) if all_data and all_data["ids"] else []
+        else:
+            items = [(mem_id, meta) for mem_id, _, meta in self._store.items()]
+        if self._queue is not None:
+            seen = {mem_id for mem_id, _ in items}
+            items.extend((m, meta) for m, _, meta in self._queue.snapshot() if m not in seen)
+        return items
+
+    @contextmanager
+    def batched_writes(self, max_pending: int = DEFAULT_WRITE_BATCH):
+        """Köa update_metadata/delete och skriv dem som bulk-anrop.
+
+        Flushas när blocket lämnas eller när max_pending skrivningar väntar.
+        Nästlade block delar den yttersta batchen.
+        """
+        with self._lock:
+            if self._batch is not None:
+                yield self._batch
+                return
+            self._batch = MetadataWriteBatch(self, max_pending)
             try:
-                all_data = self.collection.get()
-            except Exception:
-                return 0
+                yield self._batch
+            finally:
+                batch, self._batch = self._batch, None
+                batch.flush()
 
-            if all_data and all_data["ids"]:
-                ids_to_remove = []
-                for i, mem_id in enumerate(all_data["ids"]):
-                    meta = all_data["metadatas"][i]
-                    time_elapsed = now - meta.get("last_access", now)
-                    strength = meta.get("strength", 1.0)
-                    ret = self.retention(time_elapsed, strength)
+    @_synchronized
+    def update_metadata(self, memory_id: str, metadata: dict) -> None:
+        """Ersätt metadata för ett minne (köas om en batch är öppen)."""
+        if self._queue is not None and self._queue.amend(memory_id, metadata):
+            self._track(memory_id, metadata)
+            return
+        if not HAS_CHROMADB and memory_id not in self._store:
+            return
+        self._track(memory_id, metadata)
+        if self._batch is not None:
+            self._batch.update(memory_id, metadata)
+        else:
+            self._apply_updates([memory_id], [metadata])
 
-                    if ret < self.decay_threshold:
-                        ids_to_remove.append(mem_id)
+    @_synchronized
+    def delete(self, memory_ids: list[str]) -> None:
+        """Ta bort minnen utan att räkna dem som decay."""
+        if not memory_ids:
+            return
+        for memory_id in memory_ids:
+            self._untrack(memory_id)
+        if self._queue is not None:
+            cancelled = self._queue.cancel(memory_ids)
+            memory_ids = [m for m in memory_ids if m not in cancelled]
+            if not memory_ids:
+                return
+        if self._batch is not None:
+            self._batch.delete(memory_ids)
+        else:
+            self._apply_deletes(list(memory_ids))
 
-                if ids_to_remove:
-                    self.collection.delete(ids=ids_to_remove)
-                    removed = len(ids_to_remove)
+    @_synchronized
+    def _apply_updates(self, memory_ids: list[str], metadatas: list[dict]) -> None:
+        if HAS_CHROMADB:
+            self.collection.update(ids=memory_ids, metadatas=metadatas)
+            return
+        for memory_id, metadata in zip(memory_ids, metadatas):
+            if memory_id in self._store:
+                self._store.set_metadata(memory_id, metadata)
+
+    @_synchronized
+    def _apply_deletes(self, memory_ids: list[str]) -> None:
+        if HAS_CHROMADB:
+            self.collection.delete(ids=memory_ids)
         else:
-            surviving = []
-            for mem in self.memories:
-                meta = mem["metadata"]
-                time_elapsed = now - meta.get("last_access", now)
-                strength = meta.get("strength", 1.0)
-                ret = self.retention(time_elapsed, strength)
-
-                if ret >= self.decay_threshold:
-                    surviving.append(mem)
-                else:
-                    removed += 1
-            self.memories = surviving
+            self._store.remove(memory_ids)
 
-        self.total_decayed += removed
-        if removed > 0:
+    def is_migrated(self, name: str) -> bool:
+        """Har engångsmigreringen `name` redan körts mot den här collectionen?"""
+        return name in self.migrations
+
+    @_synchronized
+    def mark_migrated(self, name: str) -> None:
+        """Spara att migreringen `name` körts.
+
+        Markören ligger i binärloggens header (fallback) eller i
+        collectionens metadata (ChromaDB), så att nästa start hoppar över den.
+        """
+        if name in self.migrations:
+            return
+        self.migrations.add(name)
+        if HAS_CHROMADB:
+            metadata = {k: v for k, v in (self.collection.metadata or {}).items() if not k.startswith("hnsw:")}
+            try:
+                self.collection.modify(metadata={**metadata, "migrations": ",".join(sorted(self.migrations))})
+            except Exception as e:
+                print(f"[memory] Warning: Could not save migration marker {name}: {e}")
+        else:
             self._save_fallback()
-        return removed
 
+    def flush(self, timeout: float | None = None) -> bool:
+        """Vänta tills skrivkön är tömd (no-op utan write-behind)."""
+        return self._queue.flush(timeout) if self._queue is not None else True
+
+    def close(self) -> None:
+        """Töm skrivkön, stoppa bakgrundstråden och spara."""
+        if self._queue is not None:
+            self._queue.close()
+        self._save_fallback()
+        if self._warm is not None:
+            self._warm.save()
+
+    @_synchronized
     def get_stats(self) -> dict:
         """Returnera minnesstatistik."""
         if HAS_CHROMADB:
@@ -360,15 +1911,30 @@ class EbbinghausMemory:
             except Exception:
                 count = 0
         else:
-            count = len(self.memories)
+            count = len(self._store)
 
-        return {
+        stats = {
             "active_memories": count,
             "total_stored": self.total_stored,
             "total_recalled": self.total_recalled,
             "total_decayed": self.total_decayed,
+            "total_merged": self.total_merged,
+            "expiry_tracked": len(self._expiry),
             "backend": "chromadb" if HAS_CHROMADB else "in-memory",
         }
+        if self._queue is not None:
+            stats["active_memories"] += len(self._queue)
+            stats["write_behind"] = self._queue.stats()
+        if self._warm is not None:
+            stats["tiers"] = {
+                "hot": stats["active_memories"],
+                "warm": len(self._warm),
+                "cold": len(self._cold),
+                "demoted": self.total_demoted,
+                "archived": self.total_archived,
+                "promoted": self.total_promoted,
+            }
+        return stats
 
 
 class ShortTermBuffer:
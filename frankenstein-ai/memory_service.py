@@ -0,0 +1,425 @@
+"""
+Lokal minnestjänst: en process äger EbbinghausMemory, många agenter delar den.
+
+Varje FrankensteinCodeAgent (swarm-noder, ablation/A-B-körningar, benchmark)
+bygger annars ett eget EbbinghausMemory mot samma Chroma-katalog — dubbel
+RAM-användning och flera skrivare mot samma SQLite-fil. Här finns:
+
+1. MemoryServer: Daemon som lyssnar på en Unix-socket (eller localhost TCP),
+   äger ett EbbinghausMemory per collection och betjänar store/recall/GC
+   samt batchade anrop från många klientprocesser
+2. MemoryClient: Samma API som EbbinghausMemory, men anropen går till daemonen
+3. connect_memory(): Ger MemoryClient om FRANKENSTEIN_MEMORY_SERVICE är satt
+   (och daemonen svarar), annars ett vanligt in-process EbbinghausMemory
+
+Protokollet är multiprocessing.connection (pickle + HMAC-autentisering med
+authkey), så bara processer som delar nyckeln kan ansluta. Nyckeln tas från
+FRANKENSTEIN_MEMORY_AUTHKEY eller slumpas vid daemonens första start och
+sparas i training_data/memory_service.key (läs/skriv bara för ägaren).
+TCP-adresser måste vara loopback — pickle-protokollet exponeras aldrig mot
+nätverket.
+
+Starta daemonen: python memory_service.py [--address PATH|HOST:PORT]
+"""
+
+import argparse
+import builtins
+import ipaddress
+import os
+import secrets
+import signal
+import socket
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from multiprocessing import AuthenticationError
+from multiprocessing.connection import Client, Listener
+
+from memory import EbbinghausMemory
+
+# Miljövariabler för adress och autentiseringsnyckel
+SERVICE_ENV = "FRANKENSTEIN_MEMORY_SERVICE"
+AUTHKEY_ENV = "FRANKENSTEIN_MEMORY_AUTHKEY"
+
+DEFAULT_SERVICE_ADDRESS = (
+    os.path.join(tempfile.gettempdir(), "frankenstein-memory.sock")
+    if hasattr(socket, "AF_UNIX") else "127.0.0.1:47474"
+)
+DEFAULT_AUTHKEY_FILE = os.path.join(os.path.dirname(__file__), "training_data", "memory_service.key")
+AUTHKEY_BYTES = 32
+
+# Metoder som klienter får anropa på serverns EbbinghausMemory
+SERVICE_METHODS = frozenset({
+    "store", "store_many", "recall", "deep_recall", "garbage_collect",
+    "update_metadata", "delete", "iter_metadata", "get_stats", "flush",
+    "rebalance_tiers", "retention", "is_migrated", "mark_migrated",
+})
+
+
+class MemoryServiceError(RuntimeError):
+    """Fel i daemonen som inte motsvarar ett inbyggt undantag."""
+
+
+def _check_loopback(host: str) -> None:
+    if host == "localhost":
+        return
+    try:
+        loopback = ipaddress.ip_address(host.strip("[]")).is_loopback
+    except ValueError:
+        loopback = False
+    if not loopback:
+        raise ValueError(f"Minnestjänsten accepterar bara loopback-adresser, inte {host}")
+
+
+def parse_address(value: str | tuple[str, int]) -> str | tuple[str, int]:
+    """"host:port" → (host, port) för TCP; allt annat är en Unix-socket-sökväg.
+
+    TCP-värden måste vara localhost eller en loopback-IP (ValueError annars).
+    """
+    if isinstance(value, tuple):
+        _check_loopback(value[0])
+        return value
+    host, sep, port = value.rpartition(":")
+    if sep and port.isdigit() and "/" not in value and os.sep not in value:
+        host = host.strip("[]") or "127.0.0.1"
+        _check_loopback(host)
+        return (host, int(port))
+    return value
+
+
+def load_authkey(path: str = DEFAULT_AUTHKEY_FILE, create: bool = False) -> bytes:
+    """Läs nyckelfilen; med create slumpas en ny nyckel om filen saknas.
+
+    Filen skapas exklusivt med rättigheterna 0600, så två daemoner som
+    startar samtidigt får samma nyckel.
+    """
+    if create and not os.path.exists(path):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        try:
+            fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+        except FileExistsError:
+            pass
+        else:
+            with os.fdopen(fd, "wb") as f:
+                f.write(secrets.token_hex(AUTHKEY_BYTES).encode("ascii"))
+    with open(path, "rb") as f:
+        key = f.read().strip()
+    if not key:
+        raise OSError(f"Tom nyckelfil: {path}")
+    return key
+
+
+def _authkey(authkey: bytes | None, create: bool = False) -> bytes:
+    if authkey is not None:
+        return authkey
+    env = os.environ.get(AUTHKEY_ENV)
+    return env.encode("utf-8") if env else load_authkey(create=create)
+
+
+def _raise_remote(kind: str, message: str):
+    exc_type = getattr(builtins, kind, None)
+    if isinstance(exc_type, type) and issubclass(exc_type, Exception):
+        raise exc_type(message)
+    raise MemoryServiceError(f"{kind}: {message}")
+
+
+class MemoryServer:
+    """Daemon som äger ett EbbinghausMemory per collection.
+
+    Första klienten som öppnar en collection bestämmer dess options
+    (decay_threshold, write_behind, tiering, ...). Varje anslutning
+    betjänas i en egen tråd; EbbinghausMemory synkroniserar själv.
+
+    Med gc_interval körs garbage_collect på alla collections periodiskt.
+    """
+
+    def __init__(
+        self,
+        address: str | tuple[str, int] | None = None,
+        authkey: bytes | None = None,
+        gc_interval: float | None = None,
+        memory_factory=EbbinghausMemory,
+    ):
+        self.address = parse_address(address or os.environ.get(SERVICE_ENV) or DEFAULT_SERVICE_ADDRESS)
+        self._authkey = _authkey(authkey, create=True)
+        self.gc_interval = gc_interval
+        self._factory = memory_factory
+        self._memories: dict[str, EbbinghausMemory] = {}
+        self._lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._listener: Listener | None = None
+        self._thread: threading.Thread | None = None
+        self.requests_served = 0
+
+    def _memory(self, collection: str, options: dict | None = None) -> EbbinghausMemory:
+        with self._lock:
+            mem = self._memories.get(collection)
+            if mem is None:
+                mem = self._factory(collection_name=collection, **(options or {}))
+                self._memories[collection] = mem
+            return mem
+
+    def _remove_stale_socket(self) -> None:
+        """Ta bort en kvarlämnad socket-fil om ingen daemon lyssnar på den."""
+        if not isinstance(self.address, str) or not os.path.exists(self.address):
+            return
+        probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            probe.connect(self.address)
+        except OSError:
+            os.unlink(self.address)
+        else:
+            raise OSError(f"En minnestjänst lyssnar redan på {self.address}")
+        finally:
+            probe.close()
+
+    def serve_forever(self) -> None:
+        """Ta emot anslutningar tills stop() anropas."""
+        self._remove_stale_socket()
+        self._listener = Listener(self.address, authkey=self._authkey)
+        if self.gc_interval:
+            threading.Thread(target=self._gc_loop, daemon=True, name="memory-service-gc").start()
+        print(f"[memory-service] Lyssnar på {self.address}")
+        while not self._stopping.is_set():
+            try:
+                conn = self._listener.accept()
+            except (OSError, EOFError, AuthenticationError):
+                if self._stopping.is_set():
+                    break
+                continue  # Misslyckad autentisering eller avbruten anslutning
+            threading.Thread(target=self._serve, args=(conn,), daemon=True,
+                             name="memory-service-conn").start()
+
+    def start(self) -> "MemoryServer":
+        """Kör serve_forever i en bakgrundstråd och vänta tills den lyssnar."""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True, name="memory-service")
+        self._thread.start()
+        deadline = time.monotonic() + 5.0
+        while self._listener is None and time.monotonic() < deadline:
+            time.sleep(0.01)
+        return self
+
+    def stop(self) -> None:
+        """Sluta lyssna och stäng (flusha + spara) alla minnen."""
+        self._stopping.set()
+        if self._listener is not None:
+            if self._thread is not None and self._thread.is_alive():
+                try:
+                    # Väck accept() i bakgrundstråden med en sista anslutning
+                    Client(self.address, authkey=self._authkey).close()
+                except OSError:
+                    pass
+                self._thread.join(timeout=5.0)
+            self._listener.close()
+        with self._lock:
+            memories = list(self._memories.values())
+        for mem in memories:
+            mem.close()
+
+    def _gc_loop(self) -> None:
+        while not self._stopping.wait(self.gc_interval):
+            with self._lock:
+                memories = list(self._memories.values())
+            for mem in memories:
+                try:
+                    mem.garbage_collect()
+                except Exception as e:
+                    print(f"[memory-service] GC misslyckades: {e}")
+
+    def _serve(self, conn) -> None:
+        with conn:
+            while not self._stopping.is_set():
+                try:
+                    request = conn.recv()
+                except (EOFError, OSError):
+                    return
+                try:
+                    response = ("ok", self._dispatch(request))
+                except Exception as e:
+                    response = ("error", type(e).__name__, str(e))
+                try:
+                    conn.send(response)
+                except (OSError, ValueError):
+                    return
+                self.requests_served += 1
+
+    def _dispatch(self, request: dict):
+        op = request.get("op")
+        collection = request.get("collection", "episodic_log")
+        if op == "open":
+            self._memory(collection, request.get("options"))
+            return True
+        mem = self._memory(collection)
+        if op == "call":
+            return self._call(mem, request["method"], request.get("args", ()), request.get("kwargs", {}))
+        if op == "batch":
+            calls = request["calls"]
+            if all(m in ("update_metadata", "delete") for m, _, _ in calls):
+                # Bara metadata-skrivningar: bulk-uppdatering i backenden
+                with mem.batched_writes():
+                    return [self._call(mem, m, a, k) for m, a, k in calls]
+            return [self._call(mem, m, a, k) for m, a, k in calls]
+        raise ValueError(f"Okänd operation: {op}")
+
+    @staticmethod
+    def _call(mem: EbbinghausMemory, method: str, args, kwargs):
+        if method not in SERVICE_METHODS:
+            raise ValueError(f"Metoden {method} exponeras inte av minnestjänsten")
+        return getattr(mem, method)(*args, **kwargs)
+
+
+class MemoryClient:
+    """In-process klient med samma API som EbbinghausMemory.
+
+    Alla anrop skickas till en MemoryServer. batched_writes() samlar
+    update_metadata/delete lokalt och skickar dem som ett batchanrop.
+    """
+
+    def __init__(
+        self,
+        address: str | tuple[str, int] | None = None,
+        authkey: bytes | None = None,
+        collection_name: str = "episodic_log",
+        **memory_options,
+    ):
+        self.address = parse_address(address or os.environ.get(SERVICE_ENV) or DEFAULT_SERVICE_ADDRESS)
+        self.collection_name = collection_name
+        self.decay_threshold = memory_options.get("decay_threshold", 0.1)
+        self._conn = Client(self.address, authkey=_authkey(authkey))
+        self._lock = threading.Lock()
+        self._batch: list[tuple[str, tuple, dict]] | None = None
+        self._request({"op": "open", "options": memory_options})
+
+    def _request(self, request: dict):
+        request["collection"] = self.collection_name
+        with self._lock:
+            self._conn.send(request)
+            reply = self._conn.recv()
+        if reply[0] == "ok":
+            return reply[1]
+        _raise_remote(reply[1], reply[2])
+
+    def _call(self, method: str, *args, **kwargs):
+        return self._request({"op": "call", "method": method, "args": args, "kwargs": kwargs})
+
+    def batch(self, calls: list[tuple[str, tuple, dict]]) -> list:
+        """Kör flera (metod, args, kwargs) i en rundresa."""
+        if not calls:
+            return []
+        return self._request({"op": "batch", "calls": calls})
+
+    def store(self, embedding, concept: str = "unknown", metadata: dict | None = None) -> str:
+        return self._call("store", embedding, concept, metadata)
+
+    def store_many(self, items) -> list[str]:
+        return self._call("store_many", list(items))
+
+    def recall(self, query_embedding, n_results: int = 5, where: dict | None = None) -> list[dict]:
+        return self._call("recall", query_embedding, n_results, where)
+
+    def deep_recall(self, query_embedding, n_results: int = 5, where: dict | None = None) -> list[dict]:
+        return self._call("deep_recall", query_embedding, n_results, where)
+
+    def garbage_collect(self) -> int:
+        return self._call("garbage_collect")
+
+    def rebalance_tiers(self, now: float | None = None) -> dict:
+        return self._call("rebalance_tiers", now)
+
+    def retention(self, time_elapsed: float, strength: float) -> float:
+        return self._call("retention", time_elapsed, strength)
+
+    def iter_metadata(self) -> list[tuple[str, dict]]:
+        return self._call("iter_metadata")
+
+    def is_migrated(self, name: str) -> bool:
+        return self._call("is_migrated", name)
+
+    def mark_migrated(self, name: str) -> None:
+        self._call("mark_migrated", name)
+
+    def update_metadata(self, memory_id: str, metadata: dict) -> None:
+        if self._batch is not None:
+            self._batch.append(("update_metadata", (memory_id, metadata), {}))
+        else:
+            self._call("update_metadata", memory_id, metadata)
+
+    def delete(self, memory_ids: list[str]) -> None:
+        if self._batch is not None:
+            self._batch.append(("delete", (list(memory_ids),), {}))
+        else:
+            self._call("delete", list(memory_ids))
+
+    @contextmanager
+    def batched_writes(self, max_pending: int | None = None):
+        """Samla metadata-uppdateringar/borttagningar till ett batchanrop."""
+        if self._batch is not None:
+            yield self
+            return
+        self._batch = []
+        try:
+            yield self
+        finally:
+            calls, self._batch = self._batch, None
+            self.batch(calls)
+
+    def flush(self, timeout: float | None = None) -> bool:
+        return self._call("flush", timeout)
+
+    def get_stats(self) -> dict:
+        stats = self._call("get_stats")
+        stats["service"] = str(self.address)
+        return stats
+
+    def close(self) -> None:
+        """Töm serverns skrivkö för den här collectionen och koppla ner."""
+        if self._conn.closed:
+            return
+        try:
+            self.flush()
+        except (OSError, EOFError):
+            pass  # Daemonen har redan stängts (och sparat)
+        finally:
+            self._conn.close()
+
+
+def connect_memory(address: str | tuple[str, int] | None = None, **memory_options):
+    """MemoryClient om en minnestjänst är konfigurerad och svarar, annars EbbinghausMemory.
+
+    Adressen tas från `address` eller FRANKENSTEIN_MEMORY_SERVICE.
+    """
+    address = address or os.environ.get(SERVICE_ENV)
+    if address:
+        try:
+            return MemoryClient(address, **memory_options)
+        except (OSError, EOFError) as e:
+            print(f"[memory] Minnestjänsten på {address} svarar inte ({e}) — använder lokalt minne")
+    return EbbinghausMemory(**memory_options)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Delad Ebbinghaus-minnestjänst")
+    parser.add_argument("--address", default=os.environ.get(SERVICE_ENV) or DEFAULT_SERVICE_ADDRESS,
+                        help="Unix-socket-sökväg eller HOST:PORT")
+    parser.add_argument("--gc-interval", type=float, default=300.0,
+                        help="Sekunder mellan garbage collection (0 = av)")
+    args = parser.parse_args()
+
+    server = MemoryServer(args.address, gc_interval=args.gc_interval or None)
+
+    def _terminate(signum, frame):
+        raise KeyboardInterrupt
+
+    # SIGTERM (t.ex. från systemd/docker) stänger lika rent som Ctrl-C
+    signal.signal(signal.SIGTERM, _terminate)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,103 @@
+"""
+Enhetstester för memory_service.py — daemon, klient och connect_memory.
+
+Kör med: python -m pytest memory_service_test.py -v
+"""
+
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import memory
+from memory import EbbinghausMemory
+from memory_service import MemoryClient, MemoryServer, connect_memory, load_authkey, parse_address
+
+
+@unittest.skipIf(memory.HAS_CHROMADB, "Testar fallback-backenden")
+class TestMemoryService(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.address = os.path.join(self.tmp.name, "mem.sock")
+        self.options = {"decay_threshold": 0.05, "fallback_file": os.path.join(self.tmp.name, "mem.json")}
+        self.server = MemoryServer(self.address, authkey=b"test").start()
+        self.addCleanup(self.tmp.cleanup)
+        self.addCleanup(self.server.stop)
+        self.rng = np.random.RandomState(7)
+
+    def _client(self, **kwargs) -> MemoryClient:
+        client = MemoryClient(self.address, authkey=b"test", collection_name="shared",
+                              **self.options, **kwargs)
+        self.addCleanup(client.close)
+        return client
+
+    def test_clients_share_one_index(self):
+        a, b = self._client(), self._client()
+        e = self.rng.randn(64)
+        mem_id = a.store(e, concept="x", metadata={"category": "c"})
+        hits = b.recall(e, n_results=1, where={"category": "c"})
+        self.assertEqual(hits[0]["id"], mem_id)
+        self.assertEqual(len(self.server._memories), 1)
+        self.assertEqual(a.get_stats()["active_memories"], 1)
+
+    def test_batched_store_and_writes(self):
+        client = self._client()
+        ids = client.store_many([(self.rng.randn(32), f"c{i}", None) for i in range(5)])
+        self.assertEqual(len(set(ids)), 5)
+        with client.batched_writes():
+            client.update_metadata(ids[0], {"strength": 7.0, "concept": "c0"})
+            client.delete(ids[1:3])
+            self.assertEqual(len(client.iter_metadata()), 5)  # Inget skickat ännu
+        meta = dict(client.iter_metadata())
+        self.assertEqual(sorted(meta), sorted([ids[0], ids[3], ids[4]]))
+        self.assertEqual(meta[ids[0]]["strength"], 7.0)
+
+    def test_remote_errors_keep_type(self):
+        client = self._client()
+        client.store(self.rng.randn(8), metadata={"x": "z"})
+        with self.assertRaises(ValueError):
+            client.recall(self.rng.randn(8), where={"x": {"$regex": "y"}})
+        with self.assertRaises(ValueError):
+            client._call("_save_fallback")
+
+    def test_wrong_authkey_is_rejected(self):
+        with self.assertRaises(Exception):
+            MemoryClient(self.address, authkey=b"wrong", **self.options)
+        self.assertEqual(self._client().garbage_collect(), 0)  # Servern lever vidare
+
+
+class TestConnectMemory(unittest.TestCase):
+    def test_parse_address(self):
+        self.assertEqual(parse_address("localhost:9000"), ("localhost", 9000))
+        self.assertEqual(parse_address("/tmp/x.sock"), "/tmp/x.sock")
+        self.assertEqual(parse_address(":9000"), ("127.0.0.1", 9000))
+        self.assertEqual(parse_address("[::1]:9000"), ("::1", 9000))
+        for remote in ("0.0.0.0:9000", "10.0.0.5:9000", "example.com:9000", ("192.168.1.2", 9000)):
+            with self.assertRaises(ValueError):
+                parse_address(remote)
+
+    def test_authkey_is_random_and_owner_only(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, "sub", "service.key")
+            with self.assertRaises(FileNotFoundError):
+                load_authkey(path)  # Klienter skapar aldrig nyckeln
+            key = load_authkey(path, create=True)
+            self.assertEqual(len(key), 64)
+            self.assertEqual(load_authkey(path, create=True), key)
+            self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+            other = os.path.join(tmp, "other.key")
+            self.assertNotEqual(load_authkey(other, create=True), key)
+
+    def test_falls_back_to_local_memory(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            mem = connect_memory(os.path.join(tmp, "missing.sock"),
+                                 fallback_file=os.path.join(tmp, "mem.json"))
+            self.assertIsInstance(mem, EbbinghausMemory)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,750 @@
+"""
+Enhetstester för memory.py — EbbinghausMemory (fallback-backend), MatrixMemoryStore
+och ExpiryIndex.
+
+Kör med: python -m pytest memory_test.py -v
+"""
+
+import functools
+import os
+import sys
+import time
+import tempfile
+import threading
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import code_agent
+import memory
+from code_agent import FrankensteinCodeAgent
+from memory import (
+    EbbinghausMemory, ExpiryIndex, MatrixMemoryStore, MetadataWriteBatch,
+    _chroma_where, _prepare_embedding, expiry_time, matches_where,
+)
+
+_SKIP_CHROMA = unittest.skipIf(memory.HAS_CHROMADB, "Testar fallback-backenden")
+
+
+def _reference_recall(mem: EbbinghausMemory, query, n: int, now: float) -> list[tuple[str, float]]:
+    """Ursprunglig loop-baserad recall (utan sidoeffekter) — referens."""
+    q = np.array(_prepare_embedding(query), dtype=np.float64)
+    scored = []
+    for mem_id, emb, meta in mem._store.items():
+        v = np.array(emb, dtype=np.float64)
+        sim = np.dot(q, v) / max(np.linalg.norm(q) * np.linalg.norm(v), 1e-10)
+        ret = mem.retention(now - meta.get("last_access", now), meta.get("strength", 1.0))
+        if ret >= mem.decay_threshold:
+            scored.append((sim, mem_id))
+    scored.sort(key=lambda x: x[0], reverse=True)
+    return [(mem_id, sim) for sim, mem_id in scored[:n]]
+
+
+@_SKIP_CHROMA
+class TestMatrixFallback(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.mem = EbbinghausMemory(
+            decay_threshold=0.05,
+            fallback_file=os.path.join(self.tmp.name, "mem.json"),
+        )
+        self.rng = np.random.RandomState(0)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_recall_matches_reference(self):
+        embs = self.rng.randn(200, 2048).astype(np.float32)
+        for i, e in enumerate(embs):
+            self.mem.store(e, concept=f"c{i % 5}", metadata={"strength": float(1 + i % 4)})
+        for _ in range(10):
+            q = embs[self.rng.randint(200)] + self.rng.randn(2048).astype(np.float32)
+            expected = _reference_recall(self.mem, q, 5, time.time())
+            results = self.mem.recall(q, n_results=5)
+            self.assertEqual([r["id"] for r in results], [e[0] for e in expected])
+            for r, (_, sim) in zip(results, expected):
+                self.assertAlmostEqual(r["distance"], 1 - sim, places=5)
+
+    def test_recall_strengthens(self):
+        e = self.rng.randn(64)
+        mem_id = self.mem.store(e, metadata={"strength": 2.0})
+        result = self.mem.recall(e, n_results=1)[0]
+        self.assertEqual(result["id"], mem_id)
+        self.assertAlmostEqual(result["strength"], 3.0)
+        self.assertEqual(self.mem._store.get_metadata(mem_id)["access_count"], 1)
+
+    def test_garbage_collect_removes_decayed(self):
+        keep = self.mem.store(self.rng.randn(64), metadata={"strength": 10.0})
+        gone = self.mem.store(self.rng.randn(64), metadata={"strength": 0.0})
+        self.assertEqual(self.mem.garbage_collect(), 1)
+        self.assertIn(keep, self.mem._store)
+        self.assertNotIn(gone, self.mem._store)
+
+    def test_persistence_roundtrip(self):
+        ids = [self.mem.store(self.rng.randn(64), concept="x") for _ in range(5)]
+        self.mem._save_fallback()
+        reloaded = EbbinghausMemory(
+            decay_threshold=0.05,
+            fallback_file=os.path.join(self.tmp.name, "mem.json"),
+        )
+        self.assertEqual([m for m, _ in reloaded.iter_metadata()], ids)
+        self.assertEqual(reloaded.total_stored, 5)
+
+
+@_SKIP_CHROMA
+class TestExpiryGC(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clock = [1_000_000.0]
+        patcher = mock.patch("memory.time.time", lambda: self.clock[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.mem = EbbinghausMemory(
+            decay_threshold=0.05,
+            fallback_file=os.path.join(self.tmp.name, "mem.json"),
+        )
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _full_scan_expired(self, now: float) -> set[str]:
+        return {
+            mem_id for mem_id, meta in self.mem.iter_metadata()
+            if self.mem.retention(now - meta["last_access"], meta["strength"]) < self.mem.decay_threshold
+        }
+
+    def test_gc_matches_full_scan(self):
+        rng = np.random.RandomState(1)
+        for step in range(300):
+            self.clock[0] += rng.uniform(0, 2000)
+            self.mem.store(rng.randn(32), metadata={"strength": float(rng.uniform(0.1, 3.0))})
+            if step % 7 == 0:
+                self.mem.recall(rng.randn(32), n_results=3)
+            if step % 25 == 0:
+                expected = self._full_scan_expired(self.clock[0])
+                before = {m for m, _ in self.mem.iter_metadata()}
+                self.mem.garbage_collect()
+                after = {m for m, _ in self.mem.iter_metadata()}
+                self.assertEqual(before - after, expected)
+
+    def test_recall_skips_expired(self):
+        old = self.mem.store(np.ones(16), metadata={"strength": 0.5})
+        self.clock[0] += 3600 * 10
+        fresh = self.mem.store(-np.ones(16))
+        results = self.mem.recall(np.ones(16), n_results=2)
+        self.assertEqual([r["id"] for r in results], [fresh])
+        # Recall är read-only: bara garbage_collect raderar
+        self.assertIn(old, self.mem._store)
+        self.assertEqual(self.mem.total_decayed, 0)
+        self.assertEqual(self.mem.garbage_collect(), 1)
+        self.assertNotIn(old, self.mem._store)
+
+    def test_update_metadata_reschedules(self):
+        mem_id = self.mem.store(np.ones(16), metadata={"strength": 0.5})
+        meta = dict(self.mem._store.get_metadata(mem_id))
+        self.mem.update_metadata(mem_id, {**meta, "strength": 100.0})
+        self.clock[0] += 3600 * 10
+        self.assertEqual(self.mem.garbage_collect(), 0)
+
+
+class _RecordingMemory:
+    """Samlar bulk-anrop från MetadataWriteBatch."""
+
+    def __init__(self):
+        self.calls = []
+
+    def _apply_updates(self, ids, metadatas):
+        self.calls.append(("update", list(ids), list(metadatas)))
+
+    def _apply_deletes(self, ids):
+        self.calls.append(("delete", list(ids)))
+
+
+class TestMetadataWriteBatch(unittest.TestCase):
+    def test_coalesces_into_bulk_calls(self):
+        rec = _RecordingMemory()
+        batch = MetadataWriteBatch(rec, max_pending=100)
+        for i in range(10):
+            batch.update(f"m{i}", {"strength": i})
+        batch.update("m0", {"strength": 99})
+        batch.delete(["m1", "m2"])
+        batch.update("m1", {"strength": 5})  # Redan borttagen — ignoreras
+        self.assertEqual(rec.calls, [])
+        batch.flush()
+        self.assertEqual(len(rec.calls), 2)
+        op, ids, metas = rec.calls[0]
+        self.assertEqual(op, "update")
+        self.assertEqual(ids, ["m0"] + [f"m{i}" for i in range(3, 10)])
+        self.assertEqual(metas[0], {"strength": 99})
+        self.assertEqual(rec.calls[1], ("delete", ["m1", "m2"]))
+
+    def test_threshold_flush(self):
+        rec = _RecordingMemory()
+        batch = MetadataWriteBatch(rec, max_pending=4)
+        for i in range(9):
+            batch.update(f"m{i}", {})
+        self.assertEqual(batch.flushes, 2)
+        self.assertEqual(len(batch), 1)
+
+    @_SKIP_CHROMA
+    def test_batched_writes_apply_on_exit(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            mem = EbbinghausMemory(fallback_file=os.path.join(tmp, "mem.json"))
+            a = mem.store(np.ones(8))
+            b = mem.store(-np.ones(8))
+            with mem.batched_writes():
+                mem.update_metadata(a, {**mem._store.get_metadata(a), "strength": 7.0})
+                mem.delete([b])
+                self.assertEqual(mem._store.get_metadata(a)["strength"], 1.0)
+                self.assertIn(b, mem._store)
+            self.assertEqual(mem._store.get_metadata(a)["strength"], 7.0)
+            self.assertNotIn(b, mem._store)
+
+
+class TestExpiryIndex(unittest.TestCase):
+    def test_lazy_invalidation(self):
+        idx = ExpiryIndex()
+        idx.set("a", 10.0)
+        idx.set("b", 20.0)
+        idx.set("a", 30.0)  # Gammal post för "a" ska ignoreras
+        idx.discard("b")
+        self.assertEqual(idx.pop_expired(25.0), [])
+        self.assertEqual(idx.next_expiry(), 30.0)
+        self.assertEqual(idx.pop_expired(31.0), ["a"])
+        self.assertEqual(len(idx), 0)
+
+    def test_closed_form_matches_retention(self):
+        meta = {"last_access": 100.0, "strength": 2.0}
+        t = expiry_time(meta, 0.1)
+        mem_ret = lambda now: np.exp(-(now - 100.0) / (2.0 * 3600))
+        self.assertGreaterEqual(mem_ret(t - 1e-3), 0.1)
+        self.assertLess(mem_ret(t + 1e-3), 0.1)
+        self.assertEqual(expiry_time({"strength": 1.0}, 0.1), float("inf"))
+
+
+@_SKIP_CHROMA
+class TestBinaryPersistence(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "mem.json")
+        self.rng = np.random.RandomState(2)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _open(self, **kwargs) -> EbbinghausMemory:
+        return EbbinghausMemory(decay_threshold=0.05, fallback_file=self.path, **kwargs)
+
+    def _state(self, mem: EbbinghausMemory) -> list[tuple[str, dict]]:
+        return [(m, dict(meta)) for m, meta in mem.iter_metadata()]
+
+    def test_incremental_save_appends(self):
+        mem = self._open()
+        for _ in range(10):
+            mem.store(self.rng.randn(64))
+        mem._save_fallback()
+        seg, log = mem._binlog._paths(mem._binlog.generation)
+        seg_size = os.path.getsize(seg)
+        with open(log, "rb") as f:
+            log_prefix = f.read()
+
+        for _ in range(5):
+            mem.store(self.rng.randn(64))
+        mem._save_fallback()
+        self.assertEqual(os.path.getsize(seg), seg_size * 15 // 10)
+        with open(log, "rb") as f:
+            self.assertTrue(f.read().startswith(log_prefix))
+
+    def test_updates_and_deletes_survive_reload(self):
+        mem = self._open()
+        ids = [mem.store(self.rng.randn(64), concept=f"c{i}") for i in range(6)]
+        mem._save_fallback()
+        mem.update_metadata(ids[0], {**mem._store.get_metadata(ids[0]), "strength": 9.0})
+        mem.delete(ids[1:3])
+        mem.recall(mem._store.get_embedding(ids[4]), n_results=1)
+        mem._save_fallback()
+
+        reloaded = self._open()
+        self.assertEqual(self._state(reloaded), self._state(mem))
+        self.assertEqual(reloaded.total_recalled, mem.total_recalled)
+        np.testing.assert_array_equal(
+            reloaded._store.get_embedding(ids[5]), mem._store.get_embedding(ids[5])
+        )
+
+    def test_disk_dtype_follows_store(self):
+        mem = self._open()
+        query = self.rng.randn(64)
+        ids = [mem.store(self.rng.randn(64)) for _ in range(8)]
+        mem._save_fallback()
+        self.assertEqual(mem._binlog.disk_dtype, np.float32)
+        reloaded = self._open()
+        for m in ids:
+            np.testing.assert_array_equal(reloaded._store.get_embedding(m), mem._store.get_embedding(m))
+        hits = [(h["id"], h["distance"]) for h in mem.recall(query, n_results=3)]
+        self.assertEqual([(h["id"], h["distance"]) for h in reloaded.recall(query, n_results=3)], hits)
+
+        half = EbbinghausMemory(fallback_file=os.path.join(self.tmp.name, "half.json"),
+                                embedding_dtype="float16")
+        self.assertEqual(half._binlog.disk_dtype, np.float16)
+
+    def test_compaction_keeps_live_rows(self):
+        mem = self._open()
+        ids = [mem.store(self.rng.randn(16)) for _ in range(600)]
+        mem._save_fallback()
+        generation = mem._binlog.generation
+        mem.delete(ids[:500])
+        mem._save_fallback()  # 500 döda rader > 256 → kompaktering vid nästa save
+        mem._save_fallback()
+        self.assertEqual(mem._binlog.generation, generation + 1)
+        self.assertEqual(mem._binlog.segment_rows, 100)
+        self.assertEqual([m for m, _ in self._open().iter_metadata()], ids[500:])
+
+    def test_torn_append_is_ignored(self):
+        mem = self._open()
+        ids = [mem.store(self.rng.randn(16)) for _ in range(4)]
+        mem._save_fallback()
+        seg, log = mem._binlog._paths(mem._binlog.generation)
+        with open(seg, "ab") as f:
+            f.write(b"\x00" * 7)
+        with open(log, "a", encoding="utf-8") as f:
+            f.write('{"op": "del", "ids"')
+        self.assertEqual([m for m, _ in self._open().iter_metadata()], ids)
+
+    def test_migrates_json_file(self):
+        legacy = self._open(persist_format="json")
+        ids = [legacy.store(self.rng.randn(64)) for _ in range(7)]
+        legacy._save_fallback()
+        self.assertTrue(os.path.exists(self.path))
+
+        migrated = self._open()
+        self.assertEqual([m for m, _ in migrated.iter_metadata()], ids)
+        self.assertFalse(os.path.exists(self.path))
+        self.assertTrue(os.path.exists(self.path + ".migrated"))
+        self.assertEqual([m for m, _ in self._open().iter_metadata()], ids)
+
+    def test_instances_sharing_a_base_keep_each_others_memories(self):
+        a, b = self._open(), self._open()
+        a_ids = [a.store(self.rng.randn(16)) for _ in range(50)]
+        b_ids = [b.store(self.rng.randn(16)) for _ in range(50)]
+        a._save_fallback()
+        b._save_fallback()
+        self.assertEqual(sorted(m for m, _ in self._open().iter_metadata()), sorted(a_ids + b_ids))
+        self.assertIn(a_ids[0], b._store)  # b spelade upp a:s poster före sin append
+
+        # a raderar och kompakterar; b:s senare minnen och raderingar får inte gå förlorade
+        a.delete(a_ids[:10])
+        later = b.store(self.rng.randn(16))
+        b._save_fallback()
+        a._binlog.compact(a._store, a._counters())
+        self.assertIn(later, a._store)
+        b.delete([b_ids[0]])
+        b._save_fallback()
+        final = {m for m, _ in self._open().iter_metadata()}
+        self.assertEqual(final, set(a_ids[10:] + b_ids[1:] + [later]))
+        self.assertNotIn(a_ids[0], b._store)
+
+    def test_eviction_rereads_metadata_from_other_instances(self):
+        a, b = self._open(), self._open()
+        old = time.time() - 10 * 24 * 3600
+        shared = a.store(self.rng.randn(16), metadata={"strength": 1.0})
+        stale = a.store(self.rng.randn(16), metadata={"strength": 1.0})
+        for mem_id in (shared, stale):
+            a.update_metadata(mem_id, {**a._store.get_metadata(mem_id), "last_access": old})
+        a._save_fallback()
+        b._save_fallback()  # b ser båda som utgångna
+
+        # a förstärker det ena minnet; b:s utgångsindex vet inget om det
+        a.update_metadata(shared, {**a._store.get_metadata(shared), "last_access": time.time(), "strength": 5.0})
+        a._save_fallback()
+        self.assertEqual(b.garbage_collect(), 1)
+        self.assertIn(shared, b._store)
+        self.assertNotIn(stale, b._store)
+        self.assertFalse(b._expiry.is_expired(shared, time.time()))
+        self.assertEqual({m for m, _ in self._open().iter_metadata()}, {shared})
+
+    def test_migration_marker_survives_other_writers(self):
+        a, b = self._open(), self._open()
+        a.store(self.rng.randn(16))
+        a.mark_migrated("category_backfill")
+        b.store(self.rng.randn(16))
+        b._save_fallback()  # b läste headern före markören men skriver över den
+        self.assertTrue(b.is_migrated("category_backfill"))
+        self.assertTrue(self._open().is_migrated("category_backfill"))
+
+    def test_default_fallback_file_is_per_collection(self):
+        with mock.patch.object(memory, "_DEFAULT_FALLBACK_FILE", os.path.join(self.tmp.name, "ebbinghaus_memory.json")):
+            legacy = EbbinghausMemory(fallback_file=memory._DEFAULT_FALLBACK_FILE)
+            legacy_id = legacy.store(self.rng.randn(16))
+            legacy._save_fallback()
+            before = sorted(os.listdir(self.tmp.name))
+            math_mem = EbbinghausMemory(collection_name="math_research")
+            self.assertEqual(sorted(os.listdir(self.tmp.name)), before)  # Konstruktion flyttar inget
+            self.assertTrue(memory.adopt_legacy_fallback())
+            self.assertFalse(memory.adopt_legacy_fallback())  # Bara en gång
+            code_mem = EbbinghausMemory(collection_name="code_solutions")
+        self.assertEqual(len(math_mem._store), 0)
+        self.assertIn(legacy_id, code_mem._store)  # Kodagentens collection tar över de gamla filerna
+        self.assertTrue(code_mem._binlog.header_path.endswith("ebbinghaus_code_solutions.header.json"))
+
+
+@_SKIP_CHROMA
+class TestWriteBehind(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rng = np.random.RandomState(3)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _open(self, **kwargs) -> EbbinghausMemory:
+        mem = EbbinghausMemory(
+            decay_threshold=0.05,
+            fallback_file=os.path.join(self.tmp.name, "mem.json"),
+            write_behind=True,
+            **kwargs,
+        )
+        self.addCleanup(mem.close)
+        return mem
+
+    def _gate(self, mem: EbbinghausMemory) -> threading.Event:
+        """Håll bakgrundstråden borta från backenden tills eventet sätts."""
+        release = threading.Event()
+        write = mem._write_batch
+
+        def gated(items):
+            release.wait(5)
+            write(items)
+
+        mem._write_batch = gated
+        self.addCleanup(release.set)
+        return release
+
+    def test_recall_sees_pending_writes(self):
+        mem = self._open()
+        release = self._gate(mem)
+        target = mem.store(np.ones(32), concept="pending")
+        mem.store(-np.ones(32))
+        results = mem.recall(np.ones(32), n_results=1)
+        self.assertEqual(results[0]["id"], target)
+        self.assertAlmostEqual(results[0]["strength"], 1.5)
+        self.assertEqual(mem.get_stats()["active_memories"], 2)
+
+        release.set()
+        self.assertTrue(mem.flush(timeout=5))
+        meta = mem._store.get_metadata(target)
+        self.assertAlmostEqual(meta["strength"], 1.5)
+        self.assertEqual(meta["access_count"], 1)
+
+    def test_delete_cancels_pending(self):
+        mem = self._open()
+        release = self._gate(mem)
+        ids = [mem.store(self.rng.randn(16)) for _ in range(3)]
+        mem.delete(ids)
+        release.set()
+        mem.flush(timeout=5)
+        self.assertEqual(mem.iter_metadata(), [])
+
+    def test_drop_oldest_backpressure(self):
+        mem = self._open(write_queue_size=2, write_batch_size=1, backpressure="drop_oldest")
+        release = self._gate(mem)
+        ids = [mem.store(self.rng.randn(16)) for _ in range(6)]
+        release.set()
+        mem.flush(timeout=5)
+        stats = mem.get_stats()["write_behind"]
+        self.assertGreater(stats["dropped"], 0)
+        self.assertEqual(len(mem.iter_metadata()) + stats["dropped"], 6)
+        self.assertIn(ids[-1], mem._store)
+
+    def test_close_flushes_and_persists(self):
+        mem = self._open()
+        ids = [mem.store(self.rng.randn(16)) for _ in range(120)]
+        mem.close()
+        self.assertEqual(mem.get_stats()["write_behind"]["written"], 120)
+        reloaded = EbbinghausMemory(fallback_file=os.path.join(self.tmp.name, "mem.json"))
+        self.assertEqual([m for m, _ in reloaded.iter_metadata()], ids)
+
+    def test_concurrent_recall_during_writes(self):
+        mem = self._open(write_batch_size=8)
+        for i in range(300):
+            mem.store(self.rng.randn(32), concept=f"c{i}")
+            if i % 10 == 0:
+                self.assertTrue(mem.recall(self.rng.randn(32), n_results=3))
+        mem.flush(timeout=5)
+        self.assertEqual(len(mem._store), 300)
+
+    def test_invalid_policy(self):
+        with self.assertRaises(ValueError):
+            self._open(backpressure="spill")
+
+
+@_SKIP_CHROMA
+class TestDedupeOnWrite(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rng = np.random.RandomState(5)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _open(self, **kwargs) -> EbbinghausMemory:
+        mem = EbbinghausMemory(
+            decay_threshold=0.05,
+            fallback_file=os.path.join(self.tmp.name, "mem.json"),
+            dedupe_threshold=0.97,
+            **kwargs,
+        )
+        self.addCleanup(mem.close)
+        return mem
+
+    def test_near_duplicates_merge_into_one_memory(self):
+        mem = self._open()
+        base = self.rng.randn(256)
+        first = mem.store(base, concept="a", metadata={"step": 0})
+        for step in range(1, 5):
+            self.assertEqual(mem.store(base + 0.01 * self.rng.randn(256), concept="b",
+                                       metadata={"step": step}), first)
+        other = mem.store(self.rng.randn(256), concept="c")
+        self.assertNotEqual(other, first)
+
+        meta = mem._store.get_metadata(first)
+        self.assertEqual(len(mem._store), 2)
+        self.assertEqual((meta["concept"], meta["step"]), ("b", 4))  # Senaste metadata
+        self.assertEqual(meta["merge_count"], 4)
+        self.assertEqual(meta["access_count"], 4)
+        self.assertAlmostEqual(meta["strength"], 1.5 ** 4)
+        self.assertEqual(mem.get_stats()["total_merged"], 4)
+
+    def test_merges_into_queued_memory(self):
+        mem = self._open(write_behind=True)
+        e = self.rng.randn(64)
+        first = mem.store(e)
+        self.assertEqual(mem.store(e), first)
+        mem.flush()
+        self.assertEqual(len(mem._store), 1)
+        self.assertEqual(mem._store.get_metadata(first)["merge_count"], 1)
+
+    def test_expired_memory_is_not_reused(self):
+        mem = self._open()
+        e = self.rng.randn(64)
+        first = mem.store(e, metadata={"strength": 0.0})
+        self.assertNotEqual(mem.store(e), first)
+
+
+@_SKIP_CHROMA
+class TestWhereFilter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.rng = np.random.RandomState(6)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _open(self, **kwargs) -> EbbinghausMemory:
+        mem = EbbinghausMemory(
+            decay_threshold=0.05,
+            fallback_file=os.path.join(self.tmp.name, "mem.json"),
+            **kwargs,
+        )
+        self.addCleanup(mem.close)
+        return mem
+
+    def test_filtered_recall_returns_top_n_within_category(self):
+        mem = self._open()
+        embs = self.rng.randn(120, 64)
+        cats = ["a", "b", "c"]
+        ids = [mem.store(e, metadata={"category": cats[i % 3], "score": i})
+               for i, e in enumerate(embs)]
+        q = embs[0]  # Kategori "a" — närmast globalt
+        results = mem.recall(q, n_results=5, where={"category": "b"})
+
+        q_unit = q / np.linalg.norm(q)
+        sims = [(float(embs[i] @ q_unit / np.linalg.norm(embs[i])), ids[i])
+                for i in range(120) if i % 3 == 1]
+        expected = [m for _, m in sorted(sims, reverse=True)[:5]]
+        self.assertEqual([r["id"] for r in results], expected)
+
+        both = mem.recall(q, n_results=100, where={"category": {"$in": ["a", "c"]}, "score": {"$lt": 30}})
+        self.assertEqual(len(both), 20)
+
+    def test_index_follows_updates_and_compaction(self):
+        store = MatrixMemoryStore()
+        for i in range(8):
+            store.add(f"m{i}", np.eye(8)[i], {"category": "x" if i < 4 else "y"})
+        store.set_metadata("m0", {"category": "y"})
+        store.remove(["m1", "m2", "m3", "m4", "m5"])  # Triggar kompaktering
+        rows = store.filter_rows({"category": "y"})
+        self.assertEqual([store.row_id(r) for r in rows], ["m0", "m6", "m7"])
+        self.assertEqual(len(store.filter_rows({"category": "x"})), 0)
+
+    def test_pending_writes_are_filtered(self):
+        mem = self._open(write_behind=True)
+        e = self.rng.randn(32)
+        mem._queue.put("queued", e, {"category": "z", "strength": 1.0, "last_access": time.time()})
+        self.assertEqual(mem.recall(e, 5, where={"category": "other"}), [])
+        self.assertEqual([r["id"] for r in mem.recall(e, 5, where={"category": "z"})], ["queued"])
+
+    def test_where_helpers(self):
+        meta = {"category": "a", "score": 3}
+        self.assertTrue(matches_where(meta, {"$or": [{"category": "b"}, {"score": {"$gte": 3}}]}))
+        self.assertFalse(matches_where(meta, {"category": {"$nin": ["a"]}}))
+        with self.assertRaises(ValueError):
+            matches_where(meta, {"score": {"$regex": "x"}})
+        self.assertEqual(_chroma_where({"category": "a"}), {"category": "a"})
+        self.assertEqual(_chroma_where({"category": "a", "score": 3}),
+                         {"$and": [{"category": "a"}, {"score": 3}]})
+
+
+@_SKIP_CHROMA
+class TestTiering(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.clock = [1_000_000.0]
+        patcher = mock.patch("memory.time.time", lambda: self.clock[0])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def _open(self) -> EbbinghausMemory:
+        return EbbinghausMemory(
+            decay_threshold=0.05,
+            fallback_file=os.path.join(self.tmp.name, "mem.json"),
+            tiering=True,
+            hot_threshold=0.5,
+        )
+
+    def test_rebalance_moves_down_and_deep_recall_promotes(self):
+        mem = self._open()
+        eye = np.eye(16)
+        hot = mem.store(eye[0], metadata={"strength": 100.0})
+        warm = mem.store(eye[1], metadata={"strength": 2.0})
+        cold = mem.store(eye[2], metadata={"strength": 1.0})
+
+        self.clock[0] += 3600 * 2  # R(warm) ≈ 0.37, R(cold) ≈ 0.14 → båda till warm
+        moved = mem.rebalance_tiers()
+        self.assertEqual(moved, {"demoted": 2, "archived": 0})
+        self.assertEqual(list(mem._store._row_of), [hot])
+        self.clock[0] += 3600 * 2  # R(cold) ≈ 0.02 < decay_threshold → cold
+        moved = mem.rebalance_tiers()
+        self.assertEqual(moved, {"demoted": 0, "archived": 1})
+        self.assertIn(warm, mem._warm)
+        self.assertEqual([m for m, _, _ in mem._cold], [cold])
+
+        # Vaken recall ser bara hot
+        self.assertEqual(mem.recall(eye[1], n_results=3)[0]["id"], hot)
+
+        results = mem.deep_recall(eye[2], n_results=1)
+        self.assertEqual((results[0]["id"], results[0]["tier"]), (cold, "cold"))
+        self.assertIn(cold, mem._store)
+        self.assertEqual(len(mem._cold), 0)
+        self.assertEqual(mem.get_stats()["tiers"]["promoted"], 1)
+
+        results = mem.deep_recall(eye[1], n_results=1)
+        self.assertEqual((results[0]["id"], results[0]["tier"]), (warm, "warm"))
+        self.assertNotIn(warm, mem._warm)
+        self.assertEqual(mem.recall(eye[1], n_results=1)[0]["id"], warm)
+
+    def test_gc_archives_instead_of_deleting(self):
+        mem = self._open()
+        gone = mem.store(np.ones(8), metadata={"strength": 0.1})
+        self.clock[0] += 3600
+        self.assertEqual(mem.garbage_collect(), 1)
+        self.assertEqual([m for m, _, _ in mem._cold], [gone])
+
+    def test_recall_does_not_archive(self):
+        mem = self._open()
+        gone = mem.store(np.ones(8), metadata={"strength": 0.1})
+        self.clock[0] += 3600
+        self.assertEqual(mem.recall(np.ones(8)), [])
+        self.assertEqual(mem.deep_recall(np.ones(8)), [])
+        self.assertIn(gone, mem._store)
+        self.assertEqual((len(mem._cold), mem.total_archived), (0, 0))
+
+    def test_tiers_persist(self):
+        mem = self._open()
+        mem.store(np.ones(8), metadata={"strength": 1.0})
+        self.clock[0] += 3600 * 2
+        mem.rebalance_tiers()
+        mem.close()
+        self.assertEqual(len(self._open()._warm), 1)
+
+    def test_agent_lookup_keeps_uncategorized_and_limits_deep_recall(self):
+        mem = self._open()
+        query = [np.eye(16)[0]]
+        agent = SimpleNamespace(
+            episodic_memory=mem, _deep_recall_at={}, concept_code={"legacy": "print(1)"}, solved={},
+            _perceive_task=lambda task: torch.from_numpy(query[0]).float(),
+            hdc=SimpleNamespace(encode=lambda f: f.unsqueeze(0)),
+        )
+        find = functools.partial(FrankensteinCodeAgent._find_similar_from_memory, agent)
+        task = SimpleNamespace(category="math", tags=[])
+        with mock.patch.object(mem, "deep_recall", wraps=mem.deep_recall) as deep:
+            self.assertIsNone(find(task))
+            self.assertIsNone(find(task))
+            self.assertEqual(deep.call_count, 1)  # Samma kategori inom intervallet: ingen ny arkivsökning
+            find(SimpleNamespace(category="strings", tags=[]))
+            self.clock[0] += code_agent.DEEP_RECALL_INTERVAL
+            find(task)
+            self.assertEqual(deep.call_count, 3)
+
+        mem.store(query[0], concept="legacy", metadata={"strength": 10.0})  # Utan category
+        self.assertEqual(FrankensteinCodeAgent._backfill_memory_categories(agent), 1)
+        self.assertEqual(find(task), "print(1)")
+
+        # Engångsmigrering: markören överlever omstart, ingen ny skanning
+        mem.close()
+        agent.episodic_memory = reopened = self._open()
+        self.assertTrue(reopened.is_migrated(code_agent.CATEGORY_BACKFILL))
+        with mock.patch.object(reopened, "iter_metadata") as scan:
+            self.assertEqual(FrankensteinCodeAgent._backfill_memory_categories(agent), 0)
+        scan.assert_not_called()
+
+
+class TestMatrixMemoryStore(unittest.TestCase):
+    def test_remove_and_compact_preserve_order(self):
+        store = MatrixMemoryStore()
+        for i in range(10):
+            store.add(f"m{i}", np.eye(10)[i], {"strength": 1.0, "last_access": 0.0})
+        store.remove([f"m{i}" for i in range(0, 10, 2)])
+        store.remove(["m1"])  # Triggar kompaktering
+        self.assertEqual([m for m, _, _ in store.items()], ["m3", "m5", "m7", "m9"])
+        hits = store.search(np.eye(10)[7], 1, now=0.0, threshold=0.0)
+        self.assertEqual(store.row_id(hits[0][0]), "m7")
+
+    def test_float16_storage(self):
+        store = MatrixMemoryStore(dtype="float16")
+        store.add("a", np.ones(8), {"strength": 1.0, "last_access": 0.0})
+        self.assertEqual(store._emb.dtype, np.float16)
+        hits = store.search(np.ones(8), 1, now=0.0, threshold=0.0)
+        self.assertAlmostEqual(hits[0][1], 1.0, places=3)
+
+    def test_int8_storage_ranks_like_float32(self):
+        rng = np.random.RandomState(4)
+        embs = rng.randn(300, 128)
+        exact, quant = MatrixMemoryStore(), MatrixMemoryStore(dtype="int8")
+        for i, e in enumerate(embs):
+            exact.add(f"m{i}", e, {"strength": 1.0, "last_access": 0.0})
+            quant.add(f"m{i}", e, {"strength": 1.0, "last_access": 0.0})
+        self.assertEqual(quant._emb.dtype, np.int8)
+        self.assertEqual(quant.get_embedding("m0").dtype, np.float32)
+        q = embs[42] + 0.1 * rng.randn(128)
+        a = [exact.row_id(r) for r, _, _ in exact.search(q, 5, now=0.0, threshold=0.0)]
+        b = quant.search(q, 5, now=0.0, threshold=0.0)
+        self.assertEqual(quant.row_id(b[0][0]), a[0])
+        self.assertAlmostEqual(b[0][1], exact.search(q, 1, now=0.0, threshold=0.0)[0][1], places=2)
+
+    def test_dimension_mismatch(self):
+        store = MatrixMemoryStore()
+        store.add("a", np.ones(8), {})
+        with self.assertRaises(ValueError):
+            store.add("b", np.ones(4), {})
+
+
+if __name__ == "__main__":
+    unittest.main()
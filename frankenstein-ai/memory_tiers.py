@@ -0,0 +1,321 @@
+"""
+Nivåindelad lagring för episodiska minnen (hot / warm / cold).
+
+EbbinghausMemory håller bara "heta" minnen (hög retention) i sitt
+sökbara RAM-index/ChromaDB. Svagare minnen flyttas under sömnen till:
+
+1. WarmTierStore: int8-kvantiserade embeddings (skala per vektor) i en
+   memory-mappad fil — söks bara vid explicit djup recall
+2. ColdArchive: gzip-komprimerat JSONL-arkiv med float16-embeddings för
+   minnen som GC annars hade raderat
+
+Båda nivåerna kan befordra minnen tillbaka till den heta nivån.
+"""
+
+import base64
+import gzip
+import heapq
+import json
+import os
+
+import numpy as np
+
+from quantization import dequantize_int8, quantize_int8
+
+# Antal arkivrader som poängsätts per block vid sökning i kall nivå
+_COLD_SCAN_CHUNK = 1024
+
+
+def _cosine(matrix: np.ndarray, query: np.ndarray) -> np.ndarray:
+    q = np.asarray(query, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(q)
+    return (matrix @ q) / np.maximum(norms, 1e-10)
+
+
+def _retention(metadatas: list[dict], now: float, strength_scale: float) -> np.ndarray:
+    strength = np.array([m.get("strength", 1.0) for m in metadatas], dtype=np.float64)
+    last = np.array([m.get("last_access", now) for m in metadatas], dtype=np.float64)
+    with np.errstate(over="ignore"):
+        ret = np.exp(-(now - last) / np.maximum(strength * strength_scale, 0.01))
+    return np.where(strength <= 0, 0.0, ret)
+
+
+class WarmTierStore:
+    """Varm nivå: int8-kvantiserade embeddings i en memory-mappad fil.
+
+    Filer bredvid `base`:
+    - <base>.warm.i8: int8-rader (append-only, läses via np.memmap)
+    - <base>.warm.scale.f32: en float32-skala per rad
+    - <base>.warm.meta.json: id → (rad, metadata), skrivs atomiskt
+
+    Borttagna rader blir döda tills filen kompakteras vid save().
+    """
+
+    def __init__(self, base_path: str):
+        self.base = base_path
+        self.vec_path = f"{base_path}.warm.i8"
+        self.scale_path = f"{base_path}.warm.scale.f32"
+        self.meta_path = f"{base_path}.warm.meta.json"
+        self.dim: int | None = None
+        self._disk_rows = 0
+        self._codes: np.ndarray | None = None
+        self._scales: np.ndarray | None = None
+        self._pending_codes: list[np.ndarray] = []
+        self._pending_scales: list[float] = []
+        self._row_of: dict[str, int] = {}
+        self._meta: dict[str, dict] = {}
+        self._dirty = False
+        if os.path.exists(self.meta_path):
+            self._load()
+
+    def __len__(self) -> int:
+        return len(self._row_of)
+
+    def __contains__(self, memory_id: str) -> bool:
+        return memory_id in self._row_of
+
+    @property
+    def dead_rows(self) -> int:
+        return self._disk_rows + len(self._pending_codes) - len(self._row_of)
+
+    def _load(self) -> None:
+        with open(self.meta_path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        self.dim = data["dim"]
+        self._disk_rows = data["rows"]
+        for memory_id, (row, meta) in data["entries"].items():
+            self._row_of[memory_id] = row
+            self._meta[memory_id] = meta
+        # Kapa bort svansar från en avbruten save
+        for path, size in ((self.vec_path, self._disk_rows * (self.dim or 0)),
+                           (self.scale_path, self._disk_rows * 4)):
+            if os.path.exists(path) and os.path.getsize(path) > size:
+                os.truncate(path, size)
+        self._map()
+
+    def _map(self) -> None:
+        if self._disk_rows and self.dim:
+            self._codes = np.memmap(self.vec_path, dtype=np.int8, mode="r",
+                                    shape=(self._disk_rows, self.dim))
+            self._scales = np.memmap(self.scale_path, dtype=np.float32, mode="r",
+                                     shape=(self._disk_rows,))
+        else:
+            self._codes = self._scales = None
+
+    def add(self, memory_id: str, embedding: np.ndarray, metadata: dict) -> None:
+        codes, scale = quantize_int8(embedding)
+        if self.dim is None:
+            self.dim = len(codes)
+        elif len(codes) != self.dim:
+            raise ValueError(f"Embedding-dimension {len(codes)} matchar inte varm nivå {self.dim}")
+        if memory_id in self._row_of:
+            self.pop(memory_id)
+        self._row_of[memory_id] = self._disk_rows + len(self._pending_codes)
+        self._meta[memory_id] = metadata
+        self._pending_codes.append(codes)
+        self._pending_scales.append(scale)
+        self._dirty = True
+
+    def _rows_matrix(self, rows: np.ndarray) -> np.ndarray:
+        """Avkvantiserade embeddings för givna rader (disk + väntande)."""
+        out = np.empty((len(rows), self.dim or 0), dtype=np.float32)
+        on_disk = rows < self._disk_rows
+        if on_disk.any():
+            r = rows[on_disk]
+            out[on_disk] = dequantize_int8(np.asarray(self._codes[r]), np.asarray(self._scales[r]))
+        for i in np.flatnonzero(~on_disk):
+            j = rows[i] - self._disk_rows
+            out[i] = dequantize_int8(self._pending_codes[j], self._pending_scales[j])
+        return out
+
+    def get(self, memory_id: str) -> tuple[np.ndarray, dict] | None:
+        row = self._row_of.get(memory_id)
+        if row is None:
+            return None
+        return self._rows_matrix(np.array([row]))[0], self._meta[memory_id]
+
+    def pop(self, memory_id: str) -> tuple[np.ndarray, dict] | None:
+        item = self.get(memory_id)
+        if item is not None:
+            del self._row_of[memory_id]
+            del self._meta[memory_id]
+            self._dirty = True
+        return item
+
+    def search(self, query: np.ndarray, n_results: int, predicate=None) -> list[tuple[str, float, dict]]:
+        """Top-n (id, similarity, metadata) i varm nivå.
+
+        predicate(metadata) -> bool filtrerar kandidaterna före poängsättning.
+        """
+        if not self._row_of or n_results <= 0 or len(query) != self.dim:
+            return []
+        ids = [m for m in self._row_of if predicate is None or predicate(self._meta[m])]
+        if not ids:
+            return []
+        sims = _cosine(self._rows_matrix(np.array([self._row_of[m] for m in ids], dtype=np.int64)), query)
+        top = np.argsort(-sims, kind="stable")[:n_results]
+        return [(ids[i], float(sims[i]), self._meta[ids[i]]) for i in top]
+
+    def expired(self, now: float, threshold: float, strength_scale: float) -> list[str]:
+        """Id:n vars retention fallit under threshold (ska till kall nivå)."""
+        if not self._meta:
+            return []
+        ids = list(self._meta)
+        ret = _retention([self._meta[m] for m in ids], now, strength_scale)
+        return [ids[i] for i in np.flatnonzero(ret < threshold)]
+
+    def save(self) -> None:
+        """Skriv väntande rader och metadata; kompaktera om hälften är döda."""
+        if not self._dirty:
+            return
+        os.makedirs(os.path.dirname(self.vec_path) or ".", exist_ok=True)
+        if self.dead_rows > max(len(self._row_of), 256):
+            self._compact()
+        elif self._pending_codes:
+            with open(self.vec_path, "ab") as f:
+                f.write(np.stack(self._pending_codes).tobytes())
+            with open(self.scale_path, "ab") as f:
+                f.write(np.asarray(self._pending_scales, dtype=np.float32).tobytes())
+            self._disk_rows += len(self._pending_codes)
+            self._pending_codes, self._pending_scales = [], []
+            self._map()
+        self._write_meta()
+        self._dirty = False
+
+    def _compact(self) -> None:
+        ids = list(self._row_of)
+        rows = np.fromiter((self._row_of[m] for m in ids), dtype=np.int64, count=len(ids))
+        codes = np.empty((len(ids), self.dim or 0), dtype=np.int8)
+        scales = np.empty(len(ids), dtype=np.float32)
+        for i, row in enumerate(rows):
+            if row < self._disk_rows:
+                codes[i], scales[i] = self._codes[row], self._scales[row]
+            else:
+                codes[i] = self._pending_codes[row - self._disk_rows]
+                scales[i] = self._pending_scales[row - self._disk_rows]
+        self._codes = self._scales = None
+        for path, data in ((self.vec_path, codes), (self.scale_path, scales)):
+            tmp = path + ".tmp"
+            with open(tmp, "wb") as f:
+                f.write(data.tobytes())
+            os.replace(tmp, path)
+        self._row_of = {m: i for i, m in enumerate(ids)}
+        self._disk_rows = len(ids)
+        self._pending_codes, self._pending_scales = [], []
+        self._map()
+
+    def _write_meta(self) -> None:
+        tmp = self.meta_path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({
+                "dim": self.dim,
+                "rows": self._disk_rows,
+                "entries": {m: [self._row_of[m], self._meta[m]] for m in self._row_of},
+            }, f, ensure_ascii=False)
+        os.replace(tmp, self.meta_path)
+
+
+class ColdArchive:
+    """Kall nivå: gzip-komprimerat JSONL-arkiv med float16-embeddings.
+
+    Nya minnen läggs till som nya gzip-medlemmar (append). Sökning
+    strömmar igenom arkivet blockvis; borttagning (vid befordran)
+    skriver om arkivet och är tänkt att vara sällsynt.
+    """
+
+    def __init__(self, base_path: str):
+        self.path = f"{base_path}.cold.jsonl.gz"
+        self._count: int | None = None
+
+    def __len__(self) -> int:
+        if self._count is None:
+            self._count = sum(1 for _ in self._lines())
+        return self._count
+
+    def _lines(self):
+        if not os.path.exists(self.path):
+            return
+        try:
+            with gzip.open(self.path, "rt", encoding="utf-8") as f:
+                for line in f:
+                    if line.strip():
+                        yield line
+        except (EOFError, OSError):
+            # Avbruten append — behåll det som gick att läsa
+            return
+
+    def append(self, items: list[tuple[str, np.ndarray, dict]]) -> None:
+        if not items:
+            return
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        with gzip.open(self.path, "at", encoding="utf-8") as f:
+            for memory_id, emb, meta in items:
+                f.write(json.dumps({
+                    "id": memory_id,
+                    "emb": base64.b64encode(np.asarray(emb, dtype=np.float16).tobytes()).decode("ascii"),
+                    "meta": meta,
+                }, ensure_ascii=False) + "\n")
+        if self._count is not None:
+            self._count += len(items)
+
+    def __iter__(self):
+        for line in self._lines():
+            rec = json.loads(line)
+            emb = np.frombuffer(base64.b64decode(rec["emb"]), dtype=np.float16).astype(np.float32)
+            yield rec["id"], emb, rec["meta"]
+
+    def search(self, query: np.ndarray, n_results: int,
+               predicate=None) -> list[tuple[str, float, dict, np.ndarray]]:
+        """Top-n (id, similarity, metadata, embedding) — strömmande genomsökning.
+
+        predicate(metadata) -> bool filtrerar posterna före poängsättning.
+        """
+        if n_results <= 0:
+            return []
+        best: list[tuple[float, int, str, dict, np.ndarray]] = []
+        chunk: list[tuple[str, np.ndarray, dict]] = []
+        seq = 0
+
+        def score(block):
+            nonlocal seq
+            block = [b for b in block if len(b[1]) == len(query)
+                     and (predicate is None or predicate(b[2]))]
+            if not block:
+                return
+            sims = _cosine(np.stack([e for _, e, _ in block]), query)
+            for (memory_id, emb, meta), sim in zip(block, sims):
+                # seq som tie-break: tidigare arkiverade vinner vid lika likhet
+                entry = (float(sim), -seq, memory_id, meta, emb)
+                seq += 1
+                if len(best) < n_results:
+                    heapq.heappush(best, entry)
+                elif entry[:2] > best[0][:2]:
+                    heapq.heapreplace(best, entry)
+
+        for item in self:
+            chunk.append(item)
+            if len(chunk) >= _COLD_SCAN_CHUNK:
+                score(chunk)
+                chunk = []
+        score(chunk)
+        best.sort(key=lambda e: (-e[0], -e[1]))
+        return [(memory_id, sim, meta, emb) for sim, _, memory_id, meta, emb in best]
+
+    def remove(self, memory_ids) -> int:
+        """Skriv om arkivet utan givna id:n."""
+        drop = set(memory_ids)
+        if not drop or not os.path.exists(self.path):
+            return 0
+        kept, removed = [], 0
+        for line in self._lines():
+            if json.loads(line)["id"] in drop:
+                removed += 1
+            else:
+                kept.append(line)
+        if removed:
+            tmp = self.path + ".tmp"
+            with gzip.open(tmp, "wt", encoding="utf-8") as f:
+                f.writelines(kept)
+            os.replace(tmp, self.path)
+            self._count = len(kept)
+        return removed
@@ -0,0 +1,122 @@
+"""
+Enhetstester för memory_tiers.py — int8-kvantisering, varm nivå och kallt arkiv.
+
+Kör med: python -m pytest memory_tiers_test.py -v
+"""
+
+import gzip
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from memory_tiers import ColdArchive, WarmTierStore, dequantize_int8, quantize_int8
+
+
+class TestQuantization(unittest.TestCase):
+    def test_roundtrip_error_bounded_by_half_step(self):
+        vec = np.random.RandomState(0).randn(1024).astype(np.float32)
+        codes, scale = quantize_int8(vec)
+        self.assertEqual(codes.dtype, np.int8)
+        err = np.max(np.abs(dequantize_int8(codes, scale) - vec))
+        self.assertLessEqual(err, scale / 2 + 1e-6)
+
+    def test_zero_vector(self):
+        codes, scale = quantize_int8(np.zeros(8))
+        np.testing.assert_array_equal(dequantize_int8(codes, scale), np.zeros(8))
+
+
+class TestWarmTierStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self.tmp.name, "mem")
+        self.rng = np.random.RandomState(1)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_search_survives_reload(self):
+        warm = WarmTierStore(self.base)
+        embs = self.rng.randn(20, 64).astype(np.float32)
+        for i, e in enumerate(embs):
+            warm.add(f"m{i}", e, {"strength": 1.0, "i": i})
+        warm.save()
+        for i, e in enumerate(self.rng.randn(5, 64)):
+            warm.add(f"n{i}", e, {"strength": 1.0})
+
+        hits = warm.search(embs[7], 1)
+        self.assertEqual(hits[0][0], "m7")
+        self.assertGreater(hits[0][1], 0.99)
+
+        warm.save()
+        reloaded = WarmTierStore(self.base)
+        self.assertEqual(len(reloaded), 25)
+        self.assertEqual(reloaded.search(embs[3], 1)[0][0], "m3")
+        self.assertIsInstance(reloaded._codes, np.memmap)
+
+    def test_pop_and_compaction(self):
+        warm = WarmTierStore(self.base)
+        for i in range(600):
+            warm.add(f"m{i}", self.rng.randn(16), {"i": i})
+        warm.save()
+        for i in range(500):
+            self.assertIsNotNone(warm.pop(f"m{i}"))
+        warm.save()
+        self.assertEqual(os.path.getsize(warm.vec_path), 100 * 16)
+        reloaded = WarmTierStore(self.base)
+        self.assertEqual(reloaded.get("m550")[1], {"i": 550})
+
+    def test_search_predicate_filters_before_ranking(self):
+        warm = WarmTierStore(self.base)
+        embs = self.rng.randn(10, 16)
+        for i, e in enumerate(embs):
+            warm.add(f"m{i}", e, {"odd": i % 2})
+        hits = warm.search(embs[4], 3, predicate=lambda meta: meta["odd"] == 1)
+        self.assertEqual(len(hits), 3)
+        self.assertTrue(all(meta["odd"] == 1 for _, _, meta in hits))
+
+    def test_expired_uses_retention(self):
+        warm = WarmTierStore(self.base)
+        warm.add("old", np.ones(4), {"strength": 1.0, "last_access": 0.0})
+        warm.add("new", np.ones(4), {"strength": 1.0, "last_access": 10_000.0})
+        self.assertEqual(warm.expired(10_000.0, 0.1, 3600), ["old"])
+
+
+class TestColdArchive(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.base = os.path.join(self.tmp.name, "mem")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_append_search_remove(self):
+        cold = ColdArchive(self.base)
+        eye = np.eye(8)
+        cold.append([(f"m{i}", eye[i], {"i": i}) for i in range(4)])
+        cold.append([(f"m{i}", eye[i], {"i": i}) for i in range(4, 8)])
+        self.assertEqual(len(cold), 8)
+
+        hits = cold.search(eye[5], 2)
+        self.assertEqual(hits[0][0], "m5")
+        np.testing.assert_allclose(hits[0][3], eye[5])
+        self.assertEqual(hits[1][0], "m0")  # Lika likhet → äldst först
+
+        self.assertEqual(cold.remove(["m5", "m9"]), 1)
+        self.assertEqual(len(ColdArchive(self.base)), 7)
+        self.assertNotEqual(cold.search(eye[5], 1)[0][0], "m5")
+
+    def test_truncated_member_is_ignored(self):
+        cold = ColdArchive(self.base)
+        cold.append([("a", np.ones(4), {})])
+        with open(cold.path, "ab") as f:
+            f.write(gzip.compress(b'{"id": "b"')[:-6])
+        self.assertEqual([m for m, _, _ in ColdArchive(self.base)], ["a"])
+
+
+if __name__ == "__main__":
+    unittest.main()
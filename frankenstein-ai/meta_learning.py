@@ -62,6 +62,70 @@ class TrainingScheduleRecommendation:
     reasons: list[str]
 
 
+def category_insight(category: str, count: int, solved: int, first_try: int, avg_time_ms: float,
+                     half_solved: tuple[int, int] | None, strategy_counts: dict[str, dict],
+                     difficulty_sum: float) -> CategoryInsight:
+    """Build a CategoryInsight from one category's counts in the analysis window.
+
+    half_solved: solved tasks in the first and second half of the category's
+    entries (None when a half has fewer than 2 entries). strategy_counts maps
+    strategy -> {"total", "solved"} in order of first appearance.
+    """
+    solve_rate = solved / count
+
+    # Trend: compare first half vs second half
+    if half_solved is not None:
+        mid = count // 2
+        first_half_rate = half_solved[0] / mid
+        second_half_rate = half_solved[1] / (count - mid)
+        if second_half_rate - first_half_rate > 0.1:
+            trend = "improving"
+        elif first_half_rate - second_half_rate > 0.1:
+            trend = "declining"
+        else:
+            trend = "stable"
+    else:
+        trend = "unknown"
+
+    # Best strategy for this category
+    best_strategy = "unknown"
+    best_rate = 0
+    for s, sc in strategy_counts.items():
+        if sc["total"] >= 2:
+            r = sc["solved"] / sc["total"]
+            if r > best_rate:
+                best_rate = r
+                best_strategy = s
+
+    # Weakness score: 0=strong, 1=very weak
+    weakness = 1.0 - solve_rate
+    if trend == "declining":
+        weakness = min(1.0, weakness + 0.15)
+    elif trend == "improving":
+        weakness = max(0.0, weakness - 0.1)
+
+    # Recommended difficulty based on solve rate
+    avg_diff = difficulty_sum / count
+    if solve_rate > 0.85:
+        rec_diff = min(10, int(avg_diff) + 1)
+    elif solve_rate < 0.3:
+        rec_diff = max(1, int(avg_diff) - 1)
+    else:
+        rec_diff = int(avg_diff)
+
+    return CategoryInsight(
+        category=category,
+        solve_rate=solve_rate,
+        first_try_rate=first_try / count,
+        avg_time_ms=avg_time_ms,
+        trend=trend,
+        best_strategy=best_strategy,
+        weakness_score=weakness,
+        recommended_difficulty=rec_diff,
+        sample_count=count,
+    )
+
+
 class MetaLearningEngine:
     """Analyzes training history and recommends optimizations."""
 
@@ -70,23 +134,43 @@ class MetaLearningEngine:
         self._last_analysis = None
         self._analysis_interval = 50  # Analyze every N tasks
 
-    def analyze(self, progress: dict) -> dict:
-        """Full meta-learning analysis. Returns insights and recommendations."""
+    def analyze(self, progress: dict, stats=None) -> dict:
+        """Full meta-learning analysis. Returns insights and recommendations.
+
+        stats: optional rolling_stats.TrendTracker — when its window size
+        matches history_window, its incremental aggregates replace every
+        pass over the history (phase, categories, strategies, parameters).
+        """
         history = progress.get("history", [])
         if len(history) < 20:
             return {"status": "insufficient_data", "tasks_needed": 20 - len(history)}
 
-        recent = history[-self.history_window:]
-
-        phase = self._detect_learning_phase(recent)
-        categories = self._analyze_categories(recent)
-        strategies = self._analyze_strategies(recent)
-        params = self._recommend_parameters(progress, recent, phase, categories)
+        if stats is not None and stats.by_strategy.size == self.history_window:
+            total_analyzed = len(stats.by_category)
+            rates = stats.phase_rates()
+            if rates is not None:
+                phase = self._phase_from_rates(*rates)
+            else:
+                # Under 100 tasks: the window is small enough to scan
+                phase = self._detect_learning_phase(list(history[-self.history_window:]))
+            categories = stats.category_insights()
+            strategies = stats.strategy_stats()
+            overall_rate, avg_time = stats.overall_rate(), stats.recent_avg_time()
+        else:
+            recent = history[-self.history_window:]
+            total_analyzed = len(recent)
+            phase = self._detect_learning_phase(recent)
+            categories = self._analyze_categories(recent)
+            strategies = self._analyze_strategies(recent)
+            overall_rate = sum(1 for h in recent if h.get("score", 0) >= 1.0) / max(len(recent), 1)
+            times = [h.get("time_ms", 0) for h in recent[-50:] if h.get("time_ms", 0) > 0]
+            avg_time = sum(times) / len(times) if times else None
+        params = self._recommend_parameters(progress, overall_rate, avg_time, phase, categories)
         schedule = self._recommend_schedule(progress, categories, phase)
 
         return {
             "status": "analyzed",
-            "total_analyzed": len(recent),
+            "total_analyzed": total_analyzed,
             "learning_phase": {
                 "phase": phase.phase,
                 "confidence": round(phase.confidence, 3),
@@ -144,11 +228,11 @@ class MetaLearningEngine:
         recent_ft = sum(1 for h in recent if h.get("first_try", False)) / len(recent)
         older_ft = sum(1 for h in older if h.get("first_try", False)) / len(older)
 
-        recent_time = [h.get("time_ms", 0) for h in recent if h.get("time_ms", 0) > 0]
-        older_time = [h.get("time_ms", 0) for h in older if h.get("time_ms", 0) > 0]
-        avg_recent_time = sum(recent_time) / max(len(recent_time), 1)
-        avg_older_time = sum(older_time) / max(len(older_time), 1)
+        return self._phase_from_rates(window, recent_rate, older_rate, recent_ft, older_ft)
 
+    def _phase_from_rates(self, window: int, recent_rate: float, older_rate: float,
+                          recent_ft: float, older_ft: float) -> LearningPhase:
+        """Classify the phase from solve/first-try rates of two adjacent windows."""
         rate_delta = recent_rate - older_rate
         ft_delta = recent_ft - older_ft
 
@@ -208,29 +292,13 @@ class MetaLearningEngine:
             if len(entries) < 3:
                 continue
 
-            solved = sum(1 for e in entries if e.get("score", 0) >= 1.0)
-            first_try = sum(1 for e in entries if e.get("first_try", False))
             times = [e.get("time_ms", 0) for e in entries if e.get("time_ms", 0) > 0]
-            avg_time = sum(times) / max(len(times), 1)
-
-            solve_rate = solved / len(entries)
-            ft_rate = first_try / len(entries)
-
-            # Trend: compare first half vs second half
             mid = len(entries) // 2
+            half_solved = None
             if mid >= 2:
-                first_half_rate = sum(1 for e in entries[:mid] if e.get("score", 0) >= 1.0) / mid
-                second_half_rate = sum(1 for e in entries[mid:] if e.get("score", 0) >= 1.0) / (len(entries) - mid)
-                if second_half_rate - first_half_rate > 0.1:
-                    trend = "improving"
-                elif first_half_rate - second_half_rate > 0.1:
-                    trend = "declining"
-                else:
-                    trend = "stable"
-            else:
-                trend = "unknown"
+                half_solved = (sum(1 for e in entries[:mid] if e.get("score", 0) >= 1.0),
+                               sum(1 for e in entries[mid:] if e.get("score", 0) >= 1.0))
 
-            # Best strategy for this category
             strat_counts: dict[str, dict] = {}
             for e in entries:
                 s = e.get("strategy", "unknown")
@@ -241,41 +309,15 @@ class MetaLearningEngine:
                 if e.get("score", 0) >= 1.0:
                     strat_counts[s]["solved"] += 1
 
-            best_strategy = "unknown"
-            best_rate = 0
-            for s, sc in strat_counts.items():
-                if sc["total"] >= 2:
-                    r = sc["solved"] / sc["total"]
-                    if r > best_rate:
-                        best_rate = r
-                        best_strategy = s
-
-            # Weakness score: 0=strong, 1=very weak
-            weakness = 1.0 - solve_rate
-            if trend == "declining":
-                weakness = min(1.0, weakness + 0.15)
-            elif trend == "improving":
-                weakness = max(0.0, weakness - 0.1)
-
-            # Recommended difficulty based on solve rate
-            avg_diff = sum(e.get("difficulty", 5) for e in entries) / len(entries)
-            if solve_rate > 0.85:
-                rec_diff = min(10, int(avg_diff) + 1)
-            elif solve_rate < 0.3:
-                rec_diff = max(1, int(avg_diff) - 1)
-            else:
-                rec_diff = int(avg_diff)
-
-            insights.append(CategoryInsight(
-                category=cat,
-                solve_rate=solve_rate,
-                first_try_rate=ft_rate,
-                avg_time_ms=avg_time,
-                trend=trend,
-                best_strategy=best_strategy,
-                weakness_score=weakness,
-                recommended_difficulty=rec_diff,
-                sample_count=len(entries),
+            insights.append(category_insight(
+                cat,
+                count=len(entries),
+                solved=sum(1 for e in entries if e.get("score", 0) >= 1.0),
+                first_try=sum(1 for e in entries if e.get("first_try", False)),
+                avg_time_ms=sum(times) / max(len(times), 1),
+                half_solved=half_solved,
+                strategy_counts=strat_counts,
+                difficulty_sum=sum(e.get("difficulty", 5) for e in entries),
             ))
 
         # Sort by weakness (weakest first)
@@ -315,9 +357,13 @@ class MetaLearningEngine:
 
         return result
 
-    def _recommend_parameters(self, progress: dict, history: list[dict],
+    def _recommend_parameters(self, progress: dict, overall_rate: float, avg_time: float | None,
                               phase: LearningPhase, categories: list[CategoryInsight]) -> list[ParameterRecommendation]:
-        """Recommend parameter adjustments based on analysis."""
+        """Recommend parameter adjustments based on analysis.
+
+        overall_rate: solve rate over the analysis window; avg_time: mean
+        positive solve time of its last 50 tasks (None if there is none).
+        """
         recs = []
         stack = progress.get("stack", {})
 
@@ -346,7 +392,6 @@ class MetaLearningEngine:
             ))
 
         # 2. Max attempts based on solve rate
-        overall_rate = sum(1 for h in history if h.get("score", 0) >= 1.0) / max(len(history), 1)
         current_max = 3
         if overall_rate < 0.4:
             recs.append(ParameterRecommendation(
@@ -362,9 +407,7 @@ class MetaLearningEngine:
             ))
 
         # 3. Batch size based on time efficiency
-        times = [h.get("time_ms", 0) for h in history[-50:] if h.get("time_ms", 0) > 0]
-        if times:
-            avg_time = sum(times) / len(times)
+        if avg_time is not None:
             if avg_time > 15000:
                 recs.append(ParameterRecommendation(
                     "batch_size", 10, 5,
@@ -33,6 +33,10 @@ class LLMProfile:
     weaknesses: list[str] = field(default_factory=list)
 
 
+# Strategies solved without an LLM (System 0/1) — not attributed to any LLM
+NON_LLM_STRATEGIES = ("system0_deterministic", "system0_promoted", "system1_memory", "system1_promoted")
+
+
 # Available LLM profiles
 LLM_PROFILES = {
     "gemini-flash": LLMProfile(
@@ -305,8 +309,25 @@ class MultiLLMRouter:
         """Get the preferred LLM for a category, if known."""
         return self.category_preference.get(category)
 
-    def import_from_history(self, history: list[dict]) -> int:
-        """Bootstrap performance data from training history."""
+    def import_from_history(self, history: list[dict], stats=None) -> int:
+        """Bootstrap performance data from training history.
+
+        stats: optional rolling_stats.TrendTracker — its cumulative
+        per-category LLM aggregate replaces the pass over history.
+        """
+        if stats is not None:
+            imported = 0
+            for cat, agg in stats.llm_by_category.groups.items():
+                # Default to gemini-flash for historical data
+                perf = self.performance["gemini-flash"][cat]
+                perf.total += agg.count
+                perf.solved += agg.solved
+                perf.first_try += agg.first_try
+                perf.total_time_ms += agg.time_sum
+                self._update_category_preference(cat)
+                imported += agg.count
+            return imported
+
         imported = 0
         for h in history:
             cat = h.get("category", "")
@@ -320,7 +341,7 @@ class MultiLLMRouter:
 
             # Infer which LLM was used from strategy
             # System 0/1 don't use LLMs, skip them
-            if strat in ("system0_deterministic", "system0_promoted", "system1_memory", "system1_promoted"):
+            if strat in NON_LLM_STRATEGIES:
                 continue
 
             # Default to gemini-flash for historical data
@@ -0,0 +1,259 @@
+"""
+Träningsprogression som append-only händelselogg + kompakta snapshots.
+
+Tidigare skrevs hela progress-dicten (inkl. 1000 historikposter och alla
+skills med exempelkod) om med indent=2 efter varje batch. Nu:
+
+1. Händelselogg (progress_events.jsonl): En JSON-rad per löst/försökt
+   uppgift, skrivs direkt när posten läggs till i historiken
+2. Snapshot (progress.json): Hela progress-dicten, kompakt, högst var
+   SNAPSHOT_INTERVAL sekund — skrivs till temporär fil och byts in
+   atomiskt (os.replace), så läsare aldrig ser en halvskriven fil
+3. Historik: ProgressHistory (RingBuffer med maxlen) i stället för en
+   lista som kopieras med [-1000:] efter varje uppgift
+
+Snapshoten anger hur långt i loggen den täcker (event_offset). Vid
+laddning spelas poster efter den punkten upp i historiken, så en krasch
+mellan två snapshots tappar inga historikposter. Loggen roteras till
+progress_events.jsonl.1 när den växer över COMPACT_BYTES.
+
+Läsare (analyze_training.py, bridge) läser snapshoten och kan följa
+loggen med EventTail — endast kompletta rader (avslutade med \\n) läses.
+"""
+
+import json
+import os
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+from bounded_history import RingBuffer
+
+SNAPSHOT_NAME = "progress.json"
+EVENTS_NAME = "progress_events.jsonl"
+
+# Antal historikposter som hålls i RAM och i snapshoten
+HISTORY_MAXLEN = 1000
+
+# Minsta tid mellan två snapshots (bridge räknar träningen som aktiv om
+# progress.json ändrats inom 90 s)
+SNAPSHOT_INTERVAL = float(os.environ.get("FRANKENSTEIN_SNAPSHOT_INTERVAL", "30"))
+
+# Händelseloggen roteras när den passerar denna storlek
+COMPACT_BYTES = 16 * 1024 * 1024
+
+
+@contextmanager
+def file_lock(path: str | Path):
+    """Exklusivt lås mellan processer (och trådar) via en låsfil."""
+    with open(path, "a+b") as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            else:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+def atomic_write_json(path: str | Path, obj: Any) -> None:
+    """Skriv JSON via temporär fil + os.replace (aldrig halvskriven)."""
+    path = Path(path)
+    tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump(obj, f, ensure_ascii=False, separators=(",", ":"), default=str)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def read_events(path: str | Path, offset: int = 0) -> tuple[list[dict], int]:
+    """Läs kompletta loggrader från byte-offset. Returnerar (poster, ny offset).
+
+    En ofullständig sista rad (skrivs just nu) lämnas kvar till nästa anrop.
+    """
+    try:
+        with open(path, "rb") as f:
+            f.seek(offset)
+            data = f.read()
+    except FileNotFoundError:
+        return [], offset
+    end = data.rfind(b"\n") + 1
+    records = []
+    for line in data[:end].splitlines():
+        if not line.strip():
+            continue
+        try:
+            records.append(json.loads(line))
+        except json.JSONDecodeError:
+            continue
+    return records, offset + end
+
+
+class EventTail:
+    """Följ händelseloggen inkrementellt (klarar rotation mellan anrop)."""
+
+    def __init__(self, data_dir: str | Path, offset: int = 0):
+        self.path = Path(data_dir) / EVENTS_NAME
+        self.offset = offset
+        self._inode = None
+
+    def poll(self) -> list[dict]:
+        try:
+            st = self.path.stat()
+        except FileNotFoundError:
+            return []
+        records: list[dict] = []
+        rotated = self._inode is not None and st.st_ino != self._inode
+        if rotated or st.st_size < self.offset:
+            # Roterad: läs resten av den gamla loggen, börja sedan om
+            records, _ = read_events(self.path.with_name(EVENTS_NAME + ".1"), self.offset)
+            self.offset = 0
+        self._inode = st.st_ino
+        new, self.offset = read_events(self.path, self.offset)
+        return records + new
+
+
+class ProgressHistory(RingBuffer):
+    """Historik med maxlen där varje append även skrivs till händelseloggen.
+
+    listeners anropas med varje ny post (t.ex. TrendTracker.push).
+    """
+
+    def __init__(self, store: "ProgressStore | None" = None, maxlen: int = HISTORY_MAXLEN):
+        super().__init__(maxlen)
+        self._store = store
+        self.listeners: list = []
+
+    def append(self, item: Any) -> None:
+        super().append(item)
+        if self._store is not None:
+            self._store.record(item)
+        for listener in self.listeners:
+            listener(item)
+
+
+class ProgressStore:
+    """Händelselogg + snapshot för progress-dicten i en katalog."""
+
+    def __init__(
+        self,
+        data_dir: str | Path,
+        history_maxlen: int = HISTORY_MAXLEN,
+        snapshot_interval: float = SNAPSHOT_INTERVAL,
+        compact_bytes: int = COMPACT_BYTES,
+    ):
+        self.data_dir = Path(data_dir)
+        self.snapshot_path = self.data_dir / SNAPSHOT_NAME
+        self.events_path = self.data_dir / EVENTS_NAME
+        self.history_maxlen = history_maxlen
+        self.snapshot_interval = snapshot_interval
+        self.compact_bytes = compact_bytes
+        self._lock = threading.Lock()
+        self._events_file = None
+        self._last_snapshot = 0.0
+        self.snapshots_written = 0
+
+    # --- Laddning ---
+
+    def load(self, default: dict | None = None) -> dict:
+        """Läs snapshot (eller default), och spela upp loggen efter den."""
+        progress = None
+        if self.snapshot_path.exists():
+            try:
+                progress = json.loads(self.snapshot_path.read_text(encoding="utf-8"))
+            except Exception:
+                progress = None
+        if progress is None:
+            progress = dict(default or {})
+
+        offset = int(progress.pop("event_offset", 0) or 0)
+        history = ProgressHistory(None, self.history_maxlen)
+        history.extend(progress.get("history", []))
+        for record in self._events_since(offset):
+            history.append(record)
+        history._store = self
+        progress["history"] = history
+        return progress
+
+    def _events_since(self, offset: int) -> list[dict]:
+        try:
+            size = self.events_path.stat().st_size
+        except FileNotFoundError:
+            size = 0
+        records: list[dict] = []
+        if offset > size:
+            # Loggen roterades efter snapshoten — resten ligger i .1
+            records, _ = read_events(self.events_path.with_name(EVENTS_NAME + ".1"), offset)
+            offset = 0
+        new, _ = read_events(self.events_path, offset)
+        return records + new
+
+    # --- Skrivning ---
+
+    def record(self, entry: dict) -> None:
+        """Lägg till en post i händelseloggen (en hel rad per write)."""
+        line = json.dumps(entry, ensure_ascii=False, separators=(",", ":"), default=str) + "\n"
+        with self._lock:
+            if self._events_file is None:
+                self.data_dir.mkdir(parents=True, exist_ok=True)
+                self._events_file = open(self.events_path, "a", encoding="utf-8")
+            self._events_file.write(line)
+            self._events_file.flush()
+
+    def save(self, progress: dict, force: bool = False) -> bool:
+        """Skriv snapshot om intervallet passerats (eller force). Returnerar True om skriven."""
+        now = time.time()
+        if not force and now - self._last_snapshot < self.snapshot_interval:
+            return False
+        with self._lock:
+            self.data_dir.mkdir(parents=True, exist_ok=True)
+            if self._events_file is not None:
+                self._events_file.flush()
+            offset = self.events_path.stat().st_size if self.events_path.exists() else 0
+            if offset > self.compact_bytes:
+                self._rotate()
+                offset = 0
+            snapshot = dict(progress)
+            snapshot["history"] = list(progress.get("history", []))
+            snapshot["event_offset"] = offset
+            atomic_write_json(self.snapshot_path, snapshot)
+        self._last_snapshot = now
+        self.snapshots_written += 1
+        return True
+
+    def _rotate(self) -> None:
+        if self._events_file is not None:
+            self._events_file.close()
+            self._events_file = None
+        os.replace(self.events_path, self.events_path.with_name(EVENTS_NAME + ".1"))
+
+    def close(self) -> None:
+        with self._lock:
+            if self._events_file is not None:
+                self._events_file.close()
+                self._events_file = None
+
+
+def read_progress(data_dir: str | Path) -> dict | None:
+    """Läs aktuell progression (snapshot + efterföljande logg) utan att skriva."""
+    store = ProgressStore(data_dir)
+    if not store.snapshot_path.exists() and not store.events_path.exists():
+        return None
+    progress = store.load()
+    progress["history"] = list(progress["history"])
+    return progress
@@ -0,0 +1,87 @@
+"""
+Enhetstester för progress_store.py — händelselogg, snapshots, uppspelning och tail.
+
+Kör med: python -m pytest progress_store_test.py -v
+"""
+
+import json
+import os
+import sys
+import tempfile
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from progress_store import EVENTS_NAME, EventTail, ProgressStore, read_events, read_progress
+
+
+class TestProgressStore(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.dir = self.tmp.name
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_history_is_bounded_and_logged(self):
+        store = ProgressStore(self.dir, history_maxlen=5)
+        progress = store.load(default={"history": [], "total": 0})
+        for i in range(8):
+            progress["history"].append({"id": i})
+        self.assertEqual([h["id"] for h in progress["history"]], [3, 4, 5, 6, 7])
+        self.assertEqual(progress["history"][-2:], [{"id": 6}, {"id": 7}])
+        records, _ = read_events(os.path.join(self.dir, EVENTS_NAME))
+        self.assertEqual(len(records), 8)
+        store.close()
+
+    def test_snapshot_interval_and_force(self):
+        store = ProgressStore(self.dir, snapshot_interval=3600)
+        progress = store.load(default={"history": []})
+        self.assertTrue(store.save(progress))
+        self.assertFalse(store.save(progress))
+        self.assertTrue(store.save(progress, force=True))
+        with open(store.snapshot_path, encoding="utf-8") as f:
+            self.assertIn("event_offset", json.load(f))
+        store.close()
+
+    def test_events_after_snapshot_are_replayed(self):
+        store = ProgressStore(self.dir)
+        progress = store.load(default={"history": [], "total": 0})
+        progress["history"].append({"id": "a"})
+        progress["total"] = 1
+        store.save(progress, force=True)
+        progress["history"].append({"id": "b"})  # Krasch före nästa snapshot
+        store.close()
+
+        reloaded = ProgressStore(self.dir).load()
+        self.assertEqual([h["id"] for h in reloaded["history"]], ["a", "b"])
+        self.assertEqual(reloaded["total"], 1)
+        self.assertNotIn("event_offset", reloaded)
+
+    def test_rotation_keeps_replay_and_tail_working(self):
+        store = ProgressStore(self.dir, compact_bytes=1)
+        progress = store.load(default={"history": []})
+        tail = EventTail(self.dir)
+        progress["history"].append({"id": 1})
+        self.assertEqual(tail.poll(), [{"id": 1}])
+
+        store.save(progress, force=True)  # Loggen > compact_bytes → roteras
+        self.assertTrue(os.path.exists(os.path.join(self.dir, EVENTS_NAME + ".1")))
+        progress["history"].append({"id": 2})
+        self.assertEqual(tail.poll(), [{"id": 2}])
+        store.close()
+        self.assertEqual([h["id"] for h in read_progress(self.dir)["history"]], [1, 2])
+
+    def test_partial_line_is_left_for_next_read(self):
+        path = os.path.join(self.dir, EVENTS_NAME)
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"id": 1}\n{"id": ')
+        records, offset = read_events(path)
+        self.assertEqual(records, [{"id": 1}])
+        with open(path, "a", encoding="utf-8") as f:
+            f.write('2}\n')
+        self.assertEqual(read_events(path, offset)[0], [{"id": 2}])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -54,7 +54,9 @@ class PromotionPipeline:
     S2_TO_S1_THRESHOLD = 3   # successes needed for S2 → S1
     S1_TO_S0_THRESHOLD = 10  # consecutive successes needed for S1 → S0
 
-    def __init__(self):
+    def __init__(self, state_path: Path | None = PROMOTION_STATE_PATH):
+        # None disables persistence (training workers — the coordinator owns the file)
+        self.state_path = state_path
         self.candidates: dict[str, PromotionCandidate] = {}
         self.promoted_s1: dict[str, str] = {}  # signature → best_code
         self.promoted_s0: dict[str, str] = {}  # signature → template_code
@@ -214,8 +216,20 @@ class PromotionPipeline:
             },
         }
 
+    def merge_promoted(self, promoted_s1: dict[str, str], promoted_s0: dict[str, str]) -> int:
+        """Adopt tiers promoted elsewhere (another worker). Returns number of new entries."""
+        added = 0
+        for local, incoming in ((self.promoted_s1, promoted_s1), (self.promoted_s0, promoted_s0)):
+            for sig, code in incoming.items():
+                if sig not in local:
+                    local[sig] = code
+                    added += 1
+        return added
+
     def _save_state(self):
         """Persist promotion state to disk."""
+        if self.state_path is None:
+            return
         state = {
             "promoted_s1": self.promoted_s1,
             "promoted_s0": self.promoted_s0,
@@ -236,8 +250,8 @@ class PromotionPipeline:
             },
         }
         try:
-            PROMOTION_STATE_PATH.parent.mkdir(parents=True, exist_ok=True)
-            PROMOTION_STATE_PATH.write_text(
+            self.state_path.parent.mkdir(parents=True, exist_ok=True)
+            self.state_path.write_text(
                 json.dumps(state, indent=2, ensure_ascii=False),
                 encoding="utf-8",
             )
@@ -247,8 +261,8 @@ class PromotionPipeline:
     def _load_state(self):
         """Load promotion state from disk."""
         try:
-            if PROMOTION_STATE_PATH.exists():
-                state = json.loads(PROMOTION_STATE_PATH.read_text(encoding="utf-8"))
+            if self.state_path is not None and self.state_path.exists():
+                state = json.loads(self.state_path.read_text(encoding="utf-8"))
                 self.promoted_s1 = state.get("promoted_s1", {})
                 self.promoted_s0 = state.get("promoted_s0", {})
                 for sig, data in state.get("candidates", {}).items():
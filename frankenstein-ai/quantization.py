@@ -0,0 +1,336 @@
+"""
+Kvantiserad lagring av embeddings: float32, float16 eller int8.
+
+HDC-vektorer (10 000 dims) och minnes-embeddings (1024 dims) lagras
+annars som Python-listor eller float32. Den här modulen ger:
+
+1. QuantizedVector: En vektor i valfri precision (int8 med skala per vektor)
+2. QuantizedMatrix: Växande radmatris med förberäknade normer; cosine
+   similarity räknas blockvis direkt på koderna (avkvantisering i block)
+3. quantized_attribute: Property för dataclasses som lagrar kvantiserat
+   men fortfarande exponerar en lista
+4. benchmark_quantization: Mäter minnesvinst och recall@k-förlust
+
+Kör benchmark: python quantization.py
+"""
+
+import os
+
+import numpy as np
+
+EMBEDDING_DTYPES = ("float32", "float16", "int8")
+
+# Standardprecision för forsknings-, HDC- och minnes-embeddings.
+# float32 ger oförändrade resultat; float16/int8 väljs explicit via miljövariabeln.
+DEFAULT_EMBEDDING_DTYPE = os.environ.get("FRANKENSTEIN_EMBEDDING_DTYPE", "float32")
+
+# Rader per block när kvantiserade matriser avkvantiseras för matmul
+SIMILARITY_BLOCK = 4096
+
+
+def check_dtype(dtype: str | np.dtype) -> str:
+    """Normalisera och validera ett precisionsnamn."""
+    name = np.dtype(dtype).name
+    if name not in EMBEDDING_DTYPES:
+        raise ValueError(f"Okänd embedding-precision: {name} (välj {EMBEDDING_DTYPES})")
+    return name
+
+
+def quantize_int8(vec: np.ndarray) -> tuple[np.ndarray, float]:
+    """Symmetrisk int8-kvantisering med en skalfaktor per vektor."""
+    vec = np.asarray(vec, dtype=np.float32)
+    scale = float(np.max(np.abs(vec))) / 127.0 if len(vec) else 0.0
+    if scale == 0.0:
+        return np.zeros(len(vec), dtype=np.int8), 1.0
+    return np.clip(np.rint(vec / scale), -127, 127).astype(np.int8), scale
+
+
+def dequantize_int8(codes: np.ndarray, scales: np.ndarray | float) -> np.ndarray:
+    """Inversen av quantize_int8 — fungerar för en rad eller en matris."""
+    scales = np.asarray(scales, dtype=np.float32)
+    if codes.ndim == 2:
+        scales = scales[:, None]
+    return codes.astype(np.float32) * scales
+
+
+def quantize(vec: np.ndarray, dtype: str) -> tuple[np.ndarray, float]:
+    """Koda en vektor i given precision. Returnerar (koder, skala)."""
+    if dtype == "int8":
+        return quantize_int8(vec)
+    return np.asarray(vec, dtype=dtype).reshape(-1), 1.0
+
+
+def quantize_rows(matrix: np.ndarray, dtype: str) -> tuple[np.ndarray, np.ndarray]:
+    """Radvis quantize() för en hel matris. Returnerar (koder, skalor)."""
+    matrix = np.asarray(matrix, dtype=np.float32)
+    if dtype != "int8":
+        return matrix.astype(dtype, copy=False), np.ones(len(matrix), dtype=np.float32)
+    scales = np.max(np.abs(matrix), axis=1) / 127.0 if matrix.size else np.zeros(len(matrix))
+    scales = np.where(scales == 0.0, 1.0, scales).astype(np.float32)
+    codes = np.clip(np.rint(matrix / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize(codes: np.ndarray, scales: np.ndarray | float = 1.0) -> np.ndarray:
+    """Avkvantisera till float32 (rad eller matris)."""
+    if codes.dtype == np.int8:
+        return dequantize_int8(codes, scales)
+    return codes.astype(np.float32, copy=False)
+
+
+def block_dot(
+    codes: np.ndarray,
+    query: np.ndarray,
+    scales: np.ndarray | None = None,
+    block: int = SIMILARITY_BLOCK,
+) -> np.ndarray:
+    """codes @ query utan att avkvantisera hela matrisen på en gång.
+
+    float32 går direkt till BLAS; float16/int8 konverteras block för block
+    och int8-resultatet skalas per rad efteråt.
+    """
+    q = np.asarray(query, dtype=np.float32)
+    if codes.dtype == np.float32:
+        return codes @ q
+    out = np.empty(len(codes), dtype=np.float32)
+    for start in range(0, len(codes), block):
+        out[start:start + block] = codes[start:start + block].astype(np.float32) @ q
+    if codes.dtype == np.int8 and scales is not None:
+        out *= scales
+    return out
+
+
+class QuantizedVector:
+    """En embedding lagrad som koder + skala (skala 1.0 för float16/32)."""
+
+    __slots__ = ("codes", "scale")
+
+    def __init__(self, codes: np.ndarray, scale: float = 1.0):
+        self.codes = codes
+        self.scale = float(scale)
+
+    @classmethod
+    def from_array(cls, vec, dtype: str = DEFAULT_EMBEDDING_DTYPE) -> "QuantizedVector":
+        codes, scale = quantize(np.asarray(vec, dtype=np.float32).reshape(-1), check_dtype(dtype))
+        return cls(codes, scale)
+
+    @property
+    def dtype(self) -> str:
+        return self.codes.dtype.name
+
+    @property
+    def nbytes(self) -> int:
+        return self.codes.nbytes + (4 if self.dtype == "int8" else 0)
+
+    def __len__(self) -> int:
+        return len(self.codes)
+
+    def to_array(self) -> np.ndarray:
+        return dequantize(self.codes, self.scale)
+
+    def tolist(self) -> list[float]:
+        return self.to_array().tolist()
+
+    def __repr__(self) -> str:
+        return f"QuantizedVector(dim={len(self.codes)}, dtype={self.dtype})"
+
+
+def quantized_attribute(name: str, dtype: str | None = None) -> property:
+    """Property som lagrar en embedding som QuantizedVector.
+
+    Läsning ger en lista (samma API som tidigare list-fält), skrivning
+    accepterar lista, array eller QuantizedVector. Används på dataclasses:
+    `Klass.fält = quantized_attribute("fält")` efter klassdefinitionen.
+    """
+    key = f"_q_{name}"
+
+    def fget(obj):
+        q = obj.__dict__.get(key)
+        return None if q is None else q.tolist()
+
+    def fset(obj, value):
+        if value is not None and not isinstance(value, QuantizedVector):
+            value = QuantizedVector.from_array(value, dtype or DEFAULT_EMBEDDING_DTYPE)
+        obj.__dict__[key] = value
+
+    return property(fget, fset, doc=f"{name} (lagras kvantiserad)")
+
+
+def quantized_value(obj, name: str) -> QuantizedVector | None:
+    """Den kvantiserade vektorn bakom ett quantized_attribute (utan listkopiering)."""
+    return obj.__dict__.get(f"_q_{name}")
+
+
+class QuantizedMatrix:
+    """Växande radmatris i vald precision med förberäknade normer.
+
+    Normerna räknas på den avkvantiserade raden, så cosine similarity
+    blir konsistent med det som faktiskt lagras.
+    """
+
+    def __init__(self, dtype: str = "float32", dim: int | None = None, capacity: int = 64):
+        self.dtype = check_dtype(dtype)
+        self.dim = dim
+        self._capacity = max(1, capacity)
+        self._codes: np.ndarray | None = None
+        self._scales = np.ones(self._capacity, dtype=np.float32)
+        self._norms = np.zeros(self._capacity, dtype=np.float32)
+        self._n = 0
+
+    def __len__(self) -> int:
+        return self._n
+
+    @property
+    def nbytes(self) -> int:
+        if self._codes is None:
+            return 0
+        extra = 8 if self.dtype == "int8" else 4  # skala + norm per rad
+        return self._n * (self._codes.itemsize * self.dim + extra)
+
+    def _grow(self, needed: int) -> None:
+        if self._codes is not None and needed <= self._capacity:
+            return
+        cap = self._capacity
+        while cap < needed:
+            cap *= 2
+        codes = np.zeros((cap, self.dim), dtype=self.dtype)
+        scales = np.ones(cap, dtype=np.float32)
+        norms = np.zeros(cap, dtype=np.float32)
+        if self._codes is not None:
+            codes[:self._n] = self._codes[:self._n]
+            scales[:self._n] = self._scales[:self._n]
+            norms[:self._n] = self._norms[:self._n]
+        self._codes, self._scales, self._norms, self._capacity = codes, scales, norms, cap
+
+    def _write(self, row: int, vec: np.ndarray) -> None:
+        codes, scale = quantize(vec, self.dtype)
+        self._codes[row] = codes
+        self._scales[row] = scale
+        self._norms[row] = np.linalg.norm(dequantize(codes, scale))
+
+    def append(self, vec) -> int:
+        vec = np.asarray(vec, dtype=np.float32).reshape(-1)
+        if self.dim is None:
+            self.dim = len(vec)
+        elif len(vec) != self.dim:
+            raise ValueError(f"Dimension {len(vec)} matchar inte matrisens {self.dim}")
+        self._grow(self._n + 1)
+        self._write(self._n, vec)
+        self._n += 1
+        return self._n - 1
+
+    def set_row(self, row: int, vec) -> None:
+        self._write(row, np.asarray(vec, dtype=np.float32).reshape(-1))
+
+    def row(self, row: int) -> np.ndarray:
+        return dequantize(self._codes[row], self._scales[row])
+
+    def export_state(self) -> dict:
+        """Rader som de lagras (koder, skalor, normer) — för checkpoints."""
+        n = self._n
+        return {
+            "dtype": self.dtype,
+            "dim": self.dim,
+            "codes": self._codes[:n] if self._codes is not None else np.zeros((0, 0), dtype=self.dtype),
+            "scales": self._scales[:n],
+            "norms": self._norms[:n],
+        }
+
+    def import_state(self, state: dict) -> None:
+        """Ersätt innehållet med export_state()-data.
+
+        Rader i samma precision kopieras rakt av; annan precision
+        avkvantiseras och kodas om (normerna räknas då om).
+        """
+        n = len(state["scales"])
+        norms = state["norms"]
+        if check_dtype(state["dtype"]) == self.dtype:
+            codes, scales = np.asarray(state["codes"], dtype=self.dtype), state["scales"]
+        else:
+            dense = dequantize(np.asarray(state["codes"], dtype=state["dtype"])[:n],
+                               np.asarray(state["scales"], dtype=np.float32))
+            codes, scales = quantize_rows(dense, self.dtype)
+            norms = np.linalg.norm(dequantize(codes, scales), axis=1) if n else np.zeros(0, dtype=np.float32)
+        self.dim = state["dim"]
+        self._n = 0
+        self._codes = None
+        self._capacity = max(1, n)
+        if self.dim is not None:
+            self._grow(self._capacity)
+            self._codes[:n] = codes[:n]
+            self._scales[:n] = scales
+            self._norms[:n] = norms
+            self._n = n
+
+    def delete_row(self, row: int) -> int | None:
+        """Ta bort en rad genom att flytta in sista raden. Returnerar flyttad rads gamla index."""
+        last = self._n - 1
+        moved = None
+        if row != last:
+            self._codes[row] = self._codes[last]
+            self._scales[row] = self._scales[last]
+            self._norms[row] = self._norms[last]
+            moved = last
+        self._n -= 1
+        return moved
+
+    def similarities(self, query) -> np.ndarray:
+        """Cosine similarity mot alla rader (blockvis på koderna)."""
+        if self._n == 0:
+            return np.zeros(0, dtype=np.float32)
+        q = np.asarray(query, dtype=np.float32).reshape(-1)
+        dots = block_dot(self._codes[:self._n], q, self._scales[:self._n])
+        return dots / np.maximum(self._norms[:self._n] * np.linalg.norm(q), 1e-8)
+
+
+def benchmark_quantization(
+    n_vectors: int = 2000,
+    dim: int = 1024,
+    n_queries: int = 100,
+    k: int = 10,
+    seed: int = 0,
+    dtypes: tuple[str, ...] = EMBEDDING_DTYPES,
+) -> dict[str, dict]:
+    """Mät minne och recall-noggrannhet per precision.
+
+    Data: klustrade vektorer (som HDC-koncept) och brusiga frågor.
+    recall_at_k är andelen av float64-facit:s top-k som återfinns i
+    kvantiserad top-k; max_sim_error är största avvikelsen i similarity.
+    """
+    rng = np.random.RandomState(seed)
+    centers = rng.randn(max(1, n_vectors // 20), dim)
+    data = centers[rng.randint(len(centers), size=n_vectors)] + 0.5 * rng.randn(n_vectors, dim)
+    queries = data[rng.randint(n_vectors, size=n_queries)] + 0.5 * rng.randn(n_queries, dim)
+
+    unit = data / np.linalg.norm(data, axis=1, keepdims=True)
+    exact = [unit @ (q / np.linalg.norm(q)) for q in queries]
+    exact_top = [set(np.argsort(-s)[:k]) for s in exact]
+
+    report = {}
+    for dtype in dtypes:
+        mat = QuantizedMatrix(dtype=dtype, dim=dim, capacity=n_vectors)
+        for vec in data:
+            mat.append(vec)
+        hits = 0
+        max_err = 0.0
+        for q, ref, top in zip(queries, exact, exact_top):
+            sims = mat.similarities(q)
+            hits += len(top & set(np.argsort(-sims)[:k]))
+            max_err = max(max_err, float(np.max(np.abs(sims - ref))))
+        report[dtype] = {
+            "bytes": mat.nbytes,
+            "recall_at_k": hits / (k * n_queries),
+            "max_sim_error": max_err,
+        }
+    base = report.get("float32", {}).get("bytes") or n_vectors * (dim * 4 + 4)
+    for stats in report.values():
+        stats["compression"] = base / max(stats["bytes"], 1)
+    return report
+
+
+if __name__ == "__main__":
+    results = benchmark_quantization()
+    print(f"{'dtype':<8} {'MB':>8} {'x':>6} {'recall@10':>10} {'max Δsim':>10}")
+    for name, r in results.items():
+        print(f"{name:<8} {r['bytes'] / 1e6:>8.2f} {r['compression']:>6.2f} "
+              f"{r['recall_at_k']:>10.3f} {r['max_sim_error']:>10.5f}")
@@ -0,0 +1,117 @@
+"""
+Enhetstester för quantization.py — kvantiserade vektorer, matriser och benchmark.
+
+Kör med: python -m pytest quantization_test.py -v
+"""
+
+import os
+import sys
+import unittest
+from dataclasses import dataclass
+from typing import Optional
+
+import numpy as np
+import torch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from quantization import (
+    QuantizedMatrix, QuantizedVector, benchmark_quantization, block_dot,
+    quantize_rows, quantized_attribute, quantized_value,
+)
+from cognition import NeuroSymbolicBridge
+
+
+@dataclass
+class _Finding:
+    name: str
+    hdc_embedding: Optional[list] = None
+
+
+_Finding.hdc_embedding = quantized_attribute("hdc_embedding", dtype="int8")
+
+
+class TestQuantizedVector(unittest.TestCase):
+    def test_modes_roundtrip(self):
+        vec = np.random.RandomState(0).randn(1000)
+        for dtype, tol, nbytes in (("float32", 1e-6, 4000), ("float16", 1e-2, 2000), ("int8", 0.05, 1004)):
+            q = QuantizedVector.from_array(vec, dtype)
+            self.assertEqual(q.nbytes, nbytes)
+            self.assertLess(np.max(np.abs(q.to_array() - vec)), tol)
+
+    def test_invalid_dtype(self):
+        with self.assertRaises(ValueError):
+            QuantizedVector.from_array(np.ones(4), "float64")
+
+    def test_dataclass_attribute_keeps_list_api(self):
+        f = _Finding("a", hdc_embedding=[0.5, -1.0, 0.25])
+        self.assertIsInstance(quantized_value(f, "hdc_embedding"), QuantizedVector)
+        self.assertEqual(quantized_value(f, "hdc_embedding").dtype, "int8")
+        np.testing.assert_allclose(f.hdc_embedding, [0.5, -1.0, 0.25], atol=0.01)
+        self.assertIsNone(_Finding("b").hdc_embedding)
+
+
+class TestQuantizedMatrix(unittest.TestCase):
+    def test_import_state_requantizes_other_precision(self):
+        rng = np.random.RandomState(2)
+        src = QuantizedMatrix("float16")
+        for vec in rng.randn(6, 32):
+            src.append(vec)
+        dst = QuantizedMatrix("int8")
+        dst.import_state(src.export_state())
+        self.assertEqual(len(dst), 6)
+        self.assertEqual(dst.export_state()["codes"].dtype, np.int8)
+        np.testing.assert_allclose(dst.row(3), src.row(3), atol=0.05)
+        np.testing.assert_allclose(dst.similarities(src.row(3)), src.similarities(src.row(3)), atol=0.01)
+
+    def test_block_dot_matches_dense(self):
+        rng = np.random.RandomState(1)
+        mat = rng.randn(50, 32)
+        codes, scales = quantize_rows(mat, "int8")
+        q = rng.randn(32)
+        dense = (codes.astype(np.float32) * scales[:, None]) @ q
+        np.testing.assert_allclose(block_dot(codes, q, scales, block=7), dense, rtol=1e-4, atol=1e-4)
+
+    def test_similarities_and_delete(self):
+        mat = QuantizedMatrix(dtype="float16", capacity=2)
+        eye = np.eye(6)
+        for v in eye:
+            mat.append(v)
+        self.assertEqual(int(np.argmax(mat.similarities(eye[4]))), 4)
+        self.assertEqual(mat.delete_row(1), 5)  # Sista raden flyttas in
+        self.assertEqual(len(mat), 5)
+        self.assertEqual(int(np.argmax(mat.similarities(eye[5]))), 1)
+
+    def test_benchmark_reports_compression_and_recall(self):
+        report = benchmark_quantization(n_vectors=300, dim=128, n_queries=20, k=5)
+        self.assertAlmostEqual(report["float16"]["compression"], 2.0, places=1)
+        self.assertGreater(report["int8"]["compression"], 3.5)
+        self.assertGreaterEqual(report["int8"]["recall_at_k"], 0.9)
+        self.assertLess(report["float16"]["max_sim_error"], 1e-3)
+
+
+class TestPrototypeMemory(unittest.TestCase):
+    def test_bridge_classifies_with_int8_prototypes(self):
+        torch.manual_seed(0)
+        exact = NeuroSymbolicBridge(lnn_output_dim=8, hdc_dim=512)
+        quant = NeuroSymbolicBridge(lnn_output_dim=8, hdc_dim=512, prototype_dtype="int8")
+        quant.load_state_dict(exact.state_dict())
+        samples = [exact.encode(torch.randn(8)) for _ in range(5)]
+        for i, hv in enumerate(samples):
+            exact.learn_concept(f"c{i}", hv)
+            quant.learn_concept(f"c{i}", hv)
+
+        for hv in samples:
+            e, q = exact.classify(hv), quant.classify(hv)
+            self.assertEqual(e[2], q[2])
+            self.assertAlmostEqual(e[1], q[1], places=2)
+        self.assertIsInstance(quant.concept_memory["c0"], torch.Tensor)
+        self.assertLess(quant.concept_memory.nbytes, exact.concept_memory.nbytes / 3)
+
+        del quant.concept_memory["c1"]
+        self.assertEqual(list(quant.concept_memory), ["c0", "c2", "c3", "c4"])
+        self.assertEqual(quant.classify(samples[4])[2], "c4")
+
+
+if __name__ == "__main__":
+    unittest.main()
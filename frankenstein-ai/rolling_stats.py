@@ -0,0 +1,441 @@
+"""
+Inkrementell rullande statistik över träningshistoriken.
+
+Trendberäkningen, adaptive_difficulty, MetaLearningEngine, MultiLLMRouter och
+SpacedRepetitionScheduler läste om samma historik (senaste 10/50/100/200
+poster, grupperat per nivå, kategori och strategi, eller hela historiken vid
+start). TrendTracker matas en gång per uppgift och håller glidande fönster
+och kumulativa aggregat med löpande summor:
+
+1. SlidingAggregate: Fönster över de senaste N posterna (eller alla, N=None)
+   med aggregat per nyckel — push är O(1) (ny post adderas, utträngd post
+   subtraheras)
+2. TrendTracker: Fönstren som trenderna bygger på, samma utdata som
+   batch_trends() och MetaLearningEngine (fas, kategorier, strategier),
+   plus kumulativa per-kategori-aggregat för routerns och
+   repetitionsschemats uppstart
+3. check_consistency: Jämför trackern mot batch-omräkning från historiken
+
+Användning:
+    tracker = TrendTracker(progress["history"])
+    progress["history"].listeners.append(tracker.push)
+    progress["trends"] = tracker.trends()
+"""
+
+from collections import deque
+from dataclasses import asdict
+from typing import Any, Callable, Iterable
+
+from meta_learning import CategoryInsight, MetaLearningEngine, category_insight
+from multi_llm_router import NON_LLM_STRATEGIES
+
+# Globala trendfönster (namn, antal poster)
+TREND_WINDOWS = (("last_10", 10), ("last_50", 50), ("last_100", 100))
+
+# Fönster för per-nivå-, per-kategori- och per-strategi-aggregat
+GROUP_WINDOW = 200
+
+# Antal senaste poster som adaptive_difficulty tittar på
+RECENT_WINDOW = 30
+
+LEVELS = range(1, 11)
+
+# Senaste poäng per kategori i de kumulativa aggregaten (≥ SpacedRepetitionScheduler.HISTORY_SIZE)
+CATEGORY_SCORES = 20
+
+_SKIP = object()
+
+
+class _Agg:
+    """Löpande summor för en grupp i ett fönster."""
+
+    __slots__ = ("count", "solved", "first_try", "time_sum", "time_pos_sum", "time_pos_n", "difficulty_sum")
+
+    def __init__(self):
+        self.count = 0
+        self.solved = 0
+        self.first_try = 0
+        self.time_sum = 0.0
+        self.time_pos_sum = 0.0
+        self.time_pos_n = 0
+        self.difficulty_sum = 0
+
+    def add(self, sign: int, solved: bool, first: bool, time_ms: float, difficulty) -> None:
+        self.count += sign
+        self.solved += sign * solved
+        self.first_try += sign * first
+        self.time_sum += sign * time_ms
+        self.difficulty_sum += sign * difficulty
+        if time_ms > 0:
+            self.time_pos_sum += sign * time_ms
+            self.time_pos_n += sign
+
+    def rates(self) -> dict:
+        return {
+            "solve_rate": round(self.solved / self.count, 3),
+            "first_try_rate": round(self.first_try / self.count, 3),
+            "avg_time_ms": round(self.time_pos_sum / max(self.time_pos_n, 1), 1),
+            "count": self.count,
+        }
+
+
+def _fields(entry: dict) -> tuple[bool, bool, float, Any]:
+    return (entry.get("score", 0) >= 1.0, bool(entry.get("first_try", False)),
+            entry.get("time_ms", 0), entry.get("difficulty", 5))
+
+
+class SlidingAggregate:
+    """De senaste `size` posterna, aggregerade per nyckel.
+
+    key_fn(post) ger gruppnyckeln, eller _SKIP om posten bara ska ta plats
+    i fönstret (t.ex. nivåer utanför 1–10). Grupper som töms tas bort.
+    size=None ger ett kumulativt aggregat utan utträngning.
+
+    ordered=True håller dessutom gruppens poster i fönsterordning
+    (löpnummer + lösta före posten), så att solved_range() och
+    first_seq() svarar utan att gå igenom fönstret.
+    """
+
+    def __init__(self, size: int | None, key_fn: Callable[[dict], Any], ordered: bool = False):
+        self.size = size
+        self.key_fn = key_fn
+        self.groups: dict[Any, _Agg] = {}
+        self._window: deque = deque()
+        self._pushed = 0
+        self._order: dict[Any, deque] | None = {} if ordered else None
+        self._solved_total: dict[Any, int] = {}
+
+    def push(self, entry: dict) -> None:
+        key = self.key_fn(entry)
+        fields = _fields(entry)
+        self._pushed += 1
+        if key is not _SKIP:
+            self.groups.setdefault(key, _Agg()).add(1, *fields)
+            if self._order is not None:
+                before = self._solved_total.get(key, 0)
+                self._order.setdefault(key, deque()).append((self._pushed, before))
+                self._solved_total[key] = before + fields[0]
+        if self.size is None:
+            return
+        self._window.append((key, *fields))
+        if len(self._window) > self.size:
+            old_key, *old = self._window.popleft()
+            if old_key is not _SKIP:
+                agg = self.groups[old_key]
+                agg.add(-1, *old)
+                if self._order is not None:
+                    self._order[old_key].popleft()
+                if agg.count == 0:
+                    del self.groups[old_key]
+                    if self._order is not None:
+                        del self._order[old_key], self._solved_total[old_key]
+
+    def solved_range(self, key, start: int, stop: int) -> int:
+        """Lösta bland gruppens poster [start, stop) i fönstret (kräver ordered)."""
+        order = self._order[key]
+        end = self._solved_total[key] if stop >= len(order) else order[stop][1]
+        return end - order[start][1]
+
+    def first_seq(self, key) -> int:
+        """Löpnummer för gruppens äldsta post i fönstret (kräver ordered)."""
+        return self._order[key][0][0]
+
+    def __len__(self) -> int:
+        return self._pushed if self.size is None else len(self._window)
+
+
+def _level_key(entry: dict):
+    level = entry.get("difficulty")
+    return int(level) if level in LEVELS else _SKIP
+
+
+def _strategy_key(entry: dict):
+    return entry.get("strategy", "") or _SKIP
+
+
+def _category_key(entry: dict):
+    return entry.get("category", "unknown")
+
+
+def _category_strategy_key(entry: dict):
+    strategy = entry.get("strategy", "unknown")
+    return (_category_key(entry), strategy) if strategy else _SKIP
+
+
+def _llm_category_key(entry: dict):
+    category = entry.get("category", "")
+    if not category or entry.get("strategy", "") in NON_LLM_STRATEGIES:
+        return _SKIP
+    return category
+
+
+class CategoryTotals:
+    """Kumulativ historik för en kategori — det SpacedRepetitionScheduler startar från."""
+
+    __slots__ = ("attempted", "solved", "first_try", "scores", "difficulty",
+                 "last_attempted", "last_solved", "last_failed")
+
+    def __init__(self):
+        self.attempted = 0
+        self.solved = 0
+        self.first_try = 0  # Lösta på första försöket
+        self.scores: deque = deque(maxlen=CATEGORY_SCORES)
+        self.difficulty = 5
+        self.last_attempted = 0
+        self.last_solved = 0
+        self.last_failed = 0
+
+    def push(self, entry: dict) -> None:
+        score = entry.get("score", 0)
+        self.attempted += 1
+        self.scores.append(score)
+        self.difficulty = entry.get("difficulty", 5)
+        if score >= 1.0:
+            self.solved += 1
+            self.first_try += bool(entry.get("first_try", False))
+        ts = entry.get("timestamp", 0)
+        if ts:
+            self.last_attempted = max(self.last_attempted, ts)
+            if score >= 1.0:
+                self.last_solved = max(self.last_solved, ts)
+            else:
+                self.last_failed = max(self.last_failed, ts)
+
+
+class TrendTracker:
+    """Delad inkrementell statistikmotor för träningsloopen."""
+
+    def __init__(self, history: Iterable[dict] = ()):
+        self.rebuild(history)
+
+    def rebuild(self, history: Iterable[dict] = ()) -> None:
+        """Nollställ och mata in historiken på nytt (t.ex. efter en avvikelse)."""
+        self.windows = {
+            name: SlidingAggregate(size, lambda h: "all") for name, size in TREND_WINDOWS
+        }
+        self.by_level = SlidingAggregate(GROUP_WINDOW, _level_key)
+        self.by_category = SlidingAggregate(GROUP_WINDOW, _category_key, ordered=True)
+        self.by_strategy = SlidingAggregate(GROUP_WINDOW, _strategy_key)
+        self.by_category_strategy = SlidingAggregate(GROUP_WINDOW, _category_strategy_key, ordered=True)
+        # Kumulativt (hela historiken): routerns LLM-resultat och repetitionsschemat
+        self.llm_by_category = SlidingAggregate(None, _llm_category_key)
+        self.categories: dict[str, CategoryTotals] = {}
+        self._recent: deque = deque(maxlen=RECENT_WINDOW)
+        self.total = 0
+        for entry in history:
+            self.push(entry)
+
+    def push(self, entry: dict) -> None:
+        """Registrera en ny historikpost — O(1)."""
+        for window in self.windows.values():
+            window.push(entry)
+        self.by_level.push(entry)
+        self.by_category.push(entry)
+        self.by_strategy.push(entry)
+        self.by_category_strategy.push(entry)
+        self.llm_by_category.push(entry)
+        totals = self.categories.get(_category_key(entry))
+        if totals is None:
+            totals = self.categories[_category_key(entry)] = CategoryTotals()
+        totals.push(entry)
+        self._recent.append(entry)
+        self.total += 1
+
+    def recent(self, n: int = RECENT_WINDOW) -> list[dict]:
+        """De senaste n (högst RECENT_WINDOW) posterna, äldst först."""
+        items = list(self._recent)
+        return items[-n:] if n < len(items) else items
+
+    def trends(self) -> dict:
+        """Samma utdata som batch_trends(history)."""
+        trends = {}
+        for name, window in self.windows.items():
+            agg = window.groups.get("all")
+            if agg is None:
+                trends[name] = {"solve_rate": 0, "first_try_rate": 0, "avg_time_ms": 0, "count": 0}
+            else:
+                trends[name] = agg.rates()
+
+        trends["per_level"] = {
+            str(lvl): self.by_level.groups[lvl].rates()
+            for lvl in LEVELS if lvl in self.by_level.groups
+        }
+
+        cat_trends = {}
+        for cat, agg in self.by_category.groups.items():
+            cat_trends[cat] = {
+                "attempted": agg.count,
+                "solved": agg.solved,
+                "first_try": agg.first_try,
+                "total_time_ms": agg.time_sum,
+                "solve_rate": round(agg.solved / max(agg.count, 1), 3),
+                "avg_time_ms": round(agg.time_sum / max(agg.count, 1), 1),
+            }
+        trends["per_category"] = cat_trends
+        return trends
+
+    def strategy_stats(self, min_total: int = 3) -> dict:
+        """Samma utdata som MetaLearningEngine._analyze_strategies(history[-200:])."""
+        result = {}
+        for strategy, agg in self.by_strategy.groups.items():
+            if agg.count < min_total:
+                continue
+            avg_time = agg.time_pos_sum / max(agg.time_pos_n, 1)
+            result[strategy] = {
+                "total": agg.count,
+                "solve_rate": round(agg.solved / agg.count, 3),
+                "first_try_rate": round(agg.first_try / agg.count, 3),
+                "avg_time_ms": round(avg_time, 1),
+                "efficiency": round((agg.solved / agg.count) / max(avg_time / 1000, 0.1), 3),
+            }
+        return result
+
+
+    def category_insights(self, min_samples: int = 3) -> list[CategoryInsight]:
+        """Samma utdata som MetaLearningEngine._analyze_categories(history[-200:])."""
+        strategies: dict[str, dict[str, dict]] = {}
+        for cat, strategy in sorted(self.by_category_strategy.groups,
+                                    key=self.by_category_strategy.first_seq):
+            agg = self.by_category_strategy.groups[(cat, strategy)]
+            strategies.setdefault(cat, {})[strategy] = {"total": agg.count, "solved": agg.solved}
+
+        insights = []
+        for cat in sorted(self.by_category.groups, key=self.by_category.first_seq):
+            agg = self.by_category.groups[cat]
+            if agg.count < min_samples:
+                continue
+            mid = agg.count // 2
+            half_solved = None
+            if mid >= 2:
+                half_solved = (self.by_category.solved_range(cat, 0, mid),
+                               self.by_category.solved_range(cat, mid, agg.count))
+            insights.append(category_insight(
+                cat,
+                count=agg.count,
+                solved=agg.solved,
+                first_try=agg.first_try,
+                avg_time_ms=agg.time_pos_sum / max(agg.time_pos_n, 1),
+                half_solved=half_solved,
+                strategy_counts=strategies.get(cat, {}),
+                difficulty_sum=agg.difficulty_sum,
+            ))
+        insights.sort(key=lambda x: -x.weakness_score)
+        return insights
+
+    def phase_rates(self) -> tuple[int, float, float, float, float] | None:
+        """Indata till MetaLearningEngine._phase_from_rates: senaste 50 mot de 50 före.
+
+        None tills 100 poster finns (då är fönstren inte fulla och
+        batch-analysen på den korta historiken används).
+        """
+        last_50, last_100 = self.windows["last_50"], self.windows["last_100"]
+        if len(last_100) < last_100.size:
+            return None
+        recent, older = last_50.groups["all"], last_100.groups["all"]
+        window = last_50.size
+        return (window, recent.solved / window, (older.solved - recent.solved) / window,
+                recent.first_try / window, (older.first_try - recent.first_try) / window)
+
+    def overall_rate(self) -> float:
+        """Lösningsgrad över de senaste GROUP_WINDOW posterna."""
+        solved = sum(agg.solved for agg in self.by_category.groups.values())
+        return solved / max(len(self.by_category), 1)
+
+    def recent_avg_time(self) -> float | None:
+        """Medeltid (time_ms > 0) över de senaste 50 posterna, None om ingen finns."""
+        agg = self.windows["last_50"].groups.get("all")
+        if agg is None or agg.time_pos_n == 0:
+            return None
+        return agg.time_pos_sum / agg.time_pos_n
+
+
+def batch_trends(history) -> dict:
+    """Beräkna rullande trender från historik genom full omräkning (referens)."""
+    trends = {}
+    for window_name, window_size in TREND_WINDOWS:
+        recent = history[-window_size:] if len(history) >= window_size else history
+        if not recent:
+            trends[window_name] = {"solve_rate": 0, "first_try_rate": 0, "avg_time_ms": 0, "count": 0}
+            continue
+        solved = sum(1 for h in recent if h.get("score", 0) >= 1.0)
+        first_try = sum(1 for h in recent if h.get("first_try", False))
+        times = [h.get("time_ms", 0) for h in recent if h.get("time_ms", 0) > 0]
+        trends[window_name] = {
+            "solve_rate": round(solved / len(recent), 3),
+            "first_try_rate": round(first_try / len(recent), 3),
+            "avg_time_ms": round(sum(times) / max(len(times), 1), 1),
+            "count": len(recent),
+        }
+
+    # Trender per nivå (senaste 200)
+    level_trends = {}
+    recent_all = history[-GROUP_WINDOW:]
+    for lvl in LEVELS:
+        level_hist = [h for h in recent_all if h.get("difficulty") == lvl]
+        if level_hist:
+            s = sum(1 for h in level_hist if h.get("score", 0) >= 1.0)
+            ft = sum(1 for h in level_hist if h.get("first_try", False))
+            times = [h.get("time_ms", 0) for h in level_hist if h.get("time_ms", 0) > 0]
+            level_trends[str(lvl)] = {
+                "solve_rate": round(s / len(level_hist), 3),
+                "first_try_rate": round(ft / len(level_hist), 3),
+                "avg_time_ms": round(sum(times) / max(len(times), 1), 1),
+                "count": len(level_hist),
+            }
+    trends["per_level"] = level_trends
+
+    # Trender per kategori (senaste 200)
+    cat_trends = {}
+    for h in recent_all:
+        cat = h.get("category", "unknown")
+        if cat not in cat_trends:
+            cat_trends[cat] = {"attempted": 0, "solved": 0, "first_try": 0, "total_time_ms": 0.0}
+        cat_trends[cat]["attempted"] += 1
+        if h.get("score", 0) >= 1.0:
+            cat_trends[cat]["solved"] += 1
+        if h.get("first_try", False):
+            cat_trends[cat]["first_try"] += 1
+        cat_trends[cat]["total_time_ms"] += h.get("time_ms", 0)
+    for cat, ct in cat_trends.items():
+        ct["solve_rate"] = round(ct["solved"] / max(ct["attempted"], 1), 3)
+        ct["avg_time_ms"] = round(ct["total_time_ms"] / max(ct["attempted"], 1), 1)
+    trends["per_category"] = cat_trends
+
+    return trends
+
+
+def _diff(path: str, a, b, tol: float, out: list[str]) -> None:
+    if isinstance(a, dict) and isinstance(b, dict):
+        for key in a.keys() | b.keys():
+            if key not in a or key not in b:
+                out.append(f"{path}.{key}: saknas i {'tracker' if key not in a else 'batch'}")
+            else:
+                _diff(f"{path}.{key}", a[key], b[key], tol, out)
+    elif isinstance(a, (int, float)) and isinstance(b, (int, float)):
+        # Avrundade kvoter kan skilja ett steg när flyttalssummor driver
+        if abs(a - b) > tol * max(1.0, abs(b)):
+            out.append(f"{path}: tracker={a} batch={b}")
+    elif a != b:
+        out.append(f"{path}: tracker={a!r} batch={b!r}")
+
+
+def check_consistency(tracker: TrendTracker, history, tol: float = 1e-3) -> list[str]:
+    """Jämför trackerns utdata mot batch-omräkning. Returnerar avvikelser (tom = OK)."""
+    mismatches: list[str] = []
+    _diff("trends", tracker.trends(), batch_trends(history), tol, mismatches)
+    engine = MetaLearningEngine()
+    recent = list(history[-GROUP_WINDOW:])
+    _diff("strategies", tracker.strategy_stats(), engine._analyze_strategies(recent), tol, mismatches)
+
+    insights = tracker.category_insights()
+    batch_insights = engine._analyze_categories(recent)
+    _diff("categories", {c.category: asdict(c) for c in insights},
+          {c.category: asdict(c) for c in batch_insights}, tol, mismatches)
+    if [c.category for c in insights] != [c.category for c in batch_insights]:
+        mismatches.append("categories: olika ordning")
+
+    rates = tracker.phase_rates()
+    if rates is not None:
+        _diff("phase", asdict(engine._phase_from_rates(*rates)),
+              asdict(engine._detect_learning_phase(recent)), tol, mismatches)
+    return mismatches
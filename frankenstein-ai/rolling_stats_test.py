@@ -0,0 +1,140 @@
+"""
+Enhetstester för rolling_stats.py — glidande fönster, kumulativa aggregat och
+konsistens mot batch-omräkning.
+
+Kör med: python -m pytest rolling_stats_test.py -v
+"""
+
+import os
+import random
+import sys
+import tempfile
+import unittest
+from dataclasses import asdict
+from pathlib import Path
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+import spaced_repetition
+from meta_learning import MetaLearningEngine
+from multi_llm_router import MultiLLMRouter
+from spaced_repetition import SpacedRepetitionScheduler
+from rolling_stats import SlidingAggregate, TrendTracker, batch_trends, check_consistency
+
+
+def _history(n, seed=0):
+    rng = random.Random(seed)
+    cats = ["math", "strings", "graph", "dp", None]
+    strats = ["direct", "with_hints", "system0_deterministic", ""]
+    out = []
+    for i in range(n):
+        entry = {
+            "id": f"t{i}",
+            "score": rng.choice([0, 0.5, 1.0, 1.0]),
+            "difficulty": rng.choice([1, 2, 5, 9, 10, 12]),
+            "first_try": rng.random() < 0.4,
+            "time_ms": rng.choice([0, round(rng.uniform(1, 9000), 1)]),
+            "strategy": rng.choice(strats),
+            "timestamp": 1_700_000_000 + i * 30 if rng.random() < 0.9 else 0,
+        }
+        cat = rng.choice(cats)
+        if cat is not None:
+            entry["category"] = cat
+        out.append(entry)
+    return out
+
+
+class TestSlidingAggregate(unittest.TestCase):
+    def test_evicted_groups_disappear(self):
+        agg = SlidingAggregate(3, lambda h: h["k"])
+        for k in "aabcd":
+            agg.push({"k": k, "score": 1.0})
+        self.assertEqual(set(agg.groups), {"b", "c", "d"})
+        self.assertEqual(agg.groups["d"].solved, 1)
+
+
+class TestTrendTracker(unittest.TestCase):
+    def test_incremental_matches_batch_at_every_size(self):
+        history = _history(450)
+        tracker = TrendTracker()
+        for i, entry in enumerate(history, 1):
+            tracker.push(entry)
+            if i in (1, 7, 10, 60, 199, 200, 201, 450):
+                self.assertEqual(check_consistency(tracker, history[:i]), [], f"efter {i} poster")
+
+    def test_trends_equal_batch_output(self):
+        history = _history(300, seed=3)
+        trends = TrendTracker(history).trends()
+        batch = batch_trends(history)
+        self.assertEqual(trends["last_50"], batch["last_50"])
+        self.assertEqual(trends["per_level"], batch["per_level"])
+        self.assertEqual(set(trends["per_category"]), set(batch["per_category"]))
+
+    def test_strategy_stats_match_meta_learning(self):
+        history = _history(250, seed=5)
+        self.assertEqual(
+            TrendTracker(history).strategy_stats(),
+            MetaLearningEngine()._analyze_strategies(history[-200:]),
+        )
+
+    def test_check_consistency_reports_drift(self):
+        history = _history(50)
+        tracker = TrendTracker(history[:-1])
+        self.assertNotEqual(check_consistency(tracker, history), [])
+        tracker.rebuild(history)
+        self.assertEqual(check_consistency(tracker, history), [])
+
+    def test_category_insights_match_meta_learning(self):
+        history = _history(260, seed=7)
+        insights = TrendTracker(history).category_insights()
+        batch = MetaLearningEngine()._analyze_categories(history[-200:])
+        self.assertEqual([c.category for c in insights], [c.category for c in batch])
+        for c, b in zip(insights, batch):
+            # Löpande flyttalssummor kan skilja i sista biten
+            self.assertAlmostEqual(c.avg_time_ms, b.avg_time_ms, places=6)
+            self.assertEqual({**asdict(c), "avg_time_ms": 0}, {**asdict(b), "avg_time_ms": 0})
+
+    def test_analyze_with_stats_matches_batch(self):
+        for n in (40, 150, 400):
+            history = _history(n, seed=n)
+            progress = {"history": history, "current_difficulty": 5, "total_tasks_attempted": n}
+            engine = MetaLearningEngine(history_window=200)
+            self.assertEqual(engine.analyze(progress, stats=TrendTracker(history)),
+                             engine.analyze(progress), f"{n} poster")
+
+    def test_recent_window(self):
+        tracker = TrendTracker(_history(40))
+        self.assertEqual([h["id"] for h in tracker.recent(3)], ["t37", "t38", "t39"])
+        self.assertEqual(len(tracker.recent()), 30)
+
+
+class TestCumulativeImports(unittest.TestCase):
+    """Routerns och repetitionsschemats uppstart från trackern = full genomgång."""
+
+    def test_router_import(self):
+        history = _history(700, seed=11)
+        batch, incremental = MultiLLMRouter(), MultiLLMRouter()
+        imported = batch.import_from_history(history)
+        self.assertEqual(incremental.import_from_history(history, stats=TrendTracker(history)), imported)
+        for cat, perf in batch.performance["gemini-flash"].items():
+            other = incremental.performance["gemini-flash"][cat]
+            self.assertEqual((perf.total, perf.solved, perf.first_try), (other.total, other.solved, other.first_try))
+            self.assertAlmostEqual(perf.total_time_ms, other.total_time_ms, places=3)
+        self.assertEqual(batch.category_preference, incremental.category_preference)
+
+    def test_spaced_repetition_import(self):
+        history = _history(700, seed=13)
+        with tempfile.TemporaryDirectory() as tmp, \
+                mock.patch.object(spaced_repetition, "STATE_PATH", Path(tmp) / "sr.json"):
+            batch = SpacedRepetitionScheduler()
+            imported = batch.import_from_progress({"history": history})
+            incremental = SpacedRepetitionScheduler()
+            incremental.records.clear()
+            self.assertEqual(incremental.import_from_progress({}, stats=TrendTracker(history)), imported)
+        self.assertEqual({c: asdict(r) for c, r in incremental.records.items()},
+                         {c: asdict(r) for c, r in batch.records.items()})
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -309,8 +309,33 @@ class SpacedRepetitionScheduler:
 
     # ── Bulk import from progress.json ─────────────────────────
 
-    def import_from_progress(self, progress: dict):
-        """Import historical data from progress.json to bootstrap the scheduler."""
+    def import_from_progress(self, progress: dict, stats=None):
+        """Import historical data from progress.json to bootstrap the scheduler.
+
+        stats: optional rolling_stats.TrendTracker — its cumulative
+        per-category totals replace the pass over history.
+        """
+        if stats is not None:
+            imported = 0
+            for cat, totals in stats.categories.items():
+                if cat == "unknown":
+                    continue
+                if cat in self.records and self.records[cat].attempted >= totals.attempted:
+                    continue  # Already imported
+                rec = self._get_or_create(cat, totals.difficulty)
+                rec.attempted += totals.attempted
+                rec.solved += totals.solved
+                rec.first_try += totals.first_try
+                rec.recent_scores = (rec.recent_scores + list(totals.scores))[-self.HISTORY_SIZE:]
+                rec.last_attempted = max(rec.last_attempted, totals.last_attempted)
+                rec.last_solved = max(rec.last_solved, totals.last_solved)
+                rec.last_failed = max(rec.last_failed, totals.last_failed)
+                self._init_interval(rec)
+                imported += 1
+            if imported > 0:
+                self._save_state()
+            return imported
+
         history = progress.get("history", [])
         if not history:
             return
@@ -346,15 +371,7 @@ class SpacedRepetitionScheduler:
                         rec.last_failed = max(rec.last_failed, ts)
 
             rec.recent_scores = rec.recent_scores[-self.HISTORY_SIZE:]
-            # Compute initial interval based on solve rate
-            rate = rec.solve_rate
-            quality = rate * 5.0
-            rec.easiness_factor = max(1.3, 2.5 - 0.8 * (5.0 - quality))
-            rec.interval_seconds = max(
-                self.MIN_INTERVAL,
-                300.0 * rec.easiness_factor ** max(0, rec.solved // 5)
-            )
-            rec.interval_seconds = min(rec.interval_seconds, self.MAX_INTERVAL)
+            self._init_interval(rec)
             imported += 1
 
         if imported > 0:
@@ -364,6 +381,17 @@ class SpacedRepetitionScheduler:
 
     # ── Internal ───────────────────────────────────────────────
 
+    def _init_interval(self, rec: CategoryRecord):
+        """Compute the initial interval of an imported category from its solve rate."""
+        rate = rec.solve_rate
+        quality = rate * 5.0
+        rec.easiness_factor = max(1.3, 2.5 - 0.8 * (5.0 - quality))
+        rec.interval_seconds = max(
+            self.MIN_INTERVAL,
+            300.0 * rec.easiness_factor ** max(0, rec.solved // 5)
+        )
+        rec.interval_seconds = min(rec.interval_seconds, self.MAX_INTERVAL)
+
     def _get_or_create(self, category: str, difficulty: int = 5) -> CategoryRecord:
         if category not in self.records:
             self.records[category] = CategoryRecord(category=category, difficulty=difficulty)
@@ -0,0 +1,161 @@
+"""
+Lättviktig tidsmätning per steg (spans) i solve_task.
+
+SolveMetadata hade bara total_time_ms — en långsam uppgift gick inte att
+bryta ned i HDC, minne, S0/S1, promptbygge, LLM-väntan, evaluering osv.
+
+1. span(namn) / @timed(namn): Mäter ett steg. Utan aktiv SpanRecorder
+   i tråden returneras en delad no-op — nära noll overhead
+2. SpanRecorder: Ackumulerar EXKLUSIV tid per steg (nästlade spans dras
+   av från föräldern), så stegen summerar till högst total tid
+3. SpanStats: Glidande fönster per steg → p50/p95/medel i get_stats()
+
+Recordern är trådlokal: pipelinens förhämtningstrådar (training_pipeline)
+anropar _call_llm utan aktiv recorder och mäts därför inte.
+
+Användning:
+    with activate(SpanRecorder()) as rec:
+        with span("hdc"):
+            ...
+    rec.timings()  # {"hdc": 1.2, ...} i ms
+
+Stäng av med FRANKENSTEIN_SPANS=0.
+"""
+
+import functools
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+SPANS_ENABLED = os.environ.get("FRANKENSTEIN_SPANS", "1") != "0"
+
+# Antal senaste mätningar per steg som percentilerna räknas över
+SPAN_WINDOW = 500
+
+_local = threading.local()
+
+
+class _NullSpan:
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SPAN = _NullSpan()
+
+
+class _Span:
+    __slots__ = ("recorder", "name", "start", "child_ms")
+
+    def __init__(self, recorder: "SpanRecorder", name: str):
+        self.recorder = recorder
+        self.name = name
+
+    def __enter__(self):
+        self.child_ms = 0.0
+        self.recorder._stack.append(self)
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        elapsed = (time.perf_counter() - self.start) * 1000
+        rec = self.recorder
+        rec._stack.pop()
+        rec._ms[self.name] = rec._ms.get(self.name, 0.0) + elapsed - self.child_ms
+        if rec._stack:
+            rec._stack[-1].child_ms += elapsed
+        return False
+
+
+class SpanRecorder:
+    """Exklusiv tid per steg (ms) för ett solve_task-anrop."""
+
+    def __init__(self):
+        self._ms: dict[str, float] = {}
+        self._stack: list[_Span] = []
+
+    def span(self, name: str) -> _Span:
+        return _Span(self, name)
+
+    def timings(self, total_ms: float | None = None) -> dict[str, float]:
+        """Tid per steg; med total_ms läggs omätt tid till som "other"."""
+        out = {k: round(v, 2) for k, v in self._ms.items()}
+        if total_ms is not None:
+            out["other"] = round(max(total_ms - sum(self._ms.values()), 0.0), 2)
+        return out
+
+
+def span(name: str):
+    """Mät ett steg i trådens aktiva recorder (no-op om ingen är aktiv)."""
+    rec = getattr(_local, "recorder", None)
+    return _NULL_SPAN if rec is None else _Span(rec, name)
+
+
+def timed(name: str):
+    """Dekorator: hela funktionsanropet mäts som steget `name`."""
+    def wrap(fn):
+        @functools.wraps(fn)
+        def inner(*args, **kwargs):
+            rec = getattr(_local, "recorder", None)
+            if rec is None:
+                return fn(*args, **kwargs)
+            with _Span(rec, name):
+                return fn(*args, **kwargs)
+        return inner
+    return wrap
+
+
+@contextmanager
+def activate(recorder: SpanRecorder | None):
+    """Gör recordern aktiv i den här tråden (None = mätning avstängd)."""
+    prev = getattr(_local, "recorder", None)
+    _local.recorder = recorder
+    try:
+        yield recorder
+    finally:
+        _local.recorder = prev
+
+
+def _percentile(sorted_vals: list[float], q: float) -> float:
+    if not sorted_vals:
+        return 0.0
+    idx = q * (len(sorted_vals) - 1)
+    lo = int(idx)
+    hi = min(lo + 1, len(sorted_vals) - 1)
+    return sorted_vals[lo] + (sorted_vals[hi] - sorted_vals[lo]) * (idx - lo)
+
+
+class SpanStats:
+    """Glidande fönster av stegtider → p50/p95 per steg."""
+
+    def __init__(self, window: int = SPAN_WINDOW):
+        self.window = window
+        self._samples: dict[str, deque] = {}
+        self.count = 0
+
+    def add(self, timings: dict[str, float]) -> None:
+        self.count += 1
+        for name, ms in timings.items():
+            samples = self._samples.get(name)
+            if samples is None:
+                samples = self._samples[name] = deque(maxlen=self.window)
+            samples.append(ms)
+
+    def summary(self) -> dict[str, dict]:
+        out = {}
+        for name, samples in self._samples.items():
+            vals = sorted(samples)
+            out[name] = {
+                "p50": round(_percentile(vals, 0.5), 2),
+                "p95": round(_percentile(vals, 0.95), 2),
+                "mean": round(sum(vals) / len(vals), 2),
+                "n": len(vals),
+            }
+        return dict(sorted(out.items(), key=lambda kv: -kv[1]["mean"]))
+
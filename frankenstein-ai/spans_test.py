@@ -0,0 +1,71 @@
+"""
+Enhetstester för spans.py — exklusiv tid per steg, no-op utan recorder och percentiler.
+
+Kör med: python -m pytest spans_test.py -v
+"""
+
+import os
+import sys
+import threading
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from spans import SpanRecorder, SpanStats, activate, span, timed
+
+
+@timed("work")
+def _work(seconds):
+    time.sleep(seconds)
+    return "klar"
+
+
+class TestRecorder(unittest.TestCase):
+    def test_nested_spans_record_exclusive_time(self):
+        with activate(SpanRecorder()) as rec:
+            with span("outer"):
+                time.sleep(0.02)
+                with span("inner"):
+                    time.sleep(0.03)
+            with span("inner"):
+                time.sleep(0.01)
+        ms = rec.timings(total_ms=100.0)
+        self.assertGreaterEqual(ms["inner"], 40.0)
+        self.assertLess(ms["outer"], 30.0)  # Barnets tid dras av
+        self.assertGreaterEqual(ms["outer"], 20.0)
+        self.assertAlmostEqual(sum(ms.values()), 100.0, delta=0.05)
+
+    def test_timed_decorator_and_inactive_noop(self):
+        self.assertEqual(_work(0), "klar")  # Ingen recorder → inget mäts, inget fel
+        with span("ignored"):
+            pass
+        with activate(SpanRecorder()) as rec:
+            self.assertEqual(_work(0.01), "klar")
+        self.assertEqual(list(rec.timings()), ["work"])
+
+    def test_recorder_is_thread_local(self):
+        seen = []
+        with activate(SpanRecorder()) as rec:
+            t = threading.Thread(target=lambda: seen.append(_work(0.01)))
+            t.start()
+            t.join()
+        self.assertEqual(seen, ["klar"])
+        self.assertEqual(rec.timings(), {})
+
+
+class TestSpanStats(unittest.TestCase):
+    def test_percentiles_over_window(self):
+        stats = SpanStats(window=100)
+        for i in range(1, 201):
+            stats.add({"llm_wait": float(i), "eval": 1.0})
+        summary = stats.summary()
+        self.assertEqual(list(summary), ["llm_wait", "eval"])  # Dyraste först
+        self.assertEqual(summary["llm_wait"]["n"], 100)
+        self.assertAlmostEqual(summary["llm_wait"]["p50"], 150.5)
+        self.assertAlmostEqual(summary["llm_wait"]["p95"], 195.05)
+        self.assertEqual(summary["eval"]["p95"], 1.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
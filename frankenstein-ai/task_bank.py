@@ -0,0 +1,552 @@
+"""
+Förgenererad uppgiftsbank för generatorerna v1, v2, v4 och terminal.
+
+generate_task & co bygger varje uppgift i Python (inkl. förväntade
+utdata via referensimplementationer) mitt i träningsloopen, och
+ablation_runner genererade om sin fasta benchmarkmängd vid varje körning.
+Här:
+
+1. Bygg offline: python task_bank.py build --per-level 200 — uppgifter
+   genereras i bulk, dedupliceras (innehållshash utan id) och skrivs till
+   <källa>.jsonl (en kompakt JSON-rad per uppgift)
+2. Index: <källa>.index.json med byte-offset, längd och innehållshash per
+   uppgift, grupperat per (svårighetsgrad, kategori), plus en läsmarkör
+   per grupp
+3. Sampling: sample(källa, nivå) väljer bland nivåns grupper med oanvända
+   uppgifter (lista per nivå) och läser EN rad via seek — O(1), ingen
+   generatorkod i den heta loopen. Tom bank → generatorn anropas direkt
+   (samma beteende som tidigare)
+4. Påfyllning: När en nivå har färre än LOW_WATER oanvända uppgifter
+   fyller en bakgrundstråd på den med generatorn. Dominerar förbrukade
+   rader skrivs först en ny generation av filen med bara oanvända rader
+5. Benchmarkmängder: benchmark_tasks(namn, bygg) skriver mängden en gång
+   och läser sedan exakt samma bytes vid varje körning
+
+Användning:
+    bank = TaskBank(DATA_DIR / "task_bank")
+    task = bank.sample("v1", difficulty=4)
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import queue
+import random
+import threading
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable
+
+from progress_store import atomic_write_json
+
+BANK_VERSION = 2
+DEFAULT_BANK_DIR = Path(__file__).parent / "training_data" / "task_bank"
+
+# Oanvända uppgifter per nivå under vilket bakgrundspåfyllning startar
+LOW_WATER = int(os.environ.get("FRANKENSTEIN_TASK_BANK_LOW_WATER", "20"))
+
+# Antal uppgifter per nivå som påfyllningen siktar på
+REFILL_TARGET = 100
+
+# Uppgifter som genereras per omgång innan indexet sparas
+REFILL_BATCH = 16
+
+# Antal missar i rad (dubblett/fel nivå) innan en generator anses uttömd på en nivå
+MAX_DUPLICATE_RUN = 50
+
+# Förbrukade rader som tolereras innan påfyllningen kompakterar källans fil
+COMPACT_MIN_ROWS = 256
+
+
+def _generator(source: str) -> Callable[[int], object]:
+    """Generatorfunktion för en källa (importeras först när den behövs)."""
+    if source == "v1":
+        from task_generator import generate_task
+        return generate_task
+    if source == "v2":
+        from task_generator_v2 import generate_v2_task
+        return generate_v2_task
+    if source == "v4":
+        from task_generator_v4 import generate_v4_task
+        return generate_v4_task
+    if source == "terminal":
+        from terminal_tasks import generate_terminal_task
+        return generate_terminal_task
+    raise KeyError(f"Okänd uppgiftskälla: {source}")
+
+
+@dataclass(frozen=True)
+class SourceSpec:
+    levels: tuple[int, ...]
+    tolerance: int  # Nivåavstånd som generatorn själv blandar in (v2: ±2)
+
+
+SOURCES = {
+    "v1": SourceSpec(tuple(range(1, 11)), 1),
+    "v2": SourceSpec(tuple(range(1, 11)), 2),
+    "v4": SourceSpec(tuple(range(1, 11)), 1),
+    "terminal": SourceSpec(tuple(range(1, 11)), 0),
+}
+
+
+def task_to_dict(task) -> dict:
+    return asdict(task)
+
+
+def task_from_dict(source: str, data: dict):
+    """Bygg tillbaka Task/TerminalTask från en bankrad."""
+    if source == "terminal":
+        from terminal_env import TerminalTask, TerminalTestCase
+        cases = [TerminalTestCase(**tc) for tc in data["test_cases"]]
+        return TerminalTask(**{**data, "test_cases": cases})
+    from programming_env import Task, TestCase
+    cases = [TestCase(**tc) for tc in data["test_cases"]]
+    return Task(**{**data, "test_cases": cases})
+
+
+def content_hash(data: dict) -> str:
+    """Hash av uppgiftens innehåll (id:t är slumpat och ignoreras)."""
+    body = {k: v for k, v in data.items() if k != "id"}
+    raw = json.dumps(body, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha1(raw.encode("utf-8")).hexdigest()[:16]
+
+
+def _encode(data: dict) -> bytes:
+    return (json.dumps(data, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+class _SourceStore:
+    """En källas JSONL-fil + index. Anropas under TaskBank-låset.
+
+    Filen är append-only inom en generation; compact() skriver en ny
+    generation med bara oanvända rader och pekar om indexet (skrivs
+    atomiskt sist), så en avbruten kompaktering lämnar den gamla intakt.
+    """
+
+    def __init__(self, bank_dir: Path, source: str):
+        self.source = source
+        self.bank_dir = bank_dir
+        self.index_path = bank_dir / f"{source}.index.json"
+        self.generation = 0
+        # "nivå|kategori" → {"offsets": [...], "lengths": [...], "hashes": [...], "cursor": n}
+        self.buckets: dict[str, dict] = {}
+        self.size = 0
+        self.rows = 0
+        self._hashes: set[str] | None = None
+        # Per nivå: grupper med oanvända uppgifter (+ position för O(1)-borttagning)
+        self._open: dict[int, list[str]] = {}
+        self._open_pos: dict[str, int] = {}
+        self._remaining: dict[int, int] = {}
+        self._reader = None
+        self.dirty = False
+        self._load()
+
+    @property
+    def data_path(self) -> Path:
+        name = f"{self.source}.jsonl" if self.generation == 0 else f"{self.source}.{self.generation}.jsonl"
+        return self.bank_dir / name
+
+    def _load(self) -> None:
+        try:
+            index = json.loads(self.index_path.read_text(encoding="utf-8"))
+        except (OSError, json.JSONDecodeError):
+            return
+        if index.get("version") != BANK_VERSION:
+            return
+        self.generation = index.get("generation", 0)
+        size = self.data_path.stat().st_size if self.data_path.exists() else 0
+        if index.get("size", 0) > size:
+            self.generation = 0
+            return  # Indexet pekar förbi filen — bygg om
+        self.buckets = index["buckets"]
+        self.size = index["size"]
+        self._reindex()
+
+    def _reindex(self) -> None:
+        self.rows = 0
+        self._open, self._open_pos, self._remaining = {}, {}, {}
+        for key, bucket in self.buckets.items():
+            self.rows += len(bucket["offsets"])
+            left = len(bucket["offsets"]) - bucket["cursor"]
+            if left > 0:
+                level = self.level(key)
+                self._remaining[level] = self._remaining.get(level, 0) + left
+                self._mark_open(key, level)
+
+    def _mark_open(self, key: str, level: int) -> None:
+        keys = self._open.setdefault(level, [])
+        self._open_pos[key] = len(keys)
+        keys.append(key)
+
+    def _mark_closed(self, key: str, level: int) -> None:
+        keys = self._open[level]
+        pos = self._open_pos.pop(key)
+        last = keys.pop()
+        if last != key:
+            keys[pos] = last
+            self._open_pos[last] = pos
+
+    @staticmethod
+    def key(difficulty: int, category: str) -> str:
+        return f"{difficulty}|{category}"
+
+    @staticmethod
+    def level(key: str) -> int:
+        return int(key.split("|", 1)[0])
+
+    def remaining(self, difficulty: int) -> int:
+        return self._remaining.get(difficulty, 0)
+
+    def open_keys(self, difficulty: int) -> list[str]:
+        """Nivåns grupper med oanvända uppgifter (får inte ändras av anroparen)."""
+        return self._open.get(difficulty, [])
+
+    def is_open(self, key: str) -> bool:
+        return key in self._open_pos
+
+    @property
+    def consumed(self) -> int:
+        return self.rows - sum(self._remaining.values())
+
+    def hashes(self) -> set[str]:
+        """Innehållshashar för alla rader i filen (från indexet, ingen filläsning)."""
+        if self._hashes is None:
+            self._hashes = {h for bucket in self.buckets.values() for h in bucket["hashes"]}
+        return self._hashes
+
+    def add_many(self, tasks: list) -> int:
+        """Lägg till nya (icke-dubblerade) uppgifter. Returnerar antal tillagda."""
+        hashes = self.hashes()
+        chunks = []
+        entries = []
+        offset = self.size
+        for task in tasks:
+            data = task_to_dict(task)
+            h = content_hash(data)
+            if h in hashes:
+                continue
+            hashes.add(h)
+            raw = _encode({"h": h, "t": data})
+            chunks.append(raw)
+            entries.append((self.key(data["difficulty"], data["category"]), offset, len(raw), h))
+            offset += len(raw)
+        if not chunks:
+            return 0
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.data_path, "ab") as f:
+            f.seek(self.size)
+            f.truncate()  # Kapa en ev. halvskriven svans från en avbruten körning
+            f.write(b"".join(chunks))
+        for key, off, length, h in entries:
+            bucket = self.buckets.setdefault(key, {"offsets": [], "lengths": [], "hashes": [], "cursor": 0})
+            bucket["offsets"].append(off)
+            bucket["lengths"].append(length)
+            bucket["hashes"].append(h)
+            level = self.level(key)
+            self._remaining[level] = self._remaining.get(level, 0) + 1
+            if key not in self._open_pos:
+                self._mark_open(key, level)
+        self.rows += len(chunks)
+        self.size = offset
+        self.dirty = True
+        return len(chunks)
+
+    def take(self, key: str) -> dict | None:
+        """Nästa oanvända uppgift i gruppen (O(1): en seek + en rad)."""
+        bucket = self.buckets[key]
+        i = bucket["cursor"]
+        if i >= len(bucket["offsets"]):
+            return None
+        bucket["cursor"] = i + 1
+        level = self.level(key)
+        self._remaining[level] -= 1
+        if i + 1 == len(bucket["offsets"]):
+            self._mark_closed(key, level)
+        self.dirty = True
+        if self._reader is None:
+            self._reader = open(self.data_path, "rb")
+        self._reader.seek(bucket["offsets"][i])
+        return json.loads(self._reader.read(bucket["lengths"][i]))["t"]
+
+    def read_all(self, key: str) -> list[dict]:
+        bucket = self.buckets.get(key, {"offsets": [], "lengths": []})
+        out = []
+        with open(self.data_path, "rb") as f:
+            for off, length in zip(bucket["offsets"], bucket["lengths"]):
+                f.seek(off)
+                out.append(json.loads(f.read(length))["t"])
+        return out
+
+    def compact(self) -> int:
+        """Skriv en ny generation med bara oanvända rader. Returnerar antal borttagna."""
+        removed = self.consumed
+        old_path = self.data_path
+        self.generation += 1
+        buckets: dict[str, dict] = {}
+        offset = 0
+        with open(old_path, "rb") as src, open(self.data_path, "wb") as dst:
+            for key, bucket in self.buckets.items():
+                cursor = bucket["cursor"]
+                if cursor >= len(bucket["offsets"]):
+                    continue
+                kept = {"offsets": [], "lengths": [], "hashes": bucket["hashes"][cursor:], "cursor": 0}
+                for off, length in zip(bucket["offsets"][cursor:], bucket["lengths"][cursor:]):
+                    src.seek(off)
+                    dst.write(src.read(length))
+                    kept["offsets"].append(offset)
+                    kept["lengths"].append(length)
+                    offset += length
+                buckets[key] = kept
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+        self.buckets = buckets
+        self.size = offset
+        self._hashes = None
+        self._reindex()
+        self.dirty = True
+        self.save()
+        old_path.unlink(missing_ok=True)
+        return removed
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        self.data_path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_json(self.index_path, {"version": BANK_VERSION, "generation": self.generation,
+                                            "size": self.size, "buckets": self.buckets})
+        self.dirty = False
+
+    def reset_cursors(self) -> None:
+        for bucket in self.buckets.values():
+            bucket["cursor"] = 0
+        self._reindex()
+        self.dirty = True
+
+    def close(self) -> None:
+        self.save()
+        if self._reader is not None:
+            self._reader.close()
+            self._reader = None
+
+
+class TaskBank:
+    """Samplar förgenererade uppgifter per källa, nivå och kategori."""
+
+    def __init__(self, bank_dir: str | Path = DEFAULT_BANK_DIR, low_water: int = LOW_WATER,
+                 refill_target: int = REFILL_TARGET, background: bool = True,
+                 generators: dict[str, Callable] | None = None):
+        self.bank_dir = Path(bank_dir)
+        self.low_water = low_water
+        self.refill_target = refill_target
+        self.background = background
+        self._generators = dict(generators or {})
+        self._stores: dict[str, _SourceStore] = {}
+        self._lock = threading.RLock()
+        self._refill_q: queue.Queue = queue.Queue()
+        self._refill_pending: set[tuple[str, int]] = set()
+        self._exhausted: set[tuple[str, int]] = set()  # Nivåer generatorn inte kan fylla
+        self._thread: threading.Thread | None = None
+        self.stats = {"bank": 0, "generated": 0, "refilled": 0}
+
+    def _store(self, source: str) -> _SourceStore:
+        store = self._stores.get(source)
+        if store is None:
+            if source not in SOURCES:
+                raise KeyError(f"Okänd uppgiftskälla: {source}")
+            store = self._stores[source] = _SourceStore(self.bank_dir, source)
+        return store
+
+    def _generate(self, source: str, difficulty: int):
+        gen = self._generators.get(source)
+        if gen is None:
+            gen = self._generators[source] = _generator(source)
+        return gen(difficulty)
+
+    # --- Sampling ---
+
+    def sample(self, source: str, difficulty: int, category: str | None = None):
+        """Dra en uppgift (Task eller TerminalTask). Faller tillbaka på generatorn."""
+        with self._lock:
+            store = self._store(source)
+            key = self._pick_key(store, source, difficulty, category)
+            data = store.take(key) if key is not None else None
+            if store.remaining(difficulty) < self.low_water:
+                self._request_refill(source, difficulty)
+        if data is not None:
+            self.stats["bank"] += 1
+            return task_from_dict(source, data)
+        self.stats["generated"] += 1
+        return self._generate(source, difficulty)
+
+    @staticmethod
+    def _pick_key(store: _SourceStore, source: str, difficulty: int, category: str | None) -> str | None:
+        """Slumpa en grupp med oanvända uppgifter: exakt nivå först, sedan inom källans tolerans.
+
+        Slår bara upp nivåernas listor (O(tolerans)), aldrig alla grupper.
+        """
+        tolerance = SOURCES[source].tolerance
+        for spread in ([0, tolerance] if tolerance else [0]):
+            levels = range(difficulty - spread, difficulty + spread + 1)
+            if category is not None:
+                keys = [store.key(lvl, category) for lvl in levels if store.is_open(store.key(lvl, category))]
+                if keys:
+                    return random.choice(keys)
+                continue
+            # Likformigt över nivåernas öppna grupper (som en sammanslagen lista)
+            total = sum(len(store.open_keys(lvl)) for lvl in levels)
+            if total:
+                n = random.randrange(total)
+                for lvl in levels:
+                    keys = store.open_keys(lvl)
+                    if n < len(keys):
+                        return keys[n]
+                    n -= len(keys)
+        return None
+
+    # --- Påfyllning ---
+
+    def _request_refill(self, source: str, difficulty: int) -> None:
+        job = (source, difficulty)
+        if job in self._refill_pending or job in self._exhausted:
+            return
+        self._refill_pending.add(job)
+        if not self.background:
+            return
+        self._refill_q.put(job)
+        if self._thread is None:
+            self._thread = threading.Thread(target=self._refill_loop, daemon=True, name="task-bank-refill")
+            self._thread.start()
+
+    def _refill_loop(self) -> None:
+        while True:
+            job = self._refill_q.get()
+            if job is None:
+                return
+            try:
+                self.refill(*job)
+            except Exception as e:
+                print(f"[task-bank] Påfyllning {job} misslyckades: {e}")
+            finally:
+                self._refill_pending.discard(job)
+
+    def refill(self, source: str, difficulty: int, target: int | None = None) -> int:
+        """Generera uppgifter tills nivån har `target` oanvända. Returnerar antal tillagda."""
+        target = target or self.refill_target
+        with self._lock:
+            store = self._store(source)
+            if store.consumed > max(store.rows - store.consumed, COMPACT_MIN_ROWS):
+                store.compact()
+        added = 0
+        misses = 0  # Dubbletter eller uppgifter som hamnade på en annan nivå
+        while misses < MAX_DUPLICATE_RUN:
+            with self._lock:
+                missing = target - self._store(source).remaining(difficulty)
+            if missing <= 0:
+                break
+            # Generera utanför låset — sample() blockeras inte under tiden
+            batch = [self._generate(source, difficulty) for _ in range(min(missing, REFILL_BATCH))]
+            with self._lock:
+                store = self._store(source)
+                before = store.remaining(difficulty)
+                added += store.add_many(batch)
+                store.save()
+                hits = store.remaining(difficulty) - before
+            misses = 0 if hits else misses + len(batch)
+        else:
+            self._exhausted.add((source, difficulty))
+        self.stats["refilled"] += added
+        return added
+
+    def build(self, sources=tuple(SOURCES), per_level: int = REFILL_TARGET, seed: int | None = None) -> dict:
+        """Bulkgenerera offline (synkront). Returnerar antal tillagda per källa."""
+        if seed is not None:
+            random.seed(seed)
+        report = {}
+        for source in sources:
+            report[source] = sum(self.refill(source, lvl, per_level) for lvl in SOURCES[source].levels)
+        return report
+
+    # --- Benchmarkmängder ---
+
+    def benchmark_tasks(self, name: str, build: Callable[[], list]) -> list:
+        """Fast mängd [(typ, Task), ...]: byggs en gång, läses sedan identiskt."""
+        path = self.bank_dir / "benchmarks" / f"{name}.jsonl"
+        if not path.exists():
+            tasks = build()
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp = path.with_name(f".{path.name}.{os.getpid()}.tmp")
+            with open(tmp, "wb") as f:
+                for kind, task in tasks:
+                    f.write(_encode({"kind": kind, "t": task_to_dict(task)}))
+            os.replace(tmp, path)
+        out = []
+        with open(path, "rb") as f:
+            for line in f:
+                rec = json.loads(line)
+                out.append((rec["kind"], task_from_dict("terminal" if rec["kind"] == "terminal" else "v1", rec["t"])))
+        return out
+
+    # --- Övrigt ---
+
+    def summary(self) -> dict:
+        """Oanvända/totalt per källa och nivå."""
+        out = {}
+        with self._lock:
+            for source in SOURCES:
+                store = self._store(source)
+                levels = {}
+                for key, bucket in store.buckets.items():
+                    level = key.split("|", 1)[0]
+                    total, left = levels.get(level, (0, 0))
+                    levels[level] = (total + len(bucket["offsets"]), left + len(bucket["offsets"]) - bucket["cursor"])
+                out[source] = {lvl: {"total": t, "unused": u} for lvl, (t, u) in sorted(levels.items(), key=lambda kv: int(kv[0]))}
+        return out
+
+    def reset(self, source: str) -> None:
+        """Markera källans kvarvarande uppgifter som oanvända igen (kompakterade rader är borta)."""
+        with self._lock:
+            self._store(source).reset_cursors()
+            self._store(source).save()
+
+    def save(self) -> None:
+        with self._lock:
+            for store in self._stores.values():
+                store.save()
+
+    def close(self) -> None:
+        if self._thread is not None:
+            self._refill_q.put(None)
+            self._thread.join(timeout=5.0)
+            self._thread = None
+        with self._lock:
+            for store in self._stores.values():
+                store.close()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Frankenstein uppgiftsbank")
+    parser.add_argument("command", choices=["build", "stats", "reset"])
+    parser.add_argument("--dir", default=str(DEFAULT_BANK_DIR))
+    parser.add_argument("--sources", default=",".join(SOURCES))
+    parser.add_argument("--per-level", type=int, default=REFILL_TARGET,
+                        help="Oanvända uppgifter per nivå att fylla upp till")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    bank = TaskBank(args.dir, background=False)
+    sources = [s for s in args.sources.split(",") if s]
+    try:
+        if args.command == "build":
+            print(json.dumps(bank.build(sources, per_level=args.per_level, seed=args.seed), indent=2))
+        elif args.command == "reset":
+            for source in sources:
+                bank.reset(source)
+        print(json.dumps({s: v for s, v in bank.summary().items() if s in sources}, indent=2))
+    finally:
+        bank.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+"""
+Enhetstester för task_bank.py — dedup, index, sampling, påfyllning, kompaktering
+och benchmarkmängder.
+
+Kör med: python -m pytest task_bank_test.py -v
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+import unittest
+from unittest import mock
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from programming_env import Task, TestCase as TaskTestCase
+import task_bank
+from task_bank import TaskBank, content_hash, task_to_dict
+
+
+def counting_generator(limit=None):
+    """Generator som skapar unika uppgifter (upprepar sig efter `limit`)."""
+    state = {"n": 0}
+
+    def gen(difficulty):
+        state["n"] += 1
+        i = state["n"] if limit is None else state["n"] % limit
+        return Task(id=f"gen-{state['n']}", title=f"T{i}", description=f"uppgift {i}",
+                    difficulty=difficulty, category="math" if i % 2 else "string",
+                    test_cases=[TaskTestCase(str(i), str(i * 2))], tags=["loop"])
+
+    gen.state = state
+    return gen
+
+
+class _TmpBank(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def bank(self, gen, **kw):
+        kw.setdefault("background", False)
+        return TaskBank(self.tmp.name, generators={"v1": gen}, **kw)
+
+
+class TestBuild(_TmpBank):
+    def test_build_deduplicates_and_indexes_by_level_and_category(self):
+        gen = counting_generator(limit=6)
+        bank = self.bank(gen)
+        report = bank.build(["v1"], per_level=10)
+        bank.close()
+        # Bara 6 unika innehåll per nivå; id:t räknas inte
+        self.assertEqual(report["v1"], 60)
+        index = json.load(open(os.path.join(self.tmp.name, "v1.index.json")))
+        self.assertEqual(sorted(index["buckets"])[:2], ["10|math", "10|string"])
+        self.assertEqual(len(index["buckets"]["3|math"]["offsets"]), 3)
+
+    def test_content_hash_ignores_id(self):
+        gen = counting_generator(limit=1)
+        a, b = task_to_dict(gen(2)), task_to_dict(gen(2))
+        self.assertNotEqual(a["id"], b["id"])
+        self.assertEqual(content_hash(a), content_hash(b))
+
+
+class TestSample(_TmpBank):
+    def test_sample_reads_from_bank_without_generator(self):
+        bank = self.bank(counting_generator())
+        bank.build(["v1"], per_level=5)
+        bank.close()
+
+        def forbidden(difficulty):
+            raise AssertionError("generatorn ska inte anropas")
+
+        bank = self.bank(forbidden, low_water=0)
+        seen = set()
+        for _ in range(5):
+            task = bank.sample("v1", 4)
+            self.assertIsInstance(task, Task)
+            self.assertIsInstance(task.test_cases[0], TaskTestCase)
+            self.assertEqual(task.difficulty, 4)
+            seen.add(task.id)
+        self.assertEqual(len(seen), 5)  # Varje uppgift dras en gång
+        bank.close()
+
+        # Läsmarkören sparas — nästa session fortsätter där den slutade
+        bank = self.bank(counting_generator(), low_water=0)
+        self.assertEqual(bank.summary()["v1"]["4"], {"total": 5, "unused": 0})
+        bank.close()
+
+    def test_falls_back_to_generator_and_refills_in_background(self):
+        gen = counting_generator()
+        bank = self.bank(gen, background=True, low_water=3, refill_target=8)
+        task = bank.sample("v1", 2)
+        self.assertEqual(bank.stats["generated"], 1)
+        self.assertEqual(task.difficulty, 2)
+
+        deadline = time.monotonic() + 10
+        while bank.summary()["v1"].get("2", {}).get("unused", 0) < 8 and time.monotonic() < deadline:
+            time.sleep(0.01)
+        self.assertEqual(bank.summary()["v1"]["2"]["unused"], 8)
+        bank.sample("v1", 2)
+        self.assertEqual(bank.stats["bank"], 1)
+        bank.close()
+
+    def test_category_filter_and_level_tolerance(self):
+        bank = self.bank(counting_generator())
+        bank.refill("v1", 5, 4)
+        self.assertEqual(bank.sample("v1", 5, category="string").category, "string")
+        self.assertEqual(bank.sample("v1", 6).difficulty, 5)  # ±1 som generate_task
+        bank.close()
+
+    def test_exhausted_groups_leave_the_level_list(self):
+        bank = self.bank(counting_generator(), low_water=0)
+        bank.refill("v1", 3, 4)
+        store = bank._store("v1")
+        self.assertEqual(sorted(store.open_keys(3)), ["3|math", "3|string"])
+        for _ in range(4):
+            bank.sample("v1", 3)
+        self.assertEqual((store.open_keys(3), store.remaining(3)), ([], 0))
+        self.assertEqual(bank.stats["bank"], 4)
+        bank.close()
+
+
+class TestCompaction(_TmpBank):
+    def test_refill_compacts_consumed_rows(self):
+        bank = self.bank(counting_generator(), low_water=0)
+        bank.refill("v1", 3, 20)
+        drawn = [bank.sample("v1", 3).id for _ in range(15)]
+        store = bank._store("v1")
+        old_path, old_size = store.data_path, store.size
+
+        with mock.patch.object(task_bank, "COMPACT_MIN_ROWS", 10):
+            bank.refill("v1", 3, 5)  # 15 förbrukade > max(5 oanvända, 10)
+        self.assertEqual((store.generation, store.rows, store.consumed), (1, 5, 0))
+        self.assertFalse(old_path.exists())
+        self.assertLess(os.path.getsize(store.data_path), old_size)
+        self.assertEqual(len(store.hashes()), 5)
+        bank.close()
+
+        bank = self.bank(counting_generator(), low_water=0)
+        rest = [bank.sample("v1", 3).id for _ in range(5)]
+        self.assertFalse(set(rest) & set(drawn))
+        self.assertEqual(bank.summary()["v1"]["3"], {"total": 5, "unused": 0})
+        bank.close()
+
+    def test_dedupe_hashes_come_from_index(self):
+        bank = self.bank(counting_generator(limit=6))
+        bank.refill("v1", 2, 6)
+        bank.close()
+
+        bank = self.bank(counting_generator(limit=6))
+        with mock.patch.object(task_bank, "open", create=True, side_effect=AssertionError("läser filen")):
+            self.assertEqual(len(bank._store("v1").hashes()), 6)
+        self.assertEqual(bank.refill("v1", 2, 12), 0)  # Samma innehåll igen — bara dubbletter
+        bank.close()
+
+
+class TestBenchmark(_TmpBank):
+    def test_benchmark_set_is_built_once_and_byte_identical(self):
+        gen = counting_generator()
+        bank = self.bank(gen)
+        calls = []
+
+        def build():
+            calls.append(1)
+            return [("standard", gen(d)) for d in range(1, 6)]
+
+        first = bank.benchmark_tasks("b", build)
+        path = os.path.join(self.tmp.name, "benchmarks", "b.jsonl")
+        raw = open(path, "rb").read()
+        second = bank.benchmark_tasks("b", build)
+        self.assertEqual(len(calls), 1)
+        self.assertEqual([t.id for _, t in first], [t.id for _, t in second])
+        self.assertEqual(open(path, "rb").read(), raw)
+        self.assertEqual(first[0][0], "standard")
+        bank.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,238 @@
+"""
+Icke-blockerande telemetri: händelser till bridge och loggrader till fil.
+
+Tidigare gjorde varje händelse ett synkront HTTP-anrop (2–3 s timeout)
+och varje loggrad öppnade och stängde loggfilen. När bridge var nere
+kostade varje händelse hela timeouten i den heta loopen. Här:
+
+1. EventSender: Begränsad kö i minnet; en bakgrundstråd skickar allt som
+   väntar som EN POST ({"events": [...]}) per intervall. Full kö →
+   äldsta händelsen slängs (drop-oldest). Händelser med samma
+   coalesce-nyckel ersätter varandra medan de väntar (bara senaste skickas)
+2. BufferedLogWriter: Samlar rader och skriver dem med en öppning per
+   intervall (eller när bufferten är full)
+3. bridge_events(url) / log_writer(path): Processdelade instanser per
+   URL/sökväg; allt töms vid processavslut (atexit)
+
+Användning:
+    bridge_events(f"{BRIDGE_URL}/api/frankenstein/terminal/event").send(event)
+    log_writer(LOG_FILE).write("[12:00:00] SOLVED ...")
+"""
+
+import atexit
+import itertools
+import json
+import os
+import threading
+import urllib.request
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Callable
+
+# Sekunder mellan två bakgrundsutskick/-skrivningar
+DEFAULT_INTERVAL = float(os.environ.get("FRANKENSTEIN_TELEMETRY_INTERVAL", "0.5"))
+
+# Max antal väntande händelser innan de äldsta slängs
+DEFAULT_MAX_QUEUE = 1000
+
+# Max antal händelser per POST
+DEFAULT_MAX_BATCH = 200
+
+# Timeout för en batch-POST (körs i bakgrundstråden, aldrig i anroparens loop)
+DEFAULT_TIMEOUT = 2.0
+
+# Antal buffrade loggrader som tvingar fram en skrivning direkt
+DEFAULT_MAX_LINES = 256
+
+
+def _post_json(url: str, payload: dict, timeout: float) -> None:
+    data = json.dumps(payload, default=str).encode("utf-8")
+    req = urllib.request.Request(
+        url, data=data, headers={"Content-Type": "application/json"}, method="POST",
+    )
+    with urllib.request.urlopen(req, timeout=timeout):
+        pass
+
+
+class _Periodic:
+    """Bakgrundstråd som anropar flush() var `interval` sekund tills close()."""
+
+    def __init__(self, name: str, interval: float):
+        self.interval = interval
+        self._name = name
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._start_lock = threading.Lock()
+
+    def _ensure_started(self) -> None:
+        if self._thread is not None or self._stop.is_set():
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name=self._name, daemon=True)
+                self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self) -> None:
+        raise NotImplementedError
+
+    def close(self, timeout: float = 5.0) -> None:
+        """Stoppa bakgrundstråden och töm det som väntar."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+class EventSender(_Periodic):
+    """Batchar händelser till en bridge-endpoint i bakgrunden."""
+
+    def __init__(
+        self,
+        url: str,
+        interval: float = DEFAULT_INTERVAL,
+        max_queue: int = DEFAULT_MAX_QUEUE,
+        max_batch: int = DEFAULT_MAX_BATCH,
+        timeout: float = DEFAULT_TIMEOUT,
+        post: Callable[[str, dict, float], None] | None = None,
+    ):
+        super().__init__("telemetry-events", interval)
+        self.url = url
+        self.max_queue = max(1, max_queue)
+        self.max_batch = max(1, max_batch)
+        self.timeout = timeout
+        self._post = post or _post_json
+        self._pending: OrderedDict = OrderedDict()
+        self._ids = itertools.count()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.sent = 0
+        self.dropped = 0
+        self.coalesced = 0
+        self.failed_posts = 0
+
+    def send(self, event: dict, coalesce: str | None = None) -> None:
+        """Köa en händelse (returnerar direkt). coalesce: ersätt väntande med samma nyckel."""
+        with self._lock:
+            if coalesce is not None:
+                key: Any = ("coalesce", coalesce)
+                if key in self._pending:
+                    del self._pending[key]
+                    self.coalesced += 1
+            else:
+                key = next(self._ids)
+            self._pending[key] = event
+            self._trim()
+        self._ensure_started()
+
+    def _trim(self) -> None:
+        while len(self._pending) > self.max_queue:
+            self._pending.popitem(last=False)
+            self.dropped += 1
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._pending)
+
+    def flush(self) -> None:
+        """Skicka allt som väntar (i batchar om max_batch)."""
+        with self._flush_lock:
+            while True:
+                with self._lock:
+                    if not self._pending:
+                        return
+                    batch = [self._pending.popitem(last=False) for _ in range(min(self.max_batch, len(self._pending)))]
+                try:
+                    self._post(self.url, {"events": [event for _, event in batch]}, self.timeout)
+                    self.sent += len(batch)
+                except Exception:
+                    self.failed_posts += 1
+                    self._requeue(batch)
+                    return  # Bridge nere — försök igen nästa intervall
+
+    def _requeue(self, batch: list) -> None:
+        with self._lock:
+            merged = OrderedDict(batch)
+            for key, event in self._pending.items():
+                merged.pop(key, None)  # Nyare coalesce-händelse vinner
+                merged[key] = event
+            self._pending = merged
+            self._trim()
+
+
+class BufferedLogWriter(_Periodic):
+    """Samlar loggrader och skriver dem i block (en öppning per flush)."""
+
+    def __init__(self, path: str | Path, interval: float = 1.0, max_lines: int = DEFAULT_MAX_LINES):
+        super().__init__("telemetry-log", interval)
+        self.path = Path(path)
+        self.max_lines = max_lines
+        self._lines: list[str] = []
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self.written = 0
+
+    def write(self, line: str) -> None:
+        with self._lock:
+            self._lines.append(line if line.endswith("\n") else line + "\n")
+            full = len(self._lines) >= self.max_lines
+        if full:
+            self.flush()
+        else:
+            self._ensure_started()
+
+    def flush(self) -> None:
+        with self._flush_lock:
+            with self._lock:
+                lines, self._lines = self._lines, []
+            if not lines:
+                return
+            try:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                with open(self.path, "a", encoding="utf-8") as f:
+                    f.write("".join(lines))
+                self.written += len(lines)
+            except OSError:
+                pass  # Loggning får aldrig krascha träningen
+
+
+_registry: dict[tuple[str, str], _Periodic] = {}
+_registry_lock = threading.Lock()
+
+
+def bridge_events(url: str, **options) -> EventSender:
+    """Processdelad EventSender för en endpoint-URL."""
+    with _registry_lock:
+        key = ("events", url)
+        if key not in _registry:
+            _registry[key] = EventSender(url, **options)
+        return _registry[key]
+
+
+def log_writer(path: str | Path, **options) -> BufferedLogWriter:
+    """Processdelad BufferedLogWriter för en loggfil."""
+    with _registry_lock:
+        key = ("log", str(Path(path).resolve()))
+        if key not in _registry:
+            _registry[key] = BufferedLogWriter(path, **options)
+        return _registry[key]
+
+
+def flush_all() -> None:
+    """Töm alla delade sändare och skrivare (utan att stänga dem)."""
+    with _registry_lock:
+        items = list(_registry.values())
+    for item in items:
+        item.flush()
+
+
+@atexit.register
+def close_all() -> None:
+    with _registry_lock:
+        items = list(_registry.values())
+        _registry.clear()
+    for item in items:
+        item.close(timeout=DEFAULT_TIMEOUT)
@@ -0,0 +1,114 @@
+"""
+Enhetstester för telemetry.py — batchning, drop-oldest, coalesce och buffrad loggning.
+
+Kör med: python -m pytest telemetry_test.py -v
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from telemetry import BufferedLogWriter, EventSender
+
+
+class _FakePost:
+    def __init__(self, fail=False, delay=0.0):
+        self.calls = []
+        self.fail = fail
+        self.delay = delay
+
+    def __call__(self, url, payload, timeout):
+        if self.delay:
+            time.sleep(self.delay)
+        if self.fail:
+            raise ConnectionError("bridge nere")
+        self.calls.append(payload)
+
+
+class TestEventSender(unittest.TestCase):
+    def _sender(self, post, **kw):
+        sender = EventSender("http://bridge/api/x", interval=3600, post=post, **kw)
+        self.addCleanup(sender.close, 0.1)
+        return sender
+
+    def test_pending_events_go_out_in_one_post(self):
+        post = _FakePost()
+        sender = self._sender(post)
+        for i in range(5):
+            sender.send({"i": i})
+        sender.flush()
+        self.assertEqual(post.calls, [{"events": [{"i": i} for i in range(5)]}])
+        self.assertEqual(sender.sent, 5)
+
+    def test_full_queue_drops_oldest(self):
+        post = _FakePost()
+        sender = self._sender(post, max_queue=3)
+        for i in range(5):
+            sender.send({"i": i})
+        self.assertEqual(sender.dropped, 2)
+        sender.flush()
+        self.assertEqual(post.calls[0]["events"], [{"i": 2}, {"i": 3}, {"i": 4}])
+
+    def test_coalesce_keeps_latest(self):
+        post = _FakePost()
+        sender = self._sender(post)
+        sender.send({"tick": 1}, coalesce="tick")
+        sender.send({"other": True})
+        sender.send({"tick": 2}, coalesce="tick")
+        sender.flush()
+        self.assertEqual(post.calls[0]["events"], [{"other": True}, {"tick": 2}])
+        self.assertEqual(sender.coalesced, 1)
+
+    def test_failed_post_is_requeued(self):
+        post = _FakePost(fail=True)
+        sender = self._sender(post, max_batch=2)
+        for i in range(3):
+            sender.send({"i": i})
+        sender.flush()
+        self.assertEqual(sender.failed_posts, 1)
+        self.assertEqual(sender.pending(), 3)
+        post.fail = False
+        sender.flush()
+        self.assertEqual([e["i"] for call in post.calls for e in call["events"]], [0, 1, 2])
+
+    def test_send_does_not_wait_for_slow_bridge(self):
+        post = _FakePost(fail=True, delay=0.2)
+        sender = EventSender("http://bridge/api/x", interval=0.01, post=post)
+        self.addCleanup(sender.close, 1.0)
+        start = time.perf_counter()
+        for i in range(50):
+            sender.send({"i": i})
+        self.assertLess(time.perf_counter() - start, 0.1)
+
+
+class TestBufferedLogWriter(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp.name, "logs", "train.log")
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_lines_written_on_flush(self):
+        writer = BufferedLogWriter(self.path, interval=3600)
+        writer.write("a")
+        writer.write("b\n")
+        self.assertFalse(os.path.exists(self.path))
+        writer.close(0.1)
+        with open(self.path, encoding="utf-8") as f:
+            self.assertEqual(f.read(), "a\nb\n")
+
+    def test_full_buffer_writes_immediately(self):
+        writer = BufferedLogWriter(self.path, interval=3600, max_lines=3)
+        self.addCleanup(writer.close, 0.1)
+        for i in range(3):
+            writer.write(str(i))
+        self.assertEqual(writer.written, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -33,6 +33,10 @@ from typing import Any, Optional, Protocol
 import numpy as np
 import requests
 
+# telemetry.py ligger i frankenstein-ai/ — botten startas som skript från trading/
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from telemetry import bridge_events, log_writer  # noqa: E402
+
 
 def _utc_now_iso() -> str:
     return datetime.utcnow().isoformat() + "Z"
@@ -101,29 +105,18 @@ def _ensure_dirs() -> None:
 
 
 def _log(line: str) -> None:
-    _ensure_dirs()
     ts = datetime.utcnow().strftime("%Y-%m-%d %H:%M:%S")
     msg = f"[{ts}] {line}"
     print(msg, flush=True)
-    try:
-        with open(LOG_FILE, "a", encoding="utf-8") as f:
-            f.write(msg + "\n")
-    except Exception:
-        pass
+    log_writer(LOG_FILE).write(msg)
 
 
-def _send_bridge_event(event: dict) -> None:
-    """Fire-and-forget event delivery to Bridge."""
-    try:
-        payload = json.dumps({"event": event}).encode("utf-8")
-        requests.post(
-            f"{BRIDGE_URL}/api/trader/event",
-            data=payload,
-            headers={"Content-Type": "application/json"},
-            timeout=2,
-        )
-    except Exception:
-        pass
+def _send_bridge_event(event: dict, coalesce: str | None = None) -> None:
+    """Fire-and-forget event delivery to Bridge (queued and batched in the background).
+
+    coalesce: events with the same key replace each other while pending.
+    """
+    bridge_events(f"{BRIDGE_URL}/api/trader/event").send(event, coalesce=coalesce)
 
 
 @dataclass
@@ -1618,7 +1611,7 @@ def main() -> int:
             t0 = time.time()
             result = agent.tick()
             elapsed = time.time() - t0
-            _send_bridge_event({"type": "trader_tick_done", "elapsed_seconds": round(elapsed, 3), "portfolio": result.get("portfolio"), "ts": _utc_now_iso()})
+            _send_bridge_event({"type": "trader_tick_done", "elapsed_seconds": round(elapsed, 3), "portfolio": result.get("portfolio"), "ts": _utc_now_iso()}, coalesce="tick_done")
             _log(f"tick done: signals={len(result.get('signals', []))} orders={len(result.get('orders', []))} elapsed={elapsed:.2f}s total=${result.get('portfolio', {}).get('total_value_usd', 0)}")
 
             now = time.time()
@@ -0,0 +1,630 @@
+"""
+Multiprocess-träning: en koordinator och N arbetarprocesser på samma värd.
+
+run_continuous kör en agent i en process — en kärna plus nätverksväntan.
+Här delas arbetet upp:
+
+1. Koordinator: Äger schemaläggning (uppgiftsgenerering, svårighetsgrad),
+   progression/händelselogg (ProgressStore) och promotion-filen. Håller en
+   gemensam kunskapsbild (SharedLearning) som arbetarnas inlärning slås
+   ihop i
+2. Arbetare: Varsin CodeLearningAgent i en egen process (spawn). Hämtar
+   uppgifter från en delad kö (naturlig lastbalansering) och skickar
+   tillbaka resultat. Var MERGE_INTERVAL:e uppgift skickas inlärt tillstånd
+   (koncept, svarscache, promotion-tiers, skills) till koordinatorn, som
+   svarar med den sammanslagna bilden
+3. Avslut i två faser: arbetarna skickar sitt sista delta, koordinatorn
+   slår ihop och skickar slutbilden tillbaka; arbetare 0 skriver checkpoint
+
+Alla arbetare seedar torch likadant så HDC-projektionen blir identisk, och
+delar episodiskt minne via minnestjänsten (memory_service.py) som
+startaren sätter upp lokalt om ingen redan är konfigurerad. LLM-anropen
+spärras av en gemensam SharedLLMThrottle, så N arbetare tillsammans håller
+samma rate limit som en ensam agent.
+
+Starta:    python training_cluster.py --workers 4
+Benchmark: python training_cluster.py --benchmark 1,2,4,8 --tasks 80
+"""
+
+import argparse
+import multiprocessing as mp
+import os
+import queue
+import signal
+import threading
+import time
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Iterator
+
+# Antal arbetarprocesser (standard: en per kärna, minst 1)
+DEFAULT_WORKERS = int(os.environ.get("FRANKENSTEIN_WORKERS", "0")) or max(1, (os.cpu_count() or 1))
+
+# Uppgifter per arbetare mellan två sammanslagningar av inlärt tillstånd
+MERGE_INTERVAL = 20
+
+# Uppgifter som köas i förväg per arbetare
+PREFETCH_PER_WORKER = 2
+
+# Seed för torch i alla arbetare (samma HDC-projektionsmatris överallt)
+SHARED_SEED = 1729
+
+# Sekunder att vänta på arbetarnas sista delta vid avslut
+FINAL_SYNC_TIMEOUT = 120.0
+
+@dataclass
+class TaskResult:
+    """Resultat från en arbetare (plockbart — skickas över kön)."""
+    worker: int
+    task_id: str
+    title: str
+    category: str
+    difficulty: int
+    tags: list
+    score: float = 0.0
+    code: str = ""
+    feedback: str = ""
+    time_ms: float = 0.0
+    wall_ms: float = 0.0
+    attempts: int = 0
+    first_try: bool = False
+    strategy: str = ""
+    hdc_concept: str = ""
+    hdc_new: bool = False
+    gut_valence: float = 0.0
+    gut_rec: str = ""
+    error: str = ""
+    stages: dict = field(default_factory=dict)
+
+    @property
+    def solved(self) -> bool:
+        return self.score >= 1.0
+
+
+def _task_result(worker: int, task, result, wall_ms: float, error: str = "") -> TaskResult:
+    meta = getattr(result, "metadata", None) if result else None
+    return TaskResult(
+        worker=worker,
+        task_id=task.id,
+        title=task.title,
+        category=task.category,
+        difficulty=task.difficulty,
+        tags=list(task.tags),
+        score=result.score if result else 0.0,
+        code=(result.code if result else "") or "",
+        feedback=((result.feedback if result else "") or "")[:300],
+        time_ms=meta.total_time_ms if meta else wall_ms,
+        wall_ms=wall_ms,
+        attempts=meta.attempts_used if meta else 0,
+        first_try=meta.first_try_success if meta else False,
+        strategy=meta.winning_strategy if meta else "",
+        hdc_concept=meta.hdc_concept if meta else "",
+        hdc_new=meta.hdc_is_new if meta else False,
+        gut_valence=round(meta.gut_valence, 3) if meta else 0.0,
+        gut_rec=meta.gut_recommendation if meta else "",
+        error=error,
+        stages=dict(meta.stage_ms) if meta else {},
+    )
+
+
+class SharedLLMThrottle:
+    """LLMThrottle över processgränser (samma reserve-API som code_agent.LLMThrottle).
+
+    Senaste tidsluckan ligger i delat minne under ett multiprocessing-lås.
+    Koordinatorn skapar en och arbetarna ärver den som Process-argument.
+    """
+
+    def __init__(self, ctx=mp):
+        self._lock = ctx.Lock()
+        self._last = ctx.Value("d", 0.0, lock=False)
+
+    @property
+    def last_call(self) -> float:
+        return self._last.value
+
+    def reserve(self, interval: float) -> float:
+        """Nästa lediga tidslucka (time.time()-tid) minst `interval` efter föregående."""
+        with self._lock:
+            slot = max(time.time(), self._last.value + interval)
+            self._last.value = slot
+            return slot
+
+
+# --- Arbetarsidan ---
+
+
+def make_worker_agent(worker_id: int, options: dict):
+    """Standardfabrik: full CodeLearningAgent med delad projektion och checkpoint."""
+    import torch
+
+    from agent_checkpoint import CheckpointError
+    from code_agent import CodeLearningAgent
+
+    torch.manual_seed(options.get("seed", SHARED_SEED))
+    spill_dir = options.get("spill_dir")
+    agent = CodeLearningAgent(
+        max_attempts=3,
+        history_limit=options.get("history_limit"),
+        spill_dir=os.path.join(spill_dir, f"worker-{worker_id}") if spill_dir else None,
+        llm_throttle=options.get("llm_throttle"),
+    )
+    checkpoint = options.get("checkpoint")
+    if checkpoint and os.path.exists(checkpoint):
+        try:
+            agent.restore(checkpoint)
+        except (CheckpointError, OSError) as e:
+            print(f"[worker {worker_id}] Checkpoint kunde inte läsas: {e}")
+    # Koordinatorn äger promotion-filen; arbetarna får tiers via sammanslagning
+    agent.promotion.state_path = None
+    return agent
+
+
+def _handle_control(agent, msg: tuple) -> None:
+    kind = msg[0]
+    if kind == "merge":
+        agent.merge_learned(msg[1])
+    elif kind == "checkpoint":
+        agent.checkpoint(msg[1])
+
+
+def worker_main(worker_id: int, agent_factory: Callable, options: dict,
+                task_q, result_q, control_q) -> None:
+    """Arbetarprocessens loop: lös uppgifter från task_q tills None."""
+    signal.signal(signal.SIGINT, signal.SIG_IGN)  # Koordinatorn hanterar Ctrl+C
+    try:
+        agent = agent_factory(worker_id, options)
+    except Exception as e:
+        result_q.put(("failed", worker_id, repr(e)))
+        return
+    result_q.put(("ready", worker_id))
+
+    merge_interval = options.get("merge_interval", MERGE_INTERVAL)
+    since = 0.0
+    done = 0
+    while True:
+        try:
+            while True:
+                _handle_control(agent, control_q.get_nowait())
+        except queue.Empty:
+            pass
+        try:
+            task = task_q.get(timeout=0.2)
+        except queue.Empty:
+            continue
+        if task is None:
+            break
+        t0 = time.perf_counter()
+        error = ""
+        try:
+            result = agent.solve_task(task, verbose=False)
+        except Exception as e:
+            result, error = None, repr(e)
+        wall_ms = (time.perf_counter() - t0) * 1000
+        result_q.put(("result", worker_id, _task_result(worker_id, task, result, wall_ms, error)))
+        done += 1
+        if done % merge_interval == 0:
+            stamp = time.time()
+            result_q.put(("learned", worker_id, agent.export_learned(since), False))
+            since = stamp
+
+    # Fas 1: sista deltat. Fas 2: vänta på slutbilden (och ev. checkpoint-uppdrag)
+    result_q.put(("learned", worker_id, agent.export_learned(since), True))
+    deadline = time.monotonic() + FINAL_SYNC_TIMEOUT
+    while time.monotonic() < deadline:
+        try:
+            msg = control_q.get(timeout=0.5)
+        except queue.Empty:
+            continue
+        if msg[0] == "final":
+            if msg[1]:
+                agent.merge_learned(msg[1])
+            if msg[2]:
+                agent.checkpoint(msg[2])
+            break
+        _handle_control(agent, msg)
+    close = getattr(getattr(agent, "episodic_memory", None), "close", None)
+    if close is not None:
+        close()
+
+
+# --- Koordinatorsidan ---
+
+
+class SharedLearning:
+    """Koordinatorns sammanslagna kunskapsbild (samma fält som agentens inlärning)."""
+
+    def __init__(self, promotion_path: Path | None = None):
+        from code_agent import HDC_DIM, TASK_FEATURE_DIM
+        from cognition import NeuroSymbolicBridge
+        from promotion_pipeline import PromotionPipeline
+
+        self.hdc = NeuroSymbolicBridge(lnn_output_dim=TASK_FEATURE_DIM, hdc_dim=HDC_DIM)
+        self.concept_code: dict[str, str] = {}
+        self.skills: dict = {}
+        self._response_cache: dict[str, tuple[str, float]] = {}
+        self.promotion = PromotionPipeline(state_path=promotion_path)
+        self.merges = 0
+
+    def merge(self, learned: dict) -> dict:
+        from code_agent import merge_learned_into
+
+        added = merge_learned_into(self, learned)
+        self.merges += 1
+        if added["promoted"]:
+            self.promotion._save_state()
+        return added
+
+    def export(self) -> dict:
+        from code_agent import export_learned_from
+
+        return export_learned_from(self)
+
+
+class TrainingCoordinator:
+    """Startar arbetarprocesser, delar ut uppgifter och slår ihop inlärning.
+
+    Användning:
+        with TrainingCoordinator(4) as coord:
+            coord.submit(task)
+            for result in coord.results(timeout=1.0): ...
+    """
+
+    def __init__(
+        self,
+        num_workers: int = DEFAULT_WORKERS,
+        agent_factory: Callable = make_worker_agent,
+        options: dict | None = None,
+        shared: SharedLearning | None = None,
+        checkpoint_path: str | None = None,
+        start_method: str = "spawn",
+    ):
+        self.num_workers = max(1, num_workers)
+        self.agent_factory = agent_factory
+        self.options = dict(options or {})
+        self.shared = shared
+        self.checkpoint_path = checkpoint_path
+        self._ctx = mp.get_context(start_method)
+        self.llm_throttle = SharedLLMThrottle(self._ctx)
+        self._task_q = self._ctx.Queue()
+        self._result_q = self._ctx.Queue()
+        self._control_qs = [self._ctx.Queue() for _ in range(self.num_workers)]
+        self._procs: list = []
+        self.in_flight = 0
+        self.ready: set[int] = set()
+        self.failed: dict[int, str] = {}
+        self.completed: dict[int, int] = {w: 0 for w in range(self.num_workers)}
+        self.merged_deltas = 0
+        self._final: set[int] = set()
+
+    # --- Livscykel ---
+
+    def start(self, wait_ready: bool = True, timeout: float = 300.0) -> "TrainingCoordinator":
+        for worker_id in range(self.num_workers):
+            proc = self._ctx.Process(
+                target=worker_main,
+                args=(worker_id, self.agent_factory, {**self.options, "llm_throttle": self.llm_throttle},
+                      self._task_q, self._result_q, self._control_qs[worker_id]),
+                name=f"frankenstein-worker-{worker_id}",
+                daemon=True,
+            )
+            proc.start()
+            self._procs.append(proc)
+        if wait_ready:
+            deadline = time.monotonic() + timeout
+            while len(self.ready) + len(self.failed) < self.num_workers and time.monotonic() < deadline:
+                for _ in self._drain(timeout=0.2):
+                    pass
+            if not self.ready:
+                raise RuntimeError(f"Inga arbetare startade: {self.failed or 'timeout'}")
+        return self
+
+    def __enter__(self) -> "TrainingCoordinator":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def submit(self, task) -> None:
+        self._task_q.put(task)
+        self.in_flight += 1
+
+    @property
+    def capacity(self) -> int:
+        """Antal uppgifter som kan köas innan arbetarna har tillräckligt i förväg."""
+        return max(0, len(self.ready) * PREFETCH_PER_WORKER - self.in_flight)
+
+    # --- Meddelanden ---
+
+    def _drain(self, timeout: float) -> Iterator[TaskResult]:
+        """Hantera alla väntande meddelanden; ge resultaten vidare."""
+        block = True
+        while True:
+            try:
+                msg = self._result_q.get(timeout=timeout) if block else self._result_q.get_nowait()
+            except queue.Empty:
+                return
+            block = False
+            kind, worker_id = msg[0], msg[1]
+            if kind == "result":
+                self.in_flight -= 1
+                self.completed[worker_id] += 1
+                yield msg[2]
+            elif kind == "learned":
+                self._on_learned(worker_id, msg[2], final=msg[3])
+            elif kind == "ready":
+                self.ready.add(worker_id)
+            elif kind == "failed":
+                self.failed[worker_id] = msg[2]
+
+    def _on_learned(self, worker_id: int, learned: dict, final: bool) -> None:
+        if self.shared is not None:
+            self.shared.merge(learned)
+            self.merged_deltas += 1
+            if not final:
+                self._control_qs[worker_id].put(("merge", self.shared.export()))
+        if final:
+            self._final.add(worker_id)
+
+    def results(self, timeout: float = 1.0) -> Iterator[TaskResult]:
+        """Resultat som kommit in (väntar högst timeout på det första)."""
+        yield from self._drain(timeout)
+
+    def request_checkpoint(self, path: str) -> None:
+        """Be arbetare 0 skriva en checkpoint (efter nästa uppgift)."""
+        self._control_qs[0].put(("checkpoint", path))
+
+    def stop(self, timeout: float = FINAL_SYNC_TIMEOUT) -> list[TaskResult]:
+        """Stoppa arbetarna (tvåfas-synk). Returnerar resultat som kom in under tiden."""
+        if not self._procs:
+            return []
+        # Släng uppgifter som inte påbörjats — de genereras på nytt nästa körning
+        try:
+            while True:
+                if self._task_q.get_nowait() is not None:
+                    self.in_flight -= 1
+        except queue.Empty:
+            pass
+        alive = [w for w in range(self.num_workers) if w not in self.failed]
+        for _ in alive:
+            self._task_q.put(None)
+
+        late: list[TaskResult] = []
+        deadline = time.monotonic() + timeout
+        while len(self._final) < len(alive) and time.monotonic() < deadline:
+            if not any(p.is_alive() for p in self._procs):
+                break
+            late.extend(self._drain(timeout=0.2))
+
+        final_state = self.shared.export() if self.shared is not None else None
+        for worker_id in alive:
+            checkpoint = self.checkpoint_path if worker_id == min(alive) else None
+            self._control_qs[worker_id].put(("final", final_state, checkpoint))
+        for proc in self._procs:
+            proc.join(timeout=max(1.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.terminate()
+        self._procs = []
+        return late
+
+    def stats(self) -> dict:
+        return {
+            "workers": self.num_workers,
+            "ready": len(self.ready),
+            "failed": dict(self.failed),
+            "in_flight": self.in_flight,
+            "completed": dict(self.completed),
+            "merged_deltas": self.merged_deltas,
+        }
+
+
+def record_result(progress: dict, r: TaskResult) -> None:
+    """Uppdatera progressionen med ett arbetarresultat (samma fält som run_continuous)."""
+    lvl = str(r.difficulty)
+    progress["total_tasks_attempted"] = progress.get("total_tasks_attempted", 0) + 1
+    level = progress.setdefault("level_stats", {}).setdefault(lvl, {"attempted": 0, "solved": 0})
+    level["attempted"] += 1
+    cat_stat = progress.setdefault("category_stats", {}).setdefault(
+        r.category, {"attempted": 0, "solved": 0, "first_try": 0, "total_time_ms": 0.0}
+    )
+    cat_stat["attempted"] += 1
+    cat_stat["total_time_ms"] += r.time_ms
+
+    if r.solved:
+        progress["total_tasks_solved"] = progress.get("total_tasks_solved", 0) + 1
+        level["solved"] += 1
+        cat_stat["solved"] += 1
+        progress["current_streak"] = progress.get("current_streak", 0) + 1
+        progress["best_streak"] = max(progress.get("best_streak", 0), progress["current_streak"])
+        progress["total_solve_time_ms"] = progress.get("total_solve_time_ms", 0.0) + r.time_ms
+        if r.first_try:
+            progress["first_try_solves"] = progress.get("first_try_solves", 0) + 1
+            cat_stat["first_try"] += 1
+        else:
+            progress["retry_solves"] = progress.get("retry_solves", 0) + 1
+        for tag in r.tags:
+            skill = progress.setdefault("skills", {}).get(tag)
+            if skill is None:
+                progress["skills"][tag] = {
+                    "pattern": tag, "example_code": r.code[:500], "task_ids": [r.task_id],
+                    "success_rate": 1.0, "times_used": 1,
+                }
+            else:
+                skill["times_used"] = skill.get("times_used", 0) + 1
+                if r.task_id not in skill.setdefault("task_ids", []):
+                    skill["task_ids"].append(r.task_id)
+                skill["success_rate"] = 0.9 * skill.get("success_rate", 0.5) + 0.1
+    else:
+        progress["current_streak"] = 0
+
+    progress["history"].append({
+        "id": r.task_id,
+        "task_id": r.task_id,
+        "score": r.score,
+        "difficulty": r.difficulty,
+        "category": r.category,
+        "timestamp": time.time(),
+        "time_ms": round(r.time_ms, 1),
+        "stages": r.stages,
+        "attempts": r.attempts,
+        "first_try": r.first_try,
+        "strategy": r.strategy,
+        "feedback": r.feedback,
+        "hdc_concept": r.hdc_concept,
+        "hdc_new": r.hdc_new,
+        "gut_valence": r.gut_valence,
+        "gut_rec": r.gut_rec,
+        "worker": r.worker,
+    })
+
+
+def _start_local_memory_service():
+    """Starta en minnestjänst i koordinatorn om ingen är konfigurerad (bara lokal socket)."""
+    from memory_service import DEFAULT_SERVICE_ADDRESS, SERVICE_ENV, MemoryServer
+
+    if os.environ.get(SERVICE_ENV):
+        return None
+    address = DEFAULT_SERVICE_ADDRESS
+    if os.sep in address:
+        address = f"{address}.{os.getpid()}"  # Egen socket — krockar inte med en fristående daemon
+    server = MemoryServer(address).start()
+    os.environ[SERVICE_ENV] = address  # Ärvs av arbetarprocesserna
+    return server
+
+
+def run_coordinator(num_workers: int = DEFAULT_WORKERS, max_tasks: int | None = None) -> dict:
+    """Träna med N arbetarprocesser tills Ctrl+C (eller max_tasks). Returnerar statistik."""
+    import continuous_train as ct
+    from agent_checkpoint import CHECKPOINT_INTERVAL
+    from promotion_pipeline import PROMOTION_STATE_PATH
+    from rolling_stats import TrendTracker
+
+    progress_store, task_bank = ct.open_stores()
+    progress = ct.load_progress(progress_store)
+    progress["session_count"] = progress.get("session_count", 0) + 1
+    tracker = TrendTracker(progress["history"])
+    progress["history"].listeners.append(tracker.push)
+
+    server = _start_local_memory_service()
+    shared = SharedLearning(promotion_path=PROMOTION_STATE_PATH)
+    options = {
+        "history_limit": ct.HISTORY_LIMIT,
+        "spill_dir": str(ct.HISTORY_SPILL_DIR),
+        "checkpoint": str(ct.CHECKPOINT_FILE),
+    }
+    coord = TrainingCoordinator(num_workers, options=options, shared=shared,
+                                checkpoint_path=str(ct.CHECKPOINT_FILE))
+
+    stop = threading.Event()
+    signal.signal(signal.SIGINT, lambda *_: stop.set())
+    ct.log_event(f"CLUSTER START workers={num_workers}")
+    start = time.time()
+    last_checkpoint = start
+    done = 0
+    try:
+        coord.start()
+        print(f"[cluster] {len(coord.ready)}/{num_workers} arbetare redo"
+              + (f", misslyckade: {coord.failed}" if coord.failed else ""))
+        while not stop.is_set() and (max_tasks is None or done < max_tasks):
+            difficulty = ct.adaptive_difficulty(progress, stats=tracker)
+            progress["current_difficulty"] = difficulty
+            for _ in range(coord.capacity):
+                coord.submit(task_bank.sample("v1", difficulty))
+            for r in coord.results(timeout=1.0):
+                done += 1
+                record_result(progress, r)
+                if r.solved:
+                    ct.save_solution(r.task_id, r.code, r.score)
+                status = "SOLVED" if r.solved else "FAILED"
+                ct.log_event(f"{status} {r.task_id} worker={r.worker} score={r.score:.0%} "
+                             f"time={r.time_ms:.0f}ms strat={r.strategy}{' ERROR ' + r.error if r.error else ''}")
+            progress["trends"] = tracker.trends()
+            progress["cluster"] = {**coord.stats(), "tasks_per_min": round(done / max(time.time() - start, 1e-9) * 60, 1)}
+            ct.save_progress(progress_store, progress)
+            if time.time() - last_checkpoint >= CHECKPOINT_INTERVAL:
+                coord.request_checkpoint(str(ct.CHECKPOINT_FILE))
+                last_checkpoint = time.time()
+    finally:
+        for r in coord.stop():
+            record_result(progress, r)
+        elapsed = time.time() - start
+        progress["total_training_seconds"] = progress.get("total_training_seconds", 0) + elapsed
+        progress["cluster"] = {**coord.stats(), "tasks_per_min": round(done / max(elapsed, 1e-9) * 60, 1)}
+        ct.save_progress(progress_store, progress, force=True)
+        progress_store.close()
+        task_bank.close()
+        ct.log_event(f"CLUSTER STOP tasks={done} elapsed={elapsed:.0f}s")
+        ct.flush_all()
+        if server is not None:
+            server.stop()
+    return progress["cluster"]
+
+
+def benchmark_scaling(
+    worker_counts=(1, 2, 4),
+    tasks: int = 40,
+    difficulty: int = 3,
+    agent_factory: Callable = make_worker_agent,
+    options: dict | None = None,
+    task_factory: Callable | None = None,
+) -> list[dict]:
+    """Mät genomströmning (uppgifter/s) per antal arbetare.
+
+    Uppstart (agentbygge i arbetarna) räknas inte; tiden mäts från första
+    submit till sista resultat. speedup är relativt första raden.
+    """
+    if task_factory is None:
+        from task_generator import generate_task
+
+        def task_factory():
+            return generate_task(difficulty)
+
+    rows = []
+    for count in worker_counts:
+        coord = TrainingCoordinator(count, agent_factory=agent_factory, options=options)
+        coord.start()
+        batch = [task_factory() for _ in range(tasks)]
+        received = 0
+        t0 = time.perf_counter()
+        for task in batch:
+            coord.submit(task)
+        while received < tasks:
+            received += sum(1 for _ in coord.results(timeout=1.0))
+            if not any(p.is_alive() for p in coord._procs):
+                break
+        seconds = time.perf_counter() - t0
+        coord.stop()
+        rows.append({"workers": count, "tasks": received, "seconds": round(seconds, 3),
+                     "tasks_per_s": round(received / max(seconds, 1e-9), 2)})
+    base = rows[0]["tasks_per_s"] if rows else 0
+    for row in rows:
+        row["speedup"] = round(row["tasks_per_s"] / base, 2) if base else 0.0
+    return rows
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Frankenstein multiprocess-träning (lokal)")
+    parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="Antal arbetarprocesser")
+    parser.add_argument("--max-tasks", type=int, default=None, help="Stoppa efter N uppgifter")
+    parser.add_argument("--benchmark", default="", help="Kommaseparerade arbetarantal, t.ex. 1,2,4,8")
+    parser.add_argument("--tasks", type=int, default=40, help="Uppgifter per benchmarkkörning")
+    parser.add_argument("--difficulty", type=int, default=3, help="Svårighetsgrad i benchmark")
+    args = parser.parse_args()
+
+    if args.benchmark:
+        counts = [int(c) for c in args.benchmark.split(",") if c.strip()]
+        server = _start_local_memory_service()
+        try:
+            rows = benchmark_scaling(counts, tasks=args.tasks, difficulty=args.difficulty)
+        finally:
+            if server is not None:
+                server.stop()
+        print(f"{'workers':>8} {'tasks':>6} {'sek':>8} {'upg/s':>8} {'speedup':>8}")
+        for row in rows:
+            print(f"{row['workers']:>8} {row['tasks']:>6} {row['seconds']:>8.2f} "
+                  f"{row['tasks_per_s']:>8.2f} {row['speedup']:>8.2f}")
+        return
+    run_coordinator(args.workers, max_tasks=args.max_tasks)
+
+
+if __name__ == "__main__":
+    main()
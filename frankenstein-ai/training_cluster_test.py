@@ -0,0 +1,179 @@
+"""
+Enhetstester för training_cluster.py — koordinator/arbetare, sammanslagning och benchmark.
+
+Arbetarna kör en lätt fejkagent så att testerna inte bygger hela stacken.
+
+Kör med: python -m pytest training_cluster_test.py -v
+"""
+
+import os
+import sys
+import tempfile
+import time
+import unittest
+from types import SimpleNamespace
+
+import torch
+
+sys.path.insert(0, os.path.dirname(__file__))
+
+from code_agent import SkillMemory, merge_learned_into
+from programming_env import Task
+from training_cluster import SharedLearning, TaskResult, TrainingCoordinator, benchmark_scaling, record_result
+
+
+class FakeAgent:
+    def __init__(self, worker_id):
+        self.worker_id = worker_id
+        self.merged = 0
+
+    def solve_task(self, task, verbose=False):
+        time.sleep(0.01)
+        score = 1.0 if task.difficulty % 2 else 0.0
+        return SimpleNamespace(score=score, code=f"# {task.id}", feedback="", metadata=None)
+
+    def export_learned(self, since=0.0):
+        return {"worker": self.worker_id}
+
+    def merge_learned(self, learned):
+        self.merged += 1
+
+    def checkpoint(self, path):
+        with open(path, "w") as f:
+            f.write(f"worker={self.worker_id} merged={self.merged}")
+
+
+def fake_factory(worker_id, options):
+    return FakeAgent(worker_id)
+
+
+class ThrottledAgent(FakeAgent):
+    """Reserverar en LLM-lucka per uppgift och returnerar den som kod."""
+
+    def __init__(self, worker_id, throttle):
+        super().__init__(worker_id)
+        self.throttle = throttle
+
+    def solve_task(self, task, verbose=False):
+        slot = self.throttle.reserve(0.05)
+        time.sleep(max(0.0, slot - time.time()))
+        return SimpleNamespace(score=1.0, code=repr(slot), feedback="", metadata=None)
+
+
+def throttled_factory(worker_id, options):
+    return ThrottledAgent(worker_id, options["llm_throttle"])
+
+
+def failing_factory(worker_id, options):
+    raise RuntimeError("ingen agent")
+
+
+def _task(i, difficulty=1):
+    return Task(id=f"t{i}", title=f"T{i}", description="", difficulty=difficulty,
+                category="math", test_cases=[], tags=["loop"])
+
+
+class TestCoordinator(unittest.TestCase):
+    def test_all_tasks_are_processed_and_checkpoint_written(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            ckpt = os.path.join(tmp, "agent.bin")
+            coord = TrainingCoordinator(2, agent_factory=fake_factory, checkpoint_path=ckpt,
+                                        options={"merge_interval": 3}).start()
+            for i in range(10):
+                coord.submit(_task(i, difficulty=1 + i % 2))
+            results: list[TaskResult] = []
+            deadline = time.monotonic() + 30
+            while len(results) < 10 and time.monotonic() < deadline:
+                results.extend(coord.results(timeout=0.5))
+            coord.stop()
+            self.assertEqual(sorted(r.task_id for r in results), sorted(f"t{i}" for i in range(10)))
+            self.assertEqual(sum(coord.completed.values()), 10)
+            self.assertEqual(coord.in_flight, 0)
+            self.assertEqual(sum(r.solved for r in results), 5)
+            self.assertTrue(os.path.exists(ckpt))
+
+    def test_workers_share_one_llm_throttle(self):
+        coord = TrainingCoordinator(3, agent_factory=throttled_factory).start()
+        for i in range(12):
+            coord.submit(_task(i))
+        results: list[TaskResult] = []
+        deadline = time.monotonic() + 30
+        while len(results) < 12 and time.monotonic() < deadline:
+            results.extend(coord.results(timeout=0.5))
+        coord.stop()
+        self.assertGreater(len({r.worker for r in results}), 1)
+        slots = sorted(float(r.code) for r in results)
+        self.assertEqual(len(slots), 12)
+        for a, b in zip(slots, slots[1:]):
+            self.assertGreaterEqual(b - a, 0.05 - 1e-6)  # Luckorna delas över processgränsen
+        self.assertEqual(coord.llm_throttle.last_call, slots[-1])
+
+    def test_start_fails_when_no_worker_comes_up(self):
+        coord = TrainingCoordinator(1, agent_factory=failing_factory)
+        with self.assertRaises(RuntimeError):
+            coord.start(timeout=30)
+        coord.stop()
+
+    def test_benchmark_reports_speedup_per_worker_count(self):
+        rows = benchmark_scaling((1, 2), tasks=6, agent_factory=fake_factory, task_factory=lambda: _task(0))
+        self.assertEqual([r["workers"] for r in rows], [1, 2])
+        self.assertEqual([r["tasks"] for r in rows], [6, 6])
+        self.assertEqual(rows[0]["speedup"], 1.0)
+
+
+class TestLearningMerge(unittest.TestCase):
+    def _holder(self):
+        holder = SharedLearning(promotion_path=None)
+        holder.promotion.promoted_s1.clear()
+        holder.promotion.promoted_s0.clear()
+        return holder
+
+    def test_concepts_match_by_similarity_not_name(self):
+        a, b = self._holder(), self._holder()
+        hv = torch.nn.functional.normalize(torch.randn(a.hdc.hdc_dim), dim=0)
+        a.hdc.learn_concept("sort_3", hv)
+        a.concept_code["sort_3"] = "def f(): pass"
+        b.hdc.learn_concept("sort_0", hv + 0.001 * torch.randn(b.hdc.hdc_dim))
+        b.hdc.learn_concept("sort_3", torch.randn(b.hdc.hdc_dim))  # Samma namn, annat mönster
+
+        added = merge_learned_into(b, a.export())
+        self.assertEqual(added["concepts"], 0)
+        self.assertEqual(b.concept_code, {"sort_0": "def f(): pass"})
+        self.assertEqual(merge_learned_into(b, a.export())["concept_code"], 0)
+
+        c = self._holder()
+        c.hdc.learn_concept("sort_3", torch.randn(c.hdc.hdc_dim))
+        merge_learned_into(c, a.export())
+        self.assertEqual(c.hdc.get_concept_names(), ["sort_3", "sort_3~1"])
+        self.assertEqual(c.concept_code, {"sort_3~1": "def f(): pass"})
+
+    def test_cache_promotions_and_skills(self):
+        a, b = self._holder(), self._holder()
+        a._response_cache = {"h1": ("new", 20.0), "h2": ("x", 5.0)}
+        b._response_cache = {"h1": ("old", 10.0)}
+        a.promotion.promoted_s1["math:1"] = "code"
+        a.skills["loop"] = SkillMemory("loop", "for", ["t1"], 0.9, times_used=5)
+        b.skills["loop"] = SkillMemory("loop", "while", ["t2"], 0.5, times_used=2)
+
+        added = merge_learned_into(b, a.export())
+        self.assertEqual(b._response_cache["h1"], ("new", 20.0))
+        self.assertEqual(added["response_cache"], 1)
+        self.assertEqual(b.promotion.promoted_s1, {"math:1": "code"})
+        self.assertEqual(b.skills["loop"].times_used, 5)
+
+
+class TestRecordResult(unittest.TestCase):
+    def test_progress_fields_match_single_process_loop(self):
+        progress = {"history": [], "skills": {}}
+        record_result(progress, TaskResult(0, "t1", "T", "math", 3, ["loop"], score=1.0, first_try=True, time_ms=12.0))
+        record_result(progress, TaskResult(1, "t2", "T", "math", 3, ["loop"], score=0.5))
+        self.assertEqual(progress["total_tasks_attempted"], 2)
+        self.assertEqual(progress["level_stats"]["3"], {"attempted": 2, "solved": 1})
+        self.assertEqual(progress["category_stats"]["math"]["first_try"], 1)
+        self.assertEqual(progress["current_streak"], 0)
+        self.assertEqual(progress["skills"]["loop"]["times_used"], 1)
+        self.assertEqual([h["worker"] for h in progress["history"]], [0, 1])
+
+
+if __name__ == "__main__":
+    unittest.main()
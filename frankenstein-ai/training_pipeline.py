@@ -0,0 +1,234 @@
+"""
+Stegvis producent/konsument-pipeline för kontinuerlig träning.
+
+Den seriella loopen (generera → lös → evaluera → uppdatera) lämnar CPU:n
+oanvänd medan LLM-anrop väntar och LLM:en oanvänd under evaluering.
+Här delas arbetet upp i steg som körs i egna trådar, kopplade med
+begränsade köer (backpressure):
+
+1. generate:  Generera/förhämta uppgifter
+2. fast_path: S0 — deterministisk solver + evaluering (ingen LLM)
+3. draft:     S2 — första LLM-utkastet för uppgifter som S0 inte löste
+4. evaluate:  Kör utkastet mot testfallen
+
+Lärsteget (agent.solve_task med förhämtat arbete + progress-uppdatering)
+körs av konsumenten i anropande tråd — alltid en uppgift i taget, så att
+agentens tillstånd förblir konsistent.
+
+Antal trådar per steg: STAGE_WORKERS, kan överstyras med miljövariabeln
+FRANKENSTEIN_PIPELINE_WORKERS="draft=4,evaluate=2".
+"""
+
+import os
+import queue
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterator
+
+from code_agent import PrefetchedSolution
+from code_solver import solve_deterministic as solve_code_deterministic
+from programming_env import Task, evaluate_solution
+
+WORKERS_ENV = "FRANKENSTEIN_PIPELINE_WORKERS"
+
+# Standardparallellism per steg — LLM-steget begränsas i praktiken av throttlingen
+STAGE_WORKERS = {"generate": 1, "fast_path": 2, "draft": 2, "evaluate": 2}
+
+# Max antal väntande objekt mellan två steg
+DEFAULT_QUEUE_SIZE = 4
+
+# Uppgifter på/över denna nivå får ASI-kontext i solve_task — inget förhämtat utkast
+DRAFT_MAX_DIFFICULTY = 9
+
+_DONE = object()
+
+
+@dataclass
+class PipelineItem:
+    """En uppgift på väg genom pipelinen."""
+    seq: int
+    task: Task | None = None
+    prefetched: PrefetchedSolution = field(default_factory=PrefetchedSolution)
+    error: str = ""
+    stage_ms: dict[str, float] = field(default_factory=dict)
+
+
+@dataclass
+class Stage:
+    """Ett pipelinesteg: fn(item) -> item, körs av `workers` trådar."""
+    name: str
+    fn: Callable[[PipelineItem], PipelineItem]
+    workers: int = 1
+
+
+def stage_workers(overrides: str | None = None) -> dict[str, int]:
+    """STAGE_WORKERS med överstyrningar från "steg=antal,..." (eller miljön)."""
+    workers = dict(STAGE_WORKERS)
+    spec = os.environ.get(WORKERS_ENV, "") if overrides is None else overrides
+    for part in spec.split(","):
+        if "=" not in part:
+            continue
+        name, count = part.split("=", 1)
+        name = name.strip()
+        if name not in workers:
+            raise ValueError(f"Okänt pipelinesteg: {name} (välj {sorted(workers)})")
+        workers[name] = max(1, int(count))
+    return workers
+
+
+class TrainingPipeline:
+    """Kör en följd av steg parallellt, kopplade med begränsade köer.
+
+    Objekt strömmar ut i den ordning de blir klara. Ett steg som kastar
+    markerar objektet med error; efterföljande steg hoppar över det men
+    skickar det vidare, så konsumenten ser varje uppgift exakt en gång.
+    """
+
+    def __init__(self, stages: list[Stage], queue_size: int = DEFAULT_QUEUE_SIZE):
+        if not stages:
+            raise ValueError("Pipelinen behöver minst ett steg")
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats: dict[str, dict[str, float]] = {
+            s.name: {"items": 0, "errors": 0, "busy_ms": 0.0} for s in stages
+        }
+        self._stats_lock = threading.Lock()
+
+    def run(self, count: int, should_stop: Callable[[], bool] = lambda: False) -> Iterator[PipelineItem]:
+        """Mata in `count` uppgifter och leverera dem till konsumenten.
+
+        should_stop() kontrolleras innan varje ny uppgift matas in; redan
+        påbörjade uppgifter levereras fortfarande. Avbryts iterationen
+        (break) signaleras alla trådar att sluta.
+        """
+        stop = threading.Event()
+        queues = [queue.Queue(maxsize=self.queue_size) for _ in range(len(self.stages) + 1)]
+        threads: list[threading.Thread] = []
+
+        feeder = threading.Thread(
+            target=self._feed, args=(queues[0], count, should_stop, stop),
+            name="pipeline-feed", daemon=True,
+        )
+        threads.append(feeder)
+        for i, stage in enumerate(self.stages):
+            remaining = [stage.workers]
+            lock = threading.Lock()
+            for w in range(stage.workers):
+                threads.append(threading.Thread(
+                    target=self._work,
+                    args=(stage, queues[i], queues[i + 1], stop, remaining, lock),
+                    name=f"pipeline-{stage.name}-{w}", daemon=True,
+                ))
+        for t in threads:
+            t.start()
+
+        out = queues[-1]
+        try:
+            while True:
+                item = out.get()
+                if item is _DONE:
+                    break
+                yield item
+        finally:
+            stop.set()
+
+    def _feed(self, q: queue.Queue, count: int, should_stop, stop: threading.Event) -> None:
+        for seq in range(count):
+            if stop.is_set() or should_stop():
+                break
+            if not _put(q, PipelineItem(seq=seq), stop):
+                return
+        _put(q, _DONE, stop)
+
+    def _work(self, stage: Stage, inq: queue.Queue, outq: queue.Queue,
+              stop: threading.Event, remaining: list[int], lock: threading.Lock) -> None:
+        while not stop.is_set():
+            try:
+                item = inq.get(timeout=0.1)
+            except queue.Empty:
+                continue
+            if item is _DONE:
+                inq.put(item)  # Låt syskontrådarna också se slutet
+                with lock:
+                    remaining[0] -= 1
+                    last = remaining[0] == 0
+                if last:
+                    _put(outq, _DONE, stop)
+                return
+            if not item.error:
+                t0 = time.time()
+                try:
+                    item = stage.fn(item)
+                except Exception as e:
+                    item.error = f"{stage.name}: {e}"
+                elapsed = (time.time() - t0) * 1000
+                item.stage_ms[stage.name] = round(elapsed, 1)
+                with self._stats_lock:
+                    st = self.stats[stage.name]
+                    st["items"] += 1
+                    st["busy_ms"] += elapsed
+                    if item.error:
+                        st["errors"] += 1
+            if not _put(outq, item, stop):
+                return
+
+
+def _put(q: queue.Queue, item, stop: threading.Event) -> bool:
+    """Blockerande put som ger upp när pipelinen stoppas."""
+    while not stop.is_set():
+        try:
+            q.put(item, timeout=0.1)
+            return True
+        except queue.Full:
+            continue
+    return False
+
+
+def build_code_pipeline(
+    agent,
+    generate: Callable[[], Task],
+    workers: dict[str, int] | None = None,
+    queue_size: int = DEFAULT_QUEUE_SIZE,
+) -> TrainingPipeline:
+    """Pipeline för vanliga kodbatcher: generera → S0 → S2-utkast → evaluera.
+
+    Stegen läser inte agentens lärtillstånd (bara has_cached_solution och
+    draft_solution, som är trådsäkra); allt som ändrar tillstånd sker i
+    solve_task hos konsumenten. Uppgifter som S0/S1 redan kan lösa
+    (befordrad lösning eller lagrad konceptkod) får inget utkast.
+    """
+    workers = workers or stage_workers()
+
+    def generate_stage(item: PipelineItem) -> PipelineItem:
+        item.task = generate()
+        return item
+
+    def fast_path_stage(item: PipelineItem) -> PipelineItem:
+        pre = item.prefetched
+        pre.s0_code = solve_code_deterministic(item.task)
+        if pre.s0_code:
+            pre.s0_result = evaluate_solution(item.task, pre.s0_code)
+        pre.s0_checked = True
+        return item
+
+    def draft_stage(item: PipelineItem) -> PipelineItem:
+        pre = item.prefetched
+        s0_solved = pre.s0_result is not None and pre.s0_result.score >= 1.0
+        if (not s0_solved and item.task.difficulty <= DRAFT_MAX_DIFFICULTY
+                and not agent.has_cached_solution(item.task)):
+            pre.draft_code = agent.draft_solution(item.task)
+        return item
+
+    def evaluate_stage(item: PipelineItem) -> PipelineItem:
+        pre = item.prefetched
+        if pre.draft_code:
+            pre.draft_result = evaluate_solution(item.task, pre.draft_code)
+        return item
+
+    return TrainingPipeline([
+        Stage("generate", generate_stage, workers["generate"]),
+        Stage("fast_path", fast_path_stage, workers["fast_path"]),
+        Stage("draft", draft_stage, workers["draft"]),
+        Stage("evaluate", evaluate_stage, workers["evaluate"]),
+    ], queue_size=queue_size)